@@ -1,61 +1,94 @@
 from dotenv import load_dotenv
-from langchain_core.tools import BaseTool
 
 load_dotenv()
 
+from agentstr_demo.lazy import Lazy, defer_agentstr_langchain, prepare
+
+defer_agentstr_langchain()
+
 import os
 import uuid
 import asyncio
 from agentstr.nostr_agent_server import NoteFilters
 from pynostr.key import PrivateKey
-from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from agentstr import NostrClient, NostrAgentServer, AgentCard, NostrMCPClient, Skill, ChatInput
-from agentstr.mcp.langgraph import to_langgraph_tools
-from langchain_openai import ChatOpenAI
+from agentstr_demo.mcp_cache import CachedMCPClient, ToolPolicy
+from agentstr import NostrClient, AgentCard, NostrMCPClient, Skill, ChatInput
+from agentstr_demo.server import AgentServer
 
 # Get the environment variables
 relays = os.getenv('NOSTR_RELAYS').split(',')
 private_key = os.getenv('AGENT_PRIVATE_KEY')
 
-# Define LLM
-model = ChatOpenAI(temperature=0,
-                   base_url=os.getenv('LLM_BASE_URL'),
-                   api_key=os.getenv('LLM_API_KEY'),
-                   model_name=os.getenv('LLM_MODEL_NAME'))
-
 # Initialize Nostr client
 nostr_client = NostrClient(relays, private_key)
 
+
+def load_agent_factory():
+    """Import LangGraph and create the LLM and checkpointer; returns a function creating the agent for a tool list."""
+    from langchain_openai import ChatOpenAI
+    from langgraph.prebuilt import create_react_agent
+    from agentstr_demo.checkpoint import SQLiteCheckpointer
+
+    # Define LLM
+    model = ChatOpenAI(temperature=0,
+                       base_url=os.getenv('LLM_BASE_URL'),
+                       api_key=os.getenv('LLM_API_KEY'),
+                       model_name=os.getenv('LLM_MODEL_NAME'))
+    checkpointer = SQLiteCheckpointer.from_env(os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints.sqlite3"))
+    return lambda tools: create_react_agent(model, tools, checkpointer=checkpointer)
+
+
 async def run():
     # Discover MCP servers
-    mcp_pubkey = 'npub1m7kklaydljpjscl37xpdgtzfs66u70t5aex68pgdnsmjcx0vllrsmxl6vk'
+    mcp_pubkey = os.getenv('MCP_SERVER_PUBKEY') or 'npub1m7kklaydljpjscl37xpdgtzfs66u70t5aex68pgdnsmjcx0vllrsmxl6vk'
+
+    server = None  # Created below, once the agent card is ready
 
-    # Get tools from MCP servers
-    tools: list[BaseTool] = await to_langgraph_tools(NostrMCPClient(
+    # Rebuild the agent if the MCP server's tools changed since they were saved,
+    # and publish the agent card again with the new skills
+    async def refresh_tools():
+        agent.reset()
+        await prepare(agent)
+        if server is not None:
+            await server.update_agent_info(agent_card((await mcp_client.list_tools())['tools']))
+
+    # Get tools from MCP servers (saved schemas are used at startup, repeated calls are answered from a local cache)
+    mcp_client = CachedMCPClient(NostrMCPClient(
         nostr_client=nostr_client,
         mcp_pubkey=mcp_pubkey,
-    ))
-
-    # Create ReAct agent
-    agent = create_react_agent(model, tools, checkpointer=MemorySaver())
-
-    # Define skills
-    skills = [Skill(
-        name=tool.name,
-        description=tool.description,
-        satoshis=tool.metadata.get("satoshis", 0),
-    ) for tool in tools]
-
-    # Define agent info
-    agent_info = AgentCard(
-        name='Bitcoin Agent',
-        description='This agent can query bitcoin blockchain data',
-        skills=skills,
-        satoshis=0,
-        nostr_pubkey=PrivateKey.from_nsec(private_key).public_key.bech32(),
-        nostr_relays=relays,
-    )
+    ), {
+        'get_bitcoin_data': ToolPolicy(ttl=30),  # blockchain.info values change at most every 30 seconds
+    }, schema_cache=os.getenv("MCP_SCHEMA_CACHE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_schemas.sqlite3"),
+       on_schema_change=refresh_tools)
+
+    # Create ReAct agent (when AGENT_STARTUP asks, see agentstr_demo.lazy)
+    agent_factory = Lazy(load_agent_factory)
+
+    async def build_agent():
+        create_agent = await agent_factory.get()
+        from agentstr.mcp.langgraph import to_langgraph_tools  # Cheap once LangChain is loaded
+        return create_agent(await to_langgraph_tools(mcp_client))
+
+    agent = Lazy(build_agent)
+    await prepare(agent)
+
+    # Define agent info, with a skill per MCP tool
+    def agent_card(tools: list[dict]) -> AgentCard:
+        skills = [Skill(
+            name=tool['name'],
+            description=tool.get('description') or '',
+            satoshis=tool.get('satoshis', 0),
+        ) for tool in tools]
+        return AgentCard(
+            name='Bitcoin Agent',
+            description='This agent can query bitcoin blockchain data',
+            skills=skills,
+            satoshis=0,
+            nostr_pubkey=PrivateKey.from_nsec(private_key).public_key.bech32(),
+            nostr_relays=relays,
+        )
+
+    agent_info = agent_card((await mcp_client.list_tools())['tools'])
 
     # Define note filters (only listen to me for now)
     note_filters = NoteFilters(
@@ -65,14 +98,14 @@ async def run():
     # Define agent callable
     async def agent_callable(input: ChatInput) -> str:
         config = {"configurable": {"thread_id": input.thread_id or str(uuid.uuid4())}}
-        result = await agent.ainvoke({"messages": input.messages[-1]}, config=config)
+        result = await (await agent.get()).ainvoke({"messages": input.messages[-1]}, config=config)
         return result["messages"][-1].content
 
     # Create server
-    server = NostrAgentServer(nostr_client,
-                              note_filters=note_filters,
-                              agent_info=agent_info,
-                              agent_callable=agent_callable)
+    server = AgentServer(nostr_client,
+                         note_filters=note_filters,
+                         agent_info=agent_info,
+                         agent_callable=agent_callable)
 
     # Start server
     await server.start()
@@ -2,11 +2,19 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from agentstr_demo.lazy import Lazy, defer_agentstr_langchain, prepare
+
+defer_agentstr_langchain()
+
 import os
-import json
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-from agentstr import NostrClient, AgentCard, ChatInput, Skill, PrivateKey, NostrAgentServer
+from agentstr import NostrClient, AgentCard, ChatInput, Skill, PrivateKey
+from agentstr_demo import metrics
+from agentstr_demo.embeddings import DEFAULT_MODEL, load_embedder
+from agentstr_demo.scheduler import InstancePool
+from agentstr_demo.server import AgentServer
+from registry import AgentRegistry
+from router import RouteDecision, TieredRouter
+from router_index import AgentIndex
 
 
 base_url = os.getenv("LLM_BASE_URL")
@@ -16,42 +24,30 @@ model_name = os.getenv("LLM_MODEL_NAME")
 
 client = NostrClient(relays=os.getenv("NOSTR_RELAYS").split(","), private_key=os.getenv("AGENT_PRIVATE_KEY"))
 
-with open(os.path.join(os.path.dirname(__file__), 'known_agents.txt'), 'r') as f:
+known_agents_path = os.path.join(os.path.dirname(__file__), 'known_agents.txt')
+with open(known_agents_path, 'r') as f:
     known_agents = f.read().splitlines()
 
-async def run():
-    agent_cards = []
-    name_to_pubkey = {}
-    for pubkey in known_agents:
-        metadata = await client.get_metadata_for_pubkey(pubkey.strip())
-        try:
-            agent_info = AgentCard.model_validate_json(metadata.about)
-            agent_cards.append(agent_info)
-            name_to_pubkey[agent_info.name] = pubkey
-            print(json.dumps(agent_info.model_dump(), indent=4))
-        except:
-            pass  # Invalid agent card
-
-    print(f'Num agents: {len(agent_cards)}')
-    prompt = """You are an intelligent agent router that helps users find the most relevant agents on Nostr based on their requests. 
-
-Your task is to carefully analyze the user's request and match it with the most suitable agent from the list below. Consider the following guidelines:
+registry = AgentRegistry(
+    client,
+    known_agents,
+    cache_path=os.getenv('DISCOVERY_CACHE_PATH') or os.path.join(os.path.dirname(__file__), 'agent_cards.json'),
+    open_registry=os.getenv('DISCOVERY_OPEN_REGISTRY', '').lower() in ('1', 'true', 'yes'),
+)
+
+# Only the top-k matching agent cards go into each routing prompt
+top_k = int(os.getenv('DISCOVERY_TOP_K', '5'))
+agent_index = AgentIndex(embed=load_embedder(DEFAULT_MODEL, fallback=False) if os.getenv('DISCOVERY_EMBEDDINGS', '').lower() in ('1', 'true', 'yes') else None)
+
+
+ROUTER_PROMPT = """You are an intelligent agent router that helps users find the most relevant agents on Nostr based on their requests. 
+
+Your task is to carefully analyze the user's request and match it with the most suitable agent from the candidate agents listed with it. Consider the following guidelines:
 1. Only recommend an agent if there's a strong match with the user's request
 2. Be specific about why the agent is a good match
 3. If no agent is a good fit, explicitly state that no agent is a good fit
 4. Consider both the agent's name and description when making matches
 
-Available Agents:
-"""
-    for agent_card in agent_cards:
-        prompt += f"""
-{'='*80}
-Name: {agent_card.name}
-Description: {agent_card.description}
-{'='*80}"""
-
-    prompt += """
-
 Response Format:
 {
     "name": "Agent Name",  // Only include if there's a match
@@ -77,56 +73,88 @@ User: "Find me a coding tutor"
     "message": "The Code Mentor agent can help you learn programming with personalized tutoring sessions and coding exercises."
 }"""
 
-    print(f'Prompt: {prompt}')
 
-    agent = Agent(
+def build_message(request: str, agent_cards: list[AgentCard]) -> str:
+    message = "Available Agents:\n"
+    for agent_card in agent_cards:
+        message += f"""
+{'='*80}
+Name: {agent_card.name}
+Description: {agent_card.description}
+{'='*80}"""
+    return f"{message}\n\nUser: \"{request}\""
+
+
+def load_agents():
+    """Import agno; returns the pool of routing agents."""
+    from agno.agent import Agent
+    from agno.models.openai import OpenAIChat
+
+    # agno agents keep the running session on the instance, so concurrent turns each take their own
+    return InstancePool(lambda: Agent(
         model=OpenAIChat(
             temperature=0,
             base_url=base_url,
             api_key=api_key,
             id=model_name,
         ),
-        system_message=prompt
-    )
+        system_message=ROUTER_PROMPT,
+        response_model=RouteDecision,
+        use_json_mode=True,
+    ))
+
 
+async def run():
+    # Only requests the fast path can't answer need agno, imported when AGENT_STARTUP asks (see agentstr_demo.lazy)
+    agents = Lazy(load_agents)
+    await prepare(agents)
+
+    async def ask_llm(request: str, agent_cards: list[AgentCard], thread_id: str | None) -> RouteDecision | str:
+        with (await agents.get()).acquire() as agent:
+            result = await agent.arun(message=build_message(request, agent_cards), session_id=thread_id)
+        return result.content
+
+    # Keyword/skill matches are answered directly; only ambiguous requests reach the LLM
+    router = TieredRouter(ask_llm, index=agent_index, top_k=top_k)
+    # Routing counts and median latency per tier, read from the router when the metrics are scraped
+    routed = metrics.Counter('agentstr_discovery_routed_total', 'Discovery requests routed, by tier (fast path or LLM).',
+                             ['tier'])
+    route_p50 = metrics.Gauge('agentstr_discovery_route_p50_seconds', 'Median time to route a recent discovery request, '
+                              'by tier.', ['tier'])
+    for tier in router.counts:
+        routed.labels(tier).set_function(lambda tier=tier: router.counts[tier])
+        route_p50.labels(tier).set_function(lambda tier=tier: (router.stats()[tier]['p50_ms'] or 0) / 1000)
+
+    def update_agents(registry: AgentRegistry):
+        cards = registry.cards
+        router.build(cards)
+        print(f'Num agents: {len(cards)}')
+
+    # Serve cached cards right away, then keep them fresh from relay metadata updates
+    registry.on_change = update_agents
+    await registry.start()
+    registry.follow_file(known_agents_path)
 
     # Define agent callable
     async def agent_callable(input: ChatInput) -> str:
-        result = await agent.arun(message=input.messages[-1], session_id=input.thread_id)
-        content = result.content
-        if '{' in content and '}' in content:
-            try:
-                content = json.loads(content[content.find("{"):content.rfind("}")+1])
-                name = content.get('name')
-                message = content.get('message')
-                if name and name in name_to_pubkey:
-                    pubkey = name_to_pubkey[name]
-                    link = f'https://primal.net/p/{pubkey}'
-                    return f"{message}\n\nYou can find the agent here: {link}"
-                return message if message else "No agent with relevant skills found."
-            except:
-                pass
-        elif "none" == content.lower().strip():
-            return "No agent with relevant skills found."
-        return content.strip()
-        
+        return await router.route(input.messages[-1], thread_id=input.thread_id)
 
     # Create Nostr Agent Server
-    server = NostrAgentServer(relays=os.getenv("NOSTR_RELAYS").split(","),
-                              private_key=os.getenv("AGENT_PRIVATE_KEY"),
-                              nwc_str=os.getenv("AGENT_NWC_CONN_STR"),
-                              agent_info=AgentCard(
-                                  name='Discovery Agent',
-                                  description='This agent can help users find other agents on Nostr.',
-                                  skills=[Skill(
-                                    name='agent_finder', 
-                                    description='Find an agent that matches users\' request.', 
-                                    satoshis=0
-                                  )],
-                                  satoshis=0,
-                                  nostr_pubkey=PrivateKey.from_nsec(os.getenv('AGENT_PRIVATE_KEY')).public_key.bech32(),
-                              ),
-                              agent_callable=agent_callable)
+    server = AgentServer(relays=os.getenv("NOSTR_RELAYS").split(","),
+                         private_key=os.getenv("AGENT_PRIVATE_KEY"),
+                         nwc_str=os.getenv("AGENT_NWC_CONN_STR"),
+                         agent_info=AgentCard(
+                             name='Discovery Agent',
+                             description='This agent can help users find other agents on Nostr.',
+                             skills=[Skill(
+                               name='agent_finder', 
+                               description='Find an agent that matches users\' request.', 
+                               satoshis=0
+                             )],
+                             satoshis=0,
+                             nostr_pubkey=PrivateKey.from_nsec(os.getenv('AGENT_PRIVATE_KEY')).public_key.bech32(),
+                         ),
+                         agent_callable=agent_callable)
 
     # Start server
     await server.start()
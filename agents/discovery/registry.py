@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import time
+from collections.abc import Awaitable, Callable
+
+from agentstr import AgentCard, NostrClient
+from pynostr.event import Event, EventKind
+from pynostr.filters import Filters
+from pynostr.key import PublicKey
+
+
+def _to_hex(pubkey: str) -> str:
+    return PublicKey.from_npub(pubkey).hex() if pubkey.startswith('npub') else pubkey
+
+
+def _parse_card(event: Event) -> AgentCard | None:
+    """The AgentCard in a metadata event's `about` field, or None if it has none."""
+    try:
+        return AgentCard.model_validate_json(json.loads(event.content)['about'])
+    except Exception:
+        return None  # Not an agent, or an invalid agent card
+
+
+class AgentRegistry:
+    """Agent cards of known agents, kept up to date from their Nostr metadata.
+
+    Cards are fetched in batches (one relay request per `batch_size` agents, at most
+    `concurrency` requests at a time) and cached in a JSON file so a restart can serve
+    the previous cards right away. `watch()` subscribes to metadata events, so new
+    or updated cards show up without a restart.
+    """
+    def __init__(self,
+                 client: NostrClient,
+                 pubkeys: list[str],
+                 cache_path: str | None = None,
+                 batch_size: int = 100,
+                 concurrency: int = 8,
+                 timeout: float = 10,
+                 open_registry: bool = False,
+                 on_change: Callable[['AgentRegistry'], Awaitable[None] | None] | None = None):
+        """Initialize the registry.
+
+        Args:
+            client: Nostr client used to query and subscribe to relays.
+            pubkeys: Agent public keys (npub or hex) to track.
+            cache_path: JSON file where validated cards are persisted (no cache if None).
+            batch_size: Agents per metadata request.
+            concurrency: Maximum number of metadata requests in flight.
+            timeout: Seconds to wait for a metadata request.
+            open_registry: Also admit any other author whose metadata holds a valid agent card.
+            on_change: Called after cards were added or updated.
+        """
+        self.client = client
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.open_registry = open_registry
+        self.on_change = on_change
+        self._npubs: dict[str, str] = {}  # hex -> the form the agent was listed under
+        self._cards: dict[str, tuple[int, AgentCard]] = {}  # hex -> (metadata created_at, card)
+        self._tasks: set[asyncio.Task] = set()
+        self._watch_task: asyncio.Task | None = None
+        for pubkey in pubkeys:
+            self._track(pubkey)
+
+    def _track(self, pubkey: str) -> bool:
+        pubkey = pubkey.strip()
+        if not pubkey:
+            return False
+        key = _to_hex(pubkey)
+        if key in self._npubs:
+            return False
+        self._npubs[key] = pubkey if pubkey.startswith('npub') else PublicKey.from_hex(pubkey).bech32()
+        return True
+
+    @property
+    def cards(self) -> dict[str, AgentCard]:
+        """Valid agent cards by npub."""
+        return {self._npubs[key]: card for key, (_, card) in self._cards.items()}
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def load_cache(self) -> int:
+        """Load cards persisted by a previous run. Returns how many were loaded."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return 0
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return 0
+        for key, entry in cached.items():
+            if key in self._npubs or self.open_registry:
+                self._npubs.setdefault(key, entry['npub'])
+                self._cards[key] = (entry['created_at'], AgentCard.model_validate(entry['card']))
+        return len(self._cards)
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        data = {key: {'npub': self._npubs[key], 'created_at': created_at, 'card': card.model_dump()}
+                for key, (created_at, card) in self._cards.items()}
+        tmp = f'{self.cache_path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.cache_path)
+
+    def _apply(self, event: Event) -> bool:
+        """Update the card from a metadata event if it is newer. Returns whether anything changed."""
+        if event.kind != EventKind.SET_METADATA:
+            return False
+        current = self._cards.get(event.pubkey)
+        if current is not None and current[0] >= event.created_at:
+            return False
+        card = _parse_card(event)
+        if card is None:
+            return False
+        if event.pubkey not in self._npubs:
+            if not self.open_registry:
+                return False
+            self._track(event.pubkey)
+        self._cards[event.pubkey] = (event.created_at, card)
+        return True
+
+    async def refresh(self, pubkeys: list[str] | None = None) -> int:
+        """Fetch the latest metadata of `pubkeys` (default: every tracked agent). Returns how many cards changed."""
+        keys = [_to_hex(p) for p in pubkeys] if pubkeys is not None else list(self._npubs)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(batch: list[str]) -> list[Event]:
+            async with semaphore:
+                filters = Filters(kinds=[EventKind.SET_METADATA], authors=batch, limit=len(batch))
+                return await self.client.relay_manager.get_events(filters, limit=len(batch), timeout=self.timeout)
+
+        batches = [keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+        results = await asyncio.gather(*(fetch(batch) for batch in batches), return_exceptions=True)
+        changed = sum(self._apply(event) for events in results if not isinstance(events, BaseException) for event in events)
+        if changed:
+            await self._changed()
+        return changed
+
+    async def add(self, pubkeys: list[str]) -> int:
+        """Track more agents and fetch their cards. Returns how many cards were added."""
+        new = [p for p in pubkeys if self._track(p)]
+        if not new:
+            return 0
+        self._restart_watch()
+        return await self.refresh(new)
+
+    async def _changed(self):
+        self.save_cache()
+        await self._notify()
+
+    async def _notify(self):
+        if self.on_change is not None:
+            result = self.on_change(self)
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def _on_event(self, event: Event):
+        if self._apply(event):
+            await self._changed()
+
+    async def _listen(self):
+        filters = Filters(kinds=[EventKind.SET_METADATA], since=int(time.time()))
+        if not self.open_registry:
+            filters.authors = list(self._npubs)
+        await self.client.relay_manager.event_listener(filters, self._on_event)
+
+    def _restart_watch(self):
+        if self._watch_task is not None and not self.open_registry:
+            self._watch_task.cancel()
+            self._watch_task = asyncio.create_task(self._listen())
+
+    def watch(self) -> asyncio.Task:
+        """Start (or return) the background subscription to metadata updates."""
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._listen())
+        return self._watch_task
+
+    async def start(self) -> int:
+        """Serve cached cards right away and refresh them in the background; with an empty cache,
+        wait for the first fetch. Also starts `watch()`. Returns how many cards are available."""
+        if self.load_cache():
+            await self._notify()
+            self._background(self.refresh())
+        else:
+            await self.refresh()
+        self.watch()
+        return len(self._cards)
+
+    def follow_file(self, path: str, interval: float = 60) -> asyncio.Task:
+        """Poll a file of pubkeys (one per line) and start tracking any that get added to it."""
+        async def poll():
+            mtime = None
+            while True:
+                try:
+                    current = os.stat(path).st_mtime
+                    if current != mtime:
+                        mtime = current
+                        with open(path) as f:
+                            await self.add(f.read().splitlines())
+                except OSError:
+                    pass
+                await asyncio.sleep(interval)
+        return self._background(poll())
+
+    def _background(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def stop(self):
+        for task in [self._watch_task, *self._tasks]:
+            if task is not None:
+                task.cancel()
+        self._watch_task = None
@@ -0,0 +1,98 @@
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+from agentstr import AgentCard
+from pydantic import BaseModel, Field
+
+from router_index import AgentIndex, SkillIndex
+
+
+NO_MATCH = "No agent with relevant skills found."
+
+
+class RouteDecision(BaseModel):
+    name: str | None = Field(default=None, description="Name of the matching agent. Leave empty if no agent is a good fit.")
+    message: str = Field(description="Explanation of why the agent is a good match for the user's request, or why none is.")
+
+
+def agent_link(pubkey: str) -> str:
+    return f'https://primal.net/p/{pubkey}'
+
+
+class TieredRouter:
+    """Routes a request to an agent in two tiers.
+
+    1. Fast path: a request that contains an agent's name or a skill name of exactly one agent
+       (see `SkillIndex`) is answered directly, without an LLM call.
+    2. Otherwise the top-k cards from the `AgentIndex` are handed to `llm`, which returns a
+       `RouteDecision`.
+
+    Counts and recent latencies per tier are kept for `stats()`.
+    """
+    def __init__(self,
+                 llm: Callable[[str, list[AgentCard], str | None], Awaitable[RouteDecision | str]],
+                 index: AgentIndex | None = None,
+                 skill_index: SkillIndex | None = None,
+                 top_k: int = 5,
+                 window: int = 1000):
+        """Initialize the router.
+
+        Args:
+            llm: Async callable (request, candidate cards, thread id) -> decision; a plain string is used as the answer.
+            index: Retrieval index for the LLM tier's candidates.
+            skill_index: Keyword index for the fast path.
+            top_k: Candidates handed to the LLM.
+            window: Latest latencies kept per tier.
+        """
+        self.llm = llm
+        self.index = index or AgentIndex()
+        self.skill_index = skill_index or SkillIndex()
+        self.top_k = top_k
+        self.counts = {'fast': 0, 'llm': 0}
+        self.latencies = {tier: deque(maxlen=window) for tier in self.counts}
+
+    def build(self, cards: dict[str, AgentCard]):
+        """(Re)build both indexes from cards keyed by pubkey."""
+        self.index.build(cards)
+        self.skill_index.build(cards)
+
+    async def route(self, request: str, thread_id: str | None = None) -> str:
+        t0 = time.perf_counter()
+        match = self.skill_index.match(request)
+        if match is not None:
+            pubkey, card = match
+            tier = 'fast'
+            answer = f"I recommend the {card.name}. {card.description}\n\nYou can find the agent here: {agent_link(pubkey)}"
+        else:
+            tier = 'llm'
+            answer = await self._ask_llm(request, thread_id)
+        self.counts[tier] += 1
+        self.latencies[tier].append(time.perf_counter() - t0)
+        return answer
+
+    async def _ask_llm(self, request: str, thread_id: str | None) -> str:
+        candidates = [(pubkey, card) for pubkey, card, _ in self.index.search(request, k=self.top_k)]
+        if not candidates:  # e.g. "What agents do you know about?"
+            candidates = list(zip(self.index.keys, self.index.cards))[:self.top_k]
+        decision = await self.llm(request, [card for _, card in candidates], thread_id)
+        if isinstance(decision, str):  # The model's output didn't parse as a RouteDecision
+            return decision.strip() or NO_MATCH
+        name_to_pubkey = {card.name: pubkey for pubkey, card in candidates}
+        if decision.name and decision.name in name_to_pubkey:
+            return f"{decision.message}\n\nYou can find the agent here: {agent_link(name_to_pubkey[decision.name])}"
+        return decision.message or NO_MATCH
+
+    def stats(self) -> dict:
+        """Query counts, fast-path fraction and p50/p99 latency (ms) per tier."""
+        total = sum(self.counts.values())
+        result = {'queries': total, 'fast_path_fraction': self.counts['fast'] / total if total else 0.0}
+        for tier, samples in self.latencies.items():
+            ordered = sorted(samples)
+            result[tier] = {
+                'count': self.counts[tier],
+                'p50_ms': ordered[len(ordered) // 2] * 1000 if ordered else None,
+                'p99_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000 if ordered else None,
+            }
+        return result
+
@@ -0,0 +1,163 @@
+import hashlib
+import math
+import re
+from collections import Counter
+
+import numpy as np
+from agentstr import AgentCard
+
+from agentstr_demo.embeddings import Embedder
+
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by can do for from has have help i in is it me my of on or that the this to '
+    'what with you your'.split())
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def card_text(card: AgentCard) -> str:
+    """The text an agent card is indexed by: its name, description and skills."""
+    skills = ' '.join(f'{skill.name.replace("_", " ")} {skill.description}' for skill in card.skills)
+    return f'{card.name}. {card.description} {skills}'
+
+
+class AgentIndex:
+    """Top-k retrieval over agent cards.
+
+    Uses dense vectors when given an `embed` function, otherwise a sparse TF-IDF index
+    (posting lists of L2-normalized weights, so a query only touches cards that share
+    one of its terms).
+    """
+    def __init__(self, embed: Embedder | None = None):
+        self.embed = embed
+        self.keys: list[str] = []
+        self.cards: list[AgentCard] = []
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._idf: dict[str, float] = {}
+        self._matrix: np.ndarray | None = None
+        self._embedding_cache: dict[str, np.ndarray] = {}  # text hash -> vector, so unchanged cards aren't re-embedded
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def build(self, cards: dict[str, AgentCard]):
+        """(Re)build the index from cards keyed by pubkey."""
+        self.keys = list(cards)
+        self.cards = list(cards.values())
+        texts = [card_text(card) for card in self.cards]
+        if self.embed is not None:
+            self._build_dense(texts)
+        else:
+            self._build_tfidf(texts)
+
+    def _build_tfidf(self, texts: list[str]):
+        counts = [Counter(tokenize(text)) for text in texts]
+        df = Counter(term for c in counts for term in c)
+        n = len(texts)
+        self._idf = {term: math.log((1 + n) / (1 + freq)) + 1 for term, freq in df.items()}
+        postings: dict[str, tuple[list[int], list[float]]] = {}
+        for doc, c in enumerate(counts):
+            weights = {term: (1 + math.log(tf)) * self._idf[term] for term, tf in c.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, w in weights.items():
+                docs, values = postings.setdefault(term, ([], []))
+                docs.append(doc)
+                values.append(w / norm)
+        self._postings = {term: (np.array(docs, dtype=np.int32), np.array(values, dtype=np.float32))
+                          for term, (docs, values) in postings.items()}
+
+    def _build_dense(self, texts: list[str]):
+        hashes = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+        missing = [(h, text) for h, text in zip(hashes, texts) if h not in self._embedding_cache]
+        if missing:
+            vectors = self.embed([text for _, text in missing])
+            for (h, _), vector in zip(missing, vectors):
+                self._embedding_cache[h] = vector / (np.linalg.norm(vector) or 1.0)
+        self._embedding_cache = {h: self._embedding_cache[h] for h in hashes}
+        self._matrix = np.stack([self._embedding_cache[h] for h in hashes]) if hashes else None
+
+    def _scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.cards), dtype=np.float32)
+        if self.embed is not None:
+            if self._matrix is not None:
+                vector = self.embed([query])[0]
+                scores = self._matrix @ (vector / (np.linalg.norm(vector) or 1.0))
+            return scores
+        weights = {term: (1 + math.log(tf)) * self._idf[term]
+                   for term, tf in Counter(tokenize(query)).items() if term in self._postings}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        for term, w in weights.items():
+            docs, values = self._postings[term]
+            scores[docs] += values * (w / norm)
+        return scores
+
+    def search(self, query: str, k: int = 5) -> list[tuple[str, AgentCard, float]]:
+        """The `k` best matching cards as (pubkey, card, cosine similarity), best first. Cards with no overlap are left out."""
+        if not self.cards:
+            return []
+        scores = self._scores(query)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.keys[i], self.cards[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+_GENERIC_NAME_WORDS = frozenset({'agent', 'bot', 'assistant', 'ai', 'search'})
+
+
+def _variants(token: str) -> set[str]:
+    """The token with and without a plural 's'."""
+    variants = {token, token + 's'}
+    if token.endswith('s') and len(token) > 4 and not token.endswith('ss'):
+        variants.add(token[:-1])
+    return variants
+
+
+class SkillIndex:
+    """Inverted index of agent names and skill names, for confident keyword matches.
+
+    Each card contributes keys: its name (minus generic words like "agent") and each skill
+    name (e.g. `book_flight` -> "book flight"). A query matches a key when it contains all of
+    the key's words; the match is confident when exactly one card has a matching key. Keys are
+    posted under their rarest word only, and a lookup stops at the second matching card.
+    """
+    def __init__(self):
+        self._keys: list[tuple[int, list[set[str]]]] = []  # key id -> (card position, variants of each word)
+        self._postings: dict[str, list[int]] = {}  # variant of a key's rarest word -> key ids
+        self.keys: list[str] = []
+        self.cards: list[AgentCard] = []
+
+    def build(self, cards: dict[str, AgentCard]):
+        self.keys = list(cards)
+        self.cards = list(cards.values())
+        phrases = []
+        for position, card in enumerate(self.cards):
+            phrases.append((position, [t for t in tokenize(card.name) if t not in _GENERIC_NAME_WORDS]))
+            phrases += [(position, tokenize(skill.name.replace('_', ' '))) for skill in card.skills]
+        phrases = [(position, list(dict.fromkeys(words))) for position, words in phrases if words]
+        df = Counter(word for _, words in phrases for word in words)
+        self._keys = []
+        self._postings = {}
+        for position, words in phrases:
+            key_id = len(self._keys)
+            self._keys.append((position, [_variants(word) for word in words]))
+            for variant in _variants(min(words, key=df.__getitem__)):
+                self._postings.setdefault(variant, []).append(key_id)
+
+    def match(self, query: str) -> tuple[str, AgentCard] | None:
+        """The only card with a name or skill fully contained in `query`, or None if there is none or several."""
+        tokens = set(tokenize(query))
+        found = None
+        for token in tokens:
+            for key_id in self._postings.get(token, ()):
+                position, words = self._keys[key_id]
+                if position == found or not all(variants & tokens for variants in words):
+                    continue
+                if found is not None:
+                    return None
+                found = position
+        return None if found is None else (self.keys[found], self.cards[found])
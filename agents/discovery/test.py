@@ -17,31 +17,25 @@ relays = os.getenv("NOSTR_RELAYS").split(",")
 agent_public_key = private_to_public_key(os.getenv("AGENT_PRIVATE_KEY"))
 
 
-async def ask_agent():
+questions = [
+    "What agents do you know about?",
+    "Can someone help me answer a medical question?",
+    "Can you help me find the current hashrate of bitcoin?",
+    "Can someone help me with legal advice?",
+]
+
+
+async def ask(question: str) -> str:
+    # A client (and so a conversation) per question, so the questions can be asked at the same time
     client = NostrClient(relays, PrivateKey().bech32())
-    response = await client.send_direct_message_and_receive_response(
-        agent_public_key,
-        "What agents do you know about?",
-    )
-    print(response.message)
-    await asyncio.sleep(1)
-    response = await client.send_direct_message_and_receive_response(
-        agent_public_key,
-        "Can someone help me answer a medical question?",
-    )
-    print(response.message)
-    await asyncio.sleep(1)
-    response = await client.send_direct_message_and_receive_response(
-        agent_public_key,
-        "Can you help me find the current hashrate of bitcoin?",
-    )
-    print(response.message)
-    await asyncio.sleep(1)
-    response = await client.send_direct_message_and_receive_response(
-        agent_public_key,
-        "Can someone help me with legal advice?",
-    )
-    print(response.message)
+    response = await client.send_direct_message_and_receive_response(agent_public_key, question)
+    return response.message if response else "(no reply)"
+
+
+async def ask_agent():
+    # For throughput and latency under load, see benchmarks/loadgen.py
+    for answer in await asyncio.gather(*[ask(question) for question in questions]):
+        print(answer)
 
 
 if __name__ == "__main__":
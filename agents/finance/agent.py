@@ -2,45 +2,39 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from agentstr_demo.lazy import Lazy, defer_agentstr_langchain, prepare
+
+defer_agentstr_langchain()
+
 import os
 import json
 from pynostr.key import PrivateKey
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-from agno.tools.reasoning import ReasoningTools
-from agno.tools.yfinance import YFinanceTools
-from agentstr import AgentCard, ChatInput, NostrAgentServer, Skill, default_price_handler, NostrMCPClient
-from agentstr.mcp.agno import to_agno_tools
+from agentstr import AgentCard, ChatInput, Skill, default_price_handler, NostrMCPClient
+from agentstr_demo.mcp_cache import CachedMCPClient, ToolPolicy
+from agentstr_demo.scheduler import InstancePool
+from agentstr_demo.server import AgentServer
 
 # Get the environment variables
 relays = os.getenv('NOSTR_RELAYS').split(',')
 private_key = os.getenv('AGENT_PRIVATE_KEY')
 nwc_str = os.getenv('AGENT_NWC_CONN_STR')
 
-# Define model
-model = OpenAIChat(
-    temperature=0,
-    base_url=os.getenv('LLM_BASE_URL'),
-    api_key=os.getenv('LLM_API_KEY'),
-    id=os.getenv('LLM_MODEL_NAME')
-)
 
+def load_agent_factory():
+    """Import agno and yfinance and create the model; returns a function creating an agent with the given MCP tools."""
+    from agno.agent import Agent
+    from agno.models.openai import OpenAIChat
+    from agno.tools.reasoning import ReasoningTools
+    from agno.tools.yfinance import YFinanceTools
 
-# Create Nostr Agent Server
-async def run():
-    exchange_rate_tool = NostrMCPClient(
-        mcp_pubkey='npub1qg6xyneg439778thgg3xnf66ldkfrnly52yl2f4pvwnypqsh650qp8kdms',
-        relays=relays,
-        private_key=private_key,
-        nwc_str=nwc_str,
+    # Define model
+    model = OpenAIChat(
+        temperature=0,
+        base_url=os.getenv('LLM_BASE_URL'),
+        api_key=os.getenv('LLM_API_KEY'),
+        id=os.getenv('LLM_MODEL_NAME')
     )
-
-    tools = await to_agno_tools(exchange_rate_tool)
-    for tool in tools:
-        print(f"Found tool: {tool.name}")
-
-    # Define Agno agent
-    agent = Agent(
+    return lambda tools: Agent(
         model=model,
         tools=[
             ReasoningTools(add_instructions=True, analyze=True, think=True),
@@ -54,10 +48,49 @@ async def run():
         markdown=True,
     )
 
-    # Define agent callable
-    async def agent_callable(input: ChatInput) -> str:    
-        result = await agent.arun(message=input.messages[-1], session_id=input.thread_id)
-        return result.content
+
+# Create Nostr Agent Server
+async def run():
+    # Rebuild the agents if the MCP server's tools changed since they were saved
+    async def refresh_tools():
+        agents.reset()
+        await prepare(agents)
+
+    # Saved tool schemas are used at startup, and repeated exchange rate lookups are answered
+    # from a local cache (currency codes are case-insensitive)
+    same_rates = lambda args: {name: value.upper() if isinstance(value, str) else value for name, value in args.items()}
+    exchange_rate_tool = CachedMCPClient(NostrMCPClient(
+        mcp_pubkey=os.getenv('MCP_SERVER_PUBKEY') or 'npub1qg6xyneg439778thgg3xnf66ldkfrnly52yl2f4pvwnypqsh650qp8kdms',
+        relays=relays,
+        private_key=private_key,
+        nwc_str=nwc_str,
+    ), {
+        'get_exchange_rate': ToolPolicy(ttl=300, key=same_rates),
+        'get_exchange_rate_series': ToolPolicy(ttl=300, key=same_rates),
+    }, schema_cache=os.getenv('MCP_SCHEMA_CACHE_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp_schemas.sqlite3'),
+       on_schema_change=refresh_tools)
+
+    # Define Agno agents (an agent keeps the running session on the instance, so concurrent turns each take their own),
+    # when AGENT_STARTUP asks (see agentstr_demo.lazy)
+    agent_factory = Lazy(load_agent_factory)
+
+    async def build_agents():
+        create_agent = await agent_factory.get()
+        from agentstr.mcp.agno import to_agno_tools  # Cheap once agno is loaded
+        tools = await to_agno_tools(exchange_rate_tool)
+        for tool in tools:
+            print(f"Found tool: {tool.name}")
+        return InstancePool(lambda: create_agent(tools))
+
+    agents = Lazy(build_agents)
+    await prepare(agents)
+
+    # Define agent callable (yields the answer as the model writes it, so it can be streamed)
+    async def agent_callable(input: ChatInput):
+        with (await agents.get()).acquire() as agent:
+            async for chunk in await agent.arun(message=input.messages[-1], session_id=input.thread_id, stream=True):
+                if isinstance(chunk.content, str):
+                    yield chunk.content
 
 
     agent_info = AgentCard(
@@ -67,15 +100,16 @@ async def run():
         Skill(name='stock_price', description='Get the current price of a stock.', satoshis=0),
         Skill(name='historical_prices', description='Get the historical prices of a stock.', satoshis=0),
         Skill(name='exchange_rate', description='Get the exchange rate of currencies.', satoshis=0),
+        Skill(name='exchange_rate_series', description='Get exchange rates for many currency pairs or a range of dates.', satoshis=0),
     ],
     satoshis=10,
     nostr_pubkey=PrivateKey.from_nsec(private_key).public_key.bech32(),
 )
-    server = NostrAgentServer(relays=relays,
-                              private_key=private_key,
-                              agent_callable=agent_callable,
-                              agent_info=agent_info,
-                              nwc_str=nwc_str)
+    server = AgentServer(relays=relays,
+                         private_key=private_key,
+                         agent_callable=agent_callable,
+                         agent_info=agent_info,
+                         nwc_str=nwc_str)
     await server.start()
 
 
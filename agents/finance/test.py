@@ -5,6 +5,7 @@ load_dotenv()
 import os
 
 from agentstr import NostrClient, PrivateKey
+from agentstr_demo.streaming import send_and_receive_stream
 
 
 def private_to_public_key(private_key: str) -> str:
@@ -16,25 +17,19 @@ relays = os.getenv("NOSTR_RELAYS").split(",")
 agent_public_key = private_to_public_key(os.getenv("AGENT_PRIVATE_KEY"))
 
 
+async def ask(client: NostrClient, question: str):
+    # Prints the answer as it arrives when the agent streams it (AGENT_STREAM=1)
+    await send_and_receive_stream(client, agent_public_key, question, on_text=lambda text: print(text, end='', flush=True))
+    print()
+
+
 async def ask_agent():
     client = NostrClient(relays, PrivateKey().bech32())
-    response = await client.send_direct_message_and_receive_response(
-        agent_public_key,
-        "what's the exchange rate of USD to EUR?",
-    )
-    print(response.message)
+    await ask(client, "what's the exchange rate of USD to EUR?")
     await asyncio.sleep(1)
-    response = await client.send_direct_message_and_receive_response(
-        agent_public_key,
-        "How much is nvidia?",
-    )
-    print(response.message)
+    await ask(client, "How much is nvidia?")
     await asyncio.sleep(1)
-    response = await client.send_direct_message_and_receive_response(
-        agent_public_key,
-        "what's the stock price of apple?",
-    )
-    print(response.message)
+    await ask(client, "what's the stock price of apple?")
 
 
 
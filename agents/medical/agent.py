@@ -2,11 +2,14 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from agentstr_demo.lazy import Lazy, defer_agentstr_langchain, prepare
+
+defer_agentstr_langchain()
+
 import os
-from agno.agent import Agent
-from agno.tools.pubmed import PubmedTools
-from agno.models.openai import OpenAIChat
-from agentstr import NostrAgentServer, AgentCard, Skill, ChatInput, PrivateKey, default_price_handler
+from agentstr import AgentCard, Skill, ChatInput, PrivateKey, default_price_handler
+from agentstr_demo.scheduler import InstancePool
+from agentstr_demo.server import AgentServer
 
 
 base_url = os.getenv("LLM_BASE_URL")
@@ -14,9 +17,14 @@ api_key = os.getenv("LLM_API_KEY")
 model_name = os.getenv("LLM_MODEL_NAME")
 
 
-async def agent_server():
-    # Define Agno agent
-    agent = Agent(
+def load_agents():
+    """Import agno; returns the pool of agents."""
+    from agno.agent import Agent
+    from agno.tools.pubmed import PubmedTools
+    from agno.models.openai import OpenAIChat
+
+    # Define Agno agents (an agent keeps the running session on the instance, so concurrent turns each take their own)
+    return InstancePool(lambda: Agent(
         model=OpenAIChat(
             temperature=0,
             base_url=base_url,
@@ -24,29 +32,37 @@ async def agent_server():
             id=model_name,
         ),
         tools=[PubmedTools()],
-    )
+    ))
+
+
+async def agent_server():
+    # Import agno when AGENT_STARTUP asks (see agentstr_demo.lazy)
+    agents = Lazy(load_agents)
+    await prepare(agents)
 
-    # Define agent callable
-    async def agent_callable(input: ChatInput) -> str:
-        result = await agent.arun(message=input.messages[-1], session_id=input.thread_id)
-        return result.content
+    # Define agent callable (yields the answer as the model writes it, so it can be streamed)
+    async def agent_callable(input: ChatInput):
+        with (await agents.get()).acquire() as agent:
+            async for chunk in await agent.arun(message=input.messages[-1], session_id=input.thread_id, stream=True):
+                if isinstance(chunk.content, str):
+                    yield chunk.content
 
     # Create Nostr Agent Server
-    server = NostrAgentServer(relays=os.getenv("NOSTR_RELAYS").split(","),
-                              private_key=os.getenv("AGENT_PRIVATE_KEY"),
-                              nwc_str=os.getenv("AGENT_NWC_CONN_STR"),
-                              agent_info=AgentCard(
-                                  name='Medical Agent',
-                                  description='This agent can search and summarize medical articles in the PubMed database.',
-                                  skills=[Skill(
-                                    name='medical_search', 
-                                    description='Search for medical articles in the PubMed database that matches users\' request.', 
-                                    satoshis=0
-                                  )],
-                                  satoshis=15,
-                                  nostr_pubkey=PrivateKey.from_nsec(os.getenv('AGENT_PRIVATE_KEY')).public_key.bech32(),
-                              ),
-                              agent_callable=agent_callable)
+    server = AgentServer(relays=os.getenv("NOSTR_RELAYS").split(","),
+                         private_key=os.getenv("AGENT_PRIVATE_KEY"),
+                         nwc_str=os.getenv("AGENT_NWC_CONN_STR"),
+                         agent_info=AgentCard(
+                             name='Medical Agent',
+                             description='This agent can search and summarize medical articles in the PubMed database.',
+                             skills=[Skill(
+                               name='medical_search', 
+                               description='Search for medical articles in the PubMed database that matches users\' request.', 
+                               satoshis=0
+                             )],
+                             satoshis=15,
+                             nostr_pubkey=PrivateKey.from_nsec(os.getenv('AGENT_PRIVATE_KEY')).public_key.bech32(),
+                         ),
+                         agent_callable=agent_callable)
 
     # Start server
     await server.start()
@@ -2,52 +2,86 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-import os
+from agentstr_demo.lazy import Lazy, defer_agentstr_langchain, prepare
+
+defer_agentstr_langchain()
 
-from langchain_openai import ChatOpenAI
+import os
 
-from agentstr import NostrRAG
 from agentstr.nostr_rag import Author
-from agentstr import NostrAgentServer, AgentCard, Skill, ChatInput, PrivateKey
+from agentstr import NostrClient, AgentCard, Skill, ChatInput, PrivateKey
+
+from agentstr_demo.embeddings import load_embedder
+from agentstr_demo.server import AgentServer
+from agentstr_demo.workers import worker_path
+from note_store import NoteStore
+from rag_service import NostrRAGService
 
 # Define relays
 relays   = os.getenv("NOSTR_RELAYS").split(",")
 
-# Define LLM
-model = ChatOpenAI(temperature=0,
-                   base_url=os.getenv("LLM_BASE_URL"),
-                   api_key=os.getenv("LLM_API_KEY"),
-                   model_name=os.getenv("LLM_MODEL_NAME"))
+
+def load_model():
+    """Import LangChain and create the LLM."""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(temperature=0,
+                      base_url=os.getenv("LLM_BASE_URL"),
+                      api_key=os.getenv("LLM_API_KEY"),
+                      model_name=os.getenv("LLM_MODEL_NAME"))
+
+
+known_authors = [
+    Author(name="Lyn Alden", pubkey="npub1a2cww4kn9wqte4ry70vyfwqyqvpswksna27rtxd8vty6c74era8sdcw83a"),
+    Author(name="Saifedean Ammous", pubkey="npub1gdu7w6l6w65qhrdeaf6eyywepwe7v7ezqtugsrxy7hl7ypjsvxksd76nak"),
+    Author(name="Jack Dorsey", pubkey="npub1sg6plzptd64u62a878hep2kev88swjh3tw00gjsfl8f237lmu63q0uf63m")
+]
+
+# Hashtags whose notes are indexed from any author
+known_hashtags = (os.getenv("NOSTR_RAG_HASHTAGS") or "bitcoin,nostr,lightning,ai").split(",")
+
+# Embedding model: a fastembed model if NOSTR_RAG_EMBEDDING_MODEL is set and fastembed is installed, else feature hashing
+embed = load_embedder(os.getenv("NOSTR_RAG_EMBEDDING_MODEL"))
+# The vector file has a single writer, so worker processes each keep their own index
+note_store = NoteStore(worker_path(os.getenv("NOSTR_RAG_DB_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "notes.sqlite3")),
+                       dim=embed.dim)
 
 
 async def agent_server():
+    # Define LLM, created when AGENT_STARTUP asks (see agentstr_demo.lazy)
+    model = Lazy(load_model)
+    await prepare(model)
+
+    # Notes are fetched and embedded once, then kept current by relay subscriptions
+    rag = NostrRAGService(client=NostrClient(relays=relays),
+                          llm=model,
+                          known_authors=known_authors,
+                          known_hashtags=known_hashtags,
+                          store=note_store,
+                          embed=embed)
+    await rag.start()
+    print(f"Indexed {len(note_store)} notes")
+
     # Define agent callable
     async def agent_callable(input: ChatInput) -> str:
-        # Create the RAG instance
-        rag = NostrRAG(relays=relays,
-                       llm=model,
-                       known_authors=[
-                            Author(name="Lyn Alden", pubkey="npub1a2cww4kn9wqte4ry70vyfwqyqvpswksna27rtxd8vty6c74era8sdcw83a"),
-                            Author(name="Saifedean Ammous", pubkey="npub1gdu7w6l6w65qhrdeaf6eyywepwe7v7ezqtugsrxy7hl7ypjsvxksd76nak"),
-                            Author(name="Jack Dorsey", pubkey="npub1sg6plzptd64u62a878hep2kev88swjh3tw00gjsfl8f237lmu63q0uf63m")
-                       ])
-        return await rag.query(question=input.messages[-1], limit=8, query_type="authors")
+        # Questions with a hashtag (and no known author) are answered from the hashtag index
+        return await rag.query(question=input.messages[-1], limit=8, query_type="auto")
 
     # Create Nostr Agent Server
-    server = NostrAgentServer(relays=os.getenv("NOSTR_RELAYS").split(","),
-                              private_key=os.getenv("AGENT_PRIVATE_KEY"),
-                              agent_info=AgentCard(
-                                  name='Nostr Search Agent',
-                                  description='This agent can search Nostr social media for content by authors or hashtags.',
-                                  skills=[Skill(
-                                    name='nostr_search', 
-                                    description='Search Nostr social media for content by authors or hashtags.', 
-                                    satoshis=0
-                                  )],
-                                  satoshis=0,
-                                  nostr_pubkey=PrivateKey.from_nsec(os.getenv('AGENT_PRIVATE_KEY')).public_key.bech32(),
-                              ),
-                              agent_callable=agent_callable)
+    server = AgentServer(relays=os.getenv("NOSTR_RELAYS").split(","),
+                         private_key=os.getenv("AGENT_PRIVATE_KEY"),
+                         agent_info=AgentCard(
+                             name='Nostr Search Agent',
+                             description='This agent can search Nostr social media for content by authors or hashtags.',
+                             skills=[Skill(
+                               name='nostr_search', 
+                               description='Search Nostr social media for content by authors or hashtags.', 
+                               satoshis=0
+                             )],
+                             satoshis=0,
+                             nostr_pubkey=PrivateKey.from_nsec(os.getenv('AGENT_PRIVATE_KEY')).public_key.bech32(),
+                         ),
+                         agent_callable=agent_callable)
 
     # Start server
     await server.start()
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from collections.abc import Callable
+
+import numpy as np
+from pynostr.event import Event, EventKind
+
+from agentstr_demo.embeddings import Embedder
+from note_store import Note, NoteStore
+
+logger = logging.getLogger(__name__)
+
+def split_text(text: str, chunk_chars: int = 1000, overlap: int = 200) -> list[str]:
+    """Split text into chunks of at most `chunk_chars` characters at whitespace, overlapping by about `overlap`."""
+    text = ' '.join(text.split())
+    if len(text) <= chunk_chars:
+        return [text] if text else []
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            space = text.rfind(' ', start + overlap + 1, end)
+            end = space if space > start else end
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        next_start = text.find(' ', max(end - overlap, start + 1), end)
+        start = next_start + 1 if next_start != -1 else end
+    return chunks
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def to_note(event: Event) -> Note:
+    return Note(id=event.id, pubkey=event.pubkey, created_at=event.created_at, content=event.content, tags=event.tags or [])
+
+
+class IngestionPipeline:
+    """Streams Nostr events into a `NoteStore`.
+
+    Events are deduplicated by id (the same note arrives from every relay), split into
+    chunks, and embedded in batches; a chunk whose text hash is already stored reuses that
+    embedding instead of being embedded again. `put()` feeds a bounded queue drained by a
+    background worker, so a busy subscription gets backpressure instead of unbounded memory.
+    """
+    def __init__(self,
+                 store: NoteStore,
+                 embed: Embedder,
+                 batch_size: int = 256,
+                 chunk_chars: int = 1000,
+                 chunk_overlap: int = 200,
+                 max_pending: int = 10000,
+                 accept: Callable[[Event], bool] | None = None,
+                 kinds: tuple[int, ...] = (EventKind.TEXT_NOTE,)):
+        """Initialize the pipeline.
+
+        Args:
+            store: Where notes and embeddings are written.
+            embed: Embedding function (run in a worker thread).
+            batch_size: Events per batch, and chunks per embedding call.
+            chunk_chars: Maximum characters per chunk.
+            chunk_overlap: Characters shared by consecutive chunks.
+            max_pending: Maximum queued events before `put()` waits.
+            accept: Optional filter on events, e.g. by author.
+            kinds: Event kinds that are ingested.
+        """
+        self.store = store
+        self.embed = embed
+        self.batch_size = batch_size
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        self.accept = accept
+        self.kinds = set(kinds)
+        self.stats = {'events': 0, 'duplicates': 0, 'notes': 0, 'chunks': 0, 'embedded': 0, 'cached': 0}
+        self._queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=max_pending)
+        self._recent: OrderedDict[str, None] = OrderedDict()  # Recently seen ids, to drop relay duplicates cheaply
+        self._lock = asyncio.Lock()
+        self._worker: asyncio.Task | None = None
+
+    async def put(self, event: Event):
+        """Queue an event for the background worker, waiting while the queue is full."""
+        if self._worker is None:
+            self.start()
+        await self._queue.put(event)
+
+    def start(self) -> asyncio.Task:
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        return self._worker
+
+    async def join(self):
+        """Wait until every queued event has been stored."""
+        await self._queue.join()
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self.ingest(batch)
+            except Exception:
+                logger.exception(f'Failed to ingest {len(batch)} events')
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _remember(self, note_ids):
+        """Mark ids as seen once they are stored, so a failed batch is retried when the note arrives again."""
+        for note_id in note_ids:
+            self._recent[note_id] = None
+        while len(self._recent) > 4 * self.batch_size + 10000:
+            self._recent.popitem(last=False)
+
+    async def ingest(self, events: list[Event]) -> int:
+        """Store the new notes among `events` right away. Returns how many were added."""
+        added = 0
+        for start in range(0, len(events), self.batch_size):
+            async with self._lock:
+                added += await self._ingest_batch(events[start:start + self.batch_size])
+        return added
+
+    async def _ingest_batch(self, events: list[Event]) -> int:
+        self.stats['events'] += len(events)
+        fresh = {e.id: e for e in events
+                 if e.kind in self.kinds and (self.accept is None or self.accept(e)) and e.id not in self._recent}
+        new = self.store.missing(list(fresh)) if fresh else set()
+        notes = [to_note(e) for note_id, e in fresh.items() if note_id in new]
+        self.stats['duplicates'] += len(events) - len(notes)
+        if not notes:
+            self._remember(fresh)
+            return 0
+
+        chunk_notes, chunk_texts = [], []
+        for position, note in enumerate(notes):
+            for chunk in split_text(note.content, self.chunk_chars, self.chunk_overlap) or ['']:
+                chunk_notes.append(position)
+                chunk_texts.append(chunk)
+        chunk_hashes = [content_hash(text) for text in chunk_texts]
+
+        vectors = self.store.cached_vectors(list(set(chunk_hashes)))
+        self.stats['cached'] += sum(h in vectors for h in chunk_hashes)
+        pending = {h: text for h, text in zip(chunk_hashes, chunk_texts) if h not in vectors}
+        pending_hashes = list(pending)
+        for start in range(0, len(pending_hashes), self.batch_size):
+            hashes = pending_hashes[start:start + self.batch_size]
+            embedded = await asyncio.to_thread(self.embed, [pending[h] for h in hashes])
+            vectors.update(zip(hashes, embedded))
+            self.stats['embedded'] += len(hashes)
+
+        added = self.store.add(notes, chunk_notes, chunk_hashes, np.stack([vectors[h] for h in chunk_hashes]))
+        self._remember(fresh)
+        self.stats['notes'] += added
+        self.stats['chunks'] += len(chunk_hashes)
+        return added
@@ -0,0 +1,308 @@
+import json
+import os
+import sqlite3
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id TEXT PRIMARY KEY,
+    pubkey TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_by_author ON notes (pubkey, created_at);
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    note_id TEXT NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_by_hash ON chunks (hash);
+CREATE INDEX IF NOT EXISTS chunks_by_note ON chunks (note_id);
+CREATE TABLE IF NOT EXISTS note_tags (
+    tag TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    note_id TEXT NOT NULL,
+    PRIMARY KEY (tag, created_at, note_id)
+) WITHOUT ROWID;
+"""
+
+# Fills the hashtag index of a database created before it existed
+_BACKFILL_TAGS = """
+INSERT OR IGNORE INTO note_tags
+SELECT DISTINCT lower(ltrim(json_extract(tag.value, '$[1]'), '#')), notes.created_at, notes.id
+FROM notes, json_each(notes.tags) AS tag
+WHERE json_extract(tag.value, '$[0]') = 't' AND ltrim(json_extract(tag.value, '$[1]'), '#') != ''
+"""
+
+
+def hashtags(tags: list[list[str]]) -> set[str]:
+    """The normalized (lowercase, without '#') hashtags in a note's `t` tags."""
+    return {tag[1].lstrip('#').lower() for tag in tags
+            if len(tag) > 1 and tag[0] == 't' and isinstance(tag[1], str) and tag[1].lstrip('#')}
+
+
+@dataclass
+class Note:
+    id: str
+    pubkey: str
+    created_at: int
+    content: str
+    tags: list[list[str]] = field(default_factory=list)
+
+
+class VectorMatrix:
+    """Append-only matrix of L2-normalized float32 vectors in a memory-mapped file.
+
+    The file grows by doubling, and search runs block by block, so only the pages being
+    scanned need to be resident, however many rows there are.
+    """
+    def __init__(self, path: str, dim: int, size: int = 0, initial_capacity: int = 1024, block_rows: int = 65536):
+        """Open (or create) the matrix.
+
+        Args:
+            path: File holding the rows.
+            dim: Vector dimension.
+            size: Number of rows already written (the file may be larger, as it grows ahead).
+            initial_capacity: Rows to allocate for a new file.
+            block_rows: Rows scored per block in `search`.
+        """
+        self.path = path
+        self.dim = dim
+        self.size = size
+        self.block_rows = block_rows
+        existing = os.path.getsize(path) // (4 * dim) if os.path.exists(path) else 0
+        self._matrix = None
+        self._open(max(existing, initial_capacity, size))
+
+    def _open(self, capacity: int):
+        if self._matrix is not None:
+            self._matrix.flush()
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'w+b') as f:
+            f.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self.path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, rows) -> np.ndarray:
+        return np.asarray(self._matrix[:self.size][rows])
+
+    def append(self, vectors: np.ndarray) -> int:
+        """Normalize and append rows. Returns the index of the first new row."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        first, needed = self.size, self.size + len(vectors)
+        if needed > len(self._matrix):
+            self._open(max(needed, 2 * len(self._matrix)))
+        self._matrix[first:needed] = vectors / np.where(norms == 0, 1, norms)
+        self.size = needed
+        return first
+
+    def search(self, query: np.ndarray, k: int = 5, where: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Rows with the highest cosine similarity to `query`, best first.
+
+        Args:
+            query: Query vector.
+            k: Number of rows to return.
+            where: Optional boolean mask over rows; only rows where it is True are considered.
+
+        Returns:
+            (row indices, scores)
+        """
+        query = np.asarray(query, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        best_rows, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        for start in range(0, self.size, self.block_rows):
+            end = min(start + self.block_rows, self.size)
+            scores = self._matrix[start:end] @ query
+            if where is not None:
+                scores = np.where(where[start:end], scores, -np.inf)
+            if k < len(scores):
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(scores))
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            if len(best_rows) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+        valid = np.isfinite(best_scores)
+        best_rows, best_scores = best_rows[valid], best_scores[valid]
+        order = np.argsort(-best_scores)
+        return best_rows[order], best_scores[order]
+
+    def flush(self):
+        self._matrix.flush()
+
+
+class NoteStore:
+    """Nostr notes in SQLite, with the embeddings of their chunks in a `VectorMatrix`.
+
+    Each chunk of a note is one matrix row; the `chunks` table maps rows back to notes and
+    records each chunk's content hash, so identical text is only embedded once. Row authors
+    are kept in a small in-memory array to restrict a search to one author. `note_tags` is
+    an inverted index from hashtag to notes, clustered by (tag, created_at) so the newest
+    notes under a tag are read from one range of the index however large the tag is.
+    """
+    def __init__(self, path: str, dim: int, vectors_path: str | None = None):
+        """Initialize the store.
+
+        Args:
+            path: SQLite database file.
+            dim: Embedding dimension.
+            vectors_path: File for the vector matrix (default: `path` + '.vectors').
+        """
+        self.dim = dim
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        had_tags = self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'note_tags'").fetchone() is not None
+        self._db.executescript(_SCHEMA)
+        if not had_tags:
+            self._db.execute(_BACKFILL_TAGS)
+        rows = self._db.execute('SELECT COALESCE(MAX(row) + 1, 0) FROM chunks').fetchone()[0]
+        self.vectors = VectorMatrix(vectors_path or f'{path}.vectors', dim, size=rows)
+        self._notes = self._db.execute('SELECT COUNT(*) FROM notes').fetchone()[0]
+        self._author_ids: dict[str, int] = {}
+        self._authors = np.zeros(max(rows, 1024), dtype=np.int32)
+        for row, pubkey in self._db.execute('SELECT chunks.row, notes.pubkey FROM chunks JOIN notes ON notes.id = chunks.note_id'):
+            self._authors[row] = self._author_ids.setdefault(pubkey, len(self._author_ids))
+
+    def __len__(self) -> int:
+        return self._notes
+
+    def __contains__(self, note_id: str) -> bool:
+        return self._db.execute('SELECT 1 FROM notes WHERE id = ?', (note_id,)).fetchone() is not None
+
+    def missing(self, note_ids: list[str]) -> set[str]:
+        """The ids among `note_ids` that aren't stored."""
+        placeholders = ','.join('?' * len(note_ids))
+        stored = {row[0] for row in self._db.execute(f'SELECT id FROM notes WHERE id IN ({placeholders})', note_ids)}
+        return set(note_ids) - stored
+
+    def latest(self, pubkey: str) -> int | None:
+        """Timestamp of the newest stored note by `pubkey`."""
+        return self._db.execute('SELECT MAX(created_at) FROM notes WHERE pubkey = ?', (pubkey,)).fetchone()[0]
+
+    def count(self, pubkey: str) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM notes WHERE pubkey = ?', (pubkey,)).fetchone()[0]
+
+    def latest_tagged(self, tag: str) -> int | None:
+        """Timestamp of the newest stored note with hashtag `tag`."""
+        return self._db.execute('SELECT MAX(created_at) FROM note_tags WHERE tag = ?', (tag,)).fetchone()[0]
+
+    def count_tagged(self, tag: str) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM note_tags WHERE tag = ?', (tag,)).fetchone()[0]
+
+    def tagged(self, tag: str, limit: int = 50, before: tuple[int, str] | None = None) -> list[tuple[int, str]]:
+        """(created_at, note id) of the newest notes with hashtag `tag`, newest first.
+
+        Args:
+            tag: Normalized hashtag.
+            limit: Maximum notes to return.
+            before: Cursor from a previous page (its last item); only older notes are returned.
+        """
+        if before is None:
+            return self._db.execute(
+                'SELECT created_at, note_id FROM note_tags WHERE tag = ? ORDER BY created_at DESC, note_id DESC LIMIT ?',
+                (tag, limit)).fetchall()
+        return self._db.execute(
+            'SELECT created_at, note_id FROM note_tags WHERE tag = ? AND (created_at, note_id) < (?, ?) '
+            'ORDER BY created_at DESC, note_id DESC LIMIT ?', (tag, *before, limit)).fetchall()
+
+    def cached_vectors(self, hashes: list[str]) -> dict[str, np.ndarray]:
+        """Stored embeddings of chunks with these content hashes."""
+        placeholders = ','.join('?' * len(hashes))
+        rows = dict(self._db.execute(f'SELECT hash, MIN(row) FROM chunks WHERE hash IN ({placeholders}) GROUP BY hash', hashes))
+        if not rows:
+            return {}
+        vectors = self.vectors[np.array(list(rows.values()))]
+        return dict(zip(rows, vectors))
+
+    def add(self, notes: list[Note], chunk_notes: list[int], chunk_hashes: list[str], vectors: np.ndarray) -> int:
+        """Store notes and the embeddings of their chunks.
+
+        Args:
+            notes: Notes to store (ones already stored are ignored).
+            chunk_notes: For each chunk, the position of its note in `notes`.
+            chunk_hashes: For each chunk, the hash of its content.
+            vectors: For each chunk, its embedding.
+
+        Returns:
+            How many notes were added.
+        """
+        new = self.missing([note.id for note in notes])
+        keep = [i for i, position in enumerate(chunk_notes) if notes[position].id in new]
+        if not new:
+            return 0
+        first = self.vectors.append(np.asarray(vectors)[keep])
+        needed = first + len(keep)
+        if needed > len(self._authors):
+            self._authors = np.concatenate([self._authors, np.zeros(max(needed, len(self._authors)), dtype=np.int32)])
+        for offset, i in enumerate(keep):
+            pubkey = notes[chunk_notes[i]].pubkey
+            self._authors[first + offset] = self._author_ids.setdefault(pubkey, len(self._author_ids))
+        self._db.execute('BEGIN')
+        try:
+            self._db.executemany('INSERT INTO notes VALUES (?, ?, ?, ?, ?)', [
+                (note.id, note.pubkey, note.created_at, note.content, json.dumps(note.tags))
+                for note in notes if note.id in new])
+            self._db.executemany('INSERT INTO chunks VALUES (?, ?, ?)', [
+                (first + offset, notes[chunk_notes[i]].id, chunk_hashes[i]) for offset, i in enumerate(keep)])
+            self._db.executemany('INSERT OR IGNORE INTO note_tags VALUES (?, ?, ?)', [
+                (tag, note.created_at, note.id) for note in notes if note.id in new for tag in hashtags(note.tags)])
+            self._db.execute('COMMIT')
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._notes += len(new)
+        return len(new)
+
+    def search(self, vector: np.ndarray, k: int = 5, pubkey: str | None = None) -> list[tuple[Note, float]]:
+        """The `k` notes whose best chunk is most similar to `vector` (cosine), optionally only by `pubkey`."""
+        where = None
+        if pubkey is not None:
+            if pubkey not in self._author_ids:
+                return []
+            where = self._authors[:len(self.vectors)] == self._author_ids[pubkey]
+        # A note with several matching chunks takes several of the top rows, so over-fetch
+        rows, scores = self.vectors.search(vector, k=4 * k, where=where)
+        placeholders = ','.join('?' * len(rows))
+        row_notes = dict(self._db.execute(f'SELECT row, note_id FROM chunks WHERE row IN ({placeholders})', rows.tolist()))
+        best: dict[str, float] = {}
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            best.setdefault(row_notes[row], score)
+        top = list(best)[:k]
+        return list(zip(self.get(top), [best[note_id] for note_id in top]))
+
+    def search_notes(self, vector: np.ndarray, note_ids: list[str], k: int = 5) -> list[tuple[Note, float]]:
+        """The `k` notes among `note_ids` whose best chunk is most similar to `vector` (cosine)."""
+        if not note_ids:
+            return []
+        placeholders = ','.join('?' * len(note_ids))
+        rows = self._db.execute(f'SELECT row, note_id FROM chunks WHERE note_id IN ({placeholders})', note_ids).fetchall()
+        if not rows:
+            return []
+        vector = np.asarray(vector, dtype=np.float32)
+        scores = self.vectors[np.array([row for row, _ in rows])] @ (vector / (np.linalg.norm(vector) or 1.0))
+        best: dict[str, float] = {}
+        for (_, note_id), score in zip(rows, scores.tolist()):
+            if score > best.get(note_id, -np.inf):
+                best[note_id] = score
+        top = sorted(best, key=best.get, reverse=True)[:k]
+        return list(zip(self.get(top), [best[note_id] for note_id in top]))
+
+    def get(self, note_ids: list[str]) -> list[Note]:
+        """Notes by id, in the given order."""
+        placeholders = ','.join('?' * len(note_ids))
+        found = {row[0]: Note(row[0], row[1], row[2], row[3], json.loads(row[4])) for row in self._db.execute(
+            f'SELECT id, pubkey, created_at, content, tags FROM notes WHERE id IN ({placeholders})', note_ids)}
+        return [found[note_id] for note_id in note_ids if note_id in found]
+
+    def close(self):
+        self.vectors.flush()
+        self._db.close()
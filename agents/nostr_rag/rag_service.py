@@ -0,0 +1,268 @@
+import asyncio
+import heapq
+import json
+import re
+import time
+from typing import Literal
+
+from agentstr import NostrClient
+from agentstr.nostr_rag import Author
+from pynostr.event import EventKind
+from pynostr.filters import Filters
+from pynostr.key import PublicKey
+
+from agentstr_demo.embeddings import Embedder
+from agentstr_demo.lazy import Lazy
+from embedding_pipeline import IngestionPipeline
+from note_store import Note, NoteStore, hashtags
+
+
+SELECT_AUTHOR_PROMPT = """
+You are an user selector for Nostr. Given a question, suggest the relevant user mentioned in the question.
+You must select from the list of known users.
+Return ONLY the users in a JSON array format, like: ["Lyn Alden"] or ["Saifedean Ammous"]
+Only respond with 1 user. If no user is mentioned, return an empty array.
+
+Question: {question}
+
+Known users: {users}
+"""
+
+SELECT_HASHTAGS_PROMPT = """
+You are a hashtag selector for Nostr. Given a question, suggest relevant hashtags that would help find relevant content.
+Prefer hashtags from the list of indexed hashtags.
+Return ONLY the hashtags in a JSON array format, like: ["#hashtag1", "#hashtag2"]
+Use at most 3 hashtags.
+
+Question: {question}
+
+Indexed hashtags: {hashtags}
+"""
+
+ANSWER_PROMPT = """
+You are an expert assistant. Answer the following question based on the provided context.
+
+Question: {question}
+
+Context:
+{context}
+
+Answer:"""
+
+
+_HASHTAG = re.compile(r'#(\w+)')
+_WORD = re.compile(r'\w+')
+
+
+def _to_hex(pubkey: str) -> str:
+    return PublicKey.from_npub(pubkey).hex() if pubkey.startswith('npub') else pubkey
+
+
+class NostrRAGService:
+    """Long-lived retrieval over the notes of known authors and hashtags.
+
+    Unlike building a `NostrRAG` per question, the notes are kept in a local `NoteStore`:
+    `start()` fetches only what each author (and under each hashtag) was posted since the
+    newest stored note, then relay subscriptions stream new notes through an
+    `IngestionPipeline`. Each note is embedded once, and questions are answered from the
+    local index; hashtag questions read the newest notes under the tag from its inverted
+    index instead of asking relays.
+    """
+    def __init__(self,
+                 client: NostrClient,
+                 llm,
+                 known_authors: list[Author],
+                 store: NoteStore,
+                 embed: Embedder,
+                 known_hashtags: list[str] | None = None,
+                 backfill_limit: int = 500,
+                 tag_window: int = 500,
+                 max_page: int = 500,
+                 timeout: float = 10):
+        """Initialize the service.
+
+        Args:
+            client: Nostr client used to query and subscribe to relays.
+            llm: LangChain chat model for author selection and answers, or a `Lazy` that creates it.
+            known_authors: Authors whose notes are indexed.
+            store: Local note store.
+            embed: Embedding function; its dimension must match the store's.
+            known_hashtags: Hashtags whose notes are indexed, from any author.
+            backfill_limit: Maximum notes fetched per author or hashtag when catching up.
+            tag_window: Newest notes per hashtag question that are ranked against the question.
+            max_page: Maximum notes per `notes_by_tag` page.
+            timeout: Seconds to wait for a backfill request.
+        """
+        self.client = client
+        self.llm = llm
+        self.known_authors = known_authors
+        self.store = store
+        self.embed = embed
+        self.backfill_limit = backfill_limit
+        self.tag_window = tag_window
+        self.max_page = max_page
+        self.timeout = timeout
+        self._authors = {_to_hex(author.pubkey): author for author in known_authors}
+        self.hashtags = sorted(hashtags([['t', tag] for tag in known_hashtags or []]))
+        self.pipeline = IngestionPipeline(store, embed, accept=self._accept)
+        self._listeners: list[asyncio.Task] = []
+
+    async def _ask(self, prompt: str):
+        from langchain_core.messages import HumanMessage  # Loaded with the chat model
+
+        llm = await self.llm.get() if isinstance(self.llm, Lazy) else self.llm
+        return await llm.ainvoke([HumanMessage(content=prompt)])
+
+    def _accept(self, event) -> bool:
+        return event.pubkey in self._authors or not hashtags(event.tags or []).isdisjoint(self.hashtags)
+
+    async def sync_author(self, pubkey: str) -> int:
+        """Fetch what an author posted since their newest stored note. Returns how many notes were added."""
+        latest = self.store.latest(pubkey)
+        filters = Filters(kinds=[EventKind.TEXT_NOTE], authors=[pubkey], limit=self.backfill_limit)
+        if latest is not None:
+            filters.since = latest + 1
+        events = await self.client.relay_manager.get_events(filters, limit=self.backfill_limit, timeout=self.timeout)
+        return await self.pipeline.ingest(events)
+
+    async def sync_tag(self, tag: str) -> int:
+        """Fetch what was posted with a hashtag since the newest stored note. Returns how many notes were added."""
+        latest = self.store.latest_tagged(tag)
+        filters = Filters(kinds=[EventKind.TEXT_NOTE], limit=self.backfill_limit)
+        filters.add_arbitrary_tag('t', [tag])
+        if latest is not None:
+            filters.since = latest + 1
+        events = await self.client.relay_manager.get_events(filters, limit=self.backfill_limit, timeout=self.timeout)
+        return await self.pipeline.ingest(events)
+
+    async def start(self):
+        """Catch up on every author and hashtag, then keep the store updated from relay subscriptions."""
+        since = int(time.time())
+        await asyncio.gather(*(self.sync_author(pubkey) for pubkey in self._authors),
+                             *(self.sync_tag(tag) for tag in self.hashtags))
+        if not self._listeners:
+            subscriptions = []
+            if self._authors:
+                subscriptions.append(Filters(kinds=[EventKind.TEXT_NOTE], authors=list(self._authors), since=since))
+            if self.hashtags:
+                filters = Filters(kinds=[EventKind.TEXT_NOTE], since=since)
+                filters.add_arbitrary_tag('t', self.hashtags)
+                subscriptions.append(filters)
+            self.pipeline.start()
+            self._listeners = [asyncio.create_task(self.client.relay_manager.event_listener(filters, self.pipeline.put))
+                               for filters in subscriptions]
+
+    def stop(self):
+        self.pipeline.stop()
+        for listener in self._listeners:
+            listener.cancel()
+        self._listeners = []
+
+    async def select_author(self, question: str) -> tuple[str, Author] | None:
+        """The known author a question is about, as (hex pubkey, author), or None.
+
+        Authors named in the question are found without an LLM call.
+        """
+        lowered = question.lower()
+        named = [(pubkey, author) for pubkey, author in self._authors.items()
+                 if author.name and author.name.lower() in lowered]
+        if len(named) == 1:
+            return named[0]
+        prompt = SELECT_AUTHOR_PROMPT.format(question=question, users=json.dumps([a.name for a in self.known_authors]))
+        response = await self._ask(prompt)
+        try:
+            names = json.loads(response.content)
+        except json.JSONDecodeError:
+            return None
+        for pubkey, author in self._authors.items():
+            if names and author.name == names[0]:
+                return pubkey, author
+        return None
+
+    def match_hashtags(self, question: str) -> list[str]:
+        """Hashtags written in the question (`#tag`), else indexed hashtags it mentions as words."""
+        written = list(dict.fromkeys(tag.lower() for tag in _HASHTAG.findall(question)))
+        if written:
+            return written
+        words = set(_WORD.findall(question.lower()))
+        return [tag for tag in self.hashtags if tag in words]
+
+    async def select_hashtags(self, question: str) -> list[str]:
+        """Hashtags to answer a question from; an LLM picks them only if none are matched directly."""
+        tags = self.match_hashtags(question)
+        if tags:
+            return tags
+        prompt = SELECT_HASHTAGS_PROMPT.format(question=question, hashtags=json.dumps(self.hashtags))
+        response = await self._ask(prompt)
+        try:
+            tags = json.loads(response.content)
+        except json.JSONDecodeError:
+            tags = [word for word in response.content.split() if word.startswith('#')]
+        return sorted(hashtags([['t', tag] for tag in tags if isinstance(tag, str)]))[:3]
+
+    def notes_by_tag(self, tags: list[str], limit: int = 50,
+                     before: tuple[int, str] | None = None) -> tuple[list[tuple[int, str]], tuple[int, str] | None]:
+        """One page of the newest notes under any of `tags`, from the local index.
+
+        Args:
+            tags: Normalized hashtags.
+            limit: Page size (capped at `max_page`).
+            before: Cursor returned with the previous page.
+
+        Returns:
+            ((created_at, note id) newest first, cursor for the next page or None at the end)
+        """
+        limit = max(1, min(limit, self.max_page))
+        pages = [self.store.tagged(tag, limit, before) for tag in tags]
+        page = []
+        for item in heapq.merge(*pages, reverse=True):
+            if not page or item != page[-1]:
+                page.append(item)
+                if len(page) == limit:
+                    break
+        return page, (tuple(page[-1]) if len(page) == limit else None)
+
+    async def retrieve(self, question: str, limit: int = 5,
+                       query_type: Literal["authors", "hashtags", "auto"] = "authors") -> list[Note]:
+        """The notes most relevant to a question, from the local index.
+
+        With `query_type="auto"`, a question naming a known author or a hashtag is answered
+        from that index without an LLM call; otherwise the author is selected by the LLM.
+        """
+        if query_type not in ("authors", "hashtags", "auto"):
+            raise ValueError(f"Invalid query type: {query_type}")
+        if query_type == "auto":
+            lowered = question.lower()
+            named = any(author.name and author.name.lower() in lowered for author in self._authors.values())
+            query_type = "hashtags" if not named and self.match_hashtags(question) else "authors"
+        if query_type == "hashtags":
+            return await self._retrieve_by_tags(question, limit)
+        selected = await self.select_author(question)
+        if selected is None:
+            return []
+        pubkey, author = selected
+        vector = (await asyncio.to_thread(self.embed, [question]))[0]
+        notes = [note for note, _ in self.store.search(vector, k=limit, pubkey=pubkey)]
+        for note in notes:
+            note.content = f"Posted by {author.name}:\n\n{note.content}"
+        return notes
+
+    async def _retrieve_by_tags(self, question: str, limit: int) -> list[Note]:
+        tags = await self.select_hashtags(question)
+        recent, _ = self.notes_by_tag(tags, limit=self.tag_window)
+        if not recent:
+            return []
+        vector = (await asyncio.to_thread(self.embed, [question]))[0]
+        notes = [note for note, _ in self.store.search_notes(vector, [note_id for _, note_id in recent], k=limit)]
+        for note in notes:
+            names = ' '.join(f'#{tag}' for tag in sorted(hashtags(note.tags) & set(tags)))
+            note.content = f"Posted with {names}:\n\n{note.content}"
+        return notes
+
+    async def query(self, question: str, limit: int = 5,
+                    query_type: Literal["authors", "hashtags", "auto"] = "authors") -> str:
+        """Answer a question from the most relevant notes."""
+        notes = await self.retrieve(question, limit, query_type)
+        prompt = ANSWER_PROMPT.format(question=question, context="\n\n".join(note.content for note in notes))
+        response = await self._ask(prompt)
+        return response.content
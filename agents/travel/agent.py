@@ -2,17 +2,23 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from agentstr_demo.lazy import Lazy, defer_agentstr_langchain, prepare
+
+defer_agentstr_langchain()
+
+import asyncio
 import os
 from agentstr import AgentCard, Skill
-from agentstr import ChatInput, NostrAgentServer, NoteFilters, default_price_handler
+from agentstr import ChatInput, NoteFilters, PriceHandler, default_price_handler
+from agentstr_demo.server import AgentServer
 from pynostr.key import PrivateKey
-from langchain_openai import ChatOpenAI
-import random
-import string
+import contextvars
+import uuid
 from typing import Literal
-from pydantic import BaseModel
-import dspy
-import datetime
+from models import Date, Flight
+from flight_store import FlightStore
+from history_store import HistoryStore
+from booking_store import BookingStore
 
 
 YEAR = 2025
@@ -20,27 +26,6 @@ MONTH = 9
 DAY = 1
 
 
-class Date(BaseModel):
-    # Somehow LLM is bad at specifying `datetime.datetime`, so
-    # we define a custom class to represent the date.
-    year: int
-    month: int
-    day: int
-    hour: int = 12
-
-class Flight(BaseModel):
-    flight_id: str
-    date_time: Date
-    origin: str
-    destination: str
-    duration: float
-    price: float
-
-class Itinerary(BaseModel):
-    confirmation_number: str
-    flight: Flight
-
-
 flight_database = {
     "DA123": Flight(
         flight_id="DA123",  # DSPy Airline 123
@@ -124,97 +109,144 @@ flight_database = {
     ),
 }
 
-itinery_database = {}
-ticket_database = {}
+# Load the inventory from FLIGHT_INVENTORY_PATH (CSV or Parquet) if set, otherwise use the sample flights
+if os.getenv('FLIGHT_INVENTORY_PATH'):
+    flight_store = FlightStore.from_file(os.getenv('FLIGHT_INVENTORY_PATH'))
+else:
+    flight_store = FlightStore(flight_database.values())
+
+# The tools call it in worker threads (each has its own connection): a write can wait out the busy timeout
+# for another process's lock, which must not stall the event loop
+booking_store = BookingStore(
+    os.getenv('BOOKING_DB_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bookings.sqlite3'),
+    default_capacity=int(os.getenv('FLIGHT_SEAT_CAPACITY', '150')),
+)
+
+# The user (Nostr pubkey) whose request is being handled, set by `agent_callable` for the tools below
+current_user: contextvars.ContextVar[str] = contextvars.ContextVar('current_user')
 
 
 async def show_itinerary():
     """Show the itinerary for the user"""
-    return sorted(list(itinery_database.values()), key=lambda x: datetime.datetime(x.date_time.year, x.date_time.month, x.date_time.day, x.date_time.hour))
-
-async def search_flights(criteria: Literal['shortest', 'cheapest'] = 'shortest') -> Flight:
-    """Pick up the best flight that matches users' request. we pick the shortest, and cheaper one on ties."""
-    sorted_flights = sorted(
-        list(flight_database.values()),
-        key=lambda x: (
-            x.get("duration" if criteria == 'shortest' else "price") if isinstance(x, dict) else x.duration,
-            x.get("price" if criteria == 'shortest' else "duration") if isinstance(x, dict) else x.price,
-        ),
-    )
-    return sorted_flights[0]
+    return await asyncio.to_thread(booking_store.itinerary, current_user.get())
 
+async def search_flights(origin: str | None = None,
+                         destination: str | None = None,
+                         date: Date | None = None,
+                         criteria: Literal['shortest', 'cheapest'] = 'shortest',
+                         max_price: float | None = None,
+                         limit: int = 3) -> list[Flight]:
+    """Find the best flights that match users' request, best first. For 'shortest' we pick the shortest, and cheaper one on ties; for 'cheapest' the reverse.
 
-def _generate_id(length=8):
-    chars = string.ascii_lowercase + string.digits
-    return "".join(random.choices(chars, k=length))
+    Leave origin, destination, date or max_price empty to not filter on them."""
+    return flight_store.search(origin=origin, destination=destination, date=date,
+                               criteria=criteria, max_price=max_price, limit=limit)
 
 
 async def book_flight(flight: Flight):
     """Book a flight on behalf of the user."""
-    confirmation_number = _generate_id()
-    while confirmation_number in itinery_database:
-        confirmation_number = _generate_id()
-    itinery_database[confirmation_number] = Itinerary(
-        confirmation_number=confirmation_number,
-        flight=flight,
-    )
-    return confirmation_number, itinery_database[confirmation_number]
+    listed = flight_store.get(flight.flight_id)
+    if listed is None:
+        raise ValueError(f"Cannot find flight {flight.flight_id}, please search for flights first.")
+    itinerary = await asyncio.to_thread(booking_store.book, current_user.get(), listed)
+    return itinerary.confirmation_number, itinerary
 
 
 async def cancel_itinerary(confirmation_number: str):
     """Cancel an itinerary on behalf of the user."""
-    if confirmation_number in itinery_database:
-        del itinery_database[confirmation_number]
-        return
-    raise ValueError("Cannot find the itinerary, please check your confirmation number.")
+    await asyncio.to_thread(booking_store.cancel, current_user.get(), confirmation_number)
+
 
 
+llm_api_key = os.getenv("LLM_API_KEY")
+llm_base_url = os.getenv("LLM_BASE_URL")
+llm_model_name = os.getenv("LLM_MODEL_NAME")
 
-class DSPyAirlineCustomerSerice(dspy.Signature):
-    """You are an airline customer service agent that helps user book and manage flights.
 
-    You are given a list of tools to handle user request, and you should decide the right tool to use in order to
-    fullfil users' request."""
+def load_program():
+    """Import DSPy (and LiteLLM with it) and create the agent and the history summarizer; returns `(dspy, agent, summarizer)`."""
+    import dspy
 
-    user_request: str = dspy.InputField(desc="The user's request")
-    history: dspy.History = dspy.InputField(desc="The conversation history")
-    process_result: str = dspy.OutputField(
-        desc=(
-                "Message that summarizes the process result, and the information users need, e.g., the "
-                "confirmation_number if a new flight is booked."
+    class DSPyAirlineCustomerSerice(dspy.Signature):
+        """You are an airline customer service agent that helps user book and manage flights.
+
+        You are given a list of tools to handle user request, and you should decide the right tool to use in order to
+        fullfil users' request."""
+
+        user_request: str = dspy.InputField(desc="The user's request")
+        history: dspy.History = dspy.InputField(desc="The conversation history")
+        process_result: str = dspy.OutputField(
+            desc=(
+                    "Message that summarizes the process result, and the information users need, e.g., the "
+                    "confirmation_number if a new flight is booked."
+                )
             )
-        )
 
+    class SummarizeHistory(dspy.Signature):
+        """Fold earlier turns of an airline customer service conversation into a short summary, keeping
+        names, flights, dates and confirmation numbers."""
+
+        previous_summary: str = dspy.InputField(desc="Summary of the conversation so far, if any")
+        turns: list[dict] = dspy.InputField(desc="Turns to fold into the summary")
+        summary: str = dspy.OutputField(desc="Updated summary")
+
+    agent = dspy.ReAct(
+        DSPyAirlineCustomerSerice,
+        tools = [
+            show_itinerary,
+            search_flights,
+            book_flight,
+            cancel_itinerary
+        ]
+    )
+    summarizer = dspy.Predict(SummarizeHistory)
 
-agent = dspy.ReAct(
-    DSPyAirlineCustomerSerice,
-    tools = [
-        show_itinerary,
-        search_flights,
-        book_flight,
-        cancel_itinerary
-    ]
-)
+    # Set on the modules rather than with dspy.configure(), which only the thread that first called it may use
+    lm = dspy.LM(model=llm_model_name, api_base=llm_base_url.rstrip('/v1'), api_key=llm_api_key, model_type='chat')
+    agent.set_lm(lm)
+    summarizer.set_lm(lm)
+    return dspy, agent, summarizer
 
-llm_api_key = os.getenv("LLM_API_KEY")
-llm_base_url = os.getenv("LLM_BASE_URL")
-llm_model_name = os.getenv("LLM_MODEL_NAME")
 
-dspy.configure(lm=dspy.LM(model=llm_model_name, api_base=llm_base_url.rstrip('/v1'), api_key=llm_api_key, model_type='chat'))
+# Created when AGENT_STARTUP asks (see agentstr_demo.lazy)
+program = Lazy(load_program)
+
+
+async def summarize_history(previous_summary: str | None, turns: list[dict]) -> str:
+    _, _, summarizer = await program.get()
+    result = await summarizer.acall(previous_summary=previous_summary or '', turns=turns)
+    return result.summary
+
+
+history_store = HistoryStore(
+    max_turns=int(os.getenv('HISTORY_MAX_TURNS', '10')),
+    max_tokens=int(os.getenv('HISTORY_MAX_TOKENS', '2000')),
+    max_threads=int(os.getenv('HISTORY_MAX_THREADS', '1000')),
+    idle_ttl=float(os.getenv('HISTORY_IDLE_TTL', '3600')),
+    db_path=os.getenv('HISTORY_DB_PATH') or None,
+    summarize=summarize_history if os.getenv('HISTORY_SUMMARIZE', '').lower() in ('1', 'true', 'yes') else None,
+)
 
 
 async def run():
-    message_history = {}
+    # default_price_handler() imports LangChain, so it is created when AGENT_STARTUP asks as well
+    price_handler = Lazy(default_price_handler)
+    await prepare(program, price_handler)
+
+    async def price_llm(prompt: str) -> str:
+        return await (await price_handler.get()).llm_callable(prompt)
 
     async def agent_callable(chat_input: ChatInput) -> str:
         thread_id = chat_input.thread_id or str(uuid.uuid4())
+        current_user.set(thread_id)
         print(f"Found request: {chat_input.messages[-1]}")
-        history = dspy.History(messages=message_history.get(thread_id, []))
-        if thread_id not in message_history:
-            message_history[thread_id] = []
+        messages, _ = history_store.messages(thread_id)
+        dspy, agent, _ = await program.get()
+        history = dspy.History(messages=messages)
         result = await agent.acall(user_request=chat_input.messages[-1], history=history)
-        message_history[thread_id].append({'user_request': chat_input.messages[-1], **result}) 
-        print(f"Result: {result.process_result}")       
+        # Keep only the request and answer; the ReAct trajectory would otherwise be replayed every turn
+        await history_store.append(thread_id, {'user_request': chat_input.messages[-1], 'process_result': result.process_result})
+        print(f"Result: {result.process_result}")
         return result.process_result
 
     # Define agent info
@@ -238,13 +270,13 @@ async def run():
         nostr_pubkeys=['npub1jch03stp0x3fy6ykv5df2fnhtaq4xqvqlmpjdu68raaqcntca5tqahld7a'],
     )
     
-    server = NostrAgentServer(relays=relays, 
-                              private_key=private_key, 
-                              nwc_str=nwc_str,
-                              agent_info=agent_info,
-                              agent_callable=agent_callable,
-                              note_filters=note_filters,
-                              price_handler=default_price_handler())
+    server = AgentServer(relays=relays, 
+                         private_key=private_key, 
+                         nwc_str=nwc_str,
+                         agent_info=agent_info,
+                         agent_callable=agent_callable,
+                         note_filters=note_filters,
+                         price_handler=PriceHandler(llm_callable=price_llm))
 
     await server.start()
 
@@ -0,0 +1,136 @@
+import random
+import sqlite3
+import string
+import threading
+import time
+
+from models import Flight, Itinerary
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seats (
+    flight_id TEXT PRIMARY KEY,
+    capacity INTEGER NOT NULL,
+    booked INTEGER NOT NULL DEFAULT 0 CHECK (booked <= capacity)
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    confirmation_number TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    flight_id TEXT NOT NULL,
+    departure TEXT NOT NULL,
+    flight TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bookings_by_user ON bookings (user_id, departure);
+"""
+
+
+def generate_confirmation_number(length=8) -> str:
+    chars = string.ascii_lowercase + string.digits
+    return "".join(random.choices(chars, k=length))
+
+
+class BookingStore:
+    """Persistent bookings in SQLite (WAL mode).
+
+    Every booking and cancellation runs in a single `BEGIN IMMEDIATE` transaction that also
+    updates the flight's seat count, so concurrent callers (threads or processes sharing the
+    file) can never book more seats than a flight has. Bookings are indexed by user, so looking
+    up one user's itinerary doesn't touch anybody else's.
+
+    Call `close()` before forking: SQLite's file locks are not inherited by a child process, so
+    a connection open across `fork()` lets the child's writes go missing.
+    """
+    def __init__(self, path: str, default_capacity: int = 150, busy_timeout: float = 30.0):
+        """Initialize the store.
+
+        Args:
+            path: SQLite database file (':memory:' is not supported, since each thread opens its own connection).
+            default_capacity: Seats on a flight that was never given an explicit capacity.
+            busy_timeout: Seconds to wait for another writer to release the database lock.
+        """
+        self.path = path
+        self.default_capacity = default_capacity
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=self.busy_timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def set_capacity(self, flight_id: str, capacity: int):
+        """Set the number of seats on a flight. Raises ValueError if more seats are already booked."""
+        try:
+            self._connect().execute(
+                'INSERT INTO seats (flight_id, capacity) VALUES (?, ?) '
+                'ON CONFLICT (flight_id) DO UPDATE SET capacity = excluded.capacity',
+                (flight_id, capacity))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Flight {flight_id} already has more than {capacity} seats booked.")
+
+    def seats_left(self, flight_id: str) -> int:
+        row = self._connect().execute('SELECT capacity - booked FROM seats WHERE flight_id = ?', (flight_id,)).fetchone()
+        return row[0] if row else self.default_capacity
+
+    def book(self, user_id: str, flight: Flight) -> Itinerary:
+        """Book one seat on `flight` for `user_id`. Raises ValueError if the flight is full."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('INSERT OR IGNORE INTO seats (flight_id, capacity) VALUES (?, ?)',
+                         (flight.flight_id, self.default_capacity))
+            taken = conn.execute('UPDATE seats SET booked = booked + 1 WHERE flight_id = ? AND booked < capacity',
+                                 (flight.flight_id,))
+            if taken.rowcount == 0:
+                raise ValueError(f"Flight {flight.flight_id} is fully booked.")
+            d = flight.date_time
+            departure = f'{d.year:04d}-{d.month:02d}-{d.day:02d}T{d.hour:02d}'
+            while True:
+                confirmation_number = generate_confirmation_number()
+                try:
+                    conn.execute('INSERT INTO bookings VALUES (?, ?, ?, ?, ?, ?)',
+                                 (confirmation_number, user_id, flight.flight_id, departure,
+                                  flight.model_dump_json(), time.time()))
+                    break
+                except sqlite3.IntegrityError:
+                    continue
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return Itinerary(confirmation_number=confirmation_number, flight=flight)
+
+    def cancel(self, user_id: str, confirmation_number: str):
+        """Cancel one of `user_id`'s bookings and release its seat. Raises ValueError if there is no such booking."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute('DELETE FROM bookings WHERE confirmation_number = ? AND user_id = ? RETURNING flight_id',
+                               (confirmation_number, user_id)).fetchall()
+            if not rows:
+                raise ValueError("Cannot find the itinerary, please check your confirmation number.")
+            conn.execute('UPDATE seats SET booked = booked - 1 WHERE flight_id = ?', (rows[0][0],))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def itinerary(self, user_id: str) -> list[Itinerary]:
+        """`user_id`'s bookings, by departure time."""
+        rows = self._connect().execute(
+            'SELECT confirmation_number, flight FROM bookings WHERE user_id = ? ORDER BY departure, created_at',
+            (user_id,))
+        return [Itinerary(confirmation_number=number, flight=Flight.model_validate_json(flight)) for number, flight in rows]
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
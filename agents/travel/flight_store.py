@@ -0,0 +1,212 @@
+import bisect
+import csv
+import datetime
+import heapq
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from typing import Literal
+
+from models import Date, Flight
+
+
+# (flight_id, origin, destination, departure, duration in hours, price)
+FlightRecord = tuple[str, str, str, datetime.datetime, float, float]
+
+PRICE, DURATION = 0, 1
+
+
+class FlightStore:
+    """In-memory flight inventory with sorted indexes for fast top-k searches.
+
+    Flights are bucketed by (origin, destination, departure date). Each bucket, and the
+    inventory as a whole, keeps two lists ordered by (price, duration) and by
+    (duration, price). A search merges only the buckets that match its filters and walks
+    them in order, stopping after `limit` results, so it never sorts the inventory.
+    Records are stored as plain tuples; `Flight` models are built only for results.
+    """
+    def __init__(self, flights: Iterable[Flight] = ()):
+        self._records: dict[str, FlightRecord] = {}
+        self._buckets: dict[tuple[str, str, int], tuple[list, list]] = {}
+        self._global: tuple[list, list] = ([], [])
+        self._buckets_by_origin: dict[str, set] = defaultdict(set)
+        self._buckets_by_destination: dict[str, set] = defaultdict(set)
+        self._buckets_by_day: dict[int, set] = defaultdict(set)
+        self.add_many(flights)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, flight_id: str) -> bool:
+        return flight_id in self._records
+
+    @classmethod
+    def from_file(cls, path: str) -> 'FlightStore':
+        """Load an inventory from a CSV or Parquet file (see `read_flight_records`)."""
+        store = cls()
+        store.add_records(read_flight_records(path))
+        return store
+
+    def get(self, flight_id: str) -> Flight | None:
+        record = self._records.get(flight_id)
+        return _to_flight(record) if record else None
+
+    def add(self, flight: Flight):
+        """Add (or replace) a single flight, keeping every index sorted."""
+        record = _to_record(flight)
+        if record[0] in self._records:
+            self.remove(record[0])
+        self._records[record[0]] = record
+        price_key, duration_key = _keys(record)
+        for index in (self._bucket(record), self._global):
+            bisect.insort(index[PRICE], price_key)
+            bisect.insort(index[DURATION], duration_key)
+
+    def add_many(self, flights: Iterable[Flight]):
+        self.add_records(_to_record(flight) for flight in flights)
+
+    def add_records(self, records: Iterable[FlightRecord]):
+        """Bulk-load records: append everything, then sort each touched index once."""
+        records = {record[0]: record for record in records}
+        for flight_id in records.keys() & self._records.keys():
+            self.remove(flight_id)  # Indexes are still sorted here
+        touched = {id(self._global): self._global}
+        for record in records.values():
+            self._records[record[0]] = record
+            price_key, duration_key = _keys(record)
+            for index in (self._bucket(record), self._global):
+                index[PRICE].append(price_key)
+                index[DURATION].append(duration_key)
+                touched[id(index)] = index
+        for index in touched.values():
+            index[PRICE].sort()
+            index[DURATION].sort()
+
+    def remove(self, flight_id: str):
+        """Remove a flight from the inventory and every index."""
+        record = self._records.pop(flight_id)
+        price_key, duration_key = _keys(record)
+        for index in (self._bucket(record), self._global):
+            for keys, key in ((index[PRICE], price_key), (index[DURATION], duration_key)):
+                del keys[bisect.bisect_left(keys, key)]
+
+    def _bucket(self, record: FlightRecord) -> tuple[list, list]:
+        key = (record[1], record[2], record[3].toordinal())
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = ([], [])
+            self._buckets_by_origin[key[0]].add(key)
+            self._buckets_by_destination[key[1]].add(key)
+            self._buckets_by_day[key[2]].add(key)
+        return bucket
+
+    def search(self,
+               origin: str | None = None,
+               destination: str | None = None,
+               date: Date | datetime.date | str | None = None,
+               criteria: Literal['shortest', 'cheapest'] = 'shortest',
+               max_price: float | None = None,
+               max_duration: float | None = None,
+               limit: int = 1) -> list[Flight]:
+        """Find the best flights matching the filters.
+
+        Args:
+            origin: Origin airport code (any if None).
+            destination: Destination airport code (any if None).
+            date: Departure date (any if None).
+            criteria: 'shortest' orders by duration then price, 'cheapest' by price then duration.
+            max_price: Only flights at or below this price.
+            max_duration: Only flights at or below this duration, in hours.
+            limit: Maximum number of flights to return.
+
+        Returns:
+            Up to `limit` flights, best first.
+        """
+        if limit <= 0:
+            return []
+        order = DURATION if criteria == 'shortest' else PRICE
+        results = []
+        for key in self._ordered_keys(origin, destination, _day(date), order):
+            first, second, flight_id = key
+            price, duration = (first, second) if order == PRICE else (second, first)
+            # The primary sort key only grows from here, so its bound ends the walk
+            if order == PRICE and max_price is not None and price > max_price:
+                break
+            if order == DURATION and max_duration is not None and duration > max_duration:
+                break
+            if (max_price is not None and price > max_price) or (max_duration is not None and duration > max_duration):
+                continue
+            results.append(_to_flight(self._records[flight_id]))
+            if len(results) >= limit:
+                break
+        return results
+
+    def _ordered_keys(self, origin: str | None, destination: str | None, day: int | None, order: int) -> Iterator[tuple]:
+        if origin is None and destination is None and day is None:
+            return iter(self._global[order])
+        if origin is not None and destination is not None and day is not None:
+            bucket = self._buckets.get((origin.upper(), destination.upper(), day))
+            return iter(bucket[order]) if bucket else iter(())
+        candidates = None
+        for index, value in ((self._buckets_by_origin, origin), (self._buckets_by_destination, destination),
+                             (self._buckets_by_day, day)):
+            if value is None:
+                continue
+            keys = index.get(value.upper() if isinstance(value, str) else value, set())
+            candidates = keys if candidates is None else candidates & keys
+        return heapq.merge(*[self._buckets[key][order] for key in candidates or ()])
+
+
+def read_flight_records(path: str) -> Iterator[FlightRecord]:
+    """Stream flight records from a CSV or Parquet file.
+
+    The file needs the columns flight_id, origin, destination, departure (ISO 8601,
+    e.g. 2025-09-01T06:00), duration (hours) and price. Parquet support needs `pyarrow`.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=65536):
+            yield from (_parse_row(row) for row in batch.to_pylist())
+    else:
+        with open(path, newline='') as f:
+            yield from (_parse_row(row) for row in csv.DictReader(f))
+
+
+def _parse_row(row: dict) -> FlightRecord:
+    departure = row['departure']
+    if not isinstance(departure, datetime.datetime):
+        departure = datetime.datetime.fromisoformat(str(departure))
+    return (str(row['flight_id']), str(row['origin']).upper(), str(row['destination']).upper(),
+            departure, float(row['duration']), float(row['price']))
+
+
+def _keys(record: FlightRecord) -> tuple[tuple, tuple]:
+    flight_id, _, _, _, duration, price = record
+    return (price, duration, flight_id), (duration, price, flight_id)
+
+
+def _day(date: Date | datetime.date | str | None) -> int | None:
+    if date is None:
+        return None
+    if isinstance(date, Date):
+        return datetime.date(date.year, date.month, date.day).toordinal()
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date[:10])
+    return date.toordinal()
+
+
+def _to_record(flight: Flight) -> FlightRecord:
+    d = flight.date_time
+    return (flight.flight_id, flight.origin.upper(), flight.destination.upper(),
+            datetime.datetime(d.year, d.month, d.day, d.hour), flight.duration, flight.price)
+
+
+def _to_flight(record: FlightRecord) -> Flight:
+    flight_id, origin, destination, departure, duration, price = record
+    return Flight(
+        flight_id=flight_id,
+        origin=origin,
+        destination=destination,
+        date_time=Date(year=departure.year, month=departure.month, day=departure.day, hour=departure.hour),
+        duration=duration,
+        price=price,
+    )
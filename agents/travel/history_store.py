@@ -0,0 +1,161 @@
+import asyncio
+import json
+import sqlite3
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from agentstr_demo.tokens import count_tokens
+
+
+@dataclass
+class ThreadHistory:
+    turns: list[dict] = field(default_factory=list)
+    turn_tokens: list[int] = field(default_factory=list)
+    summary: str | None = None
+    summary_tokens: int = 0
+    total_tokens: int = 0  # Tokens of every turn ever added, i.e. what an unbounded history would send
+    last_used: float = 0.0
+
+
+class HistoryStore:
+    """Bounded per-thread conversation history.
+
+    Each thread keeps at most `max_turns` recent turns within `max_tokens`. Older turns are
+    dropped, or folded into a running summary when a `summarize` callable is given. At most
+    `max_threads` threads stay in memory; the least recently used (and any idle longer than
+    `idle_ttl`) are evicted, spilling to SQLite when `db_path` is set so they can be reloaded
+    on their next turn.
+    """
+    def __init__(self,
+                 max_turns: int = 10,
+                 max_tokens: int = 2000,
+                 max_threads: int = 1000,
+                 idle_ttl: float | None = 3600,
+                 db_path: str | None = None,
+                 summarize: Callable[[str | None, list[dict]], Awaitable[str]] | None = None,
+                 count_tokens: Callable[[str], int] = count_tokens,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the store.
+
+        Args:
+            max_turns: Maximum number of turns sent with each request.
+            max_tokens: Token budget for the history sent with each request (summary included).
+            max_threads: Maximum number of threads kept in memory.
+            idle_ttl: Seconds after which an idle thread is evicted from memory (never if None).
+            db_path: SQLite file that evicted threads spill to (they are dropped if None).
+            summarize: Async callable (previous summary, retired turns) -> new summary.
+            count_tokens: Token counter for a turn's JSON.
+            clock: Monotonic time source, in seconds.
+        """
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.max_threads = max_threads
+        self.idle_ttl = idle_ttl
+        self.summarize = summarize
+        self.count_tokens = count_tokens
+        self.clock = clock
+        self.tokens_saved = 0
+        self._threads: OrderedDict[str, ThreadHistory] = OrderedDict()
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS histories (thread_id TEXT PRIMARY KEY, data TEXT NOT NULL)')
+
+    def __len__(self) -> int:
+        return len(self._threads)
+
+    def _thread(self, thread_id: str) -> ThreadHistory:
+        now = self.clock()
+        self._evict_idle(now)
+        history = self._threads.get(thread_id)
+        if history is None:
+            history = self._load(thread_id) or ThreadHistory()
+            self._threads[thread_id] = history
+            while len(self._threads) > self.max_threads:
+                self._spill(*self._threads.popitem(last=False))
+        self._threads.move_to_end(thread_id)
+        history.last_used = now
+        return history
+
+    def _evict_idle(self, now: float):
+        if self.idle_ttl is None:
+            return
+        while self._threads:
+            thread_id, history = next(iter(self._threads.items()))
+            if history.last_used > now - self.idle_ttl:
+                break
+            self._spill(*self._threads.popitem(last=False))
+
+    def _spill(self, thread_id: str, history: ThreadHistory):
+        if self._db is not None:
+            data = {'turns': history.turns, 'turn_tokens': history.turn_tokens, 'summary': history.summary,
+                    'summary_tokens': history.summary_tokens, 'total_tokens': history.total_tokens}
+            self._db.execute('INSERT OR REPLACE INTO histories (thread_id, data) VALUES (?, ?)',
+                             (thread_id, json.dumps(data)))
+
+    def _load(self, thread_id: str) -> ThreadHistory | None:
+        if self._db is None:
+            return None
+        row = self._db.execute('SELECT data FROM histories WHERE thread_id = ?', (thread_id,)).fetchone()
+        return ThreadHistory(**json.loads(row[0])) if row else None
+
+    def messages(self, thread_id: str) -> tuple[list[dict], int]:
+        """History to send with the next request on a thread.
+
+        Returns:
+            (messages, prompt tokens saved compared to sending the full history)
+        """
+        history = self._thread(thread_id)
+        messages = list(history.turns)
+        sent = sum(history.turn_tokens)
+        if history.summary:
+            messages.insert(0, {'user_request': '(summary of the earlier conversation)', 'process_result': history.summary})
+            sent += history.summary_tokens
+        saved = history.total_tokens - sent
+        self.tokens_saved += saved
+        return messages, saved
+
+    async def append(self, thread_id: str, turn: dict):
+        """Record a finished turn, retiring the oldest turns that no longer fit the budget."""
+        lock = self._locks.get(thread_id)
+        if lock is None:
+            self._locks[thread_id] = lock = asyncio.Lock()
+        # Appends to one thread run one at a time, so each summary builds on the previous one
+        async with lock:
+            history = self._thread(thread_id)
+            tokens = self.count_tokens(json.dumps(turn, default=str))
+            history.turns.append(turn)
+            history.turn_tokens.append(tokens)
+            history.total_tokens += tokens
+
+            # A new summary may be longer than the one it replaces, so measure again until the history fits
+            while True:
+                retired = []
+                # The latest turn is always kept, even if it alone exceeds the token budget
+                while len(history.turns) > 1 and (
+                    len(history.turns) > self.max_turns
+                    or sum(history.turn_tokens) + history.summary_tokens > self.max_tokens
+                ):
+                    retired.append(history.turns.pop(0))
+                    history.turn_tokens.pop(0)
+                if not retired or self.summarize is None:
+                    break
+                summary = await self.summarize(history.summary, retired)
+                # Other threads may have spilled this one while the summary was written; update its current copy
+                history = self._thread(thread_id)
+                history.summary = summary
+                history.summary_tokens = self.count_tokens(summary)
+            if history.summary and sum(history.turn_tokens) + history.summary_tokens > self.max_tokens:
+                history.summary, history.summary_tokens = None, 0  # Too long to send even with the latest turn alone
+
+    def close(self):
+        """Spill every in-memory thread (if backed by SQLite) and close the database."""
+        if self._db is not None:
+            for thread_id, history in self._threads.items():
+                self._spill(thread_id, history)
+            self._db.close()
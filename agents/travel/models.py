@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+
+
+class Date(BaseModel):
+    # Somehow LLM is bad at specifying `datetime.datetime`, so
+    # we define a custom class to represent the date.
+    year: int
+    month: int
+    day: int
+    hour: int = 12
+
+class Flight(BaseModel):
+    flight_id: str
+    date_time: Date
+    origin: str
+    destination: str
+    duration: float
+    price: float
+
+class Itinerary(BaseModel):
+    confirmation_number: str
+    flight: Flight
@@ -0,0 +1 @@
+"""Shared building blocks for the Agentstr demo agents and MCP servers."""
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into a single in-flight call.
+
+    The first caller for a key starts the work; everyone who asks for the same key
+    while it is still running awaits that same task instead of starting their own.
+    """
+    def __init__(self):
+        self.shared = 0  # Calls that joined work already in flight
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` for `key`, or join the call that is already running for it.
+
+        Args:
+            key: Identifies the work being done.
+            fn: Zero-argument coroutine function that performs the work.
+
+        Returns:
+            The result of the shared call.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.shared += 1
+        # Shield so a cancelled caller doesn't cancel the work for everyone else
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every caller went away
+
+
+class TTLCache:
+    """In-memory cache where every entry carries its own time-to-live.
+
+    Optionally bounded: once `max_size` entries are stored the least recently used
+    entry is evicted. Loads through `get_or_load` are coalesced per key.
+    """
+    def __init__(self, max_size: int | None = None, clock: Callable[[], float] = time.monotonic):
+        """Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries to keep (unbounded if None).
+            clock: Monotonic time source, in seconds.
+        """
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+        self._flight = SingleFlight()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    @property
+    def coalesced(self) -> int:
+        """Number of misses that were served by joining a load already in flight."""
+        return self._flight.shared
+
+    def _lookup(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` if missing or expired."""
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """Store `value` under `key` for `ttl` seconds (forever if None)."""
+        expires_at = self.clock() + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """Drop `key` from the cache if present."""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        self._entries.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float | None = None) -> Any:
+        """Return the cached value for `key`, loading and caching it on a miss.
+
+        Concurrent misses for the same key share one call to `loader`.
+
+        Args:
+            key: Cache key.
+            loader: Zero-argument coroutine function producing the value.
+            ttl: Seconds to keep the loaded value (forever if None).
+
+        Returns:
+            The cached or freshly loaded value.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        async def load():
+            value = await loader()
+            self.set(key, value, ttl)
+            return value
+
+        return await self._flight.do(key, load)
+
+
+class SQLiteCache:
+    """Persistent key/value cache backed by a SQLite file.
+
+    Values are stored as JSON, optionally with an expiry. Reads and writes are single
+    indexed statements, cheap enough to run directly on the event loop.
+    """
+    def __init__(self, path: str, table: str = 'cache', clock: Callable[[], float] = time.time):
+        """Initialize the cache, creating the database file if needed.
+
+        Args:
+            path: Path of the SQLite database file.
+            table: Table to store entries in, so several caches can share one file.
+            clock: Wall-clock time source, in seconds (expiries survive restarts).
+        """
+        self.path = path
+        self.table = table
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)')
+
+    def __len__(self) -> int:
+        return self._db.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def _lookup(self, key: str) -> Any:
+        row = self._db.execute(f'SELECT value, expires_at FROM {self.table} WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return _MISSING
+        value, expires_at = row
+        if expires_at is not None and expires_at <= self.clock():
+            self.delete(key)
+            return _MISSING
+        return json.loads(value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the stored value for `key`, or `default` if missing or expired."""
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None):
+        """Store a JSON-serializable `value` under `key` for `ttl` seconds (forever if None)."""
+        expires_at = self.clock() + ttl if ttl is not None else None
+        self._db.execute(f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)',
+                         (key, json.dumps(value), expires_at))
+
+    def set_many(self, items: dict[str, Any], ttl: float | None = None):
+        """Store several entries in one transaction."""
+        expires_at = self.clock() + ttl if ttl is not None else None
+        with self._db:
+            self._db.execute('BEGIN')
+            self._db.executemany(f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)',
+                                 [(key, json.dumps(value), expires_at) for key, value in items.items()])
+
+    def delete(self, key: str):
+        """Drop `key` from the cache if present."""
+        self._db.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def clear(self):
+        """Drop every entry."""
+        self._db.execute(f'DELETE FROM {self.table}')
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        return self._db.execute(f'DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?',
+                                (self.clock(),)).rowcount
+
+    def close(self):
+        self._db.close()
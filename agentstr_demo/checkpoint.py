@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import time
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+class SQLiteCheckpointer(SqliteSaver):
+    """LangGraph checkpointer that keeps thread state in SQLite instead of RAM.
+
+    A drop-in for `MemorySaver` built on `langgraph-checkpoint-sqlite`'s `SqliteSaver`:
+    nothing is loaded until a thread is used, and each turn reads the thread's latest
+    checkpoint from disk, so memory doesn't grow with the number of threads and
+    conversations survive a restart. On top of `SqliteSaver`, only the newest `keep`
+    checkpoints of a thread are kept (each one holds the full state), and threads idle for
+    longer than `ttl` are deleted by `prune()`, which also runs every `prune_interval`
+    seconds on write.
+    """
+    def __init__(self,
+                 path: str,
+                 keep: int = 2,
+                 ttl: float | None = 30 * 24 * 3600,
+                 prune_interval: float = 600,
+                 clock: Callable[[], float] = time.time,
+                 **kwargs):
+        """Open (or create) the checkpoint database.
+
+        Args:
+            path: SQLite database file.
+            keep: Checkpoints kept per thread; older ones and their writes are compacted away.
+            ttl: Seconds after its last write that a thread is deleted (kept forever if None).
+            prune_interval: Minimum seconds between automatic `prune()` runs.
+            clock: Time source, in seconds.
+            kwargs: Passed through to `SqliteSaver` (e.g. `serde`).
+        """
+        super().__init__(sqlite3.connect(path, check_same_thread=False), **kwargs)
+        self.keep = max(keep, 1)
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self.clock = clock
+        self._last_prune = clock()
+
+    @classmethod
+    def from_env(cls, default_path: str, **kwargs) -> 'SQLiteCheckpointer':
+        """Create a checkpointer configured by CHECKPOINT_* environment variables.
+
+        Recognized variables: CHECKPOINT_DB_PATH (default `default_path`), CHECKPOINT_KEEP
+        and CHECKPOINT_TTL (seconds, 0 to keep idle threads forever). Keyword arguments
+        take precedence.
+        """
+        env = {
+            'keep': ('CHECKPOINT_KEEP', int),
+            'ttl': ('CHECKPOINT_TTL', lambda v: float(v) or None),
+        }
+        for arg, (name, parse) in env.items():
+            if arg not in kwargs and os.getenv(name):
+                kwargs[arg] = parse(os.getenv(name))
+        return cls(os.getenv('CHECKPOINT_DB_PATH') or default_path, **kwargs)
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript("""
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS threads (thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS threads_by_age ON threads (updated_at);
+        """)
+
+    def put(self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = str(saved['configurable']['thread_id'])
+        now = self.clock()
+        with self.cursor() as cur:
+            cur.execute('INSERT OR REPLACE INTO threads VALUES (?, ?)', (thread_id, now))
+            self._compact(cur, thread_id, saved['configurable']['checkpoint_ns'])
+        if self.ttl is not None and now - self._last_prune >= self.prune_interval:
+            self.prune()
+        return saved
+
+    def _compact(self, cur: sqlite3.Cursor, thread_id: str, checkpoint_ns: str):
+        oldest_kept = cur.execute(
+            'SELECT checkpoint_id, parent_checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? '
+            'ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?', (thread_id, checkpoint_ns, self.keep - 1)).fetchone()
+        if oldest_kept is None:
+            return
+        checkpoint_id, parent_id = oldest_kept
+        cur.execute('DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?',
+                    (thread_id, checkpoint_ns, checkpoint_id))
+        # The parent's writes stay: its TASKS writes are the Sends the oldest kept checkpoint still has to run
+        cur.execute('DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ? AND checkpoint_id IS NOT ?',
+                    (thread_id, checkpoint_ns, checkpoint_id, parent_id))
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._delete([str(thread_id)])
+
+    def _delete(self, thread_ids: Sequence[str]):
+        with self.cursor() as cur:
+            for table in ('checkpoints', 'writes', 'threads'):
+                cur.executemany(f'DELETE FROM {table} WHERE thread_id = ?', [(t,) for t in thread_ids])
+
+    def prune(self) -> int:
+        """Delete threads that haven't been written for `ttl` seconds. Returns how many were deleted."""
+        self._last_prune = now = self.clock()
+        if self.ttl is None:
+            return 0
+        with self.cursor(transaction=False) as cur:
+            idle = [row[0] for row in cur.execute('SELECT thread_id FROM threads WHERE updated_at < ?', (now - self.ttl,))]
+        if idle:
+            self._delete(idle)
+        return len(idle)
+
+    def thread_count(self) -> int:
+        with self.cursor(transaction=False) as cur:
+            return cur.execute('SELECT COUNT(*) FROM threads').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    # `SqliteSaver` has no async API; these run the same local SQLite calls, each well under a millisecond
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return self.get_tuple(config)
+
+    async def alist(self,
+                    config: RunnableConfig | None,
+                    *,
+                    filter: dict[str, Any] | None = None,
+                    before: RunnableConfig | None = None,
+                    limit: int | None = None) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self,
+                   config: RunnableConfig,
+                   checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self,
+                          config: RunnableConfig,
+                          writes: Sequence[tuple[str, Any]],
+                          task_id: str,
+                          task_path: str = '') -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
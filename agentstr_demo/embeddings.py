@@ -0,0 +1,78 @@
+"""Text embedding functions for local vector search.
+
+An embedding function maps a list of texts to a float32 array of shape (len(texts), dim).
+"""
+import hashlib
+import re
+from collections.abc import Callable
+
+import numpy as np
+
+
+Embedder = Callable[[list[str]], np.ndarray]
+
+DEFAULT_MODEL = 'BAAI/bge-small-en-v1.5'
+
+_TOKEN = re.compile(r'\w+')
+
+
+def hashing_embedder(dim: int = 384) -> Embedder:
+    """Bag of words and word bigrams hashed into `dim` buckets (signed), L2-normalized.
+
+    Needs no model download, is deterministic across processes, and is fast on a CPU.
+    Texts that share words land close together; it has no notion of synonyms.
+    """
+    cache: dict[str, int] = {}  # word -> 64-bit hash
+    mix = np.uint64(0x9E3779B97F4A7C15)
+
+    def word_hash(word: str) -> int:
+        cache[word] = h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), 'little')
+        return h
+
+    def embed(texts: list[str]) -> np.ndarray:
+        if len(cache) > 1_000_000:
+            cache.clear()
+        lengths, hashes = [], []
+        for text in texts:
+            words = _TOKEN.findall(text.lower())
+            lengths.append(len(words))
+            hashes.extend([cache.get(w) or word_hash(w) for w in words])
+        words = np.array(hashes, dtype=np.uint64)
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        # Bigrams are hashed from their two word hashes (uint64 arithmetic wraps around)
+        same_text = rows[1:] == rows[:-1]
+        bigrams = (words[:-1] * mix + (words[1:] ^ (words[1:] >> np.uint64(29))))[same_text]
+        features = np.concatenate([words, bigrams])
+        rows = np.concatenate([rows, rows[:-1][same_text]])
+        index = rows * dim + (features % np.uint64(dim)).astype(np.int64)
+        signs = np.where(features >> np.uint64(63), 1.0, -1.0)
+        vectors = np.bincount(index, weights=signs, minlength=len(texts) * dim)
+        vectors = vectors.reshape(len(texts), dim).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    embed.dim = dim
+    return embed
+
+
+def fastembed_embedder(model_name: str = DEFAULT_MODEL) -> Embedder | None:
+    """A CPU embedding function backed by fastembed (ONNX), or None if fastembed isn't installed."""
+    try:
+        from fastembed import TextEmbedding
+    except ImportError:
+        return None
+    model = TextEmbedding(model_name)
+
+    def embed(texts: list[str]) -> np.ndarray:
+        return np.array(list(model.embed(texts)), dtype=np.float32)
+
+    embed.dim = len(embed(['dimension probe'])[0])
+    return embed
+
+
+def load_embedder(model_name: str | None = None, dim: int = 384, fallback: bool = True) -> Embedder | None:
+    """fastembed's `model_name` if given and installed, otherwise the hashing embedder (or None without `fallback`)."""
+    embed = fastembed_embedder(model_name) if model_name else None
+    if embed is None and fallback:
+        embed = hashing_embedder(dim)
+    return embed
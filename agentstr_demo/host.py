@@ -0,0 +1,256 @@
+"""Run several agents and MCP servers in one process, sharing relay connections, LLM clients and the event loop.
+
+    python -m agentstr_demo.host host.example.toml
+
+The config (TOML, or JSON if the file ends in `.json`) lists the service scripts, in the
+order they start, with an optional `env` table for all of them and one per service:
+
+    [env]
+    NOSTR_RELAYS = "wss://relay.damus.io"
+
+    [[services]]
+    script = "mcp_servers/bitcoin/server.py"
+
+    [[services]]
+    script = "agents/bitcoin/agent.py"
+    env = { AGENT_PRIVATE_KEY = "nsec1..." }
+
+Each script runs unchanged, as if it had been started on its own: it is executed as
+`__main__` and the coroutine it hands to `asyncio.run()` becomes the service. Each service
+sees its own environment through `os.environ`: the host's, then the config's, then what the
+script's `load_dotenv()` adds from the `.env` in its directory.
+
+That per-service environment only exists for Python code running in the service's context
+(its tasks, and threads started with `asyncio.to_thread`, which copies the context). The
+rest of the process sees the host's environment: C code calling `getenv()` (OpenSSL,
+SQLite, ONNX Runtime and other native libraries), subprocesses and worker processes,
+`threading.Thread`s and `loop.run_in_executor()` calls, and modules that bound `os.environ`
+before the host started (`from os import environ`). Set variables read that way in the
+host's own environment, the same for every service, or run those services as separate
+processes.
+
+A service starts once the one before it listens for direct messages, so list MCP servers
+before the agents that read their tool lists at startup. A service that fails to load or
+stops is logged; the others keep running.
+
+All services share:
+- one websocket per relay (`agentstr_demo.relay_pool`), with one direct message
+  subscription per relay for every hosted pubkey, routed to each service by recipient;
+- one HTTP connection pool for the OpenAI clients created without their own (LangChain's
+  `ChatOpenAI` already shares one per base URL and timeout);
+- the metrics endpoint on the host's METRICS_PORT, with every service's series.
+"""
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import runpy
+import sys
+import tomllib
+from collections.abc import Coroutine, Iterator, MutableMapping
+from dataclasses import dataclass, field
+
+from agentstr_demo import metrics, tracing  # Configured from the host's environment, not a service's
+from agentstr_demo.relay_pool import RelayPool, install
+
+logger = logging.getLogger(__name__)
+
+_service_env: contextvars.ContextVar[dict[str, str] | None] = contextvars.ContextVar('service_env', default=None)
+
+
+class _ScopedEnviron(MutableMapping):
+    """`os.environ` that reads and writes the current service's environment, if any.
+
+    Only lookups through `os.environ` (and `os.getenv`) are scoped; the process environment
+    that C code and child processes see stays the host's.
+    """
+    def __init__(self, environ: MutableMapping):
+        self.environ = environ
+
+    def _current(self) -> MutableMapping:
+        env = _service_env.get()
+        return self.environ if env is None else env
+
+    def __getitem__(self, key):
+        return self._current()[key]
+
+    def __setitem__(self, key, value):
+        self._current()[key] = value
+
+    def __delitem__(self, key):
+        del self._current()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._current())
+
+    def __len__(self) -> int:
+        return len(self._current())
+
+    def copy(self) -> dict[str, str]:
+        return dict(self._current())
+
+
+@dataclass
+class ServiceConfig:
+    script: str
+    name: str = ''  # Defaults to the script's directory, e.g. agents/bitcoin
+    env: dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.script = os.path.abspath(self.script)
+        self.name = self.name or '/'.join(os.path.dirname(self.script).split(os.sep)[-2:])
+
+
+def load_config(path: str) -> list[ServiceConfig]:
+    """The services of a host config file; script paths are relative to the file."""
+    with open(path, 'rb') as f:
+        config = json.load(f) if path.endswith('.json') else tomllib.load(f)
+    root = os.path.dirname(os.path.abspath(path))
+    shared = {key: str(value) for key, value in config.get('env', {}).items()}
+    services = [ServiceConfig(os.path.join(root, service['script']), service.get('name', ''),
+                              {**shared, **{key: str(value) for key, value in service.get('env', {}).items()}})
+                for service in config['services']]
+    names = [service.name for service in services]
+    if len(set(names)) < len(names):
+        raise ValueError(f'Service names must be unique, got {names}; set `name` on services in the same directory')
+    return services
+
+
+def _share_openai_http_client():
+    """Give every `openai.AsyncOpenAI` created without an HTTP client the same one; returns it.
+
+    With tracing on, the shared client records each LLM request as an `llm.request` span.
+    """
+    try:
+        import openai
+    except ImportError:
+        return None
+    shared = openai.DefaultAsyncHttpxClient(event_hooks=tracing.event_hooks())
+    init = openai.AsyncOpenAI.__init__
+
+    @functools.wraps(init)
+    def __init__(self, *args, http_client=None, **kwargs):
+        init(self, *args, http_client=http_client or shared, **kwargs)
+
+    openai.AsyncOpenAI.__init__ = __init__
+    return shared
+
+
+class Host:
+    """Loads service scripts into this process and runs them on its event loop."""
+    def __init__(self, services: list[ServiceConfig], pool: RelayPool | None = None, startup_timeout: float = 120):
+        """Initialize the host.
+
+        Args:
+            services: The services, in the order they start.
+            pool: Relay connections for every service (defaults to a new `RelayPool`).
+            startup_timeout: Seconds to wait for a service to listen before starting the next one anyway.
+        """
+        self.services = services
+        self.pool = pool or RelayPool()
+        self.startup_timeout = startup_timeout
+        self.failed: dict[str, str] = {}
+
+    def _load(self, service: ServiceConfig, environ: dict[str, str]) -> tuple[contextvars.Context, Coroutine]:
+        """Run the service's script in a context of its own; returns the context and the coroutine it started."""
+        env = {key: value for key, value in environ.items() if key != 'METRICS_PORT'} | service.env
+        context = contextvars.Context()
+        context.run(_service_env.set, env)
+        started = []
+
+        def run(main, **kwargs):
+            started.append(main)
+
+        directory = os.path.dirname(service.script)
+        sys.path.insert(0, directory)
+        asyncio_run, asyncio.run = asyncio.run, run
+        try:
+            context.run(runpy.run_path, service.script, run_name='__main__')
+        finally:
+            asyncio.run = asyncio_run
+            sys.path.remove(directory)
+            # The script holds on to its sibling modules (e.g. rates.py); dropping them from sys.modules
+            # lets a later service import its own module of the same name
+            for name, module in list(sys.modules.items()):
+                if (getattr(module, '__file__', None) or '').startswith(directory + os.sep):
+                    del sys.modules[name]
+        if not started:
+            raise RuntimeError(f'{service.script} did not call asyncio.run()')
+        # The host serves every service's metrics; a port from the service's .env would clash
+        if 'METRICS_PORT' not in service.env:
+            env.pop('METRICS_PORT', None)
+        return context, started[0]
+
+    async def _serve(self, service: ServiceConfig, main: Coroutine):
+        try:
+            await main
+            logger.warning(f'{service.name} stopped')
+        except Exception as e:
+            logger.exception(f'{service.name} failed')
+            self.failed[service.name] = repr(e)
+
+    async def _wait_listening(self, service: ServiceConfig, env: dict[str, str], task: asyncio.Task):
+        from pynostr.key import PrivateKey
+
+        nsec = env.get('AGENT_PRIVATE_KEY') or env.get('MCP_SERVER_PRIVATE_KEY')
+        if not nsec:
+            return
+        pubkey = PrivateKey.from_nsec(nsec).public_key
+        listening = asyncio.create_task(self.pool.listening(pubkey.hex()).wait())
+        done, _ = await asyncio.wait([listening, task], timeout=self.startup_timeout, return_when=asyncio.FIRST_COMPLETED)
+        listening.cancel()
+        if listening in done:
+            logger.info(f'{service.name} is listening as {pubkey.bech32()}')
+        elif not done:
+            logger.warning(f'{service.name} is not listening after {self.startup_timeout:.0f} s, starting the next service')
+
+    async def run(self):
+        """Load and start every service, then run them until cancelled."""
+        install(self.pool)
+        llm_http_client = _share_openai_http_client()
+        environ = dict(os.environ)
+        scoped = os.environ = _ScopedEnviron(os.environ)
+        tasks = []
+        try:
+            async with metrics.serve_from_env():
+                for service in self.services:
+                    try:
+                        context, main = self._load(service, environ)
+                    except Exception as e:
+                        logger.exception(f'Could not load {service.name}')
+                        self.failed[service.name] = repr(e)
+                        continue
+                    tasks.append(asyncio.create_task(self._serve(service, main), context=context))
+                    await self._wait_listening(service, context[_service_env], tasks[-1])
+                logger.info(f'Hosting {len(self.services) - len(self.failed)} of {len(self.services)} services')
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.pool.aclose()
+            if llm_http_client is not None:
+                await llm_http_client.aclose()
+            os.environ = scoped.environ
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run several agents and MCP servers in one process.')
+    parser.add_argument('config', help='host config (TOML, or JSON), e.g. host.example.toml')
+    parser.add_argument('--only', help='comma-separated names of the services to run (default all)')
+    parser.add_argument('--startup-timeout', type=float, default=120,
+                        help='seconds to wait for a service to listen before starting the next one')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    services = load_config(args.config)
+    if args.only:
+        services = [service for service in services if service.name in args.only.split(',')]
+    asyncio.run(Host(services, startup_timeout=args.startup_timeout).run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from agentstr_demo import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = metrics.Counter('agentstr_http_requests_total', 'Outbound HTTP requests by status class (or error).',
+                           ['host', 'status'])
+REQUEST_SECONDS = metrics.Histogram('agentstr_http_request_seconds', 'Outbound HTTP requests, including the wait for '
+                                    'a per-host slot.', ['host'])
+
+
+def _h2_available() -> bool:
+    return importlib.util.find_spec('h2') is not None
+
+
+class HTTPPool:
+    """Server-scoped pool of keep-alive HTTP connections shared by every tool call.
+
+    Wraps a single `httpx.AsyncClient` so tool calls reuse TCP/TLS connections instead of
+    paying a fresh handshake each time, and caps how many requests may be in flight to
+    any one host. The pool is reference counted: it opens on the first `start()` (or
+    `async with`) and closes when the last user calls `aclose()`.
+    """
+    def __init__(self,
+                 max_connections: int = 100,
+                 max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0,
+                 per_host_limit: int | None = 20,
+                 timeout: float = 30.0,
+                 http2: bool | None = None,
+                 **client_kwargs):
+        """Initialize the pool (connections are not opened until it starts).
+
+        Args:
+            max_connections: Maximum number of open connections across all hosts.
+            max_keepalive_connections: Maximum number of idle connections kept alive.
+            keepalive_expiry: Seconds an idle connection is kept before closing it.
+            per_host_limit: Maximum concurrent requests to a single host (unlimited if None).
+            timeout: Default request timeout in seconds.
+            http2: Use HTTP/2 when the server supports it. Defaults to True if `h2` is installed.
+            client_kwargs: Extra keyword arguments for `httpx.AsyncClient`.
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.http2 = _h2_available() if http2 is None else http2
+        self.client_kwargs = client_kwargs
+        self._client: httpx.AsyncClient | None = None
+        self._users = 0
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'HTTPPool':
+        """Create a pool configured by HTTP_POOL_* environment variables.
+
+        Recognized variables: HTTP_POOL_MAX_CONNECTIONS, HTTP_POOL_MAX_KEEPALIVE,
+        HTTP_POOL_KEEPALIVE_EXPIRY, HTTP_POOL_PER_HOST (0 for unlimited),
+        HTTP_POOL_TIMEOUT and HTTP_POOL_HTTP2 (1/0). Keyword arguments take precedence.
+        """
+        env = {
+            'max_connections': ('HTTP_POOL_MAX_CONNECTIONS', int),
+            'max_keepalive_connections': ('HTTP_POOL_MAX_KEEPALIVE', int),
+            'keepalive_expiry': ('HTTP_POOL_KEEPALIVE_EXPIRY', float),
+            'per_host_limit': ('HTTP_POOL_PER_HOST', lambda v: int(v) or None),
+            'timeout': ('HTTP_POOL_TIMEOUT', float),
+            'http2': ('HTTP_POOL_HTTP2', lambda v: v.lower() in ('1', 'true', 'yes')),
+        }
+        for arg, (name, parse) in env.items():
+            if arg not in kwargs and os.getenv(name):
+                kwargs[arg] = parse(os.getenv(name))
+        return cls(**kwargs)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The underlying client. Only available while the pool is started."""
+        if self._client is None:
+            raise RuntimeError("HTTPPool is not started; use `await pool.start()` or `async with pool`")
+        return self._client
+
+    async def start(self) -> 'HTTPPool':
+        """Open the pool (or take another reference to an already open pool)."""
+        if self._client is None:
+            logger.info(f"Opening HTTP pool (limits={self.limits}, per_host={self.per_host_limit}, http2={self.http2})")
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2,
+                                             **self.client_kwargs)
+        self._users += 1
+        return self
+
+    async def aclose(self):
+        """Release a reference to the pool, closing its connections when it was the last one."""
+        self._users = max(self._users - 1, 0)
+        if self._users == 0 and self._client is not None:
+            client, self._client = self._client, None
+            logger.info("Closing HTTP pool")
+            await client.aclose()
+
+    async def __aenter__(self) -> 'HTTPPool':
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore | None:
+        if not self.per_host_limit:
+            return None
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the pool, waiting for a free per-host slot first."""
+        host = urlsplit(str(url)).netloc
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            with tracing.span('http.request', method=method, host=host) as span:
+                semaphore = self._host_semaphore(host)
+                if semaphore is None:
+                    response = await self.client.request(method, url, **kwargs)
+                else:
+                    async with semaphore:
+                        response = await self.client.request(method, url, **kwargs)
+                span.set(status=response.status_code)
+                status = f'{response.status_code // 100}xx'
+                return response
+        finally:
+            REQUESTS.labels(host, status).inc()
+            REQUEST_SECONDS.labels(host).observe(time.perf_counter() - started)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
@@ -0,0 +1,164 @@
+"""Defer an agent's framework imports and model/tool construction, so it publishes its card and listens right away.
+
+An agent wraps what is slow to create (its LLM client, LangGraph/agno/DSPy agent, tools)
+in `Lazy` values and passes them to `prepare()` before starting its server. `AGENT_STARTUP`
+picks when they are built:
+- `eager` (default): before the server starts, as if nothing was deferred;
+- `lazy`: on the first request that needs each of them;
+- `warm`: in the background while the server starts; requests that come first wait for it.
+
+In `lazy` and `warm` startup `defer_agentstr_langchain()`, called before `agentstr` is
+imported, also keeps the package import from loading LangChain, which it only needs for
+`agentstr.nostr_rag.NostrRAG` (about two seconds of every agent's startup).
+"""
+import asyncio
+import importlib.abc
+import importlib.machinery
+import inspect
+import logging
+import os
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+STARTUP_MODES = ('eager', 'lazy', 'warm')
+
+
+def startup_mode() -> str:
+    """The agent's startup mode from `AGENT_STARTUP`."""
+    mode = (os.getenv('AGENT_STARTUP') or 'eager').lower()
+    if mode not in STARTUP_MODES:
+        raise ValueError(f'AGENT_STARTUP must be one of {", ".join(STARTUP_MODES)}, got {mode!r}')
+    return mode
+
+
+class Lazy(Generic[T]):
+    """A value built on first use; concurrent first uses wait for the same build.
+
+    A plain function runs in a worker thread, so importing a framework doesn't hold up the
+    event loop (other conversations, relay keepalives); a coroutine function is awaited. A
+    failed build is tried again by the next `get()`.
+    """
+    def __init__(self, build: Callable[[], T | Awaitable[T]], name: str | None = None):
+        self.build = build
+        self.name = name or getattr(build, '__name__', 'value')
+        self.build_s: float | None = None  # Seconds the last build took
+        self._task: asyncio.Task | None = None
+
+    @property
+    def built(self) -> bool:
+        return self._task is not None and self._task.done() and not self._task.cancelled() and self._task.exception() is None
+
+    async def get(self) -> T:
+        """The value, built now if it hasn't been yet."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._build())
+        # Shield so a cancelled request doesn't cancel the build for everyone else
+        return await asyncio.shield(self._task)
+
+    async def _build(self) -> T:
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(self.build):
+                value = await self.build()
+            else:
+                value = await asyncio.to_thread(self.build)
+        except BaseException:
+            if self._task is asyncio.current_task():
+                self._task = None
+            raise
+        self.build_s = time.perf_counter() - start
+        logger.info(f'Built {self.name} in {self.build_s:.2f} s')
+        return value
+
+    def warm_up(self) -> asyncio.Task:
+        """Start building in the background; a failure is logged and left to the next `get()`."""
+        task = asyncio.ensure_future(self.get())
+        task.add_done_callback(self._warmed_up)
+        return task
+
+    def _warmed_up(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f'Could not build {self.name} in the background: {task.exception()!r}')
+
+    def reset(self):
+        """Build again on the next `get()`, e.g. after the build's inputs changed."""
+        self._task = None
+
+
+async def prepare(*values: Lazy):
+    """Build `values` as `AGENT_STARTUP` asks: now, in the background or on first use."""
+    mode = startup_mode()
+    if mode == 'eager':
+        await asyncio.gather(*(value.get() for value in values))
+    elif mode == 'warm':
+        for value in values:
+            value.warm_up()
+
+
+_LANGCHAIN = ('langchain_community', 'langchain_core', 'langchain_openai')
+
+
+class _DeferLangChain(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Loads `agentstr.nostr_rag` as if LangChain were not installed, and imports it when a `NostrRAG` is created."""
+    def __init__(self):
+        self.loader = None
+        self.loading = False
+
+    def find_spec(self, name, path, target=None):
+        if self.loading and name.partition('.')[0] in _LANGCHAIN:
+            raise ModuleNotFoundError(f'{name} is imported when a NostrRAG is created', name=name)
+        if name != 'agentstr.nostr_rag':
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(name, path, target)
+        if spec is not None:
+            self.loader, spec.loader = spec.loader, self
+        return spec
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.loading = True
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.loading = False
+            sys.meta_path.remove(self)
+        if not module.langchain_installed:
+            init = module.NostrRAG.__init__
+
+            def __init__(rag, *args, **kwargs):
+                _import_langchain(module)
+                init(rag, *args, **kwargs)
+
+            module.NostrRAG.__init__ = __init__
+
+
+def _import_langchain(module):
+    """Bind the LangChain names `agentstr.nostr_rag` would have imported, if LangChain is installed."""
+    if module.langchain_installed:
+        return
+    try:
+        from langchain_community.embeddings import FakeEmbeddings
+        from langchain_core.documents import Document
+        from langchain_core.messages import HumanMessage
+        from langchain_core.vectorstores import InMemoryVectorStore
+        from langchain_openai import ChatOpenAI
+    except ImportError:
+        return
+    vars(module).update(FakeEmbeddings=FakeEmbeddings, Document=Document, HumanMessage=HumanMessage,
+                        InMemoryVectorStore=InMemoryVectorStore, ChatOpenAI=ChatOpenAI, langchain_installed=True)
+
+
+def defer_agentstr_langchain():
+    """In `lazy` and `warm` startup, keep `import agentstr` from importing LangChain; call before importing it."""
+    if startup_mode() == 'eager' or 'agentstr.nostr_rag' in sys.modules:
+        return
+    if not any(isinstance(finder, _DeferLangChain) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _DeferLangChain())
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from agentstr_demo import metrics, tracing
+from agentstr_demo.cache import SingleFlight, SQLiteCache, TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+_MISSING = object()
+
+CALLS = metrics.Counter('agentstr_mcp_client_calls_total', 'An agent\'s MCP tool calls: hit, coalesced or remote.',
+                        ['server', 'tool', 'result'])
+HIT_RATIO = metrics.Gauge('agentstr_mcp_client_hit_ratio', 'Share of an agent\'s MCP tool calls answered without a remote call.',
+                          ['server', 'tool'])
+SATS_SAVED = metrics.Counter('agentstr_mcp_client_sats_saved_total', 'Satoshis not paid thanks to the MCP tool cache.',
+                             ['server', 'tool'])
+CALL_SECONDS = metrics.Histogram('agentstr_mcp_client_call_seconds', 'An agent\'s MCP tool calls.', ['server', 'tool'])
+
+
+@dataclass(frozen=True)
+class ToolPolicy:
+    """How the results of one remote MCP tool may be reused.
+
+    Attributes:
+        ttl: Seconds a result is reused for. With `deterministic` and no ttl, results never expire.
+        deterministic: The result depends only on the arguments, so it can be kept indefinitely.
+        key: Normalizes the arguments into the cache key (e.g. lowercasing a query);
+            the arguments themselves are used if None.
+    """
+    ttl: float | None = None
+    deterministic: bool = False
+    key: Callable[[dict[str, Any]], Any] | None = None
+
+    @property
+    def cacheable(self) -> bool:
+        return self.deterministic or self.ttl is not None
+
+
+def schema_hash(tools: dict[str, Any]) -> str:
+    """Stable hash of an MCP server's tool list, to tell whether its schemas changed."""
+    return hashlib.sha256(json.dumps(tools, sort_keys=True).encode()).hexdigest()
+
+
+class CachedMCPClient:
+    """Wraps a `NostrMCPClient` so repeated tool calls are answered locally.
+
+    Every remote tool call is an encrypted round trip over relays, often with a Lightning
+    payment, so results of tools with a `ToolPolicy` are kept in a TTL + LRU cache and
+    identical calls in flight share one request. Tools without a policy always go to the
+    server. Pass the wrapper wherever the client goes (`to_langgraph_tools`, `to_agno_tools`).
+
+    With a `schema_cache` file, `list_tools` answers from the schemas saved on the last run,
+    so the agent starts without waiting for the server, and fetches them again in the
+    background. When the server's schemas changed, they are saved and `on_schema_change`
+    is awaited so the agent can rebuild its tools.
+    """
+    def __init__(self,
+                 mcp_client,
+                 policies: dict[str, ToolPolicy] | None = None,
+                 max_size: int = 1000,
+                 clock: Callable[[], float] = time.monotonic,
+                 schema_cache: str | None = None,
+                 on_schema_change: Callable[[], Awaitable[None]] | None = None):
+        """Initialize the wrapper.
+
+        Args:
+            mcp_client: The `NostrMCPClient` to call on a miss.
+            policies: Tool name -> how its results may be reused.
+            max_size: Maximum number of results kept (least recently used are evicted).
+            clock: Monotonic time source, in seconds.
+            schema_cache: SQLite file where tool schemas are saved, keyed by the server's pubkey
+                (schemas are always fetched from the server if None).
+            on_schema_change: Awaited after a background fetch found different schemas.
+        """
+        self.mcp_client = mcp_client
+        self.policies = policies or {}
+        self.cache = TTLCache(max_size=max_size, clock=clock)
+        self.schemas = SQLiteCache(schema_cache, table='mcp_schemas') if schema_cache else None
+        self.on_schema_change = on_schema_change
+        self.schema_changes = 0
+        self._flight = SingleFlight()
+        self._stats: dict[str, dict[str, int]] = {}
+        self._call_seconds: dict[str, Any] = {}
+        self._revalidation: asyncio.Task | None = None
+        self._fetched = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.mcp_client, name)
+
+    async def list_tools(self) -> dict[str, Any] | None:
+        """The server's tools: the saved schemas if there are any (revalidated in the background), else fetched."""
+        if self.schemas is None:
+            return await self.mcp_client.list_tools()
+        saved = self.schemas.get(self.mcp_client.mcp_pubkey)
+        if saved is None:
+            return await self._fetch_tools()
+        for tool in saved['tools']['tools']:
+            self.mcp_client.tool_to_sats_map[tool['name']] = tool.get('satoshis', 0)
+        if not self._fetched and (self._revalidation is None or self._revalidation.done()):
+            self._revalidation = asyncio.create_task(self._revalidate(saved['hash']))
+        return saved['tools']
+
+    async def _fetch_tools(self) -> dict[str, Any]:
+        tools = await self.mcp_client.list_tools()
+        self.schemas.set(self.mcp_client.mcp_pubkey, {'hash': schema_hash(tools), 'tools': tools})
+        self._fetched = True
+        return tools
+
+    async def _revalidate(self, saved_hash: str):
+        try:
+            tools = await self._fetch_tools()
+            if schema_hash(tools) != saved_hash:
+                self.schema_changes += 1
+                logger.info(f'Tool schemas of {self.mcp_client.mcp_pubkey} changed')
+                if self.on_schema_change is not None:
+                    await self.on_schema_change()
+        except Exception as e:
+            logger.warning(f'Revalidating the tool schemas of {self.mcp_client.mcp_pubkey} failed: {e!r}')
+
+    async def call_tool(self, name: str, arguments: dict[str, Any], timeout: int = 60) -> dict[str, Any] | None:
+        """Call a tool, reusing a cached result when its policy allows. Errors and empty responses aren't cached."""
+        stats = self._stats.get(name) or self._track(name)
+        stats['calls'] += 1
+        started = time.perf_counter()
+        try:
+            return await self._call_tool(name, arguments, timeout, stats)
+        finally:
+            self._call_seconds[name].observe(time.perf_counter() - started)
+
+    def _track(self, name: str) -> dict[str, int]:
+        stats = self._stats[name] = {'calls': 0, 'hits': 0, 'coalesced': 0, 'remote_calls': 0}
+        server = self.mcp_client.mcp_pubkey
+        CALLS.labels(server, name, 'hit').set_function(lambda: stats['hits'])
+        CALLS.labels(server, name, 'coalesced').set_function(lambda: stats['coalesced'])
+        CALLS.labels(server, name, 'remote').set_function(lambda: stats['remote_calls'])
+        HIT_RATIO.labels(server, name).set_function(lambda: self.metrics()[name]['hit_rate'])
+        SATS_SAVED.labels(server, name).set_function(lambda: self.metrics()[name]['sats_saved'])
+        self._call_seconds[name] = CALL_SECONDS.labels(server, name)
+        return stats
+
+    async def _call_tool(self, name: str, arguments: dict[str, Any], timeout: int, stats: dict[str, int]) -> dict[str, Any] | None:
+        with tracing.span('mcp.call', tool=name) as span:
+            policy = self.policies.get(name)
+            if policy is None or not policy.cacheable:
+                stats['remote_calls'] += 1
+                span.set(result='remote')
+                return await self.mcp_client.call_tool(name, arguments, timeout)
+
+            key = (name, json.dumps(policy.key(arguments) if policy.key else arguments, sort_keys=True, default=str))
+            result = self.cache.get(key, _MISSING)
+            if result is not _MISSING:
+                stats['hits'] += 1
+                span.set(result='hit')
+                return result
+            if key in self._flight:
+                stats['coalesced'] += 1
+                span.set(result='coalesced')
+            else:
+                span.set(result='remote')
+
+            async def load():
+                stats['remote_calls'] += 1
+                result = await self.mcp_client.call_tool(name, arguments, timeout)
+                if result is not None and not result.get('isError'):
+                    self.cache.set(key, result, policy.ttl)
+                return result
+
+            return await self._flight.do(key, load)
+
+    def metrics(self) -> dict[str, dict[str, float]]:
+        """Per-tool calls, cache hits, calls that joined one in flight, hit rate and satoshis not paid."""
+        metrics = {}
+        for name, stats in self._stats.items():
+            saved = stats['hits'] + stats['coalesced']
+            metrics[name] = {**stats, 'hit_rate': saved / stats['calls'] if stats['calls'] else 0.0,
+                             'sats_saved': saved * self.mcp_client.tool_to_sats_map.get(name, 0)}
+        return metrics
@@ -0,0 +1,334 @@
+"""Prometheus metrics of agents and MCP servers, served over HTTP when METRICS_PORT is set.
+
+Counters and histograms are plain numbers updated on the event loop thread: no locks, and
+an update costs about as much as a dict lookup. State that other objects already keep
+(scheduler queue depth, cache hit counts) is read only when the endpoint is scraped,
+through functions given to `set_function`.
+
+`AgentServer` and `MCPServer` serve the metrics on METRICS_PORT (METRICS_HOST, default
+127.0.0.1) while they run; worker N of `agentstr_demo.workers` uses METRICS_PORT + 1 + N.
+
+    curl localhost:9464/metrics
+
+The metrics recorded by `agentstr_demo` (the `service` label is the agent's or MCP server's name):
+    agentstr_agent_turns_total{service,outcome}         turns submitted, completed, failed, timed out or rejected as busy
+    agentstr_agent_in_flight{service}                   turns running
+    agentstr_agent_queue_depth{service}                 turns waiting for a slot
+    agentstr_agent_queue_wait_seconds{service}          histogram of the wait for a slot
+    agentstr_agent_message_seconds{service}             histogram of handling a direct message, from its slot to the reply sent
+    agentstr_agent_callable_seconds{service}            histogram of agent_callable calls
+    agentstr_agent_callable_errors_total{service}       agent_callable calls that raised
+    agentstr_mcp_requests_total{service,tool,outcome}   tool calls served (ok or error)
+    agentstr_mcp_in_flight{service}                     requests being handled
+    agentstr_mcp_tool_seconds{service,tool}             histogram of tool function calls
+    agentstr_mcp_client_calls_total{server,tool,result} an agent's MCP tool calls: hit, coalesced or remote
+    agentstr_mcp_client_hit_ratio{server,tool}          share of them answered without a remote call
+    agentstr_mcp_client_sats_saved_total{server,tool}   satoshis not paid thanks to the cache
+    agentstr_mcp_client_call_seconds{server,tool}       histogram of an agent's MCP tool calls
+    agentstr_cache_lookups_total{service,cache,result}  hits and misses of an MCP server's caches
+    agentstr_cache_hit_ratio{service,cache}             their hit ratio
+    agentstr_cache_entries{service,cache}               their size
+    agentstr_http_requests_total{host,status}           outbound HTTP requests by status class (2xx..5xx, or error)
+    agentstr_http_request_seconds{host}                 histogram of outbound HTTP requests
+    agentstr_sats_invoiced_total{service}               satoshis asked for in invoices
+    agentstr_sats_earned_total{service}                 satoshis of invoices seen paid
+    agentstr_invoices_paid_total{service}               invoices seen paid
+"""
+import asyncio
+import bisect
+import logging
+import math
+import os
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import asynccontextmanager
+
+from agentstr_demo import workers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Value:
+    """A counter or gauge with one set of label values."""
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Callable[[], float] | None = None
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from `function` at each scrape instead."""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class _Buckets:
+    """A histogram with one set of label values."""
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), registry: 'Registry | None' = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._children: dict[tuple[str, ...], _Value | _Buckets] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values: str):
+        """The series with these label values (in the order of `labels`); keep it to update it cheaply."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} takes labels {self.labelnames}, got {values}')
+            key = tuple(str(v) for v in values)
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def remove(self, *values: str):
+        self._children.pop(tuple(str(v) for v in values), None)
+
+    def _label_text(self, key: tuple[str, ...]) -> str:
+        if not key:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)) + '}'
+
+    def expose(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for key, child in list(self._children.items()):
+            try:
+                yield f'{self.name}{self._label_text(key)} {_format(child.get())}'
+            except Exception as e:
+                logger.warning(f'Could not read {self.name}{self._label_text(key)}: {e!r}')
+
+
+class Counter(_Metric):
+    """A value that only goes up (or is read from a function that does)."""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0):
+        self._default.value += amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down (or is read from a function at each scrape)."""
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1.0):
+        self._default.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self._default.value -= amount
+
+    def set(self, value: float):
+        self._default.value = value
+
+
+class Histogram(_Metric):
+    """Counts of observations (e.g. seconds) in cumulative buckets, with their sum."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 registry: 'Registry | None' = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels, registry)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def expose(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} {self.kind}'
+        bounds = [_format(bound) for bound in (*self.buckets, math.inf)]
+        for key, child in list(self._children.items()):
+            labels = ''.join(f'{name}="{_escape(value)}",' for name, value in zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{labels}le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{self._label_text(key)} {_format(child.sum)}'
+            yield f'{self.name}_count{self._label_text(key)} {child.count}'
+
+
+class Registry:
+    """The metrics a process exposes."""
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+
+    def expose(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        return '\n'.join(line for metric in self._metrics.values() for line in metric.expose()) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class MetricsServer:
+    """A minimal HTTP server answering `GET /metrics` with a registry's metrics."""
+    def __init__(self, port: int, host: str = '127.0.0.1', registry: Registry = REGISTRY):
+        self.port = port
+        self.host = host
+        self.registry = registry
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> 'MetricsServer':
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f'Serving metrics on http://{self.host}:{self.port}/metrics')
+        return self
+
+    async def aclose(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> 'MetricsServer':
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=10)
+            method, path = request.split(b' ', 2)[:2]
+            if method != b'GET':
+                status, body = '405 Method Not Allowed', 'Only GET is supported\n'
+            elif path.split(b'?')[0] in (b'/metrics', b'/'):
+                status, body = '200 OK', self.registry.expose()
+            else:
+                status, body = '404 Not Found', 'Metrics are at /metrics\n'
+            data = body.encode()
+            writer.write(f'HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                         f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n'.encode() + data)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+@asynccontextmanager
+async def serve_from_env(registry: Registry = REGISTRY):
+    """Serve `registry` on METRICS_PORT while the block runs; does nothing if it isn't set."""
+    port = os.getenv('METRICS_PORT')
+    if not port:
+        yield None
+        return
+    index = workers.worker_index()
+    server = MetricsServer(int(port) + (0 if index is None else 1 + index), os.getenv('METRICS_HOST') or '127.0.0.1',
+                           registry)
+    try:
+        await server.start()
+    except OSError as e:
+        # Several services sharing one .env: the first one gets the port
+        logger.warning(f'Not serving metrics on port {server.port}: {e}')
+        yield None
+        return
+    try:
+        yield server
+    finally:
+        await server.aclose()
+
+
+# Shared by agents and MCP servers
+SATS_INVOICED = Counter('agentstr_sats_invoiced_total', 'Satoshis asked for in invoices.', ['service'])
+SATS_EARNED = Counter('agentstr_sats_earned_total', 'Satoshis of invoices seen paid.', ['service'])
+INVOICES_PAID = Counter('agentstr_invoices_paid_total', 'Invoices seen paid.', ['service'])
+
+
+_payment_services: dict[str, str] = {}  # NWC app key -> service
+_unpaid: dict[str, tuple[str, int]] = {}  # Invoice -> (service, satoshis)
+
+
+def count_payments(nostr_client, service: str):
+    """Count the invoices made with `nostr_client`'s wallet connection, and the ones seen paid, as `service`'s.
+
+    `NostrClient.nwc_relay` makes a new `NWCRelay` each time, so `NWCRelay` itself is instrumented
+    and each invoice is credited to the service owning the connection that made it.
+    """
+    nwc_relay = nostr_client.nwc_relay
+    if nwc_relay is None:
+        return
+    _payment_services[nwc_relay.nwc_info['app_privkey']] = service
+    _instrument_nwc(type(nwc_relay))
+
+
+def _instrument_nwc(nwc_class):
+    if getattr(nwc_class, '_counts_payments', False):
+        return
+    nwc_class._counts_payments = True
+    make_invoice, did_payment_succeed = nwc_class.make_invoice, nwc_class.did_payment_succeed
+
+    async def counted_make_invoice(self, amount: int, *args, **kwargs):
+        invoice = await make_invoice(self, amount, *args, **kwargs)
+        service = _payment_services.get(self.nwc_info['app_privkey'])
+        if invoice and service is not None:
+            _unpaid[invoice] = (service, amount)
+            SATS_INVOICED.labels(service).inc(amount)
+            if len(_unpaid) > 10000:  # Forget the oldest, most likely expired, invoice
+                _unpaid.pop(next(iter(_unpaid)))
+        return invoice
+
+    async def counted_did_payment_succeed(self, invoice: str, *args, **kwargs):
+        succeeded = await did_payment_succeed(self, invoice, *args, **kwargs)
+        if succeeded and invoice in _unpaid:
+            service, amount = _unpaid.pop(invoice)
+            SATS_EARNED.labels(service).inc(amount)
+            INVOICES_PAID.labels(service).inc()
+        return succeeded
+
+    nwc_class.make_invoice = counted_make_invoice
+    nwc_class.did_payment_succeed = counted_did_payment_succeed
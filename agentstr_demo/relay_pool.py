@@ -0,0 +1,322 @@
+"""One websocket per relay, shared by every Nostr client in the process.
+
+agentstr's `EventRelay` opens a new websocket for each event it publishes and each query it
+makes, and keeps one open per listener. `RelayPool` carries all of that over a single
+connection per relay URL: a publish waits for the relay's OK, a query is a subscription
+closed at EOSE, and listeners are subscriptions that are sent again, resuming from the
+newest event, whenever the connection is re-established.
+
+Direct message listeners of every pubkey share one subscription per relay whose `#p` filter
+lists them all. Events are routed by recipient to a queue per listener and decrypted by the
+listener, so each service reads its own messages in order and a slow one only holds up the
+others once its queue of `max_pending` events is full.
+
+`install(pool)` sends the relay traffic of every `NostrClient` in the process (and so of
+`NostrMCPClient`, the MCP and agent servers and their NWC wallet connections) through the pool.
+`agentstr_demo.host` does this for the services it runs.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from agentstr import nwc_relay, relay_manager
+from agentstr.relay import EventRelay
+from expiringdict import ExpiringDict
+from pynostr.event import Event
+from pynostr.filters import Filters
+from pynostr.key import PrivateKey, PublicKey
+from websockets.asyncio.client import connect
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Subscription:
+    filters: dict
+    queue: asyncio.Queue
+    follow: bool  # A listener: resumes from its newest event after a reconnect and gets no EOSE
+
+
+class RelayConnection:
+    """A websocket to one relay, re-established whenever it drops, carrying any number of subscriptions.
+
+    The connection opens on first use. Subscriptions, direct message routes and events still
+    waiting for their OK are sent again after each reconnect.
+    """
+    def __init__(self, url: str, max_pending: int = 10000, reconnect_delay: float = 1.0):
+        """Initialize the connection (it isn't opened until it's used).
+
+        Args:
+            url: WebSocket URL of the relay.
+            max_pending: Events queued per listener before reading from the relay waits for it.
+            reconnect_delay: Seconds to wait before reconnecting.
+        """
+        self.url = url
+        self.max_pending = max_pending
+        self.reconnect_delay = reconnect_delay
+        self.connects = 0
+        self._ws = None
+        self._task: asyncio.Task | None = None
+        self._subscriptions: dict[str, _Subscription] = {}
+        self._inboxes: dict[str, list[asyncio.Queue]] = {}  # Recipient pubkey (hex) -> its listeners' queues
+        self._dm_subscription = uuid.uuid4().hex
+        self._dm_since = int(time.time())
+        self._unacked: dict[str, tuple[str, asyncio.Future]] = {}  # Event id -> (EVENT message, future of its OK)
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None
+
+    def _ensure_running(self):
+        if self._task is None:
+            # A fresh context, so the reader doesn't run as part of the service that opened it
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def _run(self):
+        while True:
+            try:
+                async with connect(self.url) as ws:
+                    self.connects += 1
+                    # Taken before the first await: anything registered from here on is sent by its caller
+                    self._ws, pending = ws, self._resend()
+                    for message in pending:
+                        await ws.send(message)
+                    async for raw in ws:
+                        await self._dispatch(json.loads(raw))
+            except Exception as e:
+                logger.warning(f'Connection to {self.url} lost, reconnecting: {e}')
+            finally:
+                self._ws = None
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _resend(self) -> list[str]:
+        messages = [json.dumps(['REQ', sub_id, subscription.filters]) for sub_id, subscription in self._subscriptions.items()]
+        if self._inboxes:
+            messages.append(self._dm_request())
+        return messages + [message for message, _ in self._unacked.values()]
+
+    def _dm_request(self) -> str:
+        return json.dumps(['REQ', self._dm_subscription, {'kinds': [4], '#p': sorted(self._inboxes), 'since': self._dm_since}])
+
+    async def _send(self, message: str):
+        # Sent again after a reconnect if still needed, so a connection that's down is no error here
+        if self._ws is None:
+            return
+        try:
+            await self._ws.send(message)
+        except Exception as e:
+            logger.debug(f'Could not send to {self.url}: {e}')
+
+    @staticmethod
+    async def _put(queue: asyncio.Queue, item):
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            await queue.put(item)
+
+    async def _dispatch(self, message: list):
+        if message[0] == 'EVENT' and len(message) > 2:
+            event = Event.from_dict(message[2])
+            if message[1] == self._dm_subscription:
+                self._dm_since = max(self._dm_since, event.created_at)
+                for tag in event.tags:
+                    if len(tag) > 1 and tag[0] == 'p':
+                        for queue in self._inboxes.get(tag[1], ()):
+                            await self._put(queue, event)
+            elif (subscription := self._subscriptions.get(message[1])) is not None:
+                if subscription.follow:
+                    subscription.filters['since'] = max(subscription.filters.get('since', 0), event.created_at)
+                await self._put(subscription.queue, event)
+        elif message[0] == 'EOSE':
+            subscription = self._subscriptions.get(message[1])
+            if subscription is not None and not subscription.follow:
+                await self._put(subscription.queue, None)
+        elif message[0] == 'OK' and len(message) > 2:
+            _, future = self._unacked.pop(message[1], (None, None))
+            if future is not None and not future.done():
+                future.set_result(message[2:])
+        elif message[0] in ('NOTICE', 'CLOSED'):
+            logger.info(f'{self.url}: {message}')
+
+    async def publish(self, event: Event, timeout: float = 30) -> list:
+        """Publish a signed event and wait for the relay's OK; returns `[accepted, message]`."""
+        self._ensure_running()
+        message = event.to_message()
+        future = asyncio.get_running_loop().create_future()
+        self._unacked[event.id] = (message, future)
+        try:
+            await self._send(message)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._unacked.pop(event.id, None)
+
+    async def query(self, filters: dict, limit: int, timeout: float, close_on_eose: bool = True) -> list[Event]:
+        """Up to `limit` events matching `filters`, collected until EOSE (or until `timeout` if not `close_on_eose`)."""
+        self._ensure_running()
+        sub_id = uuid.uuid4().hex
+        subscription = self._subscriptions[sub_id] = _Subscription(filters, asyncio.Queue(), follow=False)
+        events: dict[str, Event] = {}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            await self._send(json.dumps(['REQ', sub_id, filters]))
+            while len(events) < limit:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), deadline - loop.time())
+                except TimeoutError:
+                    break
+                if event is None:
+                    if close_on_eose:
+                        break
+                    continue
+                events[event.id] = event
+        finally:
+            del self._subscriptions[sub_id]
+            await self._send(json.dumps(['CLOSE', sub_id]))
+        return list(events.values())
+
+    async def subscribe(self, filters: dict) -> tuple[str, asyncio.Queue]:
+        """Start a listener for events matching `filters`; returns its id and the queue they arrive on."""
+        self._ensure_running()
+        sub_id = uuid.uuid4().hex
+        subscription = self._subscriptions[sub_id] = _Subscription(dict(filters), asyncio.Queue(self.max_pending), follow=True)
+        await self._send(json.dumps(['REQ', sub_id, subscription.filters]))
+        return sub_id, subscription.queue
+
+    async def unsubscribe(self, sub_id: str):
+        if self._subscriptions.pop(sub_id, None) is not None:
+            await self._send(json.dumps(['CLOSE', sub_id]))
+
+    async def open_inbox(self, pubkey: str) -> asyncio.Queue:
+        """A queue of the direct messages to `pubkey` (hex), from the shared direct message subscription."""
+        self._ensure_running()
+        queue = asyncio.Queue(self.max_pending)
+        added = pubkey not in self._inboxes
+        self._inboxes.setdefault(pubkey, []).append(queue)
+        if added:
+            # Replaces the subscription; what was already stored is replayed from `since`, so start from now
+            if self.connected:
+                self._dm_since = max(self._dm_since, int(time.time()))
+            await self._send(self._dm_request())
+        return queue
+
+    async def close_inbox(self, pubkey: str, queue: asyncio.Queue):
+        queues = self._inboxes.get(pubkey, [])
+        if queue in queues:
+            queues.remove(queue)
+        if not queues and self._inboxes.pop(pubkey, None) is not None:
+            await self._send(self._dm_request() if self._inboxes else json.dumps(['CLOSE', self._dm_subscription]))
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class RelayPool:
+    """`RelayConnection`s by relay URL, each opened on first use and shared by every client."""
+    def __init__(self, max_pending: int = 10000, reconnect_delay: float = 1.0):
+        """Initialize the pool.
+
+        Args:
+            max_pending: Events queued per listener before reading from its relay waits for it.
+            reconnect_delay: Seconds to wait before reconnecting to a relay.
+        """
+        self.max_pending = max_pending
+        self.reconnect_delay = reconnect_delay
+        self._connections: dict[str, RelayConnection] = {}
+        self._listening: dict[str, asyncio.Event] = {}
+
+    @property
+    def connections(self) -> list[RelayConnection]:
+        return list(self._connections.values())
+
+    def connection(self, url: str) -> RelayConnection:
+        if url not in self._connections:
+            self._connections[url] = RelayConnection(url, self.max_pending, self.reconnect_delay)
+        return self._connections[url]
+
+    def listening(self, pubkey: str) -> asyncio.Event:
+        """Set once a direct message listener for `pubkey` (hex) is subscribed on one of the pool's relays."""
+        return self._listening.setdefault(pubkey, asyncio.Event())
+
+    def event_relay(self, relay: str, private_key: PrivateKey | None = None, public_key: PublicKey | None = None) -> 'PooledEventRelay':
+        """Drop-in for `EventRelay(relay, private_key, public_key)` that goes through the pool."""
+        return PooledEventRelay(self, relay, private_key, public_key)
+
+    async def aclose(self):
+        await asyncio.gather(*[connection.aclose() for connection in self._connections.values()])
+
+
+class PooledEventRelay(EventRelay):
+    """`EventRelay` that publishes, queries and listens over its pool's connection to the relay."""
+    def __init__(self, pool: RelayPool, relay: str, private_key: PrivateKey | None = None, public_key: PublicKey | None = None):
+        super().__init__(relay, private_key, public_key)
+        self.pool = pool
+        self.connection = pool.connection(relay)
+
+    async def get_events(self, filters: Filters, limit: int = 10, timeout: int = 30, close_on_eose: bool = True) -> list[Event]:
+        return await self.connection.query(filters.to_dict(), filters.limit or limit, timeout, close_on_eose)
+
+    async def send_event(self, event: Event):
+        if not event.sig:
+            event.sign(self.private_key.hex())
+        accepted, *reason = await self.connection.publish(event)
+        if not accepted:
+            logger.warning(f'{self.relay} rejected event {event.id}: {reason}')
+
+    async def event_listener(self, filters: Filters, callback: Callable[[Event], None], event_cache: ExpiringDict, lock: asyncio.Lock):
+        sub_id, queue = await self.connection.subscribe(filters.to_dict())
+        try:
+            while True:
+                event = await queue.get()
+                async with lock:
+                    if event.id in event_cache:
+                        continue
+                    event_cache[event.id] = True
+                try:
+                    await callback(event)
+                except Exception as e:
+                    logger.error(f'Error in event_listener callback: {e}')
+        finally:
+            await self.connection.unsubscribe(sub_id)
+
+    async def direct_message_listener(self, filters: Filters, callback: Callable[[Event, str], None], event_cache: ExpiringDict, lock: asyncio.Lock):
+        pubkey = self.public_key.hex()
+        authors = set(filters.authors or ())
+        queue = await self.connection.open_inbox(pubkey)
+        self.pool.listening(pubkey).set()
+        try:
+            while True:
+                event = await queue.get()
+                if authors and event.pubkey not in authors:
+                    continue
+                async with lock:
+                    if event.id in event_cache:
+                        continue
+                    event_cache[event.id] = True
+                try:
+                    dm = self.decrypt_message(event)
+                except Exception as e:
+                    logger.warning(f'Could not decrypt message {event.id}: {e}')
+                    continue
+                if dm is None:
+                    continue
+                try:
+                    await callback(dm.event, dm.message)
+                except Exception as e:
+                    logger.error(f'Error in direct_message_listener callback: {e}')
+        finally:
+            await self.connection.close_inbox(pubkey, queue)
+
+
+def install(pool: RelayPool):
+    """Send the relay traffic of every agentstr client in this process through `pool`."""
+    relay_manager.EventRelay = pool.event_relay
+    nwc_relay.EventRelay = pool.event_relay
@@ -0,0 +1,231 @@
+import asyncio
+import contextvars
+import os
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable, Hashable
+from contextlib import contextmanager
+from typing import Any, Generic, TypeVar
+
+T = TypeVar('T')
+
+# Thread whose turn the current task is running, so nested calls for it run inline
+_current_thread: contextvars.ContextVar[Hashable | None] = contextvars.ContextVar('current_thread', default=None)
+
+
+class SchedulerFull(Exception):
+    """Raised when a turn can't be queued because the scheduler (or its sender's share of it) is full."""
+
+
+class _Turn:
+    __slots__ = ('thread_id', 'sender', 'fn', 'future')
+
+    def __init__(self, thread_id: Hashable, sender: Hashable, fn: Callable[[], Awaitable[Any]]):
+        self.thread_id = thread_id
+        self.sender = sender
+        self.fn = fn
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class TurnScheduler:
+    """Runs conversation turns concurrently, one at a time per conversation.
+
+    Turns of different threads run in parallel up to `max_concurrency`; turns of the same
+    thread run strictly in submission order. When more threads are ready than there are
+    free slots, senders take turns round-robin, so one sender with many threads can't
+    starve the others. At most `max_queue` turns wait in total (and `max_queue_per_sender`
+    per sender): `submit()` waits for room up to `admission_timeout` seconds, which slows
+    down whoever is feeding it, then raises `SchedulerFull`.
+    """
+    def __init__(self,
+                 max_concurrency: int = 8,
+                 max_queue: int = 1000,
+                 max_queue_per_sender: int | None = 20,
+                 timeout: float | None = 300,
+                 admission_timeout: float = 5):
+        """Initialize the scheduler.
+
+        Args:
+            max_concurrency: Maximum turns running at once.
+            max_queue: Maximum turns waiting to run.
+            max_queue_per_sender: Maximum turns waiting per sender (unlimited if None).
+            timeout: Seconds a turn may run before it is cancelled (no limit if None).
+            admission_timeout: Seconds `submit()` waits for room in a full queue.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_sender = max_queue_per_sender
+        self.timeout = timeout
+        self.admission_timeout = admission_timeout
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'timed_out': 0, 'rejected': 0, 'max_queued': 0}
+        self.running = 0
+        self.queued = 0
+        self._threads: dict[Hashable, deque[_Turn]] = {}  # Waiting turns per thread
+        self._active: set[Hashable] = set()  # Threads with a turn running
+        self._ready: OrderedDict[Hashable, deque[Hashable]] = OrderedDict()  # Sender -> threads that can run next
+        self._sender_queued: dict[Hashable, int] = {}
+        self._waiters: deque[asyncio.Future] = deque()  # submit() calls waiting for room in the queue
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'TurnScheduler':
+        """Create a scheduler configured by AGENT_* environment variables.
+
+        Recognized variables: AGENT_MAX_CONCURRENCY, AGENT_MAX_QUEUE, AGENT_MAX_QUEUE_PER_SENDER
+        (0 for unlimited), AGENT_TURN_TIMEOUT (0 for no limit) and AGENT_ADMISSION_TIMEOUT.
+        Keyword arguments take precedence.
+        """
+        env = {
+            'max_concurrency': ('AGENT_MAX_CONCURRENCY', int),
+            'max_queue': ('AGENT_MAX_QUEUE', int),
+            'max_queue_per_sender': ('AGENT_MAX_QUEUE_PER_SENDER', lambda v: int(v) or None),
+            'timeout': ('AGENT_TURN_TIMEOUT', lambda v: float(v) or None),
+            'admission_timeout': ('AGENT_ADMISSION_TIMEOUT', float),
+        }
+        for arg, (name, parse) in env.items():
+            if arg not in kwargs and os.getenv(name):
+                kwargs[arg] = parse(os.getenv(name))
+        return cls(**kwargs)
+
+    async def submit(self, thread_id: Hashable, fn: Callable[[], Awaitable[T]], sender: Hashable | None = None) -> 'asyncio.Future[T]':
+        """Queue a turn, waiting while the queue is full.
+
+        Args:
+            thread_id: Conversation the turn belongs to; its turns never overlap.
+            fn: Zero-argument coroutine function that runs the turn.
+            sender: Who the turn is for, for fairness and the per-sender limit (defaults to `thread_id`).
+
+        Returns:
+            A future with the turn's result. It raises `TimeoutError` if the turn ran out of time.
+
+        Raises:
+            SchedulerFull: The sender already has `max_queue_per_sender` turns waiting, or the
+                queue stayed full for `admission_timeout` seconds.
+        """
+        sender = thread_id if sender is None else sender
+        if self.max_queue_per_sender is not None and self._sender_queued.get(sender, 0) >= self.max_queue_per_sender:
+            self.stats['rejected'] += 1
+            raise SchedulerFull(f'Too many requests waiting for {sender}')
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.admission_timeout
+        while self.queued >= self.max_queue:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, max(deadline - loop.time(), 0))
+            except TimeoutError:
+                self.stats['rejected'] += 1
+                raise SchedulerFull(f'{self.queued} requests already waiting') from None
+            finally:
+                if not waiter.done():
+                    self._waiters.remove(waiter)
+        turn = _Turn(thread_id, sender, fn)
+        self.stats['submitted'] += 1
+        self.queued += 1
+        self.stats['max_queued'] = max(self.stats['max_queued'], self.queued)
+        self._sender_queued[sender] = self._sender_queued.get(sender, 0) + 1
+        waiting = self._threads.setdefault(thread_id, deque())
+        waiting.append(turn)
+        if len(waiting) == 1 and thread_id not in self._active:
+            self._make_ready(thread_id, sender)
+        self._dispatch()
+        return turn.future
+
+    async def run(self, thread_id: Hashable, fn: Callable[[], Awaitable[T]], sender: Hashable | None = None) -> T:
+        """Run a turn and return its result.
+
+        Called from inside a turn of the same thread, `fn` runs right away, since waiting
+        for the current turn to finish first would never end.
+        """
+        if _current_thread.get() == thread_id:
+            return await fn()
+        return await (await self.submit(thread_id, fn, sender))
+
+    def _make_ready(self, thread_id: Hashable, sender: Hashable):
+        if sender not in self._ready:
+            self._ready[sender] = deque()
+        self._ready[sender].append(thread_id)
+
+    def _dispatch(self):
+        while self._ready and self.running < self.max_concurrency:
+            sender, threads = next(iter(self._ready.items()))
+            thread_id = threads.popleft()
+            if threads:
+                self._ready.move_to_end(sender)
+            else:
+                del self._ready[sender]
+            turn = self._threads[thread_id].popleft()
+            self.queued -= 1
+            self._sender_queued[turn.sender] -= 1
+            if not self._sender_queued[turn.sender]:
+                del self._sender_queued[turn.sender]
+            self._active.add(thread_id)
+            self.running += 1
+            task = asyncio.create_task(self._run(turn))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    break
+
+    async def _run(self, turn: _Turn):
+        _current_thread.set(turn.thread_id)
+        try:
+            if turn.future.cancelled():
+                return
+            result = await asyncio.wait_for(turn.fn(), self.timeout)
+        except TimeoutError as e:
+            self.stats['timed_out'] += 1
+            if not turn.future.done():
+                turn.future.set_exception(e)
+        except Exception as e:
+            self.stats['failed'] += 1
+            if not turn.future.done():
+                turn.future.set_exception(e)
+        else:
+            self.stats['completed'] += 1
+            if not turn.future.done():
+                turn.future.set_result(result)
+        finally:
+            self.running -= 1
+            self._active.discard(turn.thread_id)
+            waiting = self._threads.get(turn.thread_id)
+            if waiting:
+                self._make_ready(turn.thread_id, waiting[0].sender)
+            elif waiting is not None:
+                del self._threads[turn.thread_id]
+            self._dispatch()
+
+
+class InstancePool(Generic[T]):
+    """Hands out objects that can't serve two turns at once, creating more as needed.
+
+    For example an agno `Agent` keeps the running session and response on the instance,
+    so concurrent turns each need their own. Idle instances are reused; there are never
+    more than the peak number of turns that ran at the same time.
+    """
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self.created = 0
+        self._idle: list[T] = []
+        self._generation = 0
+
+    @contextmanager
+    def acquire(self):
+        generation = self._generation
+        if self._idle:
+            instance = self._idle.pop()
+        else:
+            instance = self.factory()
+            self.created += 1
+        try:
+            yield instance
+        finally:
+            if generation == self._generation:
+                self._idle.append(instance)
+
+    def reset(self):
+        """Stop reusing the instances created so far, e.g. after the factory's inputs changed."""
+        self._idle.clear()
+        self._generation += 1
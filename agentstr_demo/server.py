@@ -0,0 +1,281 @@
+import asyncio
+import contextvars
+import inspect
+import logging
+import os
+import time
+import uuid
+from collections.abc import AsyncIterator
+
+from agentstr import AgentCard, ChatInput, NostrAgentServer, NostrMCPServer
+from pynostr.encrypted_dm import EncryptedDirectMessage
+from pynostr.event import Event
+
+from agentstr_demo import metrics, tracing, workers
+from agentstr_demo.cache import TTLCache
+from agentstr_demo.http import HTTPPool
+from agentstr_demo.scheduler import SchedulerFull, TurnScheduler
+from agentstr_demo.streaming import chunk_message
+
+logger = logging.getLogger(__name__)
+
+AGENT_TURNS = metrics.Counter('agentstr_agent_turns_total', 'Agent turns by outcome.', ['service', 'outcome'])
+AGENT_IN_FLIGHT = metrics.Gauge('agentstr_agent_in_flight', 'Agent turns running.', ['service'])
+AGENT_QUEUE_DEPTH = metrics.Gauge('agentstr_agent_queue_depth', 'Agent turns waiting for a slot.', ['service'])
+AGENT_QUEUE_WAIT = metrics.Histogram('agentstr_agent_queue_wait_seconds', 'Wait of a direct message for a turn slot.',
+                                     ['service'])
+AGENT_MESSAGE_SECONDS = metrics.Histogram('agentstr_agent_message_seconds',
+                                          'Handling of a direct message, from its turn slot to the reply sent.', ['service'])
+AGENT_CALLABLE_SECONDS = metrics.Histogram('agentstr_agent_callable_seconds', 'Calls of agent_callable.', ['service'])
+AGENT_CALLABLE_ERRORS = metrics.Counter('agentstr_agent_callable_errors_total', 'Calls of agent_callable that raised.',
+                                        ['service'])
+MCP_REQUESTS = metrics.Counter('agentstr_mcp_requests_total', 'Tool calls served, by outcome.', ['service', 'tool', 'outcome'])
+MCP_IN_FLIGHT = metrics.Gauge('agentstr_mcp_in_flight', 'MCP requests being handled.', ['service'])
+MCP_TOOL_SECONDS = metrics.Histogram('agentstr_mcp_tool_seconds', 'Calls of tool functions.', ['service', 'tool'])
+CACHE_LOOKUPS = metrics.Counter('agentstr_cache_lookups_total', 'Lookups in an MCP server\'s caches, by result.',
+                                ['service', 'cache', 'result'])
+CACHE_HIT_RATIO = metrics.Gauge('agentstr_cache_hit_ratio', 'Hit ratio of an MCP server\'s caches.', ['service', 'cache'])
+CACHE_ENTRIES = metrics.Gauge('agentstr_cache_entries', 'Entries in an MCP server\'s caches.', ['service', 'cache'])
+
+
+class MCPServer(NostrMCPServer):
+    """NostrMCPServer that owns the HTTP connection pool its tools share.
+
+    The pool is opened when the server starts and closed cleanly when it stops. Requests,
+    tool latency, earnings and the hit ratios of `caches` are exported by `agentstr_demo.metrics`.
+    """
+    def __init__(self, *args, http_pool: HTTPPool | None = None, caches: dict[str, TTLCache] | None = None, **kwargs):
+        """Initialize the MCP server.
+
+        Args:
+            http_pool: Pool used by the server's tools (defaults to one configured from the environment).
+            caches: The tools' caches by name, to export their hit ratios.
+            args, kwargs: Passed through to `NostrMCPServer`.
+        """
+        super().__init__(*args, **kwargs)
+        self.http_pool = http_pool or HTTPPool.from_env()
+        self.client.send_direct_message = tracing.traced(self.client.send_direct_message, 'nostr.send')
+        self._in_flight = MCP_IN_FLIGHT.labels(self.display_name)
+        for name, cache in (caches or {}).items():
+            CACHE_LOOKUPS.labels(self.display_name, name, 'hit').set_function(lambda cache=cache: cache.hits)
+            CACHE_LOOKUPS.labels(self.display_name, name, 'miss').set_function(lambda cache=cache: cache.misses)
+            CACHE_HIT_RATIO.labels(self.display_name, name).set_function(
+                lambda cache=cache: cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0.0)
+            CACHE_ENTRIES.labels(self.display_name, name).set_function(lambda cache=cache: len(cache))
+        metrics.count_payments(self.client, self.display_name)
+
+    async def start(self):
+        """Open the HTTP pool, then start listening for tool calls until stopped."""
+        async with self.http_pool, metrics.serve_from_env():
+            await super().start()
+
+    async def call_tool(self, name: str, arguments: dict):
+        # Unknown tool names come from requests, so they share one label
+        tool = name if self.tool_manager.get_tool(name) else '(unknown)'
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            with tracing.span('mcp.tool', tool=name):
+                result = await super().call_tool(name, arguments)
+            outcome = 'ok'
+            return result
+        finally:
+            MCP_REQUESTS.labels(self.display_name, tool, outcome).inc()
+            MCP_TOOL_SECONDS.labels(self.display_name, tool).observe(time.perf_counter() - started)
+
+    async def _direct_message_callback(self, event: Event, message: str):
+        self._in_flight.inc()
+        try:
+            with tracing.span('mcp.request', caller=event.pubkey, relay_lag_s=time.time() - event.created_at):
+                await super()._direct_message_callback(event, message)
+        finally:
+            self._in_flight.dec()
+
+
+class AgentServer(NostrAgentServer):
+    """NostrAgentServer that handles direct messages concurrently through a `TurnScheduler`.
+
+    The relay listener awaits each message callback before reading the next event, so
+    `NostrAgentServer` answers one message at a time. Here the callback only queues the
+    message as a turn of the sender's conversation and returns: conversations run in
+    parallel, each one in order. When the scheduler is full the listener slows down, and
+    senders who are over their share get a short "busy" reply. Waiting for an invoice to
+    be paid happens outside the scheduler; the paid request is scheduled once it is.
+
+    Started as a worker by `agentstr_demo.workers`, the server takes its direct messages
+    from the launcher instead of subscribing to relays, and only worker 0 publishes the
+    agent card and listens for notes.
+
+    Turns, queue depth, latency and earnings are exported by `agentstr_demo.metrics`.
+
+    `agent_callable` may be an async generator yielding the reply piece by piece. With
+    `stream` on, the first text is sent right away and the rest in direct messages of at
+    least `stream_chunk_chars` characters or every `stream_interval` seconds, in the envelope
+    of `agentstr_demo.streaming`; otherwise the pieces are joined into one reply.
+    """
+    def __init__(self,
+                 *args,
+                 scheduler: TurnScheduler | None = None,
+                 stream: bool | None = None,
+                 stream_chunk_chars: int | None = None,
+                 stream_interval: float | None = None,
+                 **kwargs):
+        """Initialize the agent server.
+
+        Args:
+            scheduler: Scheduler for agent turns (defaults to one configured from the environment).
+            stream: Stream replies of async generator agents (default: AGENT_STREAM=1).
+            stream_chunk_chars: Characters collected before a piece is sent (default: AGENT_STREAM_CHUNK_CHARS or 400).
+            stream_interval: Seconds after which collected text is sent anyway (default: AGENT_STREAM_INTERVAL or 1).
+            args, kwargs: Passed through to `NostrAgentServer`.
+        """
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler or TurnScheduler.from_env()
+        self.stream = stream if stream is not None else os.getenv('AGENT_STREAM', '0') == '1'
+        self.stream_chunk_chars = stream_chunk_chars or int(os.getenv('AGENT_STREAM_CHUNK_CHARS') or 400)
+        self.stream_interval = stream_interval or float(os.getenv('AGENT_STREAM_INTERVAL') or 1)
+        self._background: set[asyncio.Task] = set()
+        self._started = False
+        self.client.send_direct_message = tracing.traced(self.client.send_direct_message, 'nostr.send')
+        if self.price_handler is not None:
+            self.price_handler.handle = tracing.traced(self.price_handler.handle, 'agent.price')
+        service = self.agent_info.name if self.agent_info else self.client.public_key.bech32()
+        for outcome in ('submitted', 'completed', 'failed', 'timed_out', 'rejected'):
+            AGENT_TURNS.labels(service, outcome).set_function(lambda outcome=outcome: self.scheduler.stats[outcome])
+        AGENT_IN_FLIGHT.labels(service).set_function(lambda: self.scheduler.running)
+        AGENT_QUEUE_DEPTH.labels(service).set_function(lambda: self.scheduler.queued)
+        self._queue_wait = AGENT_QUEUE_WAIT.labels(service)
+        self._message_seconds = AGENT_MESSAGE_SECONDS.labels(service)
+        self._callable_seconds = AGENT_CALLABLE_SECONDS.labels(service)
+        self._callable_errors = AGENT_CALLABLE_ERRORS.labels(service)
+        metrics.count_payments(self.client, service)
+
+    async def start(self):
+        async with metrics.serve_from_env():
+            await self._start()
+
+    async def _start(self):
+        self._started = True
+        if workers.worker_index() is None:
+            return await super().start()
+        tasks = [self._serve_routed_events()]
+        if workers.worker_index() == 0:
+            await self._publish_agent_info()
+            if self.note_filters is not None:
+                tasks.append(self.client.note_listener(callback=self._note_callback,
+                                                       pubkeys=self.note_filters.nostr_pubkeys,
+                                                       tags=self.note_filters.nostr_tags,
+                                                       following_only=self.note_filters.following_only))
+        await asyncio.gather(*tasks)
+
+    async def _publish_agent_info(self):
+        if self.agent_info:
+            await self.client.update_metadata(name="agent_server", display_name=self.agent_info.name,
+                                              about=self.agent_info.model_dump_json())
+
+    async def update_agent_info(self, agent_info: AgentCard):
+        """Replace the agent card, e.g. with new skills after the agent's tools changed, and publish it again.
+
+        Before the server starts only the card is replaced; `start()` publishes it. Of several
+        workers only worker 0 publishes.
+        """
+        self.agent_info = agent_info
+        if self._started and workers.worker_index() in (None, 0):
+            await self._publish_agent_info()
+
+    async def _serve_routed_events(self):
+        async for data in workers.receive_events():
+            event = Event.from_dict(data)
+            try:
+                dm = EncryptedDirectMessage.from_event(event)
+                dm.decrypt(self.client.private_key.hex(), public_key_hex=event.pubkey)
+            except Exception as e:
+                logger.warning(f"Could not decrypt message {event.id}: {e}")
+                continue
+            await self._direct_message_callback(event, dm.cleartext_content)
+
+    async def chat(self, message: str, thread_id: str | None = None):
+        # Also used after a payment arrives, outside the message's own turn
+        return await self.scheduler.run(thread_id, lambda: self._chat(message, thread_id))
+
+    async def _chat(self, message: str, thread_id: str | None) -> str:
+        started = time.perf_counter()
+        try:
+            with tracing.span('agent.callable', thread_id=thread_id) as span:
+                result = self.agent_callable(ChatInput(messages=[message], thread_id=thread_id))
+                if not inspect.isasyncgen(result):
+                    return await result
+                if not self.stream or thread_id is None:
+                    return ''.join([text async for text in result])
+                span.set(streamed=True)
+                # The thread id is the sender's pubkey. The caller sends what this returns, so that is the last piece
+                return await self._stream_reply(thread_id, result)
+        except Exception:
+            self._callable_errors.inc()
+            raise
+        finally:
+            self._callable_seconds.observe(time.perf_counter() - started)
+
+    async def _stream_reply(self, recipient: str, pieces: AsyncIterator[str]) -> str:
+        """Send the reply's pieces to `recipient` as they come; returns the envelope of the last one."""
+        loop = asyncio.get_running_loop()
+        stream_id = uuid.uuid4().hex
+        seq = 0
+        pending: list[str] = []
+        size = 0
+        flushed_at = loop.time()
+        sending: asyncio.Task | None = None
+        async for text in pieces:
+            pending.append(text)
+            size += len(text)
+            # The first text goes out right away. One piece in flight at a time keeps them in order,
+            # and text keeps collecting meanwhile
+            due = seq == 0 or size >= self.stream_chunk_chars or loop.time() - flushed_at >= self.stream_interval
+            if due and (sending is None or sending.done()):
+                if sending is not None:
+                    await sending
+                sending = asyncio.create_task(
+                    self.client.send_direct_message(recipient, chunk_message(stream_id, seq, ''.join(pending), False)))
+                seq += 1
+                pending, size, flushed_at = [], 0, loop.time()
+        if sending is not None:
+            await sending
+        return chunk_message(stream_id, seq, ''.join(pending), True)
+
+    async def _direct_message_callback(self, event: Event, message: str):
+        received = time.time()
+        try:
+            turn = await self.scheduler.submit(event.pubkey, lambda: self._handle_message(event, message, received))
+        except SchedulerFull as e:
+            logger.warning(f"Rejected message from {event.pubkey}: {e}")
+            await self.client.send_direct_message(event.pubkey, "I'm handling too many requests right now. Please try again in a minute.")
+            return
+        turn.add_done_callback(lambda t: self._turn_done(event, t))
+
+    async def _handle_message(self, event: Event, message: str, received: float):
+        started = time.time()
+        self._queue_wait.observe(started - received)
+        try:
+            with tracing.span('agent.message', thread_id=event.pubkey, queued_ms=(started - received) * 1000,
+                              relay_lag_s=received - event.created_at):
+                await super()._direct_message_callback(event, message)
+        finally:
+            self._message_seconds.observe(time.time() - started)
+
+    def _turn_done(self, event: Event, turn: asyncio.Future):
+        if turn.cancelled():
+            return
+        if isinstance(turn.exception(), TimeoutError):
+            self._spawn(self.client.send_direct_message(event.pubkey, "Sorry, your request took too long. Please try again."))
+        elif turn.exception() is not None:
+            logger.error(f"Error handling message from {event.pubkey}: {turn.exception()}")
+
+    async def _handle_paid_invoice(self, *args, **kwargs):
+        # Waiting up to 15 minutes for a payment must not hold a turn slot
+        self._spawn(super()._handle_paid_invoice(*args, **kwargs))
+
+    def _spawn(self, coro):
+        # A fresh context, so the task doesn't count as part of the turn that started it
+        task = asyncio.create_task(coro, context=contextvars.Context())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
@@ -0,0 +1,166 @@
+"""Streamed agent replies over Nostr direct messages.
+
+An `AgentServer` whose `agent_callable` is an async generator can send its answer in pieces
+while the LLM is still writing it. Each piece is an encrypted direct message holding a JSON
+envelope `{"stream": <id>, "seq": <n>, "text": <piece>, "done": <last piece>}`. Relays don't
+promise to deliver events in order, so `StreamAssembler` puts the pieces back together by
+`seq`, and `send_and_receive_stream` takes the place of
+`NostrClient.send_direct_message_and_receive_response` for clients that want the whole reply
+(or each piece as it arrives). A reply that isn't streamed is returned as is.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+
+from pynostr.encrypted_dm import EncryptedDirectMessage
+from pynostr.event import Event, EventKind
+from pynostr.filters import Filters
+from pynostr.utils import get_public_key
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_message(stream_id: str, seq: int, text: str, done: bool) -> str:
+    """The direct message content for one piece of a streamed reply."""
+    return json.dumps({'stream': stream_id, 'seq': seq, 'text': text, 'done': done})
+
+
+def parse_chunk(message: str) -> dict | None:
+    """The envelope of a streamed piece, or None if `message` is an ordinary reply."""
+    if not message.startswith('{"stream"'):
+        return None
+    try:
+        chunk = json.loads(message)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(chunk, dict) or not {'stream', 'seq', 'text', 'done'} <= chunk.keys():
+        return None
+    return chunk
+
+
+class StreamAssembler:
+    """Reassembles the pieces of one streamed reply, in whatever order they arrive.
+
+    The first piece decides which stream is followed; pieces of other streams are ignored.
+    """
+    def __init__(self):
+        self.stream_id: str | None = None
+        self._pieces: dict[int, str] = {}
+        self._length: int | None = None
+        self._next = 0
+
+    def add(self, chunk: dict) -> str:
+        """Add a piece. Returns the text that became readable in order because of it (possibly '')."""
+        if self.stream_id is None:
+            self.stream_id = chunk['stream']
+        elif chunk['stream'] != self.stream_id:
+            return ''
+        self._pieces[chunk['seq']] = chunk['text']
+        if chunk['done']:
+            self._length = chunk['seq'] + 1
+        start = self._next
+        while self._next in self._pieces:
+            self._next += 1
+        return ''.join(self._pieces[seq] for seq in range(start, self._next))
+
+    @property
+    def complete(self) -> bool:
+        return self._length is not None and self._next >= self._length
+
+    @property
+    def text(self) -> str:
+        """The reply so far, up to the first missing piece."""
+        return ''.join(self._pieces[seq] for seq in range(self._next))
+
+
+async def _direct_messages(client, author_pubkey: str, since: int) -> AsyncIterator[str]:
+    """Decrypted direct messages from `author_pubkey` to `client`, from every relay, without duplicates."""
+    from agentstr.relay import create_subscription
+    from websockets.asyncio.client import connect
+
+    filters = Filters(authors=[author_pubkey], kinds=[EventKind.ENCRYPTED_DIRECT_MESSAGE],
+                      pubkey_refs=[client.public_key.hex()], since=since)
+    queue: asyncio.Queue[Event | BaseException] = asyncio.Queue()
+
+    async def listen(url: str):
+        async with connect(url) as ws:
+            await ws.send(json.dumps(create_subscription(filters)))
+            async for raw in ws:
+                message = json.loads(raw)
+                if message[0] == 'EVENT' and len(message) > 2:
+                    queue.put_nowait(Event.from_dict(message[2]))
+
+    def listener_done(task: asyncio.Task):
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.warning(f'Stopped listening for replies on a relay: {task.exception()!r}')
+        if all(listener.done() for listener in listeners):  # No relay left to hear from
+            queue.put_nowait(task.exception())
+
+    listeners = [asyncio.create_task(listen(relay.relay)) for relay in client.relay_manager.relays]
+    for listener in listeners:
+        listener.add_done_callback(listener_done)
+    seen = set()
+    try:
+        while True:
+            event = await queue.get()
+            if isinstance(event, BaseException):
+                raise event
+            if event.id in seen:
+                continue
+            seen.add(event.id)
+            dm = EncryptedDirectMessage.from_event(event)
+            dm.decrypt(client.private_key.hex(), public_key_hex=event.pubkey)
+            yield dm.cleartext_content
+    finally:
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+
+async def send_and_receive_stream(client,
+                                  recipient_pubkey: str,
+                                  message: str,
+                                  timeout: float = 60,
+                                  on_text: Callable[[str], None] | None = None) -> str | None:
+    """Send a direct message and return the reply, reassembling it if it is streamed.
+
+    Args:
+        client: The `NostrClient` to send and receive with.
+        recipient_pubkey: The agent's public key (hex or bech32).
+        message: The message to send.
+        timeout: Seconds to wait for the complete reply.
+        on_text: Called with each new stretch of the reply, in order, as it arrives.
+
+    Returns:
+        The reply, what arrived of it if it timed out part way, or None if nothing arrived.
+
+    Raises:
+        Exception: The error of the last relay to fail, once listening failed on every relay.
+    """
+    author = get_public_key(recipient_pubkey).hex()
+    event = await client.relay_manager.send_message(message, author)
+    assembler = StreamAssembler()
+    deadline = time.monotonic() + timeout
+    replies = _direct_messages(client, author, event.created_at)
+    try:
+        while True:
+            try:
+                reply = await asyncio.wait_for(anext(replies), max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                return assembler.text or None
+            chunk = parse_chunk(reply)
+            if chunk is None:
+                # Not streamed, or an error in place of the rest of the stream
+                if on_text is not None:
+                    on_text(reply)
+                return reply
+            text = assembler.add(chunk)
+            if text and on_text is not None:
+                on_text(text)
+            if assembler.complete:
+                return assembler.text
+    finally:
+        await replies.aclose()
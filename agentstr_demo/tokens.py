@@ -0,0 +1,15 @@
+"""Prompt token counting."""
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken's cl100k_base if installed, otherwise ~4 characters per token."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _encoding = False
+    return len(_encoding.encode(text, disallowed_special=())) if _encoding else len(text) // 4 + 1
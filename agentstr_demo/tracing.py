@@ -0,0 +1,439 @@
+"""Timed spans around agent turns, MCP tool calls and outbound HTTP, exported to a local file.
+
+Tracing is off unless TRACE_PATH is set; `span()` then returns a shared no-op object, so the
+instrumented code pays one global lookup per span. When on, every process appends its
+finished spans to TRACE_PATH, one JSON object per line. TRACE_FORMAT selects the line format:
+- jsonl (the default): one span per line;
+- otlp: one OTLP/JSON `ExportTraceServiceRequest` per line, the format of the OpenTelemetry
+  collector's file exporter.
+TRACE_SERVICE names the process (default: the script's directory, e.g. agents/finance).
+TRACE_SAMPLE_RATE keeps that fraction of traces (default 1).
+
+The spans recorded by `agentstr_demo`:
+    agent.message   a direct message handled by an agent, from the scheduler slot to the reply sent
+                    (attributes: thread_id, queued_ms, relay_lag_s since the event's created_at)
+    agent.price     the price handler's LLM call
+    agent.callable  the agent_callable (LLM inference and tool calls)
+    mcp.call        an agent's MCP tool call (attribute `result`: hit, coalesced or remote)
+    mcp.request     a tool call request handled by an MCP server
+    mcp.tool        the MCP tool function itself
+    nostr.send      publishing a direct message to the relays
+    http.request    an outbound HTTP request through `HTTPPool`, or a client given `event_hooks()`
+    llm.request     a /chat/completions request of a client given `event_hooks()`, such as the
+                    LLM client the host shares (ends when the response body is read or closed)
+
+Spans of one turn share a trace id and carry the thread_id of the conversation. Summarize
+one or more trace files with
+
+    python -m agentstr_demo.tracing traces.jsonl [more files] [--thread <pubkey prefix>]
+"""
+import argparse
+import atexit
+import contextvars
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from functools import wraps
+from typing import Any, TypeVar
+
+T = TypeVar('T')
+
+_SERVER_SPANS = {'agent.message', 'mcp.request'}
+_CLIENT_SPANS = {'http.request', 'llm.request', 'mcp.call', 'nostr.send'}
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, error: BaseException | None = None):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _DroppedTrace(_NoopSpan):
+    """The root of a trace left out by sampling; its descendants aren't recorded either."""
+    __slots__ = ('_token',)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        return False
+
+
+class Span:
+    """A timed operation. Use it as a context manager, or call `end()` on one from `start_span()`."""
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start_ns', '_t0', '_token')
+
+    def __init__(self, tracer: 'Tracer', name: str, parent: 'Span | None', attributes: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f'{random.getrandbits(128):032x}'
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_id = parent.span_id if parent is not None else None
+        if parent is not None and 'thread_id' in parent.attributes and 'thread_id' not in attributes:
+            attributes['thread_id'] = parent.attributes['thread_id']
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter_ns()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error: BaseException | None = None):
+        self.tracer.record(self, time.perf_counter_ns() - self._t0, error)
+
+    def __enter__(self) -> 'Span':
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.end(exc)
+        return False
+
+
+_current: contextvars.ContextVar[Span | _DroppedTrace | None] = contextvars.ContextVar('trace_span', default=None)
+
+
+class Tracer:
+    """Collects finished spans and appends them to a file.
+
+    Spans are buffered and written when a trace's root span ends (about once per request),
+    when `max_buffer` spans are waiting, and at exit.
+    """
+    def __init__(self, path: str, format: str = 'jsonl', service: str = 'agentstr', sample_rate: float = 1.0,
+                 max_buffer: int = 512):
+        if format not in ('jsonl', 'otlp'):
+            raise ValueError(f'Unknown trace format {format!r} (expected jsonl or otlp)')
+        self.path = path
+        self.format = format
+        self.service = service
+        self.sample_rate = sample_rate
+        self.max_buffer = max_buffer
+        self._buffer: list[tuple[Span, int, str | None]] = []
+        self._lock = threading.Lock()
+        self._file = None
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls) -> 'Tracer | None':
+        """The tracer configured by TRACE_* environment variables, or None if TRACE_PATH isn't set."""
+        path = os.getenv('TRACE_PATH')
+        if not path:
+            return None
+        script = os.path.abspath(sys.argv[0]) if sys.argv and sys.argv[0] else ''
+        default_service = '/'.join(script.split(os.sep)[-3:-1]) or 'agentstr'
+        return cls(path, format=os.getenv('TRACE_FORMAT') or 'jsonl', service=os.getenv('TRACE_SERVICE') or default_service,
+                   sample_rate=float(os.getenv('TRACE_SAMPLE_RATE') or 1))
+
+    def record(self, span: Span, duration_ns: int, error: BaseException | None):
+        self._buffer.append((span, duration_ns, None if error is None else f'{type(error).__name__}: {error}'[:500]))
+        if span.parent_id is None or len(self._buffer) >= self.max_buffer:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+            if not spans:
+                return
+            if self.format == 'jsonl':
+                lines = [json.dumps(self._jsonl(*span), default=str) for span in spans]
+            else:
+                lines = [json.dumps(self._otlp(spans), default=str)]
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _jsonl(self, span: Span, duration_ns: int, error: str | None) -> dict:
+        return {'trace_id': span.trace_id, 'span_id': span.span_id, 'parent_id': span.parent_id, 'name': span.name,
+                'service': self.service, 'start': span.start_ns / 1e9, 'duration_ms': duration_ns / 1e6,
+                'attributes': span.attributes, 'error': error}
+
+    def _otlp(self, spans: list[tuple[Span, int, str | None]]) -> dict:
+        return {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', self.service)]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': [{
+                'traceId': span.trace_id,
+                'spanId': span.span_id,
+                'parentSpanId': span.parent_id or '',
+                'name': span.name,
+                'kind': 2 if span.name in _SERVER_SPANS else 3 if span.name in _CLIENT_SPANS else 1,
+                'startTimeUnixNano': str(span.start_ns),
+                'endTimeUnixNano': str(span.start_ns + duration_ns),
+                'attributes': [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                'status': {'code': 2, 'message': error} if error else {'code': 0},
+            } for span, duration_ns, error in spans]}],
+        }]}
+
+
+def _otlp_attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+_tracer: Tracer | None = None
+
+
+def configure(tracer: Tracer | None):
+    """Turn tracing on with `tracer`, or off with None (the environment decides at import)."""
+    global _tracer
+    if _tracer is not None and _tracer is not tracer:
+        _tracer.close()
+    _tracer = tracer
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attributes) -> Span | _NoopSpan:
+    """A span to use as a context manager; spans started inside it become its children.
+
+        with tracing.span('mcp.tool', tool=name) as span:
+            result = await fn()
+            span.set(chars=len(result))
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    parent = _current.get()
+    if isinstance(parent, _DroppedTrace):
+        return _NOOP
+    if parent is None and tracer.sample_rate < 1 and random.random() >= tracer.sample_rate:
+        return _DroppedTrace()
+    return Span(tracer, name, parent, attributes)
+
+
+def start_span(name: str, **attributes) -> Span | _NoopSpan:
+    """A span that ends with an explicit `end()`, for operations that finish elsewhere.
+
+    It is a child of the current span, but spans started meanwhile don't become its children.
+    """
+    created = span(name, **attributes)
+    return created if isinstance(created, Span) else _NOOP
+
+
+def traced(fn: Callable[..., Awaitable[T]], name: str, **attributes) -> Callable[..., Awaitable[T]]:
+    """Wrap a coroutine function so each call runs in a span; returns `fn` itself when tracing is off."""
+    if _tracer is None:
+        return fn
+
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        with span(name, **attributes):
+            return await fn(*args, **kwargs)
+    return wrapper
+
+
+def event_hooks() -> dict[str, list]:
+    """httpx `event_hooks` recording each request of a client we create as a span.
+
+    Requests to /chat/completions are `llm.request` spans, others `http.request`. A span ends
+    when the response body has been read or the response is closed, so a streamed reply is
+    timed to its last chunk; a request that fails before a response arrives isn't recorded.
+    Don't give them to `HTTPPool`'s client, which records its own spans.
+
+        client = httpx.AsyncClient(event_hooks=tracing.event_hooks())
+    """
+    if _tracer is None:
+        return {}
+    return {'request': [_start_request_span], 'response': [_end_request_span]}
+
+
+async def _start_request_span(request):
+    name = 'llm.request' if request.url.path.endswith('/chat/completions') else 'http.request'
+    request.extensions['trace_span'] = start_span(name, method=request.method, host=request.url.netloc.decode(),
+                                                  path=request.url.path)
+
+
+async def _end_request_span(response):
+    request_span = response.request.extensions.pop('trace_span', _NOOP)
+    request_span.set(status=response.status_code)
+    if response.is_closed:  # Its body was already in memory
+        request_span.end()
+        return
+    close = response.aclose
+
+    async def aclose():
+        closed = response.is_closed
+        try:
+            await close()
+        finally:
+            if not closed:
+                request_span.end()
+    response.aclose = aclose
+
+
+configure(Tracer.from_env())
+
+
+# Summary CLI
+
+def read_spans(paths: list[str]) -> list[dict]:
+    """Spans from trace files in either format, as JSONL records."""
+    spans = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if 'resourceSpans' not in record:
+                    spans.append(record)
+                    continue
+                for resource in record['resourceSpans']:
+                    service = next((a['value'].get('stringValue') for a in resource['resource']['attributes']
+                                    if a['key'] == 'service.name'), None)
+                    for scope in resource['scopeSpans']:
+                        for s in scope['spans']:
+                            start = int(s['startTimeUnixNano'])
+                            spans.append({
+                                'trace_id': s['traceId'], 'span_id': s['spanId'], 'parent_id': s.get('parentSpanId') or None,
+                                'name': s['name'], 'service': service, 'start': start / 1e9,
+                                'duration_ms': (int(s['endTimeUnixNano']) - start) / 1e6,
+                                'attributes': {a['key']: _otlp_value(a['value']) for a in s.get('attributes', [])},
+                                'error': s.get('status', {}).get('message') if s.get('status', {}).get('code') == 2 else None,
+                            })
+    return spans
+
+
+def _otlp_value(value: dict) -> Any:
+    if 'intValue' in value:
+        return int(value['intValue'])
+    return next(iter(value.values()), None)
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {'p50': value, 'p90': value, 'p99': value, 'max': value}
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p90': cuts[89], 'p99': cuts[98], 'max': max(samples)}
+
+
+def _table(rows: list[dict], columns: list[str]):
+    cell = lambda v: f'{v:.1f}' if isinstance(v, float) else str(v)
+    widths = {c: max([len(c)] + [len(cell(row.get(c, ''))) for row in rows]) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns))
+    print('  '.join('-' * widths[c] for c in columns))
+    for row in rows:
+        print('  '.join(cell(row.get(c, '')).ljust(widths[c]) for c in columns))
+
+
+def summarize(spans: list[dict]):
+    """Print the latency of every stage, and where the time of each kind of root span went."""
+    by_name = defaultdict(list)
+    for s in spans:
+        by_name[(s['service'], s['name'])].append(s)
+    print('Stages (ms)')
+    _table([{'service': service, 'stage': name, 'count': len(group), 'errors': sum(1 for s in group if s.get('error')),
+             **_percentiles([s['duration_ms'] for s in group]), 'total_s': sum(s['duration_ms'] for s in group) / 1000}
+            for (service, name), group in sorted(by_name.items())],
+           ['service', 'stage', 'count', 'errors', 'p50', 'p90', 'p99', 'max', 'total_s'])
+
+    waits = []
+    for (service, name), group in sorted(by_name.items()):
+        for attribute, scale in (('queued_ms', 1), ('relay_lag_s', 1000)):
+            values = [s['attributes'][attribute] * scale for s in group if attribute in s['attributes']]
+            if values:
+                waits.append({'service': service, 'stage': name, 'wait': attribute, **_percentiles(values)})
+    if waits:
+        print('\nWaiting before the stage started (ms; relay lag is from the event\'s created_at, to the second)')
+        _table(waits, ['service', 'stage', 'wait', 'p50', 'p90', 'p99', 'max'])
+
+    # Self time: a span's duration minus its children's. Background work started during a
+    # request (a cache refresh, a paid tool run) may outlive it, so shares are of all the work
+    children = defaultdict(float)
+    by_id = {s['span_id']: s for s in spans}
+    for s in spans:
+        if s['parent_id'] in by_id:
+            children[s['parent_id']] += s['duration_ms']
+    roots = defaultdict(list)
+    for s in spans:
+        if s['parent_id'] is None:
+            roots[(s['service'], s['name'])].append(s)
+    tree = defaultdict(list)
+    for s in spans:
+        if s['parent_id'] in by_id:
+            tree[s['parent_id']].append(s)
+    for (service, name), group in sorted(roots.items()):
+        self_time = defaultdict(float)
+        pending = list(group)
+        while pending:
+            s = pending.pop()
+            self_time[s['name']] += max(s['duration_ms'] - children[s['span_id']], 0)
+            pending.extend(tree[s['span_id']])
+        mean = sum(s['duration_ms'] for s in group) / len(group)
+        total = sum(self_time.values())
+        print(f'\nWhere the time of {service} {name} went ({len(group)} spans, mean {mean:.1f} ms)')
+        _table([{'stage': stage, 'mean_ms': ms / len(group), 'share': f'{ms / total:.0%}' if total else '-'}
+                for stage, ms in sorted(self_time.items(), key=lambda item: -item[1])], ['stage', 'mean_ms', 'share'])
+
+
+def print_thread(spans: list[dict], thread_id: str):
+    """Print the span trees of the traces of one conversation."""
+    traces = {s['trace_id'] for s in spans if str(s['attributes'].get('thread_id', '')).startswith(thread_id)}
+    tree = defaultdict(list)
+    for s in sorted(spans, key=lambda s: s['start']):
+        if s['trace_id'] in traces:
+            tree[s['parent_id']].append(s)
+
+    def show(s: dict, depth: int):
+        attributes = ' '.join(f'{k}={v:.1f}' if isinstance(v, float) else f'{k}={v}'
+                              for k, v in s['attributes'].items() if k != 'thread_id')
+        error = f"  ERROR {s['error']}" if s.get('error') else ''
+        print(f"{'  ' * depth}{s['name']:<{32 - 2 * depth}} {s['duration_ms']:9.1f} ms  {attributes}{error}")
+        for child in tree[s['span_id']]:
+            show(child, depth + 1)
+    for root in tree[None]:
+        print(time.strftime('%H:%M:%S', time.localtime(root['start'])), root['service'])
+        show(root, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize trace files written with TRACE_PATH.')
+    parser.add_argument('paths', nargs='+', help='trace files (jsonl or otlp)')
+    parser.add_argument('--thread', help='print the spans of the conversations whose thread id starts with this')
+    args = parser.parse_args()
+    spans = read_spans(args.paths)
+    if args.thread:
+        print_thread(spans, args.thread)
+    else:
+        summarize(spans)
+
+
+if __name__ == '__main__':
+    main()
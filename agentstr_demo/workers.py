@@ -0,0 +1,197 @@
+"""Run an agent script as several worker processes behind one Nostr identity.
+
+    python -m agentstr_demo.workers agents/travel/agent.py --workers 4
+
+The launcher holds the only relay subscription for the agent's direct messages and passes
+each event to one worker, picked by a consistent hash of its thread id (the sender's
+pubkey), so a conversation always lands on the same worker and no event is handled twice.
+Each worker runs the unchanged agent script; its `AgentServer.start()` reads events from
+the launcher instead of subscribing. Workers are started with the `spawn` method, so no
+open SQLite connection, socket or event loop is inherited from the launcher.
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import runpy
+import sys
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+class HashRing:
+    """Consistent hashing of keys onto nodes 0..n-1.
+
+    Each node owns `replicas` points on a ring of 64-bit hashes; a key belongs to the first
+    point at or after its own hash. Adding or removing a node only moves about 1/n of the keys.
+    """
+    def __init__(self, nodes: int, replicas: int = 100):
+        self.nodes = nodes
+        points = sorted((self._hash(f'{node}:{replica}'), node) for node in range(nodes) for replica in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+    def node(self, key: str) -> int:
+        i = bisect.bisect(self._hashes, self._hash(key))
+        return self._nodes[i % len(self._nodes)]
+
+
+@dataclass
+class _Worker:
+    index: int
+    count: int
+    inbox: multiprocessing.Queue
+    ready: multiprocessing.Queue
+
+
+_worker: _Worker | None = None
+
+
+def worker_index() -> int | None:
+    """Index of this worker process, or None when the agent runs on its own."""
+    return _worker.index if _worker else None
+
+
+def worker_path(path: str) -> str:
+    """`path`, made unique per worker for files only one process may write (e.g. `notes.w1.sqlite3`)."""
+    if _worker is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f'{root}.w{_worker.index}{ext}'
+
+
+async def receive_events():
+    """Events routed to this worker by the launcher, as dicts. Signals the launcher it's ready first."""
+    _worker.ready.put(_worker.index)
+    while True:
+        try:
+            yield await asyncio.to_thread(_worker.inbox.get, timeout=1)
+        except queue.Empty:
+            continue
+
+
+def _worker_main(script: str, worker: _Worker):
+    # Under `python -m agentstr_demo.workers` the child runs this as `__mp_main__._worker_main`, but the
+    # agent's server asks the imported `agentstr_demo.workers` whether it is a worker, so set it there
+    from agentstr_demo import workers
+    workers._worker = worker
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    runpy.run_path(script, run_name='__main__')
+
+
+class WorkerLauncher:
+    """Starts `workers` processes running an agent script and feeds them its direct messages."""
+    def __init__(self,
+                 script: str,
+                 workers: int,
+                 relays: list[str],
+                 private_key: str,
+                 max_pending: int = 10000,
+                 start_timeout: float = 120):
+        """Initialize the launcher.
+
+        Args:
+            script: Agent script each worker runs (its server must be an `AgentServer`).
+            workers: Number of worker processes.
+            relays: Relays to subscribe to.
+            private_key: The agent's private key (nsec); every worker uses the same identity.
+            max_pending: Events queued per worker before the subscription waits for it.
+            start_timeout: Seconds to wait for a worker to come up.
+        """
+        self.script = script
+        self.count = workers
+        self.relays = relays
+        self.private_key = private_key
+        self.max_pending = max_pending
+        self.start_timeout = start_timeout
+        self.ring = HashRing(workers)
+        self.routed = [0] * workers
+        self.restarts = 0
+        self._context = multiprocessing.get_context('spawn')
+        self._ready = self._context.Queue()
+        self._inboxes = [self._context.Queue(max_pending) for _ in range(workers)]
+        self._processes: list[multiprocessing.Process | None] = [None] * workers
+        self._stopping = False
+
+    def _spawn(self, index: int):
+        worker = _Worker(index, self.count, self._inboxes[index], self._ready)
+        process = self._context.Process(target=_worker_main, args=(self.script, worker), name=f'agent-worker-{index}')
+        process.start()
+        self._processes[index] = process
+
+    async def _wait_ready(self, count: int):
+        deadline = time.monotonic() + self.start_timeout
+        for _ in range(count):
+            await asyncio.to_thread(self._ready.get, timeout=max(deadline - time.monotonic(), 0))
+
+    async def route(self, event):
+        """Queue an event for the worker that owns its thread, waiting if that worker is backed up."""
+        index = self.ring.node(event.pubkey)
+        self.routed[index] += 1
+        try:
+            self._inboxes[index].put_nowait(event.to_dict())
+        except queue.Full:
+            await asyncio.to_thread(self._inboxes[index].put, event.to_dict())
+
+    async def _supervise(self):
+        while not self._stopping:
+            await asyncio.sleep(1)
+            for index, process in enumerate(self._processes):
+                if process is not None and not process.is_alive() and not self._stopping:
+                    logger.warning(f'Worker {index} exited with code {process.exitcode}, restarting')
+                    self.restarts += 1
+                    self._spawn(index)
+
+    async def run(self):
+        """Start the workers, then route direct messages to them until cancelled."""
+        from agentstr import NostrClient
+        from pynostr.event import EventKind
+        from pynostr.filters import Filters
+
+        client = NostrClient(self.relays, self.private_key)
+        for index in range(self.count):
+            self._spawn(index)
+        await self._wait_ready(self.count)
+        logger.info(f'{self.count} workers ready')
+        filters = Filters(kinds=[EventKind.ENCRYPTED_DIRECT_MESSAGE], pubkey_refs=[client.public_key.hex()],
+                          since=int(time.time()), limit=10)
+        try:
+            await asyncio.gather(client.relay_manager.event_listener(filters, self.route), self._supervise())
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopping = True
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            if process is not None:
+                process.join(5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run an agent script as several worker processes behind one Nostr identity.')
+    parser.add_argument('script', help='agent script, e.g. agents/travel/agent.py')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('AGENT_WORKERS') or os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(args.script)), '.env'))
+    logging.basicConfig(level=logging.INFO)
+    launcher = WorkerLauncher(args.script, args.workers, os.getenv('NOSTR_RELAYS').split(','), os.getenv('AGENT_PRIVATE_KEY'))
+    asyncio.run(launcher.run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Agent server load test: N simulated DMs through an in-process relay, sequential vs scheduled.
+
+Simulated users send encrypted DMs at `--rate` messages per second to an agent whose
+`agent_callable` stands in for an LLM call (log-normal latency around `--llm-latency`,
+with a few slow turns). One heavy user sends a burst of `--heavy` messages up front.
+The same traffic goes to the stock `NostrAgentServer`, which handles one message at a
+time, and to `AgentServer`, which runs conversations concurrently through a
+`TurnScheduler`. Reports throughput and latency from send to reply, for the heavy user
+and for everyone else, and checks that each user's replies came back in order.
+
+    uv run benchmarks/agent_load.py --messages 300 --users 50 --concurrency 16
+"""
+import argparse
+import asyncio
+import logging
+import math
+import random
+import time
+
+from pynostr.encrypted_dm import EncryptedDirectMessage
+from pynostr.event import Event
+from pynostr.key import PrivateKey
+
+from common import percentiles, print_table
+from relay import StubRelay
+
+logging.disable(logging.WARNING)
+
+
+class Traffic:
+    """The DMs to send, and the replies seen on the relay."""
+    def __init__(self, messages: int, users: int, heavy: int, llm_latency: float, slow_rate: float, seed: int = 1):
+        rng = random.Random(seed)
+        self.users = [PrivateKey() for _ in range(users)]
+        self.keys = {key.public_key.hex(): key for key in self.users}
+        self.plan = [(0, seq) for seq in range(heavy)]  # (user, seq); user 0 is the heavy one
+        counts = [heavy] + [0] * (users - 1)
+        for _ in range(messages - heavy):
+            user = rng.randrange(1, users)
+            self.plan.append((user, counts[user]))
+            counts[user] += 1
+        self.latency = {message: (5.0 if rng.random() < slow_rate else rng.lognormvariate(math.log(llm_latency), 0.5))
+                        for message in self.plan}
+        self.sent: dict[tuple[int, int], float] = {}
+        self.replies: dict[tuple[int, int], float] = {}
+        self.order: dict[int, list[int]] = {}
+        self.other_replies = 0
+        self.duplicates = 0  # Replies to a message that was already answered
+        self.done = asyncio.Event()
+
+    async def agent_callable(self, input):
+        user, seq = map(int, input.messages[-1].split(':'))
+        await asyncio.sleep(self.latency[(user, seq)])
+        return f'reply {user}:{seq}'
+
+    def observe(self, relay: StubRelay, agent_pubkey: str):
+        """Wrap the relay so every reply the agent publishes is decrypted and timed."""
+        add_event = relay.add_event
+
+        def add_and_observe(event: dict) -> bool:
+            stored = add_event(event)
+            if stored and event['pubkey'] == agent_pubkey and event['kind'] == 4:
+                recipient = next(tag[1] for tag in event['tags'] if tag[0] == 'p')
+                dm = EncryptedDirectMessage.from_event(Event.from_dict(event))
+                dm.decrypt(self.keys[recipient].hex(), public_key_hex=agent_pubkey)
+                if dm.cleartext_content.startswith('reply '):
+                    user, seq = map(int, dm.cleartext_content.split()[1].split(':'))
+                    if (user, seq) in self.replies:
+                        self.duplicates += 1
+                        return stored
+                    self.replies[(user, seq)] = time.perf_counter()
+                    self.order.setdefault(user, []).append(seq)
+                else:
+                    self.other_replies += 1  # "busy" or "took too long"
+                if len(self.replies) + self.other_replies >= len(self.plan):
+                    self.done.set()
+            return stored
+        relay.add_event = add_and_observe
+
+    async def send(self, relay: StubRelay, agent_pubkey: str, rate: float):
+        start = time.perf_counter()
+        for i, (user, seq) in enumerate(self.plan):
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            key = self.users[user]
+            dm = EncryptedDirectMessage()
+            dm.encrypt(key.hex(), cleartext_content=f'{user}:{seq}', recipient_pubkey=agent_pubkey)
+            event = dm.to_event()
+            event.created_at = int(time.time())
+            event.sign(key.hex())
+            self.sent[(user, seq)] = time.perf_counter()
+            relay.add_event(event.to_dict())
+
+
+async def run_mode(mode: str, args) -> list[dict]:
+    from agentstr import AgentCard, NostrAgentServer, NostrClient
+    from agentstr_demo.scheduler import TurnScheduler
+    from agentstr_demo.server import AgentServer
+
+    traffic = Traffic(args.messages, args.users, args.heavy, args.llm_latency, args.slow_rate)
+    agent_key = PrivateKey()
+    async with StubRelay() as relay:
+        client = NostrClient([relay.url], agent_key.bech32())
+        info = AgentCard(name='Load Test Agent', description='Echoes after a fake LLM delay.', skills=[], satoshis=0,
+                         nostr_pubkey=agent_key.public_key.bech32())
+        if mode == 'sequential':
+            server = NostrAgentServer(client, agent_info=info, agent_callable=traffic.agent_callable)
+        else:
+            scheduler = TurnScheduler(max_concurrency=args.concurrency, max_queue=args.max_queue,
+                                      max_queue_per_sender=args.max_queue_per_sender, timeout=args.timeout)
+            server = AgentServer(client, agent_info=info, agent_callable=traffic.agent_callable, scheduler=scheduler)
+        traffic.observe(relay, agent_key.public_key.hex())
+        task = asyncio.create_task(server.start())
+        while not any(f.get('kinds') == [4] for filters in relay._subscriptions.values() for f in filters):
+            await asyncio.sleep(0.01)
+
+        t0 = time.perf_counter()
+        await traffic.send(relay, agent_key.public_key.hex(), args.rate)
+        try:
+            await asyncio.wait_for(traffic.done.wait(), args.deadline)
+        except TimeoutError:
+            pass
+        elapsed = time.perf_counter() - t0
+        task.cancel()
+
+    rows = []
+    in_order = all(seqs == sorted(seqs) for seqs in traffic.order.values())
+    for group, users in (('heavy user', {0}), ('other users', set(range(1, args.users)))):
+        sent = [m for m in traffic.plan if m[0] in users]
+        latencies = [traffic.replies[m] - traffic.sent[m] for m in sent if m in traffic.replies]
+        rows.append({'server': mode, 'users': group, 'sent': len(sent), 'replied': len(latencies),
+                     **percentiles(latencies), 'in_order': in_order})
+    rows[0].update({'msgs_per_s': len(traffic.replies) / elapsed, 'busy/timeout': traffic.other_replies})
+    return rows
+
+
+async def main(args):
+    rows = []
+    for mode in args.modes.split(','):
+        rows += await run_mode(mode, args)
+    print(f'{args.messages} DMs from {args.users} users at {args.rate:.0f}/s (heavy user bursts {args.heavy}), '
+          f'fake LLM ~{args.llm_latency * 1000:.0f} ms, {args.slow_rate:.0%} slow turns; concurrency {args.concurrency} '
+          f'(latency from send to reply, in ms)')
+    print_table(rows, ['server', 'users', 'sent', 'replied', 'p50', 'p90', 'p99', 'max', 'in_order', 'msgs_per_s',
+                       'busy/timeout'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--heavy', type=int, default=30, help='messages the heavy user sends up front')
+    parser.add_argument('--rate', type=float, default=50, help='messages per second')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='median seconds per agent turn')
+    parser.add_argument('--slow-rate', type=float, default=0.02, help='share of turns that take 5 seconds')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--max-queue', type=int, default=1000)
+    parser.add_argument('--max-queue-per-sender', type=int, default=50)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--deadline', type=float, default=120, help='seconds to wait for replies per server')
+    parser.add_argument('--modes', default='sequential,scheduled')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,191 @@
+"""Agent cold start per `AGENT_STARTUP` mode, with where the import time goes (`python -X importtime`).
+
+Each agent runs as its own process, like `suite.py` starts it, against the same local
+stand-ins (stub relay, fake LLM, wallet and API stubs), once per mode and `--repeat` times
+each, with a new key and data directory every time. For each run it records:
+- seconds from spawning the process until its card is published and it listens for DMs;
+- the time and number of modules `-X importtime` reports imported by then, and imported
+  later, until the first reply (the deferred framework imports of `lazy` and `warm`);
+- latency of the first reply, which includes any build left to it, and of the next one;
+- resident memory when ready.
+
+The medians are printed per agent and mode, then each agent's packages that take the most
+import time before it is ready, per mode. Agents whose framework is missing can still be
+ready in `lazy` mode; their replies then fail.
+
+    uv run benchmarks/agent_startup.py --repeat 3
+    uv run benchmarks/agent_startup.py --only agents/bitcoin,agents/travel --modes eager,lazy
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from pynostr.key import PrivateKey
+
+from common import ROOT, print_table
+from fake_llm import FakeLLM
+from loadgen import LoadGenerator, classify_agent_reply, summarize
+from relay import StubRelay
+from stubs import StubHTTPServer, blockchain_info_routes, frankfurter_routes, tavily_routes
+from suite import COMPONENTS, Service, rss_mb, selected, service_environments
+from wallet import StubWallet
+
+logging.disable(logging.WARNING)
+
+MODES = ('eager', 'lazy', 'warm')
+
+# import time: self [us] | cumulative | imported package (indented by nesting)
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def import_times(path: str, start: int = 0, end: int | None = None) -> tuple[float, int, Counter]:
+    """Import time (ms) and modules `-X importtime` logged between two offsets of `path`, and the time per top-level package."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(None if end is None else end - start).decode(errors='replace')
+    total, modules, packages = 0.0, 0, Counter()
+    for line in text.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_ms = int(match[1]) / 1000
+            total += self_ms
+            modules += 1
+            packages[match[4].partition('.')[0]] += self_ms
+    return total, modules, packages
+
+
+class TimedAgent(Service):
+    """An agent process started with `-X importtime`, its import log kept apart from its output."""
+    def __init__(self, *args, mode: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.mode = mode
+        self.imports_path = self.log_path.removesuffix('.log') + '.importtime'
+
+    async def start(self, relay: StubRelay, timeout: float):
+        t0 = time.perf_counter()
+        with open(self.log_path, 'wb') as log, open(self.imports_path, 'wb') as imports:
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, '-X', 'importtime', str(ROOT / self.component.script), cwd=str(ROOT),
+                env={**self.env, 'AGENT_STARTUP': self.mode}, stdout=log, stderr=imports)
+        await self.wait_ready(relay, timeout, t0)
+        if self.error:
+            with open(self.imports_path, errors='replace') as f:
+                errors = [line.strip() for line in f if line.strip() and not IMPORT_LINE.match(line)]
+            self.error = errors[-1][:300] if errors else self.error
+
+
+async def ask(agent: TimedAgent, relay: StubRelay, wallet: StubWallet, timeout: float) -> tuple[float | None, str]:
+    """Latency (ms) of one request to `agent`, and its outcome."""
+    generator = LoadGenerator([relay.url], agent.pubkey, lambda c, t: f'{agent.component.message} ({c}.{t})',
+                              classify_agent_reply, conversations=1, turns=1, ramp=0, timeout=timeout, pay=wallet.pay)
+    summary = summarize(await generator.run(), generator.elapsed)
+    outcome = next(iter(summary['outcomes']), 'none')
+    return (summary['latency_ms']['p50'] if summary['ok'] else None), outcome
+
+
+async def run_once(name: str, mode: str, keys: dict[str, PrivateKey], directory: str, relay: StubRelay, llm: FakeLLM,
+                   wallet: StubWallet, stubs: dict[str, StubHTTPServer], args) -> dict:
+    keys = {**keys, name: PrivateKey()}  # A new identity, so the card of an earlier run doesn't count as published
+    env = service_environments([name], keys, os.path.join(directory, 'data'), relay, llm, wallet, stubs)[name]
+    agent = TimedAgent(name, COMPONENTS[name], keys[name], env, os.path.join(directory, 'agent.log'), mode=mode)
+    try:
+        await agent.start(relay, args.startup_timeout)
+        if agent.error:
+            return {'agent': name, 'mode': mode, 'error': agent.error}
+        ready_offset = os.path.getsize(agent.imports_path)
+        rss = rss_mb(agent.process.pid)[0]
+        first_ms, first = await ask(agent, relay, wallet, args.timeout)
+        next_ms = (await ask(agent, relay, wallet, args.timeout))[0] if first == 'ok' else None
+        ready_ms, ready_modules, packages = import_times(agent.imports_path, end=ready_offset)
+        deferred_ms, deferred_modules, _ = import_times(agent.imports_path, start=ready_offset)
+        return {'agent': name, 'mode': mode, 'ready_s': agent.startup_s, 'import_ms': ready_ms, 'modules': ready_modules,
+                'deferred_ms': deferred_ms, 'deferred_modules': deferred_modules, 'first_reply_ms': first_ms,
+                'next_reply_ms': next_ms, 'reply': first, 'rss_mb': rss, 'packages': packages}
+    finally:
+        await agent.stop()
+
+
+def median_row(runs: list[dict]) -> dict:
+    ok = [run for run in runs if not run.get('error')]
+    if not ok:
+        return {**runs[0], 'runs': f'0/{len(runs)}'}
+    row = {'agent': ok[0]['agent'], 'mode': ok[0]['mode'], 'runs': f'{len(ok)}/{len(runs)}',
+           'reply': Counter(run['reply'] for run in ok).most_common(1)[0][0]}
+    for key in ('ready_s', 'import_ms', 'modules', 'deferred_ms', 'deferred_modules', 'first_reply_ms', 'next_reply_ms', 'rss_mb'):
+        values = [run[key] for run in ok if run[key] is not None]
+        row[key] = statistics.median(values) if values else None
+    row['packages'] = Counter({package: statistics.median(run['packages'][package] for run in ok)
+                               for package in set().union(*(run['packages'] for run in ok))})
+    return row
+
+
+async def main(args):
+    names = selected(args.only)
+    agents = [name for name in names if COMPONENTS[name].kind == 'agent']
+    modes = args.modes.split(',')
+    for mode in modes:
+        if mode not in MODES:
+            raise SystemExit(f'Unknown mode {mode}; choose from {", ".join(MODES)}')
+    logs = tempfile.mkdtemp(prefix='agentstr-agent-startup-')
+    rows = []
+    async with (StubRelay() as relay,
+                FakeLLM(args.llm_latency) as llm,
+                StubHTTPServer(blockchain_info_routes(), latency=args.upstream_latency) as blockchain_info,
+                StubHTTPServer(frankfurter_routes(), latency=args.upstream_latency) as frankfurter,
+                StubHTTPServer(tavily_routes(), latency=args.upstream_latency, method='POST') as tavily):
+        wallet = StubWallet(relay)
+        stubs = {'blockchain.info': blockchain_info, 'frankfurter': frankfurter, 'tavily': tavily}
+        keys = {name: PrivateKey() for name in names}
+        servers = [name for name in names if COMPONENTS[name].kind == 'mcp']
+        envs = service_environments(servers, keys, os.path.join(logs, 'mcp_servers'), relay, llm, wallet, stubs)
+        mcp_servers = [Service(name, COMPONENTS[name], keys[name], env, os.path.join(logs, name.replace('/', '_') + '.log'))
+                       for name, env in envs.items()]
+        try:
+            await asyncio.gather(*[server.start(relay, args.startup_timeout) for server in mcp_servers])
+            for name in agents:
+                for mode in modes:
+                    runs = []
+                    for i in range(args.repeat):
+                        print(f'{name} ({mode}, run {i + 1})...', file=sys.stderr)
+                        directory = os.path.join(logs, name.replace('/', '_'), f'{mode}-{i}')
+                        os.makedirs(directory)
+                        runs.append(await run_once(name, mode, keys, directory, relay, llm, wallet, stubs, args))
+                    rows.append(median_row(runs))
+        finally:
+            await asyncio.gather(*[server.stop() for server in mcp_servers])
+
+    print(f'{len(agents)} agents x {len(modes)} modes, median of {args.repeat} runs; fake LLM {args.llm_latency:.2f} s '
+          f'(import and reply times in ms, memory in MB); logs in {logs}')
+    print_table(rows, ['agent', 'mode', 'runs', 'ready_s', 'import_ms', 'modules', 'deferred_ms', 'deferred_modules',
+                       'first_reply_ms', 'next_reply_ms', 'reply', 'rss_mb', 'error'])
+    for name in agents:
+        measured = [row for row in rows if row['agent'] == name and row.get('packages')]
+        if not measured:
+            continue
+        top = Counter()
+        for row in measured:
+            top.update(row['packages'])
+        print(f'\n{name}: packages imported before ready, by import time (ms)')
+        print_table([{'package': package, **{row['mode']: row['packages'].get(package, 0.0) for row in measured}}
+                     for package, _ in top.most_common(args.top)], ['package', *(row['mode'] for row in measured)])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', help=f'comma-separated agents (default all): '
+                                       f'{",".join(name for name, c in COMPONENTS.items() if c.kind == "agent")}')
+    parser.add_argument('--modes', default=','.join(MODES), help='comma-separated AGENT_STARTUP modes')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per agent and mode')
+    parser.add_argument('--top', type=int, default=8, help='packages to list per agent')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds to wait for each reply')
+    parser.add_argument('--startup-timeout', type=float, default=90)
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='seconds to the first token')
+    parser.add_argument('--upstream-latency', type=float, default=0.05, help='seconds the HTTP stubs take to answer')
+    asyncio.run(main(parser.parse_args()))
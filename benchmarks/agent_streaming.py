@@ -0,0 +1,96 @@
+"""Time-to-first-token vs time-to-full-response for streamed agent replies over Nostr DMs.
+
+The agent's `agent_callable` is an async generator standing in for a streaming LLM: the first
+token after `--first-token` seconds, then `--tps` tokens per second until `--tokens` tokens.
+`--users` users ask at once through an in-process relay, with `AgentServer` streaming off
+(one reply when the answer is complete) and on (pieces sent as they are written). The
+client is `agentstr_demo.streaming.send_and_receive_stream`; it reports when the first text
+arrived, when the reply was complete, how many DMs it took, and whether the reassembled
+reply matches what the agent wrote.
+
+    uv run benchmarks/agent_streaming.py --tokens 400 --tps 40 --users 5
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from pynostr.key import PrivateKey
+
+from common import percentiles, print_table
+from relay import StubRelay
+
+logging.disable(logging.WARNING)
+
+WORDS = 'the price table shows revenue growth across quarters with margins and guidance for next year'.split()
+
+
+def answer(tokens: int) -> list[str]:
+    return [WORDS[i % len(WORDS)] + ' ' for i in range(tokens)]
+
+
+async def run_mode(stream: bool, args) -> dict:
+    from agentstr import AgentCard, NostrClient
+    from agentstr_demo.server import AgentServer
+    from agentstr_demo.streaming import send_and_receive_stream
+
+    tokens = answer(args.tokens)
+
+    async def agent_callable(input):
+        await asyncio.sleep(args.first_token)
+        for token in tokens:
+            yield token
+            await asyncio.sleep(1 / args.tps)
+
+    agent_key = PrivateKey()
+    async with StubRelay() as relay:
+        client = NostrClient([relay.url], agent_key.bech32())
+        info = AgentCard(name='Streaming Agent', description='Writes slowly.', skills=[], satoshis=0,
+                         nostr_pubkey=agent_key.public_key.bech32())
+        server = AgentServer(client, agent_info=info, agent_callable=agent_callable, stream=stream,
+                             stream_chunk_chars=args.chunk_chars, stream_interval=args.interval)
+        task = asyncio.create_task(server.start())
+        while not any(f.get('kinds') == [4] for filters in relay._subscriptions.values() for f in filters):
+            await asyncio.sleep(0.01)
+
+        async def ask(user: int) -> dict:
+            first = None
+
+            def on_text(text: str):
+                nonlocal first
+                first = first or time.perf_counter()
+            user_client = NostrClient([relay.url], PrivateKey().bech32())
+            t0 = time.perf_counter()
+            reply = await send_and_receive_stream(user_client, agent_key.public_key.hex(), f'question {user}',
+                                                  timeout=args.tokens / args.tps * 3 + 30, on_text=on_text)
+            return {'ttft': first - t0, 'full': time.perf_counter() - t0, 'ok': reply == ''.join(tokens)}
+
+        published = relay.published
+        results = await asyncio.gather(*[ask(user) for user in range(args.users)])
+        dms = relay.published - published - args.users
+        task.cancel()
+
+    ttft = percentiles([r['ttft'] for r in results])
+    full = percentiles([r['full'] for r in results])
+    return {'streaming': 'on' if stream else 'off', 'users': args.users, 'ttft_p50': ttft['p50'],
+            'ttft_max': ttft['max'], 'full_p50': full['p50'], 'full_max': full['max'],
+            'dms_per_reply': dms / args.users, 'reassembled': all(r['ok'] for r in results)}
+
+
+async def main(args):
+    rows = [await run_mode(False, args), await run_mode(True, args)]
+    print(f'{args.tokens} tokens at {args.tps:.0f} tokens/s after {args.first_token:.1f} s, {args.users} users at once, '
+          f'pieces of {args.chunk_chars}+ chars or every {args.interval:.1f} s (times in ms)')
+    print_table(rows, ['streaming', 'users', 'ttft_p50', 'ttft_max', 'full_p50', 'full_max', 'dms_per_reply',
+                       'reassembled'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=400)
+    parser.add_argument('--tps', type=float, default=40, help='tokens per second')
+    parser.add_argument('--first-token', type=float, default=0.8, help='seconds before the first token')
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--chunk-chars', type=int, default=400)
+    parser.add_argument('--interval', type=float, default=1.0)
+    asyncio.run(main(parser.parse_args()))
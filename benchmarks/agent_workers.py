@@ -0,0 +1,110 @@
+"""Agent throughput with 1..N worker processes behind one identity (`agentstr_demo.workers`).
+
+Runs the CPU-bound stand-in agent (`cpu_agent.py`, `--cpu-ms` of CPU per turn) under the
+worker launcher, started as `python -m agentstr_demo.workers`, against an in-process relay,
+and sends `--messages` DMs from `--users` simulated users as fast as the relay takes them.
+Reports replies per second and the speedup over one worker, send-to-reply latency, how
+evenly the consistent hash spread the conversations, and whether each user's replies
+stayed in order. Fails unless the launcher holds the only subscription and every DM is
+answered exactly once. Scaling is bounded by the number of cores (`os.cpu_count()`), and
+the relay and launcher share the first one.
+
+    uv run benchmarks/agent_workers.py --workers 1,2,4,8 --messages 2000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from pynostr.key import PrivateKey
+
+from agent_load import Traffic
+from common import ROOT, percentiles, print_table
+from relay import StubRelay
+
+logging.disable(logging.WARNING)
+
+
+def dm_subscriptions(relay: StubRelay, pubkey: str) -> int:
+    return sum(1 for filters in relay._subscriptions.values() for f in filters
+               if f.get('kinds') == [4] and pubkey in f.get('#p', []))
+
+
+async def run_workers(workers: int, args) -> dict:
+    from agentstr_demo.workers import HashRing
+
+    traffic = Traffic(args.messages, args.users, heavy=0, llm_latency=0.1, slow_rate=0)
+    agent_key = PrivateKey()
+    pubkey = agent_key.public_key.hex()
+    async with StubRelay() as relay:
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [str(ROOT), os.getenv('PYTHONPATH')])),
+               'NOSTR_RELAYS': relay.url, 'AGENT_PRIVATE_KEY': agent_key.bech32(), 'CPU_AGENT_MS': str(args.cpu_ms)}
+        traffic.observe(relay, pubkey)
+        t0 = time.perf_counter()
+        # Started as documented, so the workers learn they are workers the way they do in production
+        launcher = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'agentstr_demo.workers', str(ROOT / 'benchmarks' / 'cpu_agent.py'),
+            '--workers', str(workers), cwd=str(ROOT), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True)
+        try:
+            # The launcher subscribes once every worker is ready
+            while not dm_subscriptions(relay, pubkey):
+                if launcher.returncode is not None:
+                    raise RuntimeError(f'launcher exited with {launcher.returncode}')
+                await asyncio.sleep(0.05)
+            startup = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            await traffic.send(relay, pubkey, rate=args.rate)
+            try:
+                await asyncio.wait_for(traffic.done.wait(), args.deadline)
+            except TimeoutError:
+                pass
+            elapsed = time.perf_counter() - t0
+            await asyncio.sleep(args.settle)  # Let duplicate replies, if any, arrive
+            subscriptions = dm_subscriptions(relay, pubkey)
+        finally:
+            # The launcher and its workers share a process group
+            os.killpg(launcher.pid, signal.SIGTERM)
+            await launcher.wait()
+
+    # Only the launcher may subscribe, and each DM must be answered by exactly one worker
+    assert subscriptions == 1, f'{subscriptions} direct message subscriptions for the agent, expected only the launcher\'s'
+    assert traffic.duplicates == 0, f'{traffic.duplicates} DMs were answered more than once'
+    assert len(traffic.replies) == len(traffic.plan), f'{len(traffic.plan) - len(traffic.replies)} DMs were not answered'
+
+    ring = HashRing(workers)
+    routed = Counter(ring.node(traffic.users[user].public_key.hex()) for user, _ in traffic.plan)
+    latencies = [traffic.replies[m] - traffic.sent[m] for m in traffic.plan if m in traffic.replies]
+    return {'workers': workers, 'replied': len(latencies), 'duplicates': traffic.duplicates, 'seconds': elapsed,
+            'msgs_per_s': len(latencies) / elapsed, **percentiles(latencies),
+            'routed_min': min(routed[i] for i in range(workers)), 'routed_max': max(routed.values()),
+            'in_order': all(seqs == sorted(seqs) for seqs in traffic.order.values()), 'startup_s': startup}
+
+
+async def main(args):
+    rows = []
+    for workers in [int(w) for w in args.workers.split(',')]:
+        rows.append(await run_workers(workers, args))
+        rows[-1]['speedup'] = rows[-1]['msgs_per_s'] / rows[0]['msgs_per_s']
+    print(f'{args.messages} DMs from {args.users} users, {args.cpu_ms:.0f} ms CPU per turn, {os.cpu_count()} cores '
+          f'(latency in ms)')
+    print_table(rows, ['workers', 'replied', 'duplicates', 'seconds', 'msgs_per_s', 'speedup', 'p50', 'p99', 'max',
+                       'routed_min', 'routed_max', 'in_order', 'startup_s'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default=','.join(str(w) for w in sorted({1, 2, 4, os.cpu_count() or 1})))
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--cpu-ms', type=float, default=20)
+    parser.add_argument('--rate', type=float, default=5000, help='messages per second sent to the relay')
+    parser.add_argument('--deadline', type=float, default=300, help='seconds to wait for replies per run')
+    parser.add_argument('--settle', type=float, default=1.0, help='seconds to wait for duplicate replies after the last one')
+    asyncio.run(main(parser.parse_args()))
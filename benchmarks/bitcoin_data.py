@@ -0,0 +1,72 @@
+"""Latency of the bitcoin MCP server's `get_bitcoin_data` tool against a local blockchain.info stub.
+
+Compares the old implementation (seven sequential requests on a fresh client per call)
+with the concurrent, per-endpoint cached `BlockchainInfo` fetch layer.
+
+    uv run benchmarks/bitcoin_data.py --concurrency 50 --rounds 20 --latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from agentstr_demo.http import HTTPPool
+from common import load_module, percentiles, print_table
+from stubs import StubHTTPServer, blockchain_info_routes
+
+
+async def sequential_get_bitcoin_data(base_url: str, endpoints: dict[str, tuple[str, float]]) -> dict:
+    """The original implementation: one client per call, one request at a time."""
+    async with httpx.AsyncClient() as client:
+        return {name: (await client.get(f'{base_url}/{endpoint}')).text
+                for name, (endpoint, _) in endpoints.items()}
+
+
+async def measure(call, concurrency: int, rounds: int) -> list[float]:
+    samples = []
+
+    async def timed():
+        t0 = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - t0)
+
+    for _ in range(rounds):
+        await asyncio.gather(*[timed() for _ in range(concurrency)])
+    return samples
+
+
+async def main(concurrency: int, rounds: int, latency: float):
+    server = load_module('mcp_servers/bitcoin/server.py')
+    async with StubHTTPServer(blockchain_info_routes(), latency=latency) as stub, HTTPPool() as pool:
+        base_url = f'{stub.url}/q'
+        rows = []
+
+        stub.reset_counters()
+        samples = await measure(lambda: sequential_get_bitcoin_data(base_url, server.ENDPOINTS), concurrency, rounds)
+        rows.append({'impl': 'sequential', 'calls': len(samples), 'upstream': stub.requests, **percentiles(samples)})
+
+        fetcher = server.BlockchainInfo(pool, base_url=base_url)
+        stub.reset_counters()
+        samples = await measure(fetcher.get_all, concurrency, rounds)
+        rows.append({'impl': 'concurrent+cached', 'calls': len(samples), 'upstream': stub.requests, **percentiles(samples)})
+
+        # Cold cache on every call: fan-out and in-flight sharing only
+        fetcher = server.BlockchainInfo(pool, base_url=base_url, endpoints={
+            name: (endpoint, 0) for name, (endpoint, _) in server.ENDPOINTS.items()
+        })
+        stub.reset_counters()
+        samples = await measure(fetcher.get_all, concurrency, rounds)
+        rows.append({'impl': 'concurrent (ttl=0)', 'calls': len(samples), 'upstream': stub.requests, **percentiles(samples)})
+
+    print(f'concurrency={concurrency} rounds={rounds} upstream latency={latency * 1000:.0f}ms (latencies in ms)')
+    print_table(rows, ['impl', 'calls', 'upstream', 'p50', 'p90', 'p99', 'max'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.rounds, args.latency))
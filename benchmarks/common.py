@@ -0,0 +1,61 @@
+import importlib.util
+import os
+import statistics
+import sys
+from pathlib import Path
+
+from agentstr_demo.tokens import count_tokens  # noqa: F401 (used by the benchmarks)
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_module(path: str, name: str | None = None):
+    """Import a service script (e.g. `mcp_servers/bitcoin/server.py`) by its path in the repo.
+
+    The script's directory is put on `sys.path` first so it can import its sibling modules,
+    just like it would when started with `uv run <path>`.
+    """
+    path = ROOT / path
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(name or path.parent.name + '_' + path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def set_default_env(**env: str):
+    """Set environment variables the service scripts expect, without overriding real ones."""
+    for key, value in env.items():
+        os.environ.setdefault(key, value)
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """p50/p90/p99/max of `samples`, in milliseconds."""
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else 0.0
+        return {'p50': value, 'p90': value, 'p99': value, 'max': value}
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'p50': cuts[49] * 1000,
+        'p90': cuts[89] * 1000,
+        'p99': cuts[98] * 1000,
+        'max': max(samples) * 1000,
+    }
+
+
+def print_table(rows: list[dict], columns: list[str]):
+    """Print a list of dicts as a fixed-width table."""
+    widths = {c: max(len(c), *(len(_fmt(row.get(c))) for row in rows)) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns))
+    print('  '.join('-' * widths[c] for c in columns))
+    for row in rows:
+        print('  '.join(_fmt(row.get(c)).ljust(widths[c]) for c in columns))
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    return '' if value is None else str(value)
+
+
@@ -0,0 +1,38 @@
+"""Stand-in agent for `agent_workers.py`: every turn burns `CPU_AGENT_MS` of CPU, then echoes.
+
+The CPU time stands in for the parsing, tokenization and embedding work that keeps one
+agent process on one core. Configured by NOSTR_RELAYS, AGENT_PRIVATE_KEY and CPU_AGENT_MS.
+"""
+import asyncio
+import os
+import time
+
+from agentstr import AgentCard, ChatInput, PrivateKey
+
+from agentstr_demo.server import AgentServer
+
+
+def burn(seconds: float):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+async def run():
+    cpu_seconds = float(os.getenv('CPU_AGENT_MS', '20')) / 1000
+
+    async def agent_callable(input: ChatInput) -> str:
+        burn(cpu_seconds)
+        return f'reply {input.messages[-1]}'
+
+    private_key = os.getenv('AGENT_PRIVATE_KEY')
+    server = AgentServer(relays=os.getenv('NOSTR_RELAYS').split(','),
+                         private_key=private_key,
+                         agent_info=AgentCard(name='CPU Agent', description='Burns CPU, then echoes.', skills=[],
+                                              satoshis=0, nostr_pubkey=PrivateKey.from_nsec(private_key).public_key.bech32()),
+                         agent_callable=agent_callable)
+    await server.start()
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
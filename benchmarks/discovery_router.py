@@ -0,0 +1,94 @@
+"""Discovery agent tiered routing: fast-path fraction and per-tier latency.
+
+Routes a mix of requests over the demo's own agent cards, optionally among thousands of
+synthetic ones, with a fake LLM that answers after `--llm-latency` seconds. Every request
+used to pay for an LLM call; with the TieredRouter, requests naming one agent's skill or
+name are answered from the keyword index.
+
+    uv run benchmarks/discovery_router.py --synthetic 0,10000
+"""
+import argparse
+import asyncio
+import time
+
+from common import load_module, print_table
+from discovery_routing import synthetic_cards
+
+DEMO_AGENTS = {
+    'Travel Agent': ('This agent can help you find, book, and manage flights.',
+                     ['book_flight', 'show_itinerary', 'search_flights', 'cancel_itinerary']),
+    'Medical Agent': ('This agent can search and summarize medical articles in the PubMed database.', ['medical_search']),
+    'News Agent': ('This agent can perform web search for news articles.', ['web_search']),
+    'Nostr Search Agent': ('This agent can search Nostr social media for content by authors or hashtags.', ['nostr_search']),
+    'Finance Agent': ('This agent can look up stock prices and exchange rates.',
+                      ['stock_price', 'historical_prices', 'exchange_rate', 'exchange_rate_series']),
+    'Bitcoin Agent': ('This agent can query bitcoin blockchain data', ['get_bitcoin_data']),
+}
+
+# (request, expected agent or None if the router should defer to the LLM)
+REQUESTS = [
+    ('I want to book a flight from SFO to JFK', 'Travel Agent'),
+    ('search flights to Miami next week', 'Travel Agent'),
+    ('can you show my itinerary', 'Travel Agent'),
+    ('Can someone help me answer a medical question?', 'Medical Agent'),
+    ('What is the exchange rate from USD to EUR?', 'Finance Agent'),
+    ('current stock price of AAPL', 'Finance Agent'),
+    ('latest news about AI regulation', 'News Agent'),
+    ('search nostr for posts by jack', 'Nostr Search Agent'),
+    ("what's the bitcoin hashrate right now", 'Bitcoin Agent'),
+    ('I need a doctor for my headache', None),
+    ('What agents do you know about?', None),
+    ('compare bitcoin with the price of gold stocks', None),
+]
+
+
+async def run(synthetic: int, llm_latency: float, rounds: int) -> dict:
+    from agentstr import AgentCard, Skill
+    load_module('agents/discovery/router_index.py')
+    router_module = load_module('agents/discovery/router.py')
+
+    cards = {f'npub_{name.split()[0].lower()}': AgentCard(
+        name=name, description=description, satoshis=0, nostr_pubkey=f'npub_{name.split()[0].lower()}',
+        skills=[Skill(name=skill, description=skill.replace('_', ' '), satoshis=0) for skill in skills])
+        for name, (description, skills) in DEMO_AGENTS.items()}
+    cards.update(synthetic_cards(synthetic, AgentCard, Skill))
+
+    async def fake_llm(request, candidates, thread_id):
+        await asyncio.sleep(llm_latency)
+        return router_module.RouteDecision(name=candidates[0].name if candidates else None, message='Matched.')
+
+    router = router_module.TieredRouter(fake_llm)
+    router.build(cards)
+    correct = fast = 0
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for request, expected in REQUESTS:
+            before = router.counts['fast']
+            answer = await router.route(request)
+            if router.counts['fast'] > before:
+                fast += 1
+                correct += expected is not None and f'npub_{expected.split()[0].lower()}' in answer
+    elapsed = time.perf_counter() - t0
+    stats = router.stats()
+    return {'cards': len(cards), 'queries': stats['queries'], 'fast_fraction': stats['fast_path_fraction'],
+            'fast_correct': correct / fast if fast else None,
+            'fast_p50_us': stats['fast']['p50_ms'] * 1000 if stats['fast']['p50_ms'] is not None else None,
+            'fast_p99_us': stats['fast']['p99_ms'] * 1000 if stats['fast']['p99_ms'] is not None else None,
+            'llm_p50_ms': stats['llm']['p50_ms'], 'total_s': elapsed,
+            'all_llm_s': stats['queries'] * llm_latency}
+
+
+async def main(sizes: list[int], llm_latency: float, rounds: int):
+    rows = [await run(n, llm_latency, rounds) for n in sizes]
+    print(f'Fake LLM latency {llm_latency * 1000:.0f} ms; all_llm_s is the time if every query went to the LLM')
+    print_table(rows, ['cards', 'queries', 'fast_fraction', 'fast_correct', 'fast_p50_us', 'fast_p99_us',
+                       'llm_p50_ms', 'total_s', 'all_llm_s'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--synthetic', default='0,10000', help='comma-separated numbers of synthetic cards to add')
+    parser.add_argument('--llm-latency', type=float, default=0.05)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main([int(n) for n in args.synthetic.split(',')], args.llm_latency, args.rounds))
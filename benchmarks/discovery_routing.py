@@ -0,0 +1,121 @@
+"""Discovery agent routing with 10k synthetic agent cards: top-k retrieval vs the full-list prompt.
+
+The old router put every card's name and description into the system prompt, so each query
+paid for the whole registry. The AgentIndex retrieves the top-k cards per query and only
+those go into the prompt. Reports retrieval latency, prompt tokens and recall@k (whether
+the card a query was written for is among the candidates), and for generic questions about a
+domain, the share of candidates from that domain.
+
+    uv run benchmarks/discovery_routing.py --cards 100,1000,10000 --top-k 5
+"""
+import argparse
+import random
+import time
+
+from common import count_tokens, load_module, percentiles, print_table
+
+DOMAINS = {
+    'travel': 'flights hotels booking itinerary airline trip vacation passport visa luggage',
+    'medical': 'symptoms diagnosis doctor medicine health clinic prescription treatment allergy',
+    'finance': 'stocks portfolio exchange rates currency investing dividends earnings budget tax',
+    'bitcoin': 'bitcoin blockchain lightning mempool hashrate wallet satoshis mining halving',
+    'news': 'headlines breaking news articles journalism politics summary events press',
+    'coding': 'python javascript debugging code review refactoring tests compiler api',
+    'legal': 'contracts lawyer lease agreement compliance regulation court copyright',
+    'cooking': 'recipes ingredients meal plan baking nutrition diet kitchen cuisine',
+    'fitness': 'workout training running strength yoga cardio coach exercise marathon',
+    'education': 'tutoring homework math physics exam study lessons language learning',
+    'music': 'songs playlist chords guitar piano lyrics composition concert',
+    'weather': 'forecast rain temperature storm humidity climate wind snow',
+}
+ADJECTIVES = 'smart swift friendly expert reliable local global pocket personal instant'.split()
+FILLER = 'can you please help me find someone who knows about'.split()
+
+
+def synthetic_cards(n: int, AgentCard, Skill, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    domains = list(DOMAINS)
+    cards = {}
+    for i in range(n):
+        domain = rng.choice(domains)
+        words = DOMAINS[domain].split()
+        # A made-up specialty word per card, so each one is distinguishable within its domain
+        specialty = f'{rng.choice(words)}{i}'
+        skills = [Skill(name=f'{rng.choice(words)}_{rng.choice(words)}',
+                        description=f'Handles {" ".join(rng.sample(words, 3))} requests.', satoshis=rng.randrange(20))
+                  for _ in range(rng.randrange(1, 4))]
+        cards[f'npub{i:06d}'] = AgentCard(
+            name=f'{rng.choice(ADJECTIVES).title()} {domain.title()} Agent {i}',
+            description=f'This agent helps with {" ".join(rng.sample(words, 4))} and {specialty}.',
+            skills=skills, satoshis=0, nostr_pubkey=f'npub{i:06d}')
+    return cards
+
+
+def full_list_prompt(cards: dict) -> str:
+    """The old system prompt's agent list."""
+    prompt = 'Available Agents:\n'
+    for card in cards.values():
+        prompt += f"\n{'=' * 80}\nName: {card.name}\nDescription: {card.description}\n{'=' * 80}"
+    return prompt
+
+
+def queries(cards: dict, count: int, seed: int = 2) -> list[tuple[str, str]]:
+    """(query, pubkey of the card it was written for)."""
+    rng = random.Random(seed)
+    keys = list(cards)
+    result = []
+    for _ in range(count):
+        key = rng.choice(keys)
+        specialty = cards[key].description.rstrip('.').split()[-1]
+        domain = cards[key].name.split()[1].lower()
+        result.append((f'{" ".join(rng.sample(FILLER, 4))} {rng.choice(DOMAINS[domain].split())} {specialty}', key))
+    return result
+
+
+def main(sizes: list[int], top_k: int, count: int):
+    from agentstr import AgentCard, Skill
+    router_index = load_module('agents/discovery/router_index.py')
+    rows = []
+    for n in sizes:
+        cards = synthetic_cards(n, AgentCard, Skill)
+        t0 = time.perf_counter()
+        index = router_index.AgentIndex()
+        index.build(cards)
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        full_prompt = full_list_prompt(cards)
+        full_build_ms = (time.perf_counter() - t0) * 1000
+        full_tokens = count_tokens(full_prompt)
+
+        latencies, tokens, hits = [], [], 0
+        for query, target in queries(cards, count):
+            t0 = time.perf_counter()
+            candidates = index.search(query, k=top_k)
+            prompt = full_list_prompt({key: card for key, card, _ in candidates})
+            latencies.append(time.perf_counter() - t0)
+            tokens.append(count_tokens(prompt))
+            hits += any(key == target for key, _, _ in candidates)
+        # Generic questions about a domain, with no card-specific words
+        rng, on_topic = random.Random(3), 0
+        for _ in range(count):
+            domain = rng.choice(list(DOMAINS))
+            query = f'{" ".join(rng.sample(FILLER, 4))} {" ".join(rng.sample(DOMAINS[domain].split(), 2))}'
+            candidates = index.search(query, k=top_k)
+            on_topic += sum(card.name.split()[1].lower() == domain for _, card, _ in candidates) / top_k
+        p = percentiles(latencies)
+        rows.append({'cards': n, 'index_build_s': build_s, 'full_tokens': full_tokens, 'full_build_ms': full_build_ms,
+                     'topk_tokens': sum(tokens) / len(tokens), 'topk_p50_ms': p['p50'], 'topk_p99_ms': p['p99'],
+                     f'recall@{top_k}': hits / count, 'domain_precision': on_topic / count})
+    print(f'{count} queries per size, top-{top_k} candidates')
+    print_table(rows, ['cards', 'index_build_s', 'full_tokens', 'full_build_ms', 'topk_tokens', 'topk_p50_ms',
+                       'topk_p99_ms', f'recall@{top_k}', 'domain_precision'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', default='100,1000,10000', help='comma-separated registry sizes')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+    main([int(n) for n in args.cards.split(',')], args.top_k, args.queries)
@@ -0,0 +1,97 @@
+"""Discovery agent startup: time to load N agent cards, and time for a metadata update to show up.
+
+Runs against an in-process relay that adds `--latency` seconds per request. Compares the old
+startup (one get_metadata_for_pubkey round trip per agent, in sequence) with the AgentRegistry's
+batched cold start and its warm start from the card cache.
+
+    uv run benchmarks/discovery_startup.py --agents 10,100,1000 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from pynostr.event import Event, EventKind
+from pynostr.key import PrivateKey
+
+from common import load_module, print_table
+from relay import StubRelay
+
+logging.getLogger('agentstr').setLevel(logging.WARNING)
+
+
+def metadata_event(private_key: PrivateKey, name: str, description: str, created_at: int) -> dict:
+    card = {'name': name, 'description': description, 'skills': [], 'satoshis': 0,
+            'nostr_pubkey': private_key.public_key.bech32()}
+    event = Event(content=json.dumps({'name': name, 'about': json.dumps(card)}),
+                  pubkey=private_key.public_key.hex(), created_at=created_at, kind=EventKind.SET_METADATA)
+    event.sign(private_key.hex())
+    return event.to_dict()
+
+
+async def run(n: int, latency: float, sequential_max: int) -> dict:
+    registry_module = load_module('agents/discovery/registry.py')
+    from agentstr import NostrClient
+
+    keys = [PrivateKey() for _ in range(n)]
+    now = int(time.time())
+    row = {'agents': n}
+    async with StubRelay(latency=latency) as relay:
+        for i, key in enumerate(keys):
+            relay.add_event(metadata_event(key, f'Agent {i}', f'Agent number {i}', now - 60))
+        pubkeys = [key.public_key.bech32() for key in keys]
+        client = NostrClient([relay.url], PrivateKey().bech32())
+
+        if n <= sequential_max:
+            relay.reset_counters()
+            t0 = time.perf_counter()
+            for pubkey in pubkeys:
+                await client.get_metadata_for_pubkey(pubkey)
+            row['sequential_s'] = time.perf_counter() - t0
+            row['sequential_reqs'] = relay.requests
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, 'agent_cards.json')
+            registry = registry_module.AgentRegistry(client, pubkeys, cache_path=cache_path)
+            relay.reset_counters()
+            t0 = time.perf_counter()
+            await registry.refresh()
+            row['cold_s'] = time.perf_counter() - t0
+            row['cold_reqs'] = relay.requests
+            row['cards'] = len(registry)
+
+            t0 = time.perf_counter()
+            warm = registry_module.AgentRegistry(client, pubkeys, cache_path=cache_path)
+            warm.load_cache()
+            row['warm_ms'] = (time.perf_counter() - t0) * 1000
+
+            # A metadata update pushed through the subscription
+            updated = asyncio.Event()
+            warm.on_change = lambda r: updated.set()
+            warm.watch()
+            await asyncio.sleep(latency + 0.2)
+            t0 = time.perf_counter()
+            relay.add_event(metadata_event(keys[0], 'Agent 0', 'Renamed description', int(time.time()) + 1))
+            await asyncio.wait_for(updated.wait(), timeout=10)
+            row['update_ms'] = (time.perf_counter() - t0) * 1000
+            assert warm.cards[pubkeys[0]].description == 'Renamed description'
+            warm.stop()
+    return row
+
+
+async def main(sizes: list[int], latency: float, sequential_max: int):
+    rows = [await run(n, latency, sequential_max) for n in sizes]
+    print(f'Relay latency {latency * 1000:.0f} ms per request')
+    print_table(rows, ['agents', 'cards', 'sequential_s', 'sequential_reqs', 'cold_s', 'cold_reqs', 'warm_ms', 'update_ms'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agents', default='10,100,1000', help='comma-separated registry sizes')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--sequential-max', type=int, default=100, help='skip the sequential baseline above this size')
+    args = parser.parse_args()
+    asyncio.run(main([int(n) for n in args.agents.split(',')], args.latency, args.sequential_max))
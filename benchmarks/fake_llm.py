@@ -0,0 +1,231 @@
+"""A deterministic OpenAI-compatible chat completions endpoint for offline benchmarks.
+
+Serves `POST /v1/chat/completions` (streamed or not). Answers depend only on the request:
+- With `tools` and no tool result since the last user message, it calls the tool whose name
+  and description share the most words with the user message. The arguments are built from
+  the tool's JSON schema: defaults, the first enum value, or the user message for strings.
+- With a JSON schema `response_format`, it returns a minimal object that fits the schema.
+- For the agentstr price handler prompt, it answers that the agent can handle the request.
+- For a DSPy chat adapter prompt, it fills in the output fields the prompt asks for.
+- Otherwise it writes `tokens` words of text.
+
+Each response takes `latency` seconds to the first token, then `tokens_per_second`.
+Calls are counted per API key, so each service can be given its own.
+
+    async with FakeLLM(latency=0.3, tokens_per_second=50) as llm:
+        os.environ['LLM_BASE_URL'] = llm.url  # ends in /v1
+"""
+import asyncio
+import json
+import re
+import socket
+import time
+import uuid
+from collections import Counter
+
+from aiohttp import web
+
+WORDS = ('the network processed more transactions today while fees stayed low and the price '
+         'moved within a narrow range as analysts expected').split()
+
+
+def _words(text: str) -> set[str]:
+    return set(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def _text(content) -> str:
+    if isinstance(content, list):  # content parts
+        return ' '.join(part.get('text', '') for part in content if isinstance(part, dict))
+    return content or ''
+
+
+def schema_instance(schema: dict, text: str, defs: dict | None = None):
+    """A small value that validates against `schema`; strings are filled with `text`."""
+    defs = defs if defs is not None else schema.get('$defs', schema.get('definitions', {}))
+    if '$ref' in schema:
+        return schema_instance(defs[schema['$ref'].rsplit('/', 1)[-1]], text, defs)
+    if 'default' in schema:
+        return schema['default']
+    if 'enum' in schema:
+        return schema['enum'][0]
+    if 'const' in schema:
+        return schema['const']
+    for union in ('anyOf', 'oneOf'):
+        if union in schema:
+            options = [option for option in schema[union] if option.get('type') != 'null'] or schema[union]
+            return schema_instance(options[0], text, defs)
+    kind = schema.get('type', 'object')
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != 'null'), 'null')
+    if kind == 'object':
+        properties = schema.get('properties', {})
+        # Strict schemas list every property as required
+        required = schema.get('required', [])
+        return {name: schema_instance(properties[name], text, defs) for name in required if name in properties}
+    if kind == 'array':
+        return []
+    if kind in ('integer', 'number'):
+        return schema.get('minimum', 1)
+    if kind == 'boolean':
+        return False
+    if kind == 'null':
+        return None
+    return text[:200]
+
+
+class FakeLLM:
+    """Local OpenAI-compatible server with deterministic answers and configurable latency.
+
+    Args:
+        latency: Seconds before the first token.
+        tokens_per_second: Speed of the rest of the answer.
+        tokens: Words in a plain text answer.
+        port: Port to listen on (a free one if 0).
+    """
+    def __init__(self, latency: float = 0.5, tokens_per_second: float = 50, tokens: int = 60, port: int = 0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.port = port
+        self.calls: Counter[str] = Counter()  # API key -> chat completions
+        self.tool_calls: Counter[str] = Counter()
+        self.prompt_tokens: Counter[str] = Counter()
+        self.connections = set()  # Peer addresses, one per TCP connection used
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/v1'
+
+    async def __aenter__(self) -> 'FakeLLM':
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/v1/chat/completions', self._completions)
+        app.router.add_post('/chat/completions', self._completions)
+        app.router.add_get('/v1/models', self._models)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('127.0.0.1', self.port))
+        self.port = sock.getsockname()[1]
+        await web.SockSite(self._runner, sock, backlog=1024).start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+    async def _models(self, request: web.Request) -> web.Response:
+        return web.json_response({'object': 'list', 'data': [{'id': 'fake-model', 'object': 'model', 'owned_by': 'fake'}]})
+
+    def answer(self, body: dict) -> tuple[str | None, list[dict]]:
+        """The (text, tool calls) to answer a chat completions request with."""
+        messages = body.get('messages', [])
+        last_user = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].get('role') == 'user'), None)
+        question = _text(messages[last_user].get('content')) if last_user is not None else ''
+        system = ' '.join(_text(m.get('content')) for m in messages if m.get('role') == 'system')
+        tools = [tool['function'] for tool in body.get('tools') or [] if tool.get('type') == 'function']
+        answered = last_user is not None and any(m.get('role') == 'tool' for m in messages[last_user:])
+
+        if tools and not answered and body.get('tool_choice') != 'none':
+            asked = _words(question)
+            tool = max(tools, key=lambda t: len(asked & _words(f"{t['name'].replace('_', ' ')} {t.get('description', '')}")))
+            arguments = schema_instance(tool.get('parameters') or {}, question)
+            return None, [{'id': f'call_{uuid.uuid4().hex[:24]}', 'type': 'function',
+                           'function': {'name': tool['name'], 'arguments': json.dumps(arguments)}}]
+        response_format = body.get('response_format') or {}
+        if response_format.get('type') == 'json_schema':
+            return json.dumps(schema_instance(response_format['json_schema'].get('schema', {}), question)), []
+        if response_format.get('type') == 'json_object':
+            return '{}', []
+        if '"can_handle"' in question:
+            return json.dumps({'can_handle': True, 'user_message': 'Sure, I can help with that. Shall I go ahead?',
+                               'skills_used': []}), []
+        if '[[ ## completed ## ]]' in system:
+            return self._dspy_fields(system, question), []
+        words = [WORDS[i % len(WORDS)] for i in range(self.tokens)]
+        return f"About {question[:80]!r}: {' '.join(words)}.", []
+
+    @staticmethod
+    def _dspy_fields(system: str, question: str) -> str:
+        outputs = system.split('Your output fields are:', 1)[-1].split('All interactions will be structured', 1)[0]
+        fields = []
+        for name, kind in re.findall(r'`(\w+)` \(([^)]*)\)', outputs):
+            if 'Literal' in kind:
+                options = re.findall(r"'([^']*)'", kind)
+                value = 'finish' if 'finish' in options else (options[0] if options else '')
+            elif kind.startswith('dict'):
+                value = '{}'
+            elif kind.startswith('list'):
+                value = '[]'
+            elif kind == 'bool':
+                value = 'False'
+            elif kind in ('int', 'float'):
+                value = '0'
+            else:
+                value = f'Answer to: {question[:200]}'
+            fields.append(f'[[ ## {name} ## ]]\n{value}')
+        return '\n\n'.join(fields + ['[[ ## completed ## ]]'])
+
+    async def _completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        key = request.headers.get('Authorization', '').removeprefix('Bearer ') or 'anonymous'
+        self.connections.add(request.transport.get_extra_info('peername'))
+        prompt = sum(len(_text(m.get('content')).split()) for m in body.get('messages', []))
+        text, tool_calls = self.answer(body)
+        self.calls[key] += 1
+        self.tool_calls[key] += len(tool_calls)
+        self.prompt_tokens[key] += prompt
+        pieces = [word + ' ' for word in text.split(' ')] if text else []
+        if pieces:
+            pieces[-1] = pieces[-1][:-1]
+        usage = {'prompt_tokens': prompt, 'completion_tokens': len(pieces) + 10 * len(tool_calls),
+                 'total_tokens': prompt + len(pieces) + 10 * len(tool_calls)}
+        base = {'id': f'chatcmpl-{uuid.uuid4().hex[:24]}', 'created': int(time.time()), 'model': body.get('model', 'fake-model')}
+        finish = 'tool_calls' if tool_calls else 'stop'
+
+        await asyncio.sleep(self.latency)
+        if not body.get('stream'):
+            await asyncio.sleep(max(len(pieces) - 1, 0) / self.tokens_per_second)
+            message = {'role': 'assistant', 'content': text}
+            if tool_calls:
+                message['tool_calls'] = tool_calls
+            return web.json_response({**base, 'object': 'chat.completion', 'usage': usage,
+                                      'choices': [{'index': 0, 'message': message, 'finish_reason': finish}]})
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+
+        async def send(delta: dict | None, finish_reason: str | None = None, **extra):
+            choices = [] if delta is None else [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            chunk = {**base, 'object': 'chat.completion.chunk', 'choices': choices, **extra}
+            await response.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+
+        await send({'role': 'assistant', 'content': ''})
+        for i, piece in enumerate(pieces):
+            if i:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            await send({'content': piece})
+        for i, call in enumerate(tool_calls):
+            await send({'tool_calls': [{'index': i, **call}]})
+        await send({}, finish)
+        if (body.get('stream_options') or {}).get('include_usage'):
+            await send(None, usage=usage)
+        await response.write(b'data: [DONE]\n\n')
+        await response.write_eof()
+        return response
+
+
+async def main(args):
+    async with FakeLLM(args.latency, args.tps, args.tokens, args.port) as llm:
+        print(f'Fake LLM listening on {llm.url}')
+        await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds to the first token')
+    parser.add_argument('--tps', type=float, default=50, help='tokens per second after the first')
+    parser.add_argument('--tokens', type=int, default=60, help='words in a text answer')
+    parser.add_argument('--port', type=int, default=8000)
+    asyncio.run(main(parser.parse_args()))
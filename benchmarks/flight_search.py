@@ -0,0 +1,94 @@
+"""Travel agent flight search latency as the inventory grows from 10 to 1M flights.
+
+Compares the indexed FlightStore with the old approach of sorting the whole inventory on
+every call, for a few query shapes (exact route + date, origin only, unfiltered, price cap).
+
+    uv run benchmarks/flight_search.py --sizes 10,1000,100000,1000000
+"""
+import argparse
+import datetime
+import gc
+import random
+import resource
+import time
+
+from common import load_module, percentiles, print_table
+
+AIRPORTS = ['SFO', 'JFK', 'LAX', 'ORD', 'ATL', 'DFW', 'DEN', 'SEA', 'BOS', 'MIA',
+            'LAS', 'PHX', 'IAH', 'MSP', 'DTW', 'PHL', 'CLT', 'EWR', 'SLC', 'SAN']
+START = datetime.datetime(2025, 9, 1)
+DAYS = 30
+
+
+def synthetic_records(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    for i in range(n):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        departure = START + datetime.timedelta(days=rng.randrange(DAYS), hours=rng.randrange(5, 23))
+        yield (f'DA{i}', origin, destination, departure, round(rng.uniform(1, 12), 2), float(rng.randrange(80, 1200)))
+
+
+def queries(count: int, seed: int = 2) -> list[dict]:
+    rng = random.Random(seed)
+    shapes = []
+    for _ in range(count):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        date = (START + datetime.timedelta(days=rng.randrange(DAYS))).date()
+        shapes.append({
+            'route+date': dict(origin=origin, destination=destination, date=date, criteria='shortest'),
+            'origin only': dict(origin=origin, criteria='cheapest'),
+            'unfiltered': dict(criteria='shortest'),
+            'price cap': dict(origin=origin, destination=destination, criteria='shortest', max_price=300),
+        })
+    return shapes
+
+
+def full_sort_search(flights: list, origin=None, destination=None, date=None, criteria='shortest', max_price=None):
+    """The old search_flights: sort the whole inventory on every call (filters applied after)."""
+    ordered = sorted(flights, key=lambda f: (f.duration, f.price) if criteria == 'shortest' else (f.price, f.duration))
+    return [f for f in ordered
+            if (origin is None or f.origin == origin) and (destination is None or f.destination == destination)
+            and (date is None or (f.date_time.year, f.date_time.month, f.date_time.day) == (date.year, date.month, date.day))
+            and (max_price is None or f.price <= max_price)][:3]
+
+
+def main(sizes: list[int], count: int, baseline_max: int):
+    flight_store = load_module('agents/travel/flight_store.py')
+    rows = []
+    for size in sizes:
+        gc.collect()
+        t0 = time.perf_counter()
+        store = flight_store.FlightStore()
+        store.add_records(synthetic_records(size))
+        load_s = time.perf_counter() - t0
+        gc.freeze()  # Keep the loaded inventory out of full GC passes, as a long-running agent would
+        shapes = queries(count)
+        for shape in shapes[0]:
+            samples = []
+            for q in shapes:
+                t0 = time.perf_counter()
+                store.search(limit=3, **q[shape])
+                samples.append(time.perf_counter() - t0)
+            rows.append({'flights': size, 'query': shape, 'impl': 'FlightStore', 'load s': load_s, **percentiles(samples)})
+            if size <= baseline_max:
+                flights = [store.get(flight_id) for flight_id in store._records]
+                samples = []
+                for q in shapes[:max(count // 20, 5)]:
+                    t0 = time.perf_counter()
+                    full_sort_search(flights, **q[shape])
+                    samples.append(time.perf_counter() - t0)
+                rows.append({'flights': size, 'query': shape, 'impl': 'full sort', **percentiles(samples)})
+        del store
+        gc.unfreeze()
+    print(f'{count} queries per shape, top-3 results (latencies in ms), '
+          f'peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB')
+    print_table(rows, ['flights', 'query', 'impl', 'load s', 'p50', 'p99', 'max'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,1000,10000,100000,1000000')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--baseline-max', type=int, default=100000, help='largest inventory to run the full-sort baseline on')
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(',')], args.queries, args.baseline_max)
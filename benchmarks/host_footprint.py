@@ -0,0 +1,178 @@
+"""Memory and connections of every service as separate processes vs one `agentstr_demo.host` process.
+
+The services of `suite.py` run against the same local stand-ins (stub relay, fake LLM,
+wallet and API stubs), first each in its own process as `suite.py` starts them, then all
+of them in one process started with `python -m agentstr_demo.host`. For each mode, once
+every service is up, it records:
+- resident memory, summed over the processes;
+- websockets open to the relay, and connections opened while idle for `--idle` seconds.
+
+Then each service in turn gets `--conversations` x `--turns` requests, and it records:
+- peak memory;
+- relay and LLM connections opened by the services;
+- replies ok and their latency.
+
+Services that can't start (e.g. a missing optional dependency) are left out of both modes'
+numbers and listed with their error.
+
+    uv run benchmarks/host_footprint.py --conversations 5 --turns 1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from pynostr.key import PrivateKey
+
+from common import ROOT, print_table
+from fake_llm import FakeLLM
+from relay import StubRelay
+from stubs import StubHTTPServer, blockchain_info_routes, frankfurter_routes, tavily_routes
+from suite import COMPONENTS, Service, load, rss_mb, selected, service_environments
+from wallet import StubWallet
+
+logging.disable(logging.WARNING)
+
+
+def load_error(log_path: str, name: str) -> str | None:
+    """The exception the host logged for a service it could not load, if any."""
+    with open(log_path, errors='replace') as f:
+        lines = f.read().splitlines()
+    for i, line in enumerate(lines):
+        if line.endswith(f'Could not load {name}') or line.endswith(f'{name} failed'):
+            error = next((l for l in lines[i + 1:] if l and not l[0].isspace() and not l.startswith('Traceback')), '')
+            return error[:300]
+    return None
+
+
+def memory(processes: list) -> tuple[float, float]:
+    """(current, peak) resident memory in MB, summed over `processes`."""
+    samples = [rss_mb(process.pid) for process in processes]
+    return sum(current or 0 for current, _ in samples), sum(peak or current or 0 for current, peak in samples)
+
+
+async def start_separate(services: dict[str, Service], relay: StubRelay, args) -> list:
+    """Each service in its own process, MCP servers first; returns the processes."""
+    for kind in ('mcp', 'agent'):
+        await asyncio.gather(*[s.start(relay, args.startup_timeout) for s in services.values() if s.component.kind == kind])
+    return [s.process for s in services.values() if s.process is not None]
+
+
+async def start_hosted(services: dict[str, Service], relay: StubRelay, directory: str, args) -> list:
+    """Every service in one host process; returns it."""
+    host_env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [str(ROOT), os.getenv('PYTHONPATH')])),
+                'PYTHONUNBUFFERED': '1'}
+    config = {'services': [{'script': str(ROOT / s.component.script), 'name': name,
+                            'env': {key: value for key, value in s.env.items() if host_env.get(key) != value}}
+                           for name, s in sorted(services.items(), key=lambda item: item[1].component.kind != 'mcp')]}
+    config_path = os.path.join(directory, 'host.json')
+    log_path = os.path.join(directory, 'host.log')
+    with open(config_path, 'w') as f:
+        json.dump(config, f)
+
+    t0 = time.perf_counter()
+    with open(log_path, 'wb') as log:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'agentstr_demo.host', config_path, '--startup-timeout', str(args.startup_timeout),
+            cwd=str(ROOT), env=host_env, stdout=log, stderr=subprocess.STDOUT)
+    for service in services.values():
+        service.process, service.log_path = process, log_path
+    waits = {name: asyncio.create_task(s.wait_ready(relay, len(services) * args.startup_timeout, t0))
+             for name, s in services.items()}
+    # The host logs this line once it started (or gave up on) every service
+    while process.returncode is None and not all(task.done() for task in waits.values()):
+        with open(log_path, errors='replace') as f:
+            if 'Hosting ' in f.read():
+                break
+        await asyncio.sleep(0.1)
+    await asyncio.wait(waits.values(), timeout=5)
+    for name, task in waits.items():
+        task.cancel()
+        if not task.done() or services[name].error:
+            services[name].error = load_error(log_path, name) or services[name].error or 'not ready'
+    return [process]
+
+
+async def measure(mode: str, services: dict[str, Service], processes: list, relay: StubRelay, llm: FakeLLM,
+                  wallet: StubWallet, stubs: dict[str, StubHTTPServer], args) -> tuple[dict, list[dict]]:
+    ready = {name: service for name, service in services.items() if not service.error}
+    row = {'mode': mode, 'processes': len(processes), 'services': f'{len(ready)}/{len(services)}',
+           'rss_idle_mb': memory(processes)[0], 'relay_open': relay.open_connections}
+    relay.reset_counters()
+    await asyncio.sleep(args.idle)
+    row['relay_opened_idle'] = relay.connections
+
+    relay.reset_counters()
+    llm.connections = set()
+    results = {}
+    for name, service in ready.items():
+        print(f'{mode}: loading {name}...', file=sys.stderr)
+        results[name] = await load(service, relay, llm, wallet, stubs, args)
+    row.update({
+        'rss_peak_mb': memory(processes)[1],
+        # Each load's generator holds one connection of its own
+        'relay_opened_load': relay.connections - len(ready),
+        'llm_connections': len(llm.connections),
+        'ok': sum(r['ok'] for r in results.values()),
+        'requests': sum(r['requests'] for r in results.values()),
+    })
+    rows = [{'component': name, 'mode': mode, 'startup_s': services[name].startup_s, 'ok': r['ok'],
+             'requests': r['requests'], 'p50': r['latency_p50_ms'], 'p99': r['latency_p99_ms']} for name, r in results.items()]
+    rows += [{'component': name, 'mode': mode, 'error': service.error[:80]} for name, service in services.items() if service.error]
+    return row, rows
+
+
+async def main(args):
+    names = selected(args.only)
+    logs = tempfile.mkdtemp(prefix='agentstr-host-footprint-')
+    summary, per_service = [], []
+    async with (StubRelay(latency=args.relay_latency) as relay,
+                FakeLLM(args.llm_latency) as llm,
+                StubHTTPServer(blockchain_info_routes(), latency=args.upstream_latency) as blockchain_info,
+                StubHTTPServer(frankfurter_routes(), latency=args.upstream_latency) as frankfurter,
+                StubHTTPServer(tavily_routes(), latency=args.upstream_latency, method='POST') as tavily):
+        wallet = StubWallet(relay)
+        stubs = {'blockchain.info': blockchain_info, 'frankfurter': frankfurter, 'tavily': tavily}
+        for mode in ('separate', 'host'):
+            directory = os.path.join(logs, mode)
+            os.makedirs(directory)
+            keys = {name: PrivateKey() for name in names}
+            envs = service_environments(names, keys, os.path.join(directory, 'data'), relay, llm, wallet, stubs)
+            services = {name: Service(name, COMPONENTS[name], keys[name], env, os.path.join(directory, name.replace('/', '_') + '.log'))
+                        for name, env in envs.items()}
+            try:
+                processes = await (start_separate(services, relay, args) if mode == 'separate' else
+                                   start_hosted(services, relay, directory, args))
+                row, rows = await measure(mode, services, processes, relay, llm, wallet, stubs, args)
+                summary.append(row)
+                per_service += rows
+            finally:
+                await asyncio.gather(*[s.stop() for s in services.values()])
+
+    print(f'{len(names)} services, {args.conversations} conversations x {args.turns} turns each; fake LLM '
+          f'{args.llm_latency:.2f} s (memory in MB, latency in ms); logs in {logs}')
+    print_table(summary, ['mode', 'processes', 'services', 'rss_idle_mb', 'rss_peak_mb', 'relay_open', 'relay_opened_idle',
+                          'relay_opened_load', 'llm_connections', 'ok', 'requests'])
+    print()
+    print_table(sorted(per_service, key=lambda r: r['component']),
+                ['component', 'mode', 'startup_s', 'ok', 'requests', 'p50', 'p99', 'error'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', help=f'comma-separated components (default all): {",".join(COMPONENTS)}')
+    parser.add_argument('--conversations', type=int, default=5)
+    parser.add_argument('--turns', type=int, default=1)
+    parser.add_argument('--ramp', type=float, default=0.5, help='seconds over which conversations start')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for each reply')
+    parser.add_argument('--startup-timeout', type=float, default=90)
+    parser.add_argument('--idle', type=float, default=10, help='seconds to count connections opened by idle services')
+    parser.add_argument('--llm-latency', type=float, default=0.1, help='seconds to the first token')
+    parser.add_argument('--relay-latency', type=float, default=0.0)
+    parser.add_argument('--upstream-latency', type=float, default=0.05, help='seconds the HTTP stubs take to answer')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""Handshake savings of the shared HTTPPool at 100+ concurrent tool calls.
+
+Simulates MCP tool calls that each make one upstream request to a local stub, either
+opening a fresh `httpx.AsyncClient` per call (the old behaviour) or going through one
+server-scoped `HTTPPool`. Reports connections opened and call latency.
+
+    uv run benchmarks/http_pool.py --calls 200 --concurrency 200 --tls
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import tempfile
+import time
+
+import httpx
+
+from agentstr_demo.http import HTTPPool
+from common import percentiles, print_table
+from stubs import StubHTTPServer, self_signed_tls
+
+
+async def run_calls(call, calls: int, concurrency: int) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def timed():
+        async with semaphore:
+            t0 = time.perf_counter()
+            response = await call()
+            response.raise_for_status()
+            samples.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[timed() for _ in range(calls)])
+    return samples, time.perf_counter() - t0
+
+
+async def main(calls: int, concurrency: int, rounds: int, latency: float, tls: bool, per_host: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        server_ssl, client_ssl = self_signed_tls(tmp) if tls else (None, None)
+        verify = client_ssl if tls else True
+        async with StubHTTPServer({'/rate': '{"rates": {"EUR": 0.9}}'}, latency=latency, ssl_context=server_ssl) as stub:
+            url = f'{stub.url}/rate'
+
+            async def fresh_client_call():
+                # Like `httpx.AsyncClient()` in the old tools, every client builds its own SSL context
+                fresh_verify = ssl.create_default_context(cafile=os.path.join(tmp, 'cert.pem')) if tls else True
+                async with httpx.AsyncClient(verify=fresh_verify) as client:
+                    return await client.get(url)
+
+            rows = []
+            stub.reset_counters()
+            samples, elapsed = [], 0.0
+            for _ in range(rounds):
+                s, e = await run_calls(fresh_client_call, calls, concurrency)
+                samples += s
+                elapsed += e
+            rows.append({'client': 'fresh per call', 'requests': stub.requests, 'connections': len(stub.connections),
+                         'calls/s': len(samples) / elapsed, **percentiles(samples)})
+
+            async with HTTPPool(max_keepalive_connections=per_host, per_host_limit=per_host, verify=verify) as pool:
+                stub.reset_counters()
+                samples, elapsed = [], 0.0
+                for _ in range(rounds):
+                    s, e = await run_calls(lambda: pool.get(url), calls, concurrency)
+                    samples += s
+                    elapsed += e
+                rows.append({'client': 'HTTPPool', 'requests': stub.requests, 'connections': len(stub.connections),
+                             'calls/s': len(samples) / elapsed, **percentiles(samples)})
+
+    print(f'{"https" if tls else "http"} calls={calls} x {rounds} rounds concurrency={concurrency} per_host={per_host} '
+          f'upstream latency={latency * 1000:.0f}ms (latencies in ms)')
+    print_table(rows, ['client', 'requests', 'connections', 'calls/s', 'p50', 'p90', 'p99', 'max'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--per-host', type=int, default=20, help='HTTPPool per-host concurrency cap')
+    parser.add_argument('--tls', action='store_true', help='serve the stub over HTTPS with a self-signed certificate')
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency, args.rounds, args.latency, args.tls, args.per_host))
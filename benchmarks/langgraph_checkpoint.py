@@ -0,0 +1,110 @@
+"""LangGraph agent checkpoints: memory and per-turn cost of `MemorySaver` vs `SQLiteCheckpointer`.
+
+Runs the bitcoin/news agents' graph (`create_react_agent`) with a fake chat model that calls
+one tool and then answers, for `--threads` conversations of `--turns` turns each. Every
+checkpointer runs in a fresh process, so the peak RSS of each is comparable; the run
+without a checkpointer is the baseline for the per-turn overhead. The SQLite run also
+reopens the database and continues a few threads to check that history survives a restart.
+
+    uv run benchmarks/langgraph_checkpoint.py --threads 20000 --turns 3
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from common import percentiles, print_table
+
+warnings.filterwarnings('ignore')
+
+BITCOIN_DATA = json.dumps({'price_usd': 104123.5, 'block_height': 901234, 'hashrate': 8.1e20,
+                           'difficulty': 1.2e14, 'mempool': {'count': 41234, 'vsize': 21345678}} | {
+                           f'field_{i}': 'x' * 20 for i in range(12)})
+
+
+def build_agent(checkpointer):
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.tools import tool
+    from langgraph.prebuilt import create_react_agent
+
+    @tool
+    def get_bitcoin_data() -> str:
+        """Current bitcoin price and network stats."""
+        return BITCOIN_DATA
+
+    class FakeModel(GenericFakeChatModel):
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+    def replies():
+        while True:
+            yield AIMessage('', tool_calls=[{'name': 'get_bitcoin_data', 'args': {}, 'id': 'call'}])
+            yield AIMessage('Bitcoin is trading at $104,123 at block 901,234.')
+
+    return create_react_agent(FakeModel(messages=replies()), [get_bitcoin_data], checkpointer=checkpointer)
+
+
+async def run_saver(saver: str, threads: int, turns: int, db_path: str) -> dict:
+    from langgraph.checkpoint.memory import MemorySaver
+    from agentstr_demo.checkpoint import SQLiteCheckpointer
+
+    checkpointer = {'none': lambda: None, 'MemorySaver': MemorySaver,
+                    'SQLiteCheckpointer': lambda: SQLiteCheckpointer(db_path)}[saver]()
+    agent = build_agent(checkpointer)
+    await agent.ainvoke({'messages': [('user', 'warm up')]}, {'configurable': {'thread_id': 'warm-up'}})
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    samples = []
+    t0 = time.perf_counter()
+    for turn in range(turns):
+        for thread in range(threads):
+            start = time.perf_counter()
+            await agent.ainvoke({'messages': [('user', f'What is the bitcoin price? ({turn})')]},
+                                {'configurable': {'thread_id': f'thread-{thread}'}})
+            samples.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - t0
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    row = {'checkpointer': saver, 'turns': len(samples), 'turns_per_s': len(samples) / elapsed, **percentiles(samples),
+           'rss_growth_mb': (after - before) / 1024}
+    if saver == 'SQLiteCheckpointer':
+        checkpointer.close()
+        row['db_mb'] = sum(os.path.getsize(p) for p in (db_path, db_path + '-wal') if os.path.exists(p)) / 2**20
+        reopened = SQLiteCheckpointer(db_path)
+        agent = build_agent(reopened)
+        state = await agent.ainvoke({'messages': [('user', 'And now?')]}, {'configurable': {'thread_id': 'thread-0'}})
+        row['restored'] = len(state['messages']) == 4 * (turns + 1)
+    return row
+
+
+def run_in_process(*args) -> dict:
+    return asyncio.run(run_saver(*args))
+
+
+def main(args):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for saver in args.checkpointers.split(','):
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                rows.append(pool.submit(run_in_process, saver, args.threads, args.turns,
+                                        os.path.join(tmp, f'{saver}.sqlite3')).result())
+    baseline = next((row['p50'] for row in rows if row['checkpointer'] == 'none'), None)
+    for row in rows:
+        if baseline is not None:
+            row['overhead_p50'] = row['p50'] - baseline
+    print(f'{args.threads} threads x {args.turns} turns, ReAct agent with one tool call per turn (latency in ms)')
+    print_table(rows, ['checkpointer', 'turns', 'turns_per_s', 'p50', 'p99', 'overhead_p50', 'rss_growth_mb', 'db_mb',
+                       'restored'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=5000)
+    parser.add_argument('--turns', type=int, default=3)
+    parser.add_argument('--checkpointers', default='none,MemorySaver,SQLiteCheckpointer')
+    main(parser.parse_args())
@@ -0,0 +1,428 @@
+"""Load generator for any agent or MCP server that is reachable over Nostr DMs.
+
+`--conversations` simulated users, each with its own key, talk to the target at the same
+time. Each user sends `--turns` messages one after the other and waits for the reply before
+sending the next. Users start spread over `--ramp` seconds. Agents and MCP servers don't
+reference the request in their reply, so a reply is matched by its recipient: a user has
+one request in flight at a time. A user whose reply doesn't arrive within `--timeout` stops,
+because a late reply could no longer be matched. Streamed replies (`agentstr_demo.streaming`)
+are reassembled, and the time to the first piece is reported as well.
+
+Every request ends with one outcome:
+- ok
+- busy, the scheduler's "too many requests" reply
+- turn_timeout, the "took too long" reply
+- error, an error reply or an MCP error result
+- invoice, the target asked to be paid (only if the generator can't pay)
+- partial, a stream that stopped part way
+- no_reply
+- rejected, every relay refused the request
+
+The generator prints the outcome counts, latency percentiles and a latency histogram. With
+`--json` it also writes them to a file.
+
+    # An agent from agents/ or a server from mcp_servers/, running against the same relays
+    uv run benchmarks/loadgen.py agent npub1... --relays wss://relay.damus.io --conversations 20 \\
+        --message 'What is the bitcoin hashrate?'
+    uv run benchmarks/loadgen.py mcp npub1... --tool get_bitcoin_data --arguments '{}'
+    # Self-contained: an in-process relay and an agent (or MCP tool) with a fake LLM latency
+    uv run benchmarks/loadgen.py agent --local --conversations 200 --turns 3 --stream
+    # Only the in-process relay, for services started by hand with NOSTR_RELAYS=ws://127.0.0.1:7777
+    uv run benchmarks/loadgen.py relay --port 7777
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import asdict, dataclass
+
+from pynostr.encrypted_dm import EncryptedDirectMessage
+from pynostr.event import Event, EventKind
+from pynostr.key import PrivateKey
+from pynostr.utils import get_public_key
+
+from common import percentiles, print_table
+from relay import StubRelay
+
+logging.disable(logging.WARNING)
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+
+def classify_agent_reply(text: str) -> str:
+    """The outcome of an agent's reply, from the stock replies of `AgentServer` and `NostrAgentServer`."""
+    text = text.strip()
+    if text.startswith("I'm handling too many requests"):
+        return 'busy'
+    if text.startswith('Sorry, your request took too long'):
+        return 'turn_timeout'
+    if text.startswith('Error in direct message callback'):
+        return 'error'
+    if text.startswith('lnbc') or 'Please pay ' in text:
+        return 'invoice'
+    return 'ok'
+
+
+def classify_mcp_reply(text: str) -> str:
+    """The outcome of an MCP server's reply to a `call_tool` request."""
+    if text.strip().startswith('lnbc'):
+        return 'invoice'
+    try:
+        reply = json.loads(text)
+    except json.JSONDecodeError:
+        return 'error'
+    if not isinstance(reply, dict) or 'error' in reply or reply.get('isError'):
+        return 'error'
+    return 'ok'
+
+
+@dataclass
+class TurnResult:
+    conversation: int
+    turn: int
+    outcome: str
+    latency: float | None = None  # Seconds from sending to the complete reply
+    first: float | None = None  # Seconds from sending to the first piece of the reply
+    pieces: int = 0
+    reply_chars: int = 0
+    invoices_paid: int = 0
+
+
+class _Conversation:
+    def __init__(self, index: int):
+        self.index = index
+        self.key = PrivateKey()
+        self.pubkey = self.key.public_key.hex()
+        self.replies: asyncio.Queue[str | _Rejected] = asyncio.Queue()
+
+
+class _Rejected:
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+class LoadGenerator:
+    """Runs concurrent conversations with one Nostr agent or MCP server.
+
+    All users share one websocket per relay, with a single subscription for the replies to
+    any of them, so the generator's own cost stays small next to the target's.
+    """
+    def __init__(self,
+                 relays: list[str],
+                 target: str,
+                 request: Callable[[int, int], str],
+                 classify: Callable[[str], str] = classify_agent_reply,
+                 conversations: int = 10,
+                 turns: int = 3,
+                 think_time: float = 0.0,
+                 ramp: float = 0.0,
+                 timeout: float = 60.0,
+                 pay: Callable[[str], Awaitable[None]] | None = None):
+        """Initialize the generator.
+
+        Args:
+            relays: Relay URLs to publish to and read replies from.
+            target: Public key of the agent or MCP server (hex or bech32).
+            request: (conversation, turn) -> the message to send.
+            classify: Reply text -> outcome ('ok' for a successful reply).
+            conversations: Users talking to the target at the same time.
+            turns: Messages each user sends, one after the other.
+            think_time: Seconds a user waits after a reply before sending the next message.
+            ramp: Seconds over which the users start.
+            timeout: Seconds to wait for each reply.
+            pay: Pays a BOLT11 invoice the target replied with, after which the generator keeps
+                waiting for the answer (invoices end the request if None).
+        """
+        self.relays = relays
+        self.target = get_public_key(target).hex()
+        self.request = request
+        self.classify = classify
+        self.conversations = conversations
+        self.turns = turns
+        self.think_time = think_time
+        self.ramp = ramp
+        self.timeout = timeout
+        self.pay = pay
+        self.elapsed = 0.0
+        self._by_pubkey: dict[str, _Conversation] = {}
+        self._sockets = []
+        self._unconfirmed: dict[str, list] = {}  # Event id -> [conversation, relays yet to answer]
+        self._seen: set[str] = set()
+
+    async def run(self) -> list[TurnResult]:
+        """Run every conversation to the end and return the result of each request sent."""
+        from websockets.asyncio.client import connect
+
+        conversations = [_Conversation(i) for i in range(self.conversations)]
+        self._by_pubkey = {c.pubkey: c for c in conversations}
+        subscription = {'authors': [self.target], 'kinds': [EventKind.ENCRYPTED_DIRECT_MESSAGE],
+                        '#p': list(self._by_pubkey), 'since': int(time.time()) - 1}
+        async with AsyncExitStack() as stack:
+            self._sockets = [await stack.enter_async_context(connect(url, max_size=None)) for url in self.relays]
+            subscribed = [asyncio.Event() for _ in self._sockets]
+            readers = [asyncio.create_task(self._read(ws, ready)) for ws, ready in zip(self._sockets, subscribed)]
+            try:
+                for ws in self._sockets:
+                    await ws.send(json.dumps(['REQ', 'loadgen', subscription]))
+                await asyncio.wait_for(asyncio.gather(*[ready.wait() for ready in subscribed]), self.timeout)
+                t0 = time.perf_counter()
+                delay = self.ramp / self.conversations
+                results = await asyncio.gather(*[self._converse(c, c.index * delay) for c in conversations])
+                self.elapsed = time.perf_counter() - t0
+            finally:
+                for reader in readers:
+                    reader.cancel()
+        return [result for turns in results for result in turns]
+
+    async def _converse(self, conversation: _Conversation, delay: float) -> list[TurnResult]:
+        await asyncio.sleep(delay)
+        results = []
+        for turn in range(self.turns):
+            if turn and self.think_time:
+                await asyncio.sleep(self.think_time)
+            results.append(await self._turn(conversation, turn))
+            if results[-1].outcome in ('no_reply', 'partial'):
+                break
+        return results
+
+    async def _turn(self, conversation: _Conversation, turn: int) -> TurnResult:
+        from agentstr_demo.streaming import StreamAssembler, parse_chunk
+
+        dm = EncryptedDirectMessage()
+        dm.encrypt(conversation.key.hex(), cleartext_content=self.request(conversation.index, turn),
+                   recipient_pubkey=self.target)
+        event = dm.to_event()
+        event.sign(conversation.key.hex())
+        self._unconfirmed[event.id] = [conversation, len(self._sockets)]
+        t0 = time.perf_counter()
+        message = json.dumps(['EVENT', event.to_dict()])
+        await asyncio.gather(*[ws.send(message) for ws in self._sockets], return_exceptions=True)
+
+        result = TurnResult(conversation.index, turn, 'no_reply')
+        assembler = StreamAssembler()
+        deadline = t0 + self.timeout
+        while True:
+            try:
+                reply = await asyncio.wait_for(conversation.replies.get(), max(deadline - time.perf_counter(), 0))
+            except TimeoutError:
+                if result.pieces:
+                    result.outcome = 'partial'
+                return result
+            if isinstance(reply, _Rejected):
+                result.outcome = 'rejected'
+                return result
+            now = time.perf_counter() - t0
+            result.pieces += 1
+            result.first = result.first or now
+            chunk = parse_chunk(reply)
+            if chunk is not None:
+                assembler.add(chunk)
+                if not assembler.complete:
+                    continue
+                reply = assembler.text
+            result.outcome = self.classify(reply)
+            invoice = re.search(r'lnbc[0-9a-z]+', reply) if result.outcome == 'invoice' and self.pay else None
+            if invoice is not None:
+                await self.pay(invoice.group())
+                result.invoices_paid += 1
+                assembler = StreamAssembler()
+                continue
+            result.latency = now
+            result.reply_chars = len(reply)
+            return result
+
+    async def _read(self, ws, subscribed: asyncio.Event):
+        async for raw in ws:
+            message = json.loads(raw)
+            if message[0] == 'EVENT' and len(message) > 2:
+                self._on_reply(message[2])
+            elif message[0] == 'EOSE':
+                subscribed.set()
+            elif message[0] == 'OK' and len(message) > 2:
+                self._on_ok(message[1], message[2], message[3] if len(message) > 3 else '')
+
+    def _on_reply(self, data: dict):
+        if data['id'] in self._seen:
+            return
+        self._seen.add(data['id'])
+        recipient = next((tag[1] for tag in data.get('tags', []) if len(tag) > 1 and tag[0] == 'p'), None)
+        conversation = self._by_pubkey.get(recipient)
+        if conversation is None:
+            return
+        try:
+            event = Event.from_dict(data)
+            dm = EncryptedDirectMessage.from_event(event)
+            dm.decrypt(conversation.key.hex(), public_key_hex=event.pubkey)
+        except Exception:
+            return
+        conversation.replies.put_nowait(dm.cleartext_content)
+
+    def _on_ok(self, event_id: str, accepted: bool, reason: str):
+        pending = self._unconfirmed.get(event_id)
+        if pending is None:
+            return
+        if accepted:
+            del self._unconfirmed[event_id]
+            return
+        pending[1] -= 1
+        if not pending[1]:
+            del self._unconfirmed[event_id]
+            pending[0].replies.put_nowait(_Rejected(reason))
+
+
+def histogram(latencies: list[float]) -> list[dict]:
+    """Requests per latency bucket; `le_ms` is each bucket's upper bound in milliseconds."""
+    counts = Counter(next(i for i, bound in enumerate(BUCKETS) if latency <= bound) for latency in latencies)
+    return [{'le_ms': bound * 1000 if bound != math.inf else 'inf', 'count': counts[i]}
+            for i, bound in enumerate(BUCKETS)]
+
+
+def summarize(results: list[TurnResult], elapsed: float) -> dict:
+    """Outcome counts, error rate, throughput and latency of a run, JSON-serializable."""
+    outcomes = Counter(result.outcome for result in results)
+    ok = [result for result in results if result.outcome == 'ok']
+    latencies = [result.latency for result in ok]
+    return {
+        'requests': len(results),
+        'ok': len(ok),
+        'error_rate': 1 - len(ok) / len(results) if results else 0.0,
+        'outcomes': dict(outcomes),
+        'elapsed_s': elapsed,
+        'ok_per_s': len(ok) / elapsed if elapsed else 0.0,
+        'latency_ms': percentiles(latencies),
+        'first_ms': percentiles([result.first for result in ok]),
+        'pieces_per_reply': sum(result.pieces for result in ok) / len(ok) if ok else 0.0,
+        'histogram': histogram(latencies),
+    }
+
+
+def print_summary(summary: dict):
+    outcomes = ', '.join(f'{outcome} {count}' for outcome, count in sorted(summary['outcomes'].items()))
+    print(f"{summary['requests']} requests in {summary['elapsed_s']:.1f} s: {outcomes}; "
+          f"error rate {summary['error_rate']:.1%}, {summary['ok_per_s']:.1f} ok/s, "
+          f"{summary['pieces_per_reply']:.1f} DMs per reply (latency of ok replies, in ms)")
+    print_table([{'': 'complete', **summary['latency_ms']}, {'': 'first piece', **summary['first_ms']}],
+                ['', 'p50', 'p90', 'p99', 'max'])
+    print()
+    peak = max((bucket['count'] for bucket in summary['histogram']), default=0) or 1
+    for bucket in summary['histogram']:
+        bound = bucket['le_ms'] if bucket['le_ms'] == 'inf' else f"{bucket['le_ms']:g}"
+        print(f"<= {bound:>6} ms  {bucket['count']:6d}  {'#' * round(40 * bucket['count'] / peak)}")
+
+
+@asynccontextmanager
+async def local_target(kind: str, args):
+    """An in-process relay with an agent or MCP server on it; yields (relay url, target pubkey)."""
+    from agentstr import AgentCard, NostrClient
+    from agentstr_demo.server import AgentServer, MCPServer
+
+    rng = random.Random(1)
+
+    def llm_latency() -> float:
+        return rng.lognormvariate(math.log(args.llm_latency), 0.5)
+
+    key = PrivateKey()
+    async with StubRelay(latency=args.relay_latency) as relay:
+        client = NostrClient([relay.url], key.bech32())
+        if kind == 'agent':
+            async def agent_callable(input):
+                await asyncio.sleep(llm_latency())
+                return f'You said: {input.messages[-1]}'
+
+            async def streaming_agent_callable(input):
+                for word in f'You said: {input.messages[-1]}'.split():
+                    await asyncio.sleep(llm_latency() / 5)
+                    yield word + ' '
+            info = AgentCard(name='Load Test Agent', description='Echoes after a fake LLM delay.', skills=[],
+                             satoshis=0, nostr_pubkey=key.public_key.bech32())
+            server = AgentServer(client, agent_info=info, stream=args.stream, stream_interval=args.llm_latency / 2,
+                                 agent_callable=streaming_agent_callable if args.stream else agent_callable)
+        else:
+            async def echo(text: str) -> str:
+                """Returns the text after a fake delay."""
+                await asyncio.sleep(llm_latency())
+                return text
+            server = MCPServer('Load Test Server', nostr_client=client, tools=[echo])
+        task = asyncio.create_task(server.start())
+        while not any(f.get('kinds') == [4] for filters in relay._subscriptions.values() for f in filters):
+            await asyncio.sleep(0.01)
+        try:
+            yield relay.url, key.public_key.hex()
+        finally:
+            task.cancel()
+
+
+async def serve_relay(port: int):
+    async with StubRelay(port=port) as relay:
+        print(f'Relay listening on {relay.url}')
+        await asyncio.Event().wait()
+
+
+async def main(args):
+    if args.target == 'relay':
+        return await serve_relay(args.port)
+
+    if args.target == 'agent':
+        messages = args.message or ['Hello from conversation {conversation}, turn {turn}']
+        request = lambda c, t: messages[(c + t) % len(messages)].format(conversation=c, turn=t)
+        classify = classify_agent_reply
+    else:
+        tool = args.tool or ('echo' if args.local else None)
+        if tool is None:
+            raise SystemExit('--tool is required for an MCP server')
+        arguments = json.loads(args.arguments or ('{"text": "hello"}' if args.local else '{}'))
+        request = lambda c, t: json.dumps({'action': 'call_tool', 'tool_name': tool, 'arguments': arguments})
+        classify = classify_mcp_reply
+
+    async with AsyncExitStack() as stack:
+        if args.local:
+            url, pubkey = await stack.enter_async_context(local_target(args.target, args))
+            relays = [url]
+        else:
+            if not args.pubkey or not args.relays:
+                raise SystemExit('Give the target pubkey and --relays (or NOSTR_RELAYS), or use --local')
+            relays, pubkey = args.relays.split(','), args.pubkey
+        generator = LoadGenerator(relays, pubkey, request, classify, conversations=args.conversations,
+                                  turns=args.turns, think_time=args.think, ramp=args.ramp, timeout=args.timeout)
+        results = await generator.run()
+
+    summary = summarize(results, generator.elapsed)
+    print(f'{args.conversations} conversations x {args.turns} turns with {"a local " if args.local else ""}'
+          f'{args.target} {pubkey[:12]}..., started over {args.ramp:.1f} s')
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'target': args.target, 'pubkey': pubkey, 'conversations': args.conversations,
+                       'turns': args.turns, **summary, 'requests_detail': [asdict(r) for r in results]}, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('target', choices=['agent', 'mcp', 'relay'])
+    parser.add_argument('pubkey', nargs='?', help='npub or hex public key of the agent or MCP server')
+    parser.add_argument('--relays', default=os.getenv('NOSTR_RELAYS'), help='comma-separated relay URLs')
+    parser.add_argument('--local', action='store_true', help='run an in-process relay and target')
+    parser.add_argument('--conversations', type=int, default=20)
+    parser.add_argument('--turns', type=int, default=3)
+    parser.add_argument('--think', type=float, default=0.0, help='seconds between a reply and the next message')
+    parser.add_argument('--ramp', type=float, default=1.0, help='seconds over which conversations start')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for each reply')
+    parser.add_argument('--message', action='append', help='agent message, with {conversation} and {turn} '
+                                                           'placeholders; repeat to cycle through several')
+    parser.add_argument('--tool', help='MCP tool to call')
+    parser.add_argument('--arguments', help='JSON arguments of the MCP tool')
+    parser.add_argument('--json', help='also write the summary and every request to this file')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='--local: median seconds per fake LLM call')
+    parser.add_argument('--relay-latency', type=float, default=0.0, help='--local: seconds the relay adds per message')
+    parser.add_argument('--stream', action='store_true', help='--local: stream the agent replies')
+    parser.add_argument('--port', type=int, default=7777, help='relay: port to listen on')
+    asyncio.run(main(parser.parse_args()))
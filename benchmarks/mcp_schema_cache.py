@@ -0,0 +1,108 @@
+"""Agent time-to-first-ready with MCP tool schemas fetched at startup vs saved on disk.
+
+Times `to_langgraph_tools` (what the bitcoin and news agents await before they can serve)
+with the plain `NostrMCPClient`, which fetches the server's tool list over the relays, and
+with `CachedMCPClient(schema_cache=...)`, which starts from the schemas saved on the last
+run and revalidates them in the background. Cases: a relay answering after `--latency`
+seconds, a relay that accepts the connection but never answers (the client gives up after
+its 30 second timeout), a relay that doesn't have the server's card (the server went offline
+and the relay dropped it), an unreachable relay, and a server whose tools changed since the
+last run (reports how long until the background revalidation rebuilt the tools).
+
+    uv run benchmarks/mcp_schema_cache.py --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from pynostr.event import Event, EventKind
+from pynostr.key import PrivateKey
+
+from common import print_table
+from relay import StubRelay
+
+logging.disable(logging.WARNING)
+
+
+def server_card(key: PrivateKey, tools: int, version: int = 1) -> dict:
+    """The kind 0 metadata an MCP server publishes: its tool list as JSON in `about`."""
+    about = {'tools': [{'name': f'tool_{i}', 'description': f'Tool {i}, version {version}.', 'satoshis': 10,
+                        'inputSchema': {'type': 'object', 'properties': {'query': {'type': 'string'}},
+                                        'required': ['query']}} for i in range(tools)]}
+    event = Event(kind=EventKind.SET_METADATA, content=json.dumps({'name': 'MCP Server', 'about': json.dumps(about)}),
+                  pubkey=key.public_key.hex(), created_at=int(time.time()) + version)
+    event.sign(key.hex())
+    return event.to_dict()
+
+
+async def time_to_ready(client) -> tuple[float, str]:
+    from agentstr.mcp.langgraph import to_langgraph_tools
+    t0 = time.perf_counter()
+    try:
+        tools = await asyncio.wait_for(to_langgraph_tools(client), 60)
+        return time.perf_counter() - t0, f'{len(tools)} tools'
+    except Exception as e:
+        return time.perf_counter() - t0, f'failed: {type(e).__name__}'
+
+
+async def run_case(case: str, args, tmp: str) -> list[dict]:
+    from agentstr import NostrMCPClient
+    from agentstr_demo.mcp_cache import CachedMCPClient
+
+    server_key, agent_key = PrivateKey(), PrivateKey()
+    schema_cache = os.path.join(tmp, f'{case}.sqlite3')
+    async with StubRelay(latency=args.latency) as relay:
+        relay.add_event(server_card(server_key, args.tools))
+        new_client = lambda url: NostrMCPClient(server_key.public_key.bech32(), relays=[url], private_key=agent_key.bech32())
+        # A previous run saved the schemas
+        await CachedMCPClient(new_client(relay.url), schema_cache=schema_cache).list_tools()
+
+        url = relay.url
+        if case == 'card missing':
+            relay.events.clear()
+            relay._replaceable.clear()
+        elif case == 'relay not answering':
+            relay.latency = 40  # longer than the 30 second timeout of the relay client
+        elif case == 'relay unreachable':
+            url = 'ws://127.0.0.1:9'
+        elif case == 'tools changed':
+            relay.add_event(server_card(server_key, args.tools + 1, version=2))
+
+        rows = []
+        seconds, result = await time_to_ready(new_client(url))
+        rows.append({'case': case, 'client': 'NostrMCPClient', 'ready_s': seconds, 'result': result})
+        refreshed = asyncio.Event()
+
+        async def on_change():
+            refreshed.set()
+        cached = CachedMCPClient(new_client(url), schema_cache=schema_cache, on_schema_change=on_change)
+        t0 = time.perf_counter()
+        seconds, result = await time_to_ready(cached)
+        row = {'case': case, 'client': 'CachedMCPClient', 'ready_s': seconds, 'result': result}
+        if case == 'tools changed':
+            await asyncio.wait_for(refreshed.wait(), 60)
+            row['refreshed_s'] = time.perf_counter() - t0
+        elif cached._revalidation is not None:
+            cached._revalidation.cancel()
+        rows.append(row)
+        return rows
+
+
+async def main(args):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for case in ('slow relay', 'relay not answering', 'card missing', 'relay unreachable', 'tools changed'):
+            rows += await run_case(case, args, tmp)
+    print(f'{args.tools} tools, relay answering after {args.latency:.2f} s (seconds until the agent has its tools)')
+    print_table(rows, ['case', 'client', 'ready_s', 'result', 'refreshed_s'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds the relay takes to answer each message')
+    parser.add_argument('--tools', type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,103 @@
+"""Agent-side memoization of remote MCP tool calls (`agentstr_demo.mcp_cache.CachedMCPClient`).
+
+Runs the bitcoin MCP server against a local blockchain.info stub and an in-process relay,
+and replays a trace of `get_bitcoin_data` calls as the bitcoin agent would make them:
+`--rate` questions per minute over `--minutes` simulated minutes, each from `--burst`
+conversations at once. Every call is a real encrypted round trip over the relay, once per
+call with the plain `NostrMCPClient` and only on a miss with the agent's cache policy (`--ttl`,
+30 seconds). The trace runs on a simulated clock, so it takes a few seconds. Satoshis saved
+assume the tool costs `--sats` per call.
+
+    uv run benchmarks/mcp_tool_cache.py --rate 20 --minutes 10 --burst 3
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+from pynostr.key import PrivateKey
+
+from common import load_module, percentiles, print_table
+from relay import StubRelay
+from stubs import StubHTTPServer, blockchain_info_routes
+
+logging.disable(logging.WARNING)
+
+
+def trace(rate: float, minutes: float, seed: int = 1) -> list[float]:
+    """Arrival times in seconds, Poisson at `rate` per minute."""
+    rng = random.Random(seed)
+    times, now = [], 0.0
+    while True:
+        now += rng.expovariate(rate / 60)
+        if now >= minutes * 60:
+            return times
+        times.append(now)
+
+
+async def replay(client, arrivals: list[float], burst: int, clock: list[float]) -> list[float]:
+    samples = []
+
+    async def call():
+        t0 = time.perf_counter()
+        result = await client.call_tool('get_bitcoin_data', {})
+        assert result and not result.get('isError'), result
+        samples.append(time.perf_counter() - t0)
+
+    for at in arrivals:
+        clock[0] = at
+        await asyncio.gather(*[call() for _ in range(burst)])
+    return samples
+
+
+async def main(args):
+    from agentstr import NostrMCPClient
+    from agentstr_demo.mcp_cache import CachedMCPClient, ToolPolicy
+
+    server_key, agent_key = PrivateKey(), PrivateKey()
+    arrivals = trace(args.rate, args.minutes)
+    async with StubRelay() as relay, StubHTTPServer(blockchain_info_routes(), latency=0.05) as upstream:
+        os.environ.update(NOSTR_RELAYS=relay.url, MCP_SERVER_PRIVATE_KEY=server_key.bech32(),
+                          BLOCKCHAIN_INFO_URL=upstream.url)
+        bitcoin = load_module('mcp_servers/bitcoin/server.py')
+        server = asyncio.create_task(bitcoin.run())
+        mcp_client = NostrMCPClient(server_key.public_key.bech32(), relays=[relay.url], private_key=agent_key.bech32())
+        while not relay.query([{'kinds': [0], 'authors': [server_key.public_key.hex()]}]):
+            await asyncio.sleep(0.05)
+        await mcp_client.list_tools()
+        mcp_client.tool_to_sats_map['get_bitcoin_data'] = args.sats
+
+        rows = []
+        t0 = time.perf_counter()
+        samples = await replay(mcp_client, arrivals, args.burst, [0.0])
+        rows.append({'client': 'NostrMCPClient', 'calls': len(samples), 'round_trips': len(samples), 'hit_rate': 0.0,
+                     'sats_spent': len(samples) * args.sats, 'sats_saved': 0, **percentiles(samples),
+                     'seconds': time.perf_counter() - t0})
+
+        clock = [0.0]
+        cached = CachedMCPClient(mcp_client, {'get_bitcoin_data': ToolPolicy(ttl=args.ttl)}, clock=lambda: clock[0])
+        t0 = time.perf_counter()
+        samples = await replay(cached, arrivals, args.burst, clock)
+        metrics = cached.metrics()['get_bitcoin_data']
+        rows.append({'client': 'CachedMCPClient', 'calls': metrics['calls'], 'round_trips': metrics['remote_calls'],
+                     'hit_rate': metrics['hit_rate'], 'coalesced': metrics['coalesced'],
+                     'sats_spent': metrics['remote_calls'] * args.sats, 'sats_saved': metrics['sats_saved'],
+                     **percentiles(samples), 'seconds': time.perf_counter() - t0})
+        server.cancel()
+
+    print(f'{len(arrivals)} questions x {args.burst} conversations over {args.minutes:.0f} simulated minutes, '
+          f'ttl {args.ttl:.0f} s, {args.sats} sats per call (latency in ms)')
+    print_table(rows, ['client', 'calls', 'round_trips', 'hit_rate', 'coalesced', 'sats_spent', 'sats_saved',
+                       'p50', 'p99', 'seconds'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=20, help='questions per minute')
+    parser.add_argument('--minutes', type=float, default=10)
+    parser.add_argument('--burst', type=int, default=3, help='conversations calling the tool at the same moment')
+    parser.add_argument('--ttl', type=float, default=30)
+    parser.add_argument('--sats', type=int, default=10, help='assumed price of one call')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,117 @@
+"""Cost of `agentstr_demo.metrics` updates and scrapes, and what a scrape shows under load.
+
+First the cost of a counter increment, a labeled increment and a histogram observation,
+and the time to render `--series` series. Then a local agent (`loadgen.local_target`)
+takes `--conversations` x `--turns` requests while its metrics are scraped every
+`--interval` seconds over HTTP: the scrape latency, the turns in flight and queued over
+time, and the final counters and latency histogram.
+
+    uv run benchmarks/metrics_endpoint.py --conversations 100 --turns 3 --interval 0.25
+"""
+import argparse
+import asyncio
+import logging
+import re
+import time
+from types import SimpleNamespace
+
+from common import percentiles, print_table
+from loadgen import LoadGenerator, classify_agent_reply, local_target, summarize
+
+from agentstr_demo import metrics
+
+logging.disable(logging.WARNING)
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$')
+
+
+def parse(text: str) -> dict[str, float]:
+    """Samples of a Prometheus text exposition, keyed by name and labels."""
+    samples = {}
+    for line in text.splitlines():
+        match = SAMPLE.match(line)
+        if match:
+            samples[match[1] + (match[2] or '')] = float(match[3])
+    return samples
+
+
+def per_op(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def micro(args) -> tuple[list[dict], float, int]:
+    """Nanoseconds per update, and milliseconds and bytes to render `--series` labeled series."""
+    registry = metrics.Registry()
+    counter = metrics.Counter('bench_total', 'Benchmark counter.', ['tool'], registry=registry)
+    histogram = metrics.Histogram('bench_seconds', 'Benchmark histogram.', ['tool'], registry=registry)
+    child, buckets = counter.labels('get_price'), histogram.labels('get_price')
+    rows = [
+        {'operation': 'counter child inc()', 'ns': per_op(child.inc, args.iterations)},
+        {'operation': 'counter labels(tool).inc()', 'ns': per_op(lambda: counter.labels('get_price').inc(), args.iterations)},
+        {'operation': 'histogram child observe()', 'ns': per_op(lambda: buckets.observe(0.3), args.iterations)},
+    ]
+    for i in range(args.series):
+        counter.labels(f'tool{i}').inc()
+        histogram.labels(f'tool{i}').observe(i / args.series)
+    start = time.perf_counter()
+    text = registry.expose()
+    return rows, (time.perf_counter() - start) * 1000, len(text)
+
+
+async def scrape(port: int) -> tuple[float, str]:
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n')
+    response = await reader.read()
+    writer.close()
+    return time.perf_counter() - start, response.split(b'\r\n\r\n', 1)[1].decode()
+
+
+async def main(args):
+    rows, expose_ms, size = micro(args)
+    print_table(rows, ['operation', 'ns'])
+    print(f'Rendering {args.series} labeled counters and histograms: {expose_ms:.1f} ms, {size // 1024} KB')
+
+    target = SimpleNamespace(llm_latency=args.llm_latency, relay_latency=0.0, stream=False)
+    timeline, scrape_times = [], []
+    async with local_target('agent', target) as (url, pubkey), metrics.MetricsServer(0) as server:
+        generator = LoadGenerator([url], pubkey, lambda c, t: f'Hello from {c}, turn {t}', classify_agent_reply,
+                                  conversations=args.conversations, turns=args.turns, ramp=args.ramp, timeout=60)
+        load = asyncio.create_task(generator.run())
+        started = time.perf_counter()
+        while not load.done():
+            elapsed, text = await scrape(server.port)
+            scrape_times.append(elapsed)
+            samples = parse(text)
+            timeline.append({'t_s': time.perf_counter() - started,
+                             'in_flight': samples.get('agentstr_agent_in_flight{service="Load Test Agent"}', 0),
+                             'queued': samples.get('agentstr_agent_queue_depth{service="Load Test Agent"}', 0),
+                             'completed': samples.get('agentstr_agent_turns_total{service="Load Test Agent",outcome="completed"}', 0)})
+            await asyncio.sleep(args.interval)
+        summary = summarize(await load, generator.elapsed)
+        _, text = await scrape(server.port)
+
+    print(f'\nLocal agent, {args.conversations} conversations x {args.turns} turns, fake LLM {args.llm_latency:.2f} s: '
+          f"{summary['ok']}/{summary['requests']} ok, {summary['ok_per_s']:.1f} ok/s; {len(scrape_times)} scrapes, "
+          f"latency (ms) {', '.join(f'{k} {v:.1f}' for k, v in percentiles(scrape_times).items())}")
+    step = max(len(timeline) // 12, 1)
+    print_table(timeline[::step], ['t_s', 'in_flight', 'queued', 'completed'])
+    print('\nFinal scrape (agent series):')
+    for line in text.splitlines():
+        if line.startswith('agentstr_agent_') and ('_bucket' not in line or 'le="+Inf"' in line or 'le="1"' in line):
+            print(' ', line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=1_000_000)
+    parser.add_argument('--series', type=int, default=1000, help='labeled series to render in the scrape benchmark')
+    parser.add_argument('--conversations', type=int, default=100)
+    parser.add_argument('--turns', type=int, default=3)
+    parser.add_argument('--ramp', type=float, default=2.0)
+    parser.add_argument('--interval', type=float, default=0.25, help='seconds between scrapes')
+    parser.add_argument('--llm-latency', type=float, default=0.3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,164 @@
+"""nostr_rag hashtag queries answered from the local inverted index, with hot tags of 100k+ notes.
+
+Ingests `--notes` synthetic notes whose hashtags follow a skewed distribution (a few hot tags,
+a long tail), then times newest-first pages under a hot tag: the first page, keyset pages deep
+into the tag, a merged page over two hot tags, and full hashtag questions (page + ranking).
+The baselines are what the same store would do without the index: scanning every note's tags,
+and paging with OFFSET. Finally checks that tagged notes published on a relay reach the index
+through the background subscription.
+
+    uv run benchmarks/nostr_rag_hashtags.py --notes 200000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+from pynostr.event import Event, EventKind
+from pynostr.key import PrivateKey
+
+from common import load_module, percentiles, print_table
+from nostr_rag_ingest import WORDS, events
+from nostr_rag_latency import FakeLLM
+from relay import StubRelay
+
+logging.disable(logging.WARNING)
+
+HOT_TAGS = {'bitcoin': 0.6, 'nostr': 0.35}
+TAIL_TAGS = [f'topic{i}' for i in range(500)]
+
+
+def with_tags(stream, rng: random.Random):
+    tags = {}
+    for event in stream:
+        if event.id not in tags:
+            chosen = [tag for tag, share in HOT_TAGS.items() if rng.random() < share]
+            chosen += rng.sample(TAIL_TAGS, rng.randrange(0, 3))
+            tags[event.id] = [['t', tag] for tag in chosen]
+        event.tags = tags[event.id]
+        yield event
+
+
+def timed(fn, repeat: int) -> tuple[list[float], int]:
+    """Latencies of `repeat` calls, and how many notes the last call returned."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    return samples, len(result[0] if isinstance(result, tuple) else result)
+
+
+def tagged_note(key: PrivateKey, content: str, created_at: int, tags: list[str]) -> dict:
+    event = Event(content=content, pubkey=key.public_key.hex(), created_at=created_at, kind=EventKind.TEXT_NOTE,
+                  tags=[['t', tag] for tag in tags])
+    event.sign(key.hex())
+    return event.to_dict()
+
+
+async def live_check(rag_service, note_store, embed, tmp: str) -> dict:
+    """Notes published with a tracked hashtag, by authors the agent doesn't know, reach the index."""
+    from agentstr import NostrClient
+    key, now = PrivateKey(), int(time.time())
+    async with StubRelay() as relay:
+        for i in range(20):
+            relay.add_event(tagged_note(key, f'older bitcoin note {i}', now - 100 + i, ['bitcoin']))
+        store = note_store.NoteStore(os.path.join(tmp, 'live.sqlite3'), dim=embed.dim)
+        service = rag_service.NostrRAGService(NostrClient([relay.url]), FakeLLM(), [], store, embed,
+                                              known_hashtags=['#Bitcoin'])
+        t0 = time.perf_counter()
+        await service.start()
+        backfilled = store.count_tagged('bitcoin')
+        await asyncio.sleep(0.2)
+        for i in range(10):
+            relay.add_event(tagged_note(key, f'live bitcoin note {i}', now + 1 + i, ['bitcoin', 'zaps']))
+            relay.add_event(tagged_note(key, f'untracked note {i}', now + 1 + i, ['cooking']))
+        for _ in range(100):
+            if store.count_tagged('bitcoin') >= 30:
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - t0
+        notes = await service.retrieve('what is new with #bitcoin', limit=5, query_type='auto')
+        service.stop()
+        result = {'backfilled': backfilled, 'live': store.count_tagged('bitcoin') - backfilled,
+                  'untracked_stored': store.count_tagged('cooking'), 'answer_notes': len(notes), 'seconds': elapsed}
+        store.close()
+        return result
+
+
+async def main(n: int, page_size: int, queries: int):
+    from agentstr_demo.embeddings import hashing_embedder
+    note_store = load_module('agents/nostr_rag/note_store.py')
+    embedding_pipeline = load_module('agents/nostr_rag/embedding_pipeline.py')
+    rag_service = load_module('agents/nostr_rag/rag_service.py')
+    embed = hashing_embedder()
+    rng = random.Random(5)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = note_store.NoteStore(os.path.join(tmp, 'notes.sqlite3'), dim=embed.dim)
+        pipeline = embedding_pipeline.IngestionPipeline(store, embed, max_pending=1024)
+        t0 = time.perf_counter()
+        for event in with_tags(events(n, 100, duplicate_rate=0.1, repost_rate=0.05, long_rate=0.01), rng):
+            await pipeline.put(event)
+        await pipeline.join()
+        pipeline.stop()
+        ingest_s = time.perf_counter() - t0
+
+        service = rag_service.NostrRAGService(None, FakeLLM(), [], store, embed, known_hashtags=list(HOT_TAGS) + TAIL_TAGS)
+        counts = {tag: store.count_tagged(tag) for tag in ('bitcoin', 'nostr', 'topic7')}
+        rows = []
+
+        def add(name: str, samples: list[float], items: int):
+            rows.append({'query': name, **percentiles(samples), 'notes': items})
+
+        add('first page #bitcoin', *timed(lambda: service.notes_by_tag(['bitcoin'], page_size), queries))
+        add('first page #topic7 (tail)', *timed(lambda: service.notes_by_tag(['topic7'], page_size), queries))
+        add('first page #bitcoin+#nostr', *timed(lambda: service.notes_by_tag(['bitcoin', 'nostr'], page_size), queries))
+
+        # Walk every page of the hottest tag with keyset cursors
+        samples, seen, cursor = [], 0, None
+        while True:
+            t0 = time.perf_counter()
+            page, cursor = service.notes_by_tag(['bitcoin'], page_size, before=cursor)
+            samples.append(time.perf_counter() - t0)
+            seen += len(page)
+            if cursor is None:
+                break
+        add(f'every #bitcoin page ({len(samples)}), keyset', samples, seen)
+        deep = counts['bitcoin'] - page_size
+        add('last #bitcoin page, OFFSET', *timed(lambda: store._db.execute(
+            'SELECT note_id FROM note_tags WHERE tag = ? ORDER BY created_at DESC, note_id DESC LIMIT ? OFFSET ?',
+            ('bitcoin', page_size, deep)).fetchall(), max(queries // 5, 2)))
+        add('first page #topic7, tag scan', *timed(lambda: store._db.execute(
+            'SELECT id FROM notes WHERE tags LIKE ? ORDER BY created_at DESC LIMIT ?',
+            ('%"topic7"%', page_size)).fetchall(), max(queries // 5, 2)))
+
+        questions = [f'what is new with #{rng.choice(["bitcoin", "nostr", "topic7"])} and {rng.choice(WORDS)}?'
+                     for _ in range(queries)]
+        samples = []
+        for question in questions:
+            t0 = time.perf_counter()
+            await service.retrieve(question, limit=8, query_type='auto')
+            samples.append(time.perf_counter() - t0)
+        add(f'hashtag question (newest {service.tag_window}, ranked)', samples, 8)
+        store.close()
+
+        live = await live_check(rag_service, note_store, embed, tmp)
+
+    print(f'{n} notes ingested in {ingest_s:.1f} s; #bitcoin {counts["bitcoin"]}, #nostr {counts["nostr"]}, '
+          f'#topic7 {counts["topic7"]} notes; pages of {page_size} (latency in ms)')
+    print_table(rows, ['query', 'p50', 'p90', 'p99', 'max', 'notes'])
+    print()
+    print_table([live], ['backfilled', 'live', 'untracked_stored', 'answer_notes', 'seconds'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=200000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.notes, args.page_size, args.queries))
@@ -0,0 +1,109 @@
+"""nostr_rag ingestion throughput: relay events streamed into the memory-mapped note index.
+
+Feeds `--notes` synthetic notes through the IngestionPipeline's bounded queue, the way a
+relay subscription does. A share of events arrive twice (from several relays), some are
+reposts of earlier content (a new id, same text) and some are long-form notes that get
+chunked. Reports notes per second, how many chunks were embedded vs served from the
+content-hash cache, peak RSS, and top-k search latency over the result.
+
+    uv run benchmarks/nostr_rag_ingest.py --notes 200000
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import resource
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+from common import load_module, percentiles, print_table
+
+WORDS = ('bitcoin lightning nostr relay zap inflation energy privacy freedom money gold debt policy market '
+         'node wallet key signature protocol censorship network mining fee block channel payment').split()
+
+
+@dataclass
+class FakeEvent:
+    id: str
+    pubkey: str
+    created_at: int
+    content: str
+    kind: int = 1
+    tags: list = field(default_factory=list)
+
+
+def events(n: int, authors: int, duplicate_rate: float, repost_rate: float, long_rate: float, seed: int = 1):
+    rng = random.Random(seed)
+    pubkeys = [hashlib.sha256(f'author{i}'.encode()).hexdigest() for i in range(authors)]
+    recent = []
+    for i in range(n):
+        if recent and rng.random() < repost_rate:
+            content = rng.choice(recent)
+        else:
+            length = rng.randrange(300, 600) if rng.random() < long_rate else rng.randrange(8, 40)
+            content = f'note {i}: ' + ' '.join(rng.choices(WORDS, k=length))
+            recent.append(content)
+            if len(recent) > 1000:
+                recent.pop(0)
+        event = FakeEvent(hashlib.sha256(f'{i}'.encode()).hexdigest(), rng.choice(pubkeys), 1_700_000_000 + i, content)
+        yield event
+        if rng.random() < duplicate_rate:
+            yield event
+
+
+async def main(n: int, authors: int, dim: int, batch_size: int, queries: int):
+    from agentstr_demo.embeddings import hashing_embedder
+    note_store = load_module('agents/nostr_rag/note_store.py')
+    embedding_pipeline = load_module('agents/nostr_rag/embedding_pipeline.py')
+    embed = hashing_embedder(dim)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = note_store.NoteStore(os.path.join(tmp, 'notes.sqlite3'), dim=dim)
+        pipeline = embedding_pipeline.IngestionPipeline(store, embed, batch_size=batch_size, max_pending=4 * batch_size)
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        t0 = time.perf_counter()
+        for event in events(n, authors, duplicate_rate=0.3, repost_rate=0.1, long_rate=0.02):
+            await pipeline.put(event)
+        await pipeline.join()
+        elapsed = time.perf_counter() - t0
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        pipeline.stop()
+        stats = pipeline.stats
+
+        rng = random.Random(3)
+        vectors = embed([' '.join(rng.sample(WORDS, 4)) for _ in range(queries)])
+        author = next(iter(store._author_ids))
+        everyone, one_author = [], []
+        for vector in vectors:
+            t1 = time.perf_counter()
+            store.search(vector, k=8)
+            everyone.append(time.perf_counter() - t1)
+            t1 = time.perf_counter()
+            store.search(vector, k=8, pubkey=author)
+            one_author.append(time.perf_counter() - t1)
+        vector_mb = os.path.getsize(store.vectors.path) / 2**20
+        store.close()
+
+    print(f'{n} notes from {authors} authors, dim {dim}, batches of {batch_size}')
+    print_table([{'events': stats['events'], 'notes': stats['notes'], 'duplicates': stats['duplicates'],
+                  'chunks': stats['chunks'], 'embedded': stats['embedded'], 'cached': stats['cached'],
+                  'seconds': elapsed, 'notes_per_s': stats['notes'] / elapsed,
+                  'rss_growth_mb': (rss_after - rss_before) / 1024, 'vectors_mb': vector_mb}],
+                ['events', 'notes', 'duplicates', 'chunks', 'embedded', 'cached', 'seconds', 'notes_per_s',
+                 'rss_growth_mb', 'vectors_mb'])
+    print()
+    print_table([{'search': 'all notes', **percentiles(everyone)}, {'search': 'one author', **percentiles(one_author)}],
+                ['search', 'p50', 'p90', 'p99', 'max'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=200000)
+    parser.add_argument('--authors', type=int, default=100)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.notes, args.authors, args.dim, args.batch_size, args.queries))
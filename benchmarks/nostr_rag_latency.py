@@ -0,0 +1,148 @@
+"""nostr_rag agent: a NostrRAG built per request (cold) vs the long-lived NostrRAGService (warm).
+
+Runs against an in-process relay holding `--notes` notes per author, with a fake chat model,
+so the numbers are retrieval overhead only: relay round trips and embedding. Also checks that
+a restart only fetches and embeds notes published since the last run.
+
+    uv run benchmarks/nostr_rag_latency.py --notes 500 --latency 0.05
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+from pynostr.event import Event, EventKind
+from pynostr.key import PrivateKey
+
+from common import load_module, percentiles, print_table
+from relay import StubRelay
+
+logging.disable(logging.WARNING)
+
+AUTHORS = ['Lyn Alden', 'Saifedean Ammous', 'Jack Dorsey']
+TOPICS = ['inflation', 'bitcoin', 'energy', 'debt', 'nostr', 'lightning', 'monetary policy', 'gold', 'privacy']
+QUESTIONS = [f'What does {name} think about {topic}?' for name in AUTHORS for topic in TOPICS]
+
+
+class FakeLLM:
+    """Stands in for the chat model: picks the author named in the question, answers instantly."""
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        text = messages[-1].content
+        if 'user selector' in text:
+            question = text.split('Question:')[1].split('Known users:')[0]
+            named = [name for name in AUTHORS if name in question]
+            return SimpleNamespace(content=f'["{named[0]}"]' if named else '[]')
+        return SimpleNamespace(content='An answer.')
+
+
+def text_note(key: PrivateKey, content: str, created_at: int) -> dict:
+    event = Event(content=content, pubkey=key.public_key.hex(), created_at=created_at, kind=EventKind.TEXT_NOTE)
+    event.sign(key.hex())
+    return event.to_dict()
+
+
+def publish(relay: StubRelay, keys: list[PrivateKey], count: int, start: int, rng: random.Random):
+    for key in keys:
+        for i in range(count):
+            topic = rng.choice(TOPICS)
+            relay.add_event(text_note(key, f'Thoughts on {topic} #{i}: ' + ' '.join(rng.sample(TOPICS, 3)), start + i))
+
+
+async def main(notes: int, latency: float, queries: int):
+    from agentstr import NostrClient, NostrRAG
+    from agentstr.nostr_rag import Author
+    from agentstr_demo.embeddings import hashing_embedder
+    note_store = load_module('agents/nostr_rag/note_store.py')
+    rag_service = load_module('agents/nostr_rag/rag_service.py')
+
+    rng = random.Random(1)
+    keys = [PrivateKey() for _ in AUTHORS]
+    authors = [Author(name=name, pubkey=key.public_key.bech32()) for name, key in zip(AUTHORS, keys)]
+    questions = [rng.choice(QUESTIONS) for _ in range(queries)]
+    llm = FakeLLM()
+    rows = []
+    async with StubRelay(latency=latency) as relay:
+        publish(relay, keys, notes, int(time.time()) - 10 * notes, rng)
+
+        samples = []
+        for question in questions:
+            t0 = time.perf_counter()
+            rag = NostrRAG(relays=[relay.url], llm=llm, known_authors=authors)
+            await rag.query(question=question, limit=8, query_type='authors')
+            samples.append(time.perf_counter() - t0)
+        rows.append({'mode': 'cold NostrRAG per request', **percentiles(samples), 'indexed_notes': 8})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            embed = hashing_embedder()
+            calls = {'texts': 0}
+
+            def counting_embed(texts):
+                calls['texts'] += len(texts)
+                return embed(texts)
+
+            def service():
+                store = note_store.NoteStore(os.path.join(tmp, 'notes.sqlite3'), dim=embed.dim)
+                return rag_service.NostrRAGService(NostrClient([relay.url]), llm, authors, store, counting_embed,
+                                                   backfill_limit=2 * notes)
+
+            warm = service()
+            t0 = time.perf_counter()
+            await warm.start()
+            startup = time.perf_counter() - t0
+            first_embedded = calls['texts']
+
+            samples = []
+            for question in questions:
+                t0 = time.perf_counter()
+                await warm.query(question=question, limit=8, query_type='authors')
+                samples.append(time.perf_counter() - t0)
+            rows.append({'mode': 'warm NostrRAGService', **percentiles(samples), 'indexed_notes': len(warm.store)})
+
+            # New notes arrive through the subscription
+            calls['texts'] = 0
+            await asyncio.sleep(latency + 0.2)
+            publish(relay, keys, 10, int(time.time()) + 1, rng)
+            for _ in range(100):
+                if len(warm.store) == 3 * (notes + 10):
+                    break
+                await asyncio.sleep(0.05)
+            live_embedded = calls['texts']
+            warm.stop()
+            warm.store.close()
+
+            # A restart only catches up on what was published while it was down
+            publish(relay, keys, 5, int(time.time()) + 60, rng)
+            calls['texts'] = 0
+            restarted = service()
+            t0 = time.perf_counter()
+            await restarted.start()
+            restart = time.perf_counter() - t0
+            restarted.stop()
+
+    print(f'Relay latency {latency * 1000:.0f} ms, {notes} notes per author, {queries} questions (latency in ms)')
+    print_table(rows, ['mode', 'p50', 'p90', 'p99', 'max', 'indexed_notes'])
+    print()
+    print_table([
+        {'event': 'first start', 'seconds': startup, 'notes_embedded': first_embedded},
+        {'event': '30 notes published live', 'seconds': None, 'notes_embedded': live_embedded},
+        {'event': 'restart after 15 new notes', 'seconds': restart, 'notes_embedded': calls['texts']},
+    ], ['event', 'seconds', 'notes_embedded'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=500, help='notes per author')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.notes, args.latency, args.queries))
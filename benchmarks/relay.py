@@ -0,0 +1,135 @@
+"""A minimal in-process Nostr relay (NIP-01) for offline benchmarks.
+
+Stores every event in memory (keeping only the newest replaceable event per author and kind),
+answers REQ with the stored matches followed by EOSE, and pushes new events to open
+subscriptions. Signatures are not verified.
+
+    async with StubRelay(latency=0.05) as relay:
+        client = NostrClient([relay.url], private_key)
+"""
+import asyncio
+import json
+
+from websockets.asyncio.server import serve
+
+
+def _replaceable(kind: int) -> bool:
+    return kind in (0, 3) or 10000 <= kind < 20000
+
+
+def matches(filters: dict, event: dict) -> bool:
+    """Whether `event` matches a NIP-01 filter."""
+    if 'ids' in filters and not any(event['id'].startswith(i) for i in filters['ids']):
+        return False
+    if 'authors' in filters and not any(event['pubkey'].startswith(a) for a in filters['authors']):
+        return False
+    if 'kinds' in filters and event['kind'] not in filters['kinds']:
+        return False
+    if 'since' in filters and event['created_at'] < filters['since']:
+        return False
+    if 'until' in filters and event['created_at'] > filters['until']:
+        return False
+    for key, values in filters.items():
+        if key.startswith('#'):
+            tagged = {tag[1] for tag in event.get('tags', []) if len(tag) > 1 and tag[0] == key[1:]}
+            if not tagged.intersection(values):
+                return False
+    return True
+
+
+class StubRelay:
+    """In-process relay on 127.0.0.1.
+
+    Args:
+        latency: Seconds added before answering each client message, to simulate a remote relay.
+        port: Port to listen on (a free one if 0).
+    """
+    def __init__(self, latency: float = 0.0, port: int = 0):
+        self.latency = latency
+        self.port = port
+        self.events: dict[str, dict] = {}
+        self.connections = 0
+        self.open_connections = 0
+        self.requests = 0
+        self.published = 0
+        self._replaceable: dict[tuple[str, int], str] = {}
+        self._subscriptions: dict[tuple, list[dict]] = {}  # (websocket, subscription id) -> filters
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f'ws://127.0.0.1:{self.port}'
+
+    def reset_counters(self):
+        self.connections = self.requests = self.published = 0
+
+    async def __aenter__(self):
+        self._server = await serve(self._handle, '127.0.0.1', self.port, max_size=None, ping_interval=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def add_event(self, event: dict) -> bool:
+        """Store an event and push it to matching subscriptions. Returns False if it was dropped as stale."""
+        if event['id'] in self.events:
+            return False
+        if _replaceable(event['kind']):
+            key = (event['pubkey'], event['kind'])
+            previous = self.events.get(self._replaceable.get(key))
+            if previous is not None:
+                if previous['created_at'] > event['created_at']:
+                    return False
+                del self.events[previous['id']]
+            self._replaceable[key] = event['id']
+        self.events[event['id']] = event
+        self.published += 1
+        for (ws, sub_id), filters in list(self._subscriptions.items()):
+            if any(matches(f, event) for f in filters):
+                asyncio.ensure_future(self._send(ws, ['EVENT', sub_id, event]))
+        return True
+
+    def query(self, filters: list[dict]) -> list[dict]:
+        """Stored events matching any of `filters`, newest first, honouring each filter's limit."""
+        found = {}
+        for f in filters:
+            hits = sorted((e for e in self.events.values() if matches(f, e)), key=lambda e: -e['created_at'])
+            for event in hits[:f.get('limit', len(hits))]:
+                found[event['id']] = event
+        return sorted(found.values(), key=lambda e: -e['created_at'])
+
+    async def _send(self, ws, message: list):
+        try:
+            await ws.send(json.dumps(message))
+        except Exception:
+            pass
+
+    async def _handle(self, ws):
+        self.connections += 1
+        self.open_connections += 1
+        try:
+            async for raw in ws:
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                message = json.loads(raw)
+                if message[0] == 'REQ':
+                    self.requests += 1
+                    sub_id, filters = message[1], message[2:]
+                    self._subscriptions[(ws, sub_id)] = filters
+                    for event in self.query(filters):
+                        await ws.send(json.dumps(['EVENT', sub_id, event]))
+                    await ws.send(json.dumps(['EOSE', sub_id]))
+                elif message[0] == 'EVENT':
+                    event = message[1]
+                    self.add_event(event)
+                    await ws.send(json.dumps(['OK', event['id'], True, '']))
+                elif message[0] == 'CLOSE':
+                    self._subscriptions.pop((ws, message[1]), None)
+        except Exception:
+            pass
+        finally:
+            self.open_connections -= 1
+            for key in [k for k in self._subscriptions if k[0] is ws]:
+                del self._subscriptions[key]
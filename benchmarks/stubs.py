@@ -0,0 +1,152 @@
+import asyncio
+import datetime
+import socket
+import ssl
+from collections.abc import Callable
+
+from aiohttp import web
+
+
+class StubHTTPServer:
+    """Local HTTP server standing in for an upstream API.
+
+    Every route answers after `latency` seconds. The server counts requests and the
+    number of distinct TCP connections they arrived on, so benchmarks can tell how
+    many handshakes a client needed.
+    """
+    def __init__(self, routes: dict[str, str | Callable[[web.Request], object]], latency: float = 0.05,
+                 method: str = 'GET', ssl_context: ssl.SSLContext | None = None):
+        """Initialize the stub.
+
+        Args:
+            routes: Path -> response body, or a handler returning a JSON-serializable object.
+            latency: Artificial delay before each response, in seconds.
+            method: HTTP method the routes answer to.
+            ssl_context: Serve HTTPS with this context instead of plain HTTP.
+        """
+        self.routes = routes
+        self.latency = latency
+        self.method = method
+        self.ssl_context = ssl_context
+        self.requests = 0
+        self.connections = set()
+        self._runner = None
+        self.port = None
+
+    @property
+    def url(self) -> str:
+        scheme = 'https' if self.ssl_context else 'http'
+        return f'{scheme}://127.0.0.1:{self.port}'
+
+    def reset_counters(self):
+        self.requests = 0
+        self.connections = set()
+
+    def _handler(self, response):
+        async def handle(request: web.Request) -> web.Response:
+            self.requests += 1
+            self.connections.add(request.transport.get_extra_info('peername'))
+            await asyncio.sleep(self.latency)
+            if callable(response):
+                result = response(request)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                return web.json_response(result)
+            return web.Response(text=response)
+        return handle
+
+    async def __aenter__(self) -> 'StubHTTPServer':
+        app = web.Application()
+        for path, response in self.routes.items():
+            app.router.add_route(self.method, path, self._handler(response))
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('127.0.0.1', 0))
+        self.port = sock.getsockname()[1]
+        await web.SockSite(self._runner, sock, backlog=1024, ssl_context=self.ssl_context).start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+
+def blockchain_info_routes() -> dict[str, str]:
+    """Canned answers for the blockchain.info query API."""
+    return {
+        '/q/24hrprice': '104523.17',
+        '/q/marketcap': '2077634512345',
+        '/q/24hrtransactioncount': '371234',
+        '/q/24hrbtcsent': '58213412345678',
+        '/q/hashrate': '912345678901',
+        '/q/getdifficulty': '126411437451912.2',
+        '/q/getblockcount': '899123',
+    }
+
+
+# Units per EUR
+FRANKFURTER_RATES = {'USD': 1.0842, 'GBP': 0.8431, 'JPY': 162.37, 'CHF': 0.9512, 'CAD': 1.4789, 'AUD': 1.6453}
+
+
+def frankfurter_routes() -> dict[str, Callable[[web.Request], object]]:
+    """Canned answers for the frankfurter.app API: the latest table, one date, or a range of dates."""
+    def rates(request: web.Request) -> dict:
+        when = request.match_info['when']
+        if '..' not in when:
+            date = datetime.date.today().isoformat() if when == 'latest' else when
+            return {'amount': 1.0, 'base': 'EUR', 'date': date, 'rates': FRANKFURTER_RATES}
+        start, end = (datetime.date.fromisoformat(day) for day in when.split('..'))
+        days = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+        return {'amount': 1.0, 'base': 'EUR', 'start_date': start.isoformat(), 'end_date': end.isoformat(),
+                'rates': {day.isoformat(): FRANKFURTER_RATES for day in days if day.weekday() < 5}}
+    return {'/{when}': rates}
+
+
+def tavily_routes() -> dict[str, Callable[[web.Request], object]]:
+    """Canned answers for the Tavily search API (serve with method='POST')."""
+    async def search(request: web.Request) -> dict:
+        body = await request.json()
+        return {'query': body['query'], 'results': [
+            {'title': f"{body['query']} #{i}", 'content': 'Lorem ipsum ' * 40, 'url': f'https://example.com/{i}',
+             'score': 1 - i / 10} for i in range(body.get('max_results', 5))]}
+    return {'/search': search}
+
+
+def self_signed_tls(directory: str) -> tuple[ssl.SSLContext, ssl.SSLContext]:
+    """Create a throwaway certificate for 127.0.0.1.
+
+    Returns:
+        (server context, client context that trusts the certificate)
+    """
+    import datetime
+    import ipaddress
+    import os
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, '127.0.0.1')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(minutes=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address('127.0.0.1'))]), critical=False)
+            .sign(key, hashes.SHA256()))
+    cert_path = os.path.join(directory, 'cert.pem')
+    key_path = os.path.join(directory, 'key.pem')
+    with open(cert_path, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_context.load_cert_chain(cert_path, key_path)
+    client_context = ssl.create_default_context(cafile=cert_path)
+    return server_context, client_context
@@ -0,0 +1,409 @@
+"""Offline end-to-end benchmark of every agent and MCP server, with a machine-readable report.
+
+Runs the services unchanged, each as its own process started like `uv run <script>`. Their
+environment points them at local stand-ins, so no network access, API key or wallet is
+needed:
+- an in-process Nostr relay (`relay.StubRelay`);
+- a deterministic OpenAI-compatible LLM with configurable latency (`fake_llm.FakeLLM`);
+- HTTP stubs for blockchain.info, frankfurter and Tavily (`stubs`);
+- a Nostr Wallet Connect wallet (`wallet.StubWallet`), so paid tools and agents settle
+  their invoices end to end.
+
+MCP servers start first, then the agents that use them. Each service then gets
+`--conversations` x `--turns` requests from `loadgen.LoadGenerator`, which pays any invoice
+it is sent. For each service the report records:
+- its startup time;
+- throughput, latency percentiles and error rate;
+- resident memory when idle and at its peak;
+- LLM calls, upstream HTTP requests and satoshis paid during its load.
+
+A service that can't start (e.g. a missing optional dependency) is reported as failed with
+the last line of its log. With `--trace` the services record their spans
+(`agentstr_demo.tracing`) to one file for a per-stage breakdown; with `--metrics` each
+service's metrics endpoint (`agentstr_demo.metrics`) is saved after its load. Compare a report with an earlier one with `--baseline`: metrics
+that got worse by more than `--tolerance` are flagged, and the exit status is 1.
+
+    uv run benchmarks/suite.py --conversations 20 --turns 2 --report suite.json
+    uv run benchmarks/suite.py --only agents/bitcoin --baseline suite.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import httpx
+from pynostr.key import PrivateKey
+
+from common import ROOT, print_table
+from fake_llm import FakeLLM
+from loadgen import LoadGenerator, classify_agent_reply, classify_mcp_reply, summarize
+from relay import StubRelay
+from stubs import StubHTTPServer, blockchain_info_routes, frankfurter_routes, tavily_routes
+from wallet import StubWallet
+
+logging.disable(logging.WARNING)
+
+
+@dataclass
+class Component:
+    script: str
+    kind: str  # 'agent' or 'mcp'
+    message: str | None = None  # What users ask an agent
+    tool: str | None = None  # What users call on an MCP server
+    arguments: dict = field(default_factory=dict)
+    mcp_server: str | None = None  # The component an agent calls tools on
+    env: dict[str, str] = field(default_factory=dict)
+
+
+COMPONENTS = {
+    'mcp_servers/bitcoin': Component('mcp_servers/bitcoin/server.py', 'mcp', tool='get_bitcoin_data'),
+    'mcp_servers/exchange_rate': Component('mcp_servers/exchange_rate/server.py', 'mcp', tool='get_exchange_rate',
+                                           arguments={'currency_from': 'USD', 'currency_to': 'EUR,GBP'}),
+    'mcp_servers/web_search': Component('mcp_servers/web_search/server.py', 'mcp', tool='web_search',
+                                        arguments={'query': 'bitcoin news', 'num_results': 5}),
+    'agents/bitcoin': Component('agents/bitcoin/agent.py', 'agent', message='What is the current bitcoin hashrate?',
+                                mcp_server='mcp_servers/bitcoin'),
+    'agents/news': Component('agents/news/agent.py', 'agent', message='Search the web for the latest bitcoin news',
+                             mcp_server='mcp_servers/web_search'),
+    'agents/finance': Component('agents/finance/agent.py', 'agent', message='What is the exchange rate from USD to EUR?',
+                                mcp_server='mcp_servers/exchange_rate'),
+    'agents/medical': Component('agents/medical/agent.py', 'agent', message='What are common treatments for hypertension?'),
+    'agents/discovery': Component('agents/discovery/agent.py', 'agent',
+                                  message='Can someone help me answer a medical question?'),
+    'agents/nostr_rag': Component('agents/nostr_rag/agent.py', 'agent', message='What is new with #bitcoin?'),
+    # dspy goes through litellm, which wants the provider in the model name and a base url without /v1
+    'agents/travel': Component('agents/travel/agent.py', 'agent', message='Find me a flight from SFO to JFK next week',
+                               env={'LLM_MODEL_NAME': 'openai/fake-model', 'LLM_BASE_URL': '{llm_root}'}),
+}
+
+# Files the services write, kept in a temporary directory per service
+DATA_FILES = {
+    'CHECKPOINT_DB_PATH': 'checkpoints.sqlite3',
+    'MCP_SCHEMA_CACHE_PATH': 'mcp_schemas.sqlite3',
+    'EXCHANGE_RATE_CACHE_PATH': 'rates.sqlite3',
+    'WEB_SEARCH_CACHE_DB': 'web_search.sqlite3',
+    'DISCOVERY_CACHE_PATH': 'agent_cards.json',
+    'NOSTR_RAG_DB_PATH': 'notes.sqlite3',
+    'BOOKING_DB_PATH': 'bookings.sqlite3',
+    'HISTORY_DB_PATH': 'history.sqlite3',
+}
+
+# (metric, True if higher is better) compared against a baseline report
+TRACKED = [('ok_per_s', True), ('latency_p50_ms', False), ('latency_p99_ms', False), ('error_rate', False),
+           ('rss_peak_mb', False), ('startup_s', False)]
+
+
+def rss_mb(pid: int) -> tuple[float | None, float | None]:
+    """(current, peak) resident memory of a process in MB; the peak is only known on Linux."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(status['VmRSS'].split()[0]) / 1024, int(status['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError):
+        pass
+    try:
+        return int(subprocess.run(['ps', '-o', 'rss=', '-p', str(pid)], capture_output=True, text=True).stdout) / 1024, None
+    except (OSError, ValueError):
+        return None, None
+
+
+def last_line(path: str) -> str:
+    with open(path, errors='replace') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return lines[-1][:300] if lines else ''
+
+
+class Service:
+    """One agent or MCP server process."""
+    def __init__(self, name: str, component: Component, key: PrivateKey, env: dict[str, str], log_path: str):
+        self.name = name
+        self.component = component
+        self.key = key
+        self.env = env
+        self.log_path = log_path
+        self.process: asyncio.subprocess.Process | None = None
+        self.startup_s: float | None = None
+        self.error: str | None = None
+        self.peak_mb: float | None = None
+
+    @property
+    def pubkey(self) -> str:
+        return self.key.public_key.hex()
+
+    async def start(self, relay: StubRelay, timeout: float):
+        """Start the process and wait until it published its card and listens for direct messages."""
+        t0 = time.perf_counter()
+        with open(self.log_path, 'wb') as log:
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, str(ROOT / self.component.script), cwd=str(ROOT), env=self.env,
+                stdout=log, stderr=subprocess.STDOUT)
+        await self.wait_ready(relay, timeout, t0)
+
+    async def wait_ready(self, relay: StubRelay, timeout: float, t0: float):
+        """Wait until the service published its card and listens for direct messages; `t0` is when it was started."""
+        while time.perf_counter() - t0 < timeout:
+            if self.process.returncode is not None:
+                self.error = f'exited with {self.process.returncode}: {last_line(self.log_path)}'
+                return
+            listening = any(f.get('kinds') == [4] and self.pubkey in f.get('#p', [])
+                            for filters in relay._subscriptions.values() for f in filters)
+            if listening and relay.query([{'authors': [self.pubkey], 'kinds': [0]}]):
+                self.startup_s = time.perf_counter() - t0
+                return
+            await asyncio.sleep(0.05)
+        self.error = f'not ready after {timeout:.0f} s: {last_line(self.log_path)}'
+
+    def sample_memory(self) -> float | None:
+        current, peak = rss_mb(self.process.pid)
+        if current is not None:
+            self.peak_mb = max(self.peak_mb or 0, peak or current)
+        return current
+
+    async def stop(self):
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), 5)
+        except TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+
+async def load(service: Service, relay: StubRelay, llm: FakeLLM, wallet: StubWallet, stubs: dict[str, StubHTTPServer],
+               args) -> dict:
+    component = service.component
+    if component.kind == 'agent':
+        request = lambda c, t: f'{component.message} ({c}.{t})'
+        classify = classify_agent_reply
+    else:
+        message = json.dumps({'action': 'call_tool', 'tool_name': component.tool, 'arguments': component.arguments})
+        request = lambda c, t: message
+        classify = classify_mcp_reply
+
+    llm_key = service.env['LLM_API_KEY']
+    llm_calls, paid_sats = llm.calls[llm_key], wallet.paid_sats
+    upstream = {name: stub.requests for name, stub in stubs.items()}
+    idle_mb = service.sample_memory()
+
+    generator = LoadGenerator([relay.url], service.pubkey, request, classify, conversations=args.conversations,
+                              turns=args.turns, ramp=args.ramp, timeout=args.timeout, pay=wallet.pay)
+    run = asyncio.create_task(generator.run())
+    while not run.done():
+        service.sample_memory()
+        await asyncio.wait([run], timeout=0.25)
+    summary = summarize(run.result(), generator.elapsed)
+    service.sample_memory()
+    scraped = {}
+    if 'METRICS_PORT' in service.env:
+        scraped = await scrape_metrics(service, os.path.join(os.path.dirname(service.log_path), service.name.replace('/', '_') + '.prom'))
+    return {
+        'requests': summary['requests'],
+        'ok': summary['ok'],
+        'error_rate': summary['error_rate'],
+        'outcomes': summary['outcomes'],
+        'ok_per_s': summary['ok_per_s'],
+        **{f'latency_{p}_ms': value for p, value in summary['latency_ms'].items()},
+        **{f'first_{p}_ms': value for p, value in summary['first_ms'].items() if p in ('p50', 'p99')},
+        'histogram': summary['histogram'],
+        'rss_idle_mb': idle_mb,
+        'rss_peak_mb': service.peak_mb,
+        'llm_calls': llm.calls[llm_key] - llm_calls,
+        'upstream_requests': {name: stub.requests - upstream[name] for name, stub in stubs.items()
+                              if stub.requests > upstream[name]},
+        'sats_paid': wallet.paid_sats - paid_sats,
+        **scraped,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def scrape_metrics(service: Service, path: str) -> dict:
+    """Save the service's metrics endpoint to `path`; returns what it says the service earned."""
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"http://127.0.0.1:{service.env['METRICS_PORT']}/metrics", timeout=5)
+    except httpx.HTTPError as e:
+        return {'metrics_error': repr(e)}
+    with open(path, 'w') as f:
+        f.write(response.text)
+    earned = [float(line.rsplit(' ', 1)[1]) for line in response.text.splitlines() if line.startswith('agentstr_sats_earned_total')]
+    return {'sats_earned': sum(earned)}
+
+
+def selected(only: str | None) -> list[str]:
+    """Components named in comma-separated `only` (default all), with the MCP servers they call."""
+    names = list(COMPONENTS) if not only else only.split(',')
+    for name in list(names):
+        if name not in COMPONENTS:
+            raise SystemExit(f'Unknown component {name}; choose from {", ".join(COMPONENTS)}')
+        dependency = COMPONENTS[name].mcp_server
+        if dependency and dependency not in names:
+            names.insert(0, dependency)
+    return names
+
+
+def service_environments(names: list[str], keys: dict[str, PrivateKey], data: str, relay: StubRelay, llm: FakeLLM,
+                         wallet: StubWallet, stubs: dict[str, StubHTTPServer]) -> dict[str, dict[str, str]]:
+    """Environment of each service: the local stand-ins, its key and wallet connection, and data files under `data`."""
+    common_env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(ROOT), os.getenv('PYTHONPATH')])),
+        'PYTHONUNBUFFERED': '1',
+        'NOSTR_RELAYS': relay.url,
+        'LLM_BASE_URL': llm.url,
+        'LLM_MODEL_NAME': 'fake-model',
+        'OPENAI_API_KEY': 'fake',
+        'BLOCKCHAIN_INFO_URL': f"{stubs['blockchain.info'].url}/q",
+        'FRANKFURTER_URL': stubs['frankfurter'].url,
+        'TAVILY_BASE_URL': stubs['tavily'].url,
+        'TAVILY_API_KEY': 'tvly-fake',
+    }
+    envs = {}
+    for name in names:
+        component = COMPONENTS[name]
+        directory = os.path.join(data, name.replace('/', '_'))
+        os.makedirs(directory)
+        prefix = 'AGENT' if component.kind == 'agent' else 'MCP_SERVER'
+        env = {**common_env, 'LLM_API_KEY': f'fake-{name}',
+               f'{prefix}_PRIVATE_KEY': keys[name].bech32(),
+               f'{prefix}_NWC_CONN_STR': wallet.connection_string(),
+               **{variable: os.path.join(directory, file) for variable, file in DATA_FILES.items()},
+               **{variable: value.format(llm_root=llm.url.removesuffix('/v1'))
+                  for variable, value in component.env.items()}}
+        if component.mcp_server:
+            env['MCP_SERVER_PUBKEY'] = keys[component.mcp_server].public_key.bech32()
+        envs[name] = env
+    return envs
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Tracked metrics of every service in both reports, with the relative change; worse ones are flagged."""
+    rows = []
+    for name, result in report['components'].items():
+        before = baseline.get('components', {}).get(name)
+        if before is None or result['status'] != 'ok' or before.get('status') != 'ok':
+            continue
+        for metric, higher_is_better in TRACKED:
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (0.0 if new == old else float('inf'))
+            worse = -change if higher_is_better else change
+            rows.append({'component': name, 'metric': metric, 'baseline': old, 'now': new, 'change': f'{change:+.0%}',
+                         'regressed': 'REGRESSED' if worse > tolerance and abs(new - old) > 1e-9 else ''})
+    return rows
+
+
+async def main(args) -> int:
+    names = selected(args.only)
+
+    report = {
+        'suite': 'offline',
+        'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('report', 'baseline')},
+        'components': {},
+    }
+    logs = args.logs or tempfile.mkdtemp(prefix='agentstr-suite-logs-')
+    os.makedirs(logs, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix='agentstr-suite-') as data:
+        async with (StubRelay(latency=args.relay_latency) as relay,
+                    FakeLLM(args.llm_latency, args.llm_tps, args.llm_tokens) as llm,
+                    StubHTTPServer(blockchain_info_routes(), latency=args.upstream_latency) as blockchain_info,
+                    StubHTTPServer(frankfurter_routes(), latency=args.upstream_latency) as frankfurter,
+                    StubHTTPServer(tavily_routes(), latency=args.upstream_latency, method='POST') as tavily):
+            wallet = StubWallet(relay)
+            stubs = {'blockchain.info': blockchain_info, 'frankfurter': frankfurter, 'tavily': tavily}
+            keys = {name: PrivateKey() for name in names}
+            envs = service_environments(names, keys, data, relay, llm, wallet, stubs)
+            services = {}
+            for name, env in envs.items():
+                if args.trace:
+                    env.update(TRACE_PATH=os.path.join(logs, 'traces.jsonl'), TRACE_SERVICE=name)
+                if args.metrics:
+                    env['METRICS_PORT'] = str(free_port())
+                services[name] = Service(name, COMPONENTS[name], keys[name], env, os.path.join(logs, name.replace('/', '_') + '.log'))
+
+            try:
+                # MCP servers first: agents read the tool lists from their cards at startup
+                for kind in ('mcp', 'agent'):
+                    group = [s for s in services.values() if s.component.kind == kind]
+                    await asyncio.gather(*[s.start(relay, args.startup_timeout) for s in group])
+                for name, service in services.items():
+                    result = {'kind': service.component.kind, 'status': 'failed' if service.error else 'ok',
+                              'startup_s': service.startup_s}
+                    if service.error:
+                        result['error'] = service.error
+                    else:
+                        print(f'Loading {name}...', file=sys.stderr)
+                        result.update(await load(service, relay, llm, wallet, stubs, args))
+                    report['components'][name] = result
+            finally:
+                await asyncio.gather(*[s.stop() for s in services.values()])
+
+    rows = [{'component': name, **result, 'p50': result.get('latency_p50_ms'), 'p99': result.get('latency_p99_ms'),
+             'error': (result.get('error') or '')[:60]} for name, result in report['components'].items()]
+    print(f"{args.conversations} conversations x {args.turns} turns per service; fake LLM {args.llm_latency:.2f} s to the "
+          f"first token, {args.llm_tps:.0f} tokens/s; relay +{args.relay_latency * 1000:.0f} ms, upstream APIs "
+          f"+{args.upstream_latency * 1000:.0f} ms (latency in ms, memory in MB); logs in {logs}")
+    print_table(rows, ['component', 'status', 'startup_s', 'requests', 'ok', 'error_rate', 'ok_per_s', 'p50', 'p99',
+                       'rss_idle_mb', 'rss_peak_mb', 'llm_calls', 'sats_paid', *(['sats_earned'] if args.metrics else []), 'error'])
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Report written to {args.report}')
+    if args.trace:
+        print(f'Spans in {logs}/traces.jsonl; summarize with python -m agentstr_demo.tracing {logs}/traces.jsonl')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(report, json.load(f), args.tolerance)
+        print(f'\nCompared with {args.baseline} (tolerance {args.tolerance:.0%})')
+        print_table(rows, ['component', 'metric', 'baseline', 'now', 'change', 'regressed'])
+        return 1 if any(row['regressed'] for row in rows) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', help=f'comma-separated components (default all): {",".join(COMPONENTS)}')
+    parser.add_argument('--conversations', type=int, default=10)
+    parser.add_argument('--turns', type=int, default=2)
+    parser.add_argument('--ramp', type=float, default=1.0, help='seconds over which conversations start')
+    parser.add_argument('--timeout', type=float, default=90, help='seconds to wait for each reply')
+    parser.add_argument('--startup-timeout', type=float, default=90)
+    parser.add_argument('--llm-latency', type=float, default=0.3, help='seconds to the first token')
+    parser.add_argument('--llm-tps', type=float, default=50, help='tokens per second after the first')
+    parser.add_argument('--llm-tokens', type=int, default=60, help='words in a text answer')
+    parser.add_argument('--relay-latency', type=float, default=0.0)
+    parser.add_argument('--upstream-latency', type=float, default=0.05, help='seconds the HTTP stubs take to answer')
+    parser.add_argument('--report', default='suite-report.json')
+    parser.add_argument('--baseline', help='earlier report to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='relative change counted as a regression')
+    parser.add_argument('--logs', help='directory for the services\' logs (default: a temporary directory)')
+    parser.add_argument('--metrics', action='store_true', help='scrape each service\'s metrics endpoint after its load '
+                                                                 'into <service>.prom in the logs directory')
+    parser.add_argument('--trace', action='store_true', help='record the services\' spans to traces.jsonl in the logs directory')
+    sys.exit(asyncio.run(main(parser.parse_args())))
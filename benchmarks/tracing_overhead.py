@@ -0,0 +1,78 @@
+"""Cost of `agentstr_demo.tracing` spans, off and on, per span and per agent turn.
+
+First, a turn's worth of nested spans (agent.message > agent.callable > mcp.call > http.request)
+is opened and closed `--iterations` times with tracing off, then writing JSONL and OTLP
+files. Then a local agent (`loadgen.local_target`) takes the same load with tracing off
+and on, and the spans it recorded are summarized as `python -m agentstr_demo.tracing` would.
+
+    uv run benchmarks/tracing_overhead.py --iterations 100000 --conversations 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from common import print_table
+from loadgen import LoadGenerator, classify_agent_reply, local_target, summarize
+
+from agentstr_demo import tracing
+
+logging.disable(logging.WARNING)
+
+
+def nested_spans(iterations: int) -> float:
+    """Microseconds per turn of four nested spans."""
+    start = time.perf_counter()
+    for i in range(iterations):
+        with tracing.span('agent.message', thread_id='abc', queued_ms=0.1, relay_lag_s=0.5):
+            with tracing.span('agent.callable'):
+                with tracing.span('mcp.call', tool='get_price') as span:
+                    span.set(result='remote')
+                    with tracing.span('http.request', method='GET', host='example.com') as request:
+                        request.set(status=200)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def agent_load(args) -> dict:
+    target = SimpleNamespace(llm_latency=args.llm_latency, relay_latency=0.0, stream=False)
+    async with local_target('agent', target) as (url, pubkey):
+        generator = LoadGenerator([url], pubkey, lambda c, t: f'Hello from {c}, turn {t}', classify_agent_reply,
+                                  conversations=args.conversations, turns=args.turns, ramp=1.0, timeout=60)
+        return summarize(await generator.run(), generator.elapsed)
+
+
+async def main(args):
+    directory = tempfile.mkdtemp(prefix='agentstr-tracing-')
+    rows = []
+    for mode in ('off', 'jsonl', 'otlp'):
+        path = os.path.join(directory, f'micro.{mode}')
+        tracing.configure(None if mode == 'off' else tracing.Tracer(path, format=mode, service='benchmark'))
+        rows.append({'tracing': mode, 'us_per_turn': nested_spans(args.iterations),
+                     'file_kb': os.path.getsize(path) / 1024 if os.path.exists(path) else 0.0})
+    print(f'{args.iterations} turns of 4 nested spans')
+    print_table(rows, ['tracing', 'us_per_turn', 'file_kb'])
+
+    rows = []
+    spans = os.path.join(directory, 'agent.jsonl')
+    for mode in ('off', 'jsonl'):
+        tracing.configure(None if mode == 'off' else tracing.Tracer(spans, service='agent'))
+        summary = await agent_load(args)
+        rows.append({'tracing': mode, 'ok': summary['ok'], 'ok_per_s': summary['ok_per_s'], **summary['latency_ms']})
+    tracing.configure(None)
+    print(f'\nLocal agent, {args.conversations} conversations x {args.turns} turns, '
+          f'fake LLM {args.llm_latency:.2f} s (latency in ms)')
+    print_table(rows, ['tracing', 'ok', 'ok_per_s', 'p50', 'p90', 'p99', 'max'])
+    print()
+    tracing.summarize(tracing.read_spans([spans]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100_000)
+    parser.add_argument('--conversations', type=int, default=50)
+    parser.add_argument('--turns', type=int, default=3)
+    parser.add_argument('--llm-latency', type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+"""Travel agent booking store under 1,000 concurrent bookings.
+
+Worker processes, each running a pool of threads with their own connection, race to book
+seats on a handful of flights that have fewer seats than requests. Afterwards the database
+is checked for double allocations: no flight may have more bookings than seats, every seat
+counter must match its bookings, and every successful booking must be stored exactly once.
+
+    uv run benchmarks/travel_bookings.py --bookings 1000 --processes 4 --threads 16
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from common import load_module, percentiles, print_table
+
+FLIGHTS = 5
+
+
+def _flight(models, i: int):
+    return models.Flight(flight_id=f'DA{i}', origin='SFO', destination='JFK',
+                         date_time=models.Date(year=2025, month=9, day=1 + i, hour=6), duration=5.5, price=350)
+
+
+def _worker(path: str, capacity: int, jobs: list[int], threads: int) -> list[tuple]:
+    """Book one seat per job (job i goes to flight i % FLIGHTS for user i); returns (job, confirmation or None, seconds)."""
+    booking_store = load_module('agents/travel/booking_store.py')
+    import models  # The sibling module booking_store imported, so Flight validates as the same class
+    store = booking_store.BookingStore(path, default_capacity=capacity)
+    flights = [_flight(models, i) for i in range(FLIGHTS)]
+
+    def book(job: int):
+        t0 = time.perf_counter()
+        try:
+            confirmation = store.book(f'user{job}', flights[job % FLIGHTS]).confirmation_number
+        except ValueError:
+            confirmation = None
+        return job, confirmation, time.perf_counter() - t0
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(book, jobs))
+
+
+def main(bookings: int, processes: int, threads: int, capacity: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bookings.sqlite3')
+        load_module('agents/travel/booking_store.py').BookingStore(path, default_capacity=capacity).close()
+        jobs = [list(range(bookings))[p::processes] for p in range(processes)]
+
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(processes) as pool:
+            results = [r for batch in pool.map(_worker, [path] * processes, [capacity] * processes, jobs,
+                                               [threads] * processes) for r in batch]
+        elapsed = time.perf_counter() - t0
+
+        db = sqlite3.connect(path)
+        booked = dict(db.execute('SELECT flight_id, booked FROM seats'))
+        stored = dict(db.execute('SELECT flight_id, COUNT(*) FROM bookings GROUP BY flight_id'))
+        confirmations = {c for c, in db.execute('SELECT confirmation_number FROM bookings')}
+
+    succeeded = [(job, c) for job, c, _ in results if c]
+    per_flight = Counter(f'DA{job % FLIGHTS}' for job, _ in succeeded)
+    expected = min(bookings, FLIGHTS * capacity)
+    checks = {
+        'all requests answered': len(results) == bookings,
+        'successes == min(requests, seats)': len(succeeded) == expected,
+        'no flight over capacity': all(n <= capacity for n in stored.values()),
+        'seat counters match bookings': booked == {f: stored.get(f, 0) for f in booked},
+        'successful bookings == stored rows': per_flight == Counter(stored) and {c for _, c in succeeded} == confirmations,
+    }
+
+    print(f'{bookings} bookings from {processes} processes x {threads} threads, '
+          f'{FLIGHTS} flights x {capacity} seats, in {elapsed:.2f}s ({bookings / elapsed:.0f}/s)')
+    print_table([{'booked': len(succeeded), 'sold_out': bookings - len(succeeded),
+                  **{k: round(v, 2) for k, v in percentiles([s for *_, s in results]).items()}}],
+                ['booked', 'sold_out', 'p50', 'p90', 'p99', 'max'])
+    print()
+    for name, ok in checks.items():
+        print(f'{"ok  " if ok else "FAIL"} {name}')
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=1000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--capacity', type=int, default=150, help='seats per flight')
+    args = parser.parse_args()
+    main(args.bookings, args.processes, args.threads, args.capacity)
@@ -0,0 +1,102 @@
+"""Travel agent conversation history: prompt tokens per turn and memory as threads grow.
+
+The old agent kept every turn of every thread in a dict, including the full ReAct trajectory,
+and replayed all of it on each request. The HistoryStore keeps a bounded window of
+request/answer pairs per thread and evicts idle threads to SQLite.
+
+    uv run benchmarks/travel_history.py --turns 30 --threads 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import tempfile
+
+from common import load_module, print_table
+
+
+def synthetic_turn(rng: random.Random, i: int) -> dict:
+    """A turn as the old agent stored it: request, reasoning, answer and the ReAct trajectory."""
+    trajectory = {}
+    for step in range(rng.randrange(2, 5)):
+        trajectory[f'thought_{step}'] = 'I should look up the flights that match the request. ' * 3
+        trajectory[f'tool_name_{step}'] = 'search_flights'
+        trajectory[f'tool_args_{step}'] = {'origin': 'SFO', 'destination': 'JFK', 'criteria': 'cheapest'}
+        trajectory[f'observation_{step}'] = [
+            {'flight_id': f'DA{rng.randrange(1000)}', 'origin': 'SFO', 'destination': 'JFK',
+             'date_time': {'year': 2025, 'month': 9, 'day': 1, 'hour': rng.randrange(24)},
+             'duration': 5.5, 'price': rng.randrange(200, 600)} for _ in range(3)]
+    return {
+        'user_request': f'Turn {i}: find me the cheapest flight from SFO to JFK on September {1 + i % 28}',
+        'trajectory': trajectory,
+        'reasoning': 'The user wants the cheapest option, so I searched and picked the first result.',
+        'process_result': f'The cheapest flight is DA{rng.randrange(1000)} at ${rng.randrange(200, 600)}, departing 6am.',
+    }
+
+
+def compact(turn: dict) -> dict:
+    return {'user_request': turn['user_request'], 'process_result': turn['process_result']}
+
+
+async def tokens_per_turn(history_store, turns: int, **store_kwargs) -> list[dict]:
+    async def summarize(previous, retired):
+        return ((previous or '') + ' ' + ' '.join(t['process_result'] for t in retired))[-600:]
+
+    rng = random.Random(1)
+    store = history_store.HistoryStore(summarize=summarize, **store_kwargs)
+    count = store.count_tokens
+    unbounded = []
+    rows = []
+    for i in range(1, turns + 1):
+        messages, saved = store.messages('thread')
+        old_tokens = sum(count(json.dumps(t)) for t in unbounded)
+        new_tokens = sum(count(json.dumps(t)) for t in messages)
+        if i in (1, 2, 5, 10) or i % 10 == 0:
+            rows.append({'turn': i, 'unbounded': old_tokens, 'history_store': new_tokens,
+                         'saved': old_tokens - new_tokens, 'saved_vs_window': saved})
+        turn = synthetic_turn(rng, i)
+        unbounded.append(turn)
+        await store.append('thread', compact(turn))
+    return rows
+
+
+async def memory(history_store, threads: int, turns: int, db_path: str, **store_kwargs) -> dict:
+    rng = random.Random(2)
+    store = history_store.HistoryStore(db_path=db_path, **store_kwargs)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for t in range(threads):
+        for i in range(turns):
+            store.messages(f'thread-{t}')
+            await store.append(f'thread-{t}', compact(synthetic_turn(rng, i)))
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    resident = len(store)
+    store.close()
+    return {'threads': threads, 'resident_threads': resident, 'rss_growth_mb': (after - before) / 1024,
+            'spill_mb': os.path.getsize(db_path) / 2**20}
+
+
+async def main(turns: int, threads: int, max_turns: int, max_tokens: int, max_threads: int):
+    history_store = load_module('agents/travel/history_store.py')
+    kwargs = dict(max_turns=max_turns, max_tokens=max_tokens, max_threads=max_threads)
+
+    print(f'Prompt history tokens per turn (max_turns={max_turns}, max_tokens={max_tokens}, summarizing)')
+    print_table(await tokens_per_turn(history_store, turns, **kwargs),
+                ['turn', 'unbounded', 'history_store', 'saved', 'saved_vs_window'])
+
+    print(f'\nMemory with {threads} threads x 3 turns (max_threads={max_threads}, spilling to SQLite)')
+    with tempfile.TemporaryDirectory() as tmp:
+        print_table([await memory(history_store, threads, 3, os.path.join(tmp, 'history.sqlite3'), **kwargs)],
+                    ['threads', 'resident_threads', 'rss_growth_mb', 'spill_mb'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=30)
+    parser.add_argument('--threads', type=int, default=20000)
+    parser.add_argument('--max-turns', type=int, default=10)
+    parser.add_argument('--max-tokens', type=int, default=2000)
+    parser.add_argument('--max-threads', type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.threads, args.max_turns, args.max_tokens, args.max_threads))
@@ -0,0 +1,129 @@
+"""A Nostr Wallet Connect (NIP-47) wallet service on a `StubRelay`, for offline benchmarks.
+
+Answers `make_invoice`, `lookup_invoice`, `pay_invoice`, `get_balance` and `get_info`
+requests from any app, with real (signed) BOLT11 invoices that no Lightning node will ever
+see. `pay_invoice` settles the invoice at once. Users outside Nostr pay an invoice with
+`await wallet.pay(invoice)`.
+
+    async with StubRelay() as relay:
+        wallet = StubWallet(relay)
+        os.environ['AGENT_NWC_CONN_STR'] = wallet.connection_string()
+"""
+import hashlib
+import json
+import os
+import time
+
+from pynostr.encrypted_dm import EncryptedDirectMessage
+from pynostr.event import Event
+from pynostr.key import PrivateKey
+
+from relay import StubRelay
+
+REQUEST, RESPONSE = 23194, 23195
+
+
+class StubWallet:
+    """Wallet service answering NWC requests published to `relay`.
+
+    Args:
+        relay: The relay the apps talk to the wallet through.
+        balance_sats: Balance reported by `get_balance`.
+    """
+    def __init__(self, relay: StubRelay, balance_sats: int = 1_000_000):
+        self.relay = relay
+        self.key = PrivateKey()
+        self.balance_sats = balance_sats
+        self.invoices: dict[str, dict] = {}  # Invoice -> {amount, payment_hash, preimage, settled_at}
+        self.invoiced_sats = 0
+        self.paid_sats = 0
+        self._add_event = relay.add_event
+        relay.add_event = self._observe
+
+    @property
+    def pubkey(self) -> str:
+        return self.key.public_key.hex()
+
+    def connection_string(self) -> str:
+        """A `nostr+walletconnect://` string for a new app of this wallet."""
+        return f'nostr+walletconnect://{self.pubkey}?relay={self.relay.url}&secret={PrivateKey().hex()}'
+
+    async def pay(self, invoice: str):
+        """Settle `invoice` as if someone paid it."""
+        self._settle(invoice)
+
+    def _settle(self, invoice: str) -> dict | None:
+        record = self.invoices.get(invoice)
+        if record is not None and record['settled_at'] is None:
+            record['settled_at'] = int(time.time())
+            self.paid_sats += record['amount'] // 1000
+        return record
+
+    def _observe(self, event: dict) -> bool:
+        stored = self._add_event(event)
+        if stored and event['kind'] == REQUEST and ['p', self.pubkey] in [tag[:2] for tag in event['tags']]:
+            self._respond(event)
+        return stored
+
+    def _respond(self, event: dict):
+        dm = EncryptedDirectMessage()
+        dm.decrypt(self.key.hex(), encrypted_message=event['content'], public_key_hex=event['pubkey'])
+        request = json.loads(dm.cleartext_content)
+        method, params = request['method'], request.get('params', {})
+        try:
+            result = self._handle(method, params)
+            body = {'result_type': method, 'result': result}
+        except Exception as e:
+            body = {'result_type': method, 'error': {'code': 'OTHER', 'message': str(e)}}
+        reply = EncryptedDirectMessage()
+        reply.encrypt(self.key.hex(), cleartext_content=json.dumps(body), recipient_pubkey=event['pubkey'])
+        response = Event(kind=RESPONSE, content=reply.encrypted_message, pubkey=self.pubkey,
+                         tags=[['p', event['pubkey']], ['e', event['id']]])
+        response.sign(self.key.hex())
+        self._add_event(response.to_dict())
+
+    def _handle(self, method: str, params: dict) -> dict:
+        if method == 'make_invoice':
+            return self._make_invoice(params.get('amount', 0), params.get('description', ''))
+        if method == 'lookup_invoice':
+            record = self.invoices.get(params.get('invoice')) or next(
+                (r for r in self.invoices.values() if r['payment_hash'] == params.get('payment_hash')), None)
+            if record is None:
+                raise KeyError('Invoice not found')
+            return self._describe(record)
+        if method == 'pay_invoice':
+            record = self._settle(params['invoice'])
+            if record is None:
+                raise KeyError('Unknown invoice')
+            return {'preimage': record['preimage']}
+        if method == 'get_balance':
+            return {'balance': self.balance_sats * 1000}
+        if method == 'get_info':
+            return {'alias': 'stub wallet', 'network': 'mainnet',
+                    'methods': ['make_invoice', 'lookup_invoice', 'pay_invoice', 'get_balance', 'get_info']}
+        raise ValueError(f'Unsupported method {method}')
+
+    def _make_invoice(self, amount_msat: int, description: str) -> dict:
+        from bolt11 import encode
+        from bolt11.models.tags import Tags
+        from bolt11.types import Bolt11
+
+        preimage = os.urandom(32)
+        payment_hash = hashlib.sha256(preimage).hexdigest()
+        invoice = encode(Bolt11(currency='bc', amount_msat=amount_msat or None, date=int(time.time()),
+                                tags=Tags.from_dict({'payment_hash': payment_hash, 'payment_secret': os.urandom(32).hex(),
+                                                     'description': description})), PrivateKey().hex())
+        record = {'invoice': invoice, 'amount': amount_msat, 'description': description, 'payment_hash': payment_hash,
+                  'preimage': preimage.hex(), 'created_at': int(time.time()), 'settled_at': None}
+        self.invoices[invoice] = record
+        self.invoiced_sats += amount_msat // 1000
+        return self._describe(record)
+
+    @staticmethod
+    def _describe(record: dict) -> dict:
+        result = {'type': 'incoming', 'invoice': record['invoice'], 'description': record['description'],
+                  'payment_hash': record['payment_hash'], 'amount': record['amount'],
+                  'created_at': record['created_at'], 'expires_at': record['created_at'] + 3600}
+        if record['settled_at'] is not None:
+            result.update(preimage=record['preimage'], settled_at=record['settled_at'])
+        return result
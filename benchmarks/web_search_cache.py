@@ -0,0 +1,106 @@
+"""Hit ratio, coalescing and latency of the web_search result cache, using a fake Tavily client.
+
+Replays a skewed mix of news queries (a few hot queries, a long tail, with casing and
+whitespace variations) from many concurrent callers, and a burst of identical queries
+arriving at once.
+
+    uv run benchmarks/web_search_cache.py --calls 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from common import load_module, percentiles, print_table, set_default_env
+
+
+class FakeTavilyClient:
+    """Stands in for TavilyClient: answers after `latency` seconds and counts searches."""
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.searches = 0
+
+    async def search(self, query: str, max_results: int = 5, topic: str = "general", **kwargs) -> dict:
+        self.searches += 1
+        await asyncio.sleep(self.latency)
+        return {"results": [{"title": f"{query} #{i}", "content": "...", "url": f"https://example.com/{i}"}
+                            for i in range(max_results)]}
+
+
+def query_mix(calls: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    topics = [f"bitcoin news {i}" for i in range(200)]
+    weights = [1 / (rank + 1) for rank in range(len(topics))]  # Zipf-like popularity
+    queries = []
+    for topic in rng.choices(topics, weights=weights, k=calls):
+        variant = rng.choice([topic, topic.upper(), f"  {topic} ", topic.title()])
+        queries.append(variant)
+    return queries
+
+
+async def replay(web_search, queries: list[str], concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(query):
+        async with semaphore:
+            t0 = time.perf_counter()
+            result = await web_search(query, num_results=5)
+            assert 'error' not in result, result
+            samples.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*[one(q) for q in queries])
+    return samples
+
+
+async def main(calls: int, concurrency: int, latency: float, burst: int):
+    set_default_env(NOSTR_RELAYS='ws://localhost', TAVILY_API_KEY='tvly-fake')
+    server = load_module('mcp_servers/web_search/server.py')
+    fake = FakeTavilyClient(latency)
+    server.TavilyClient = lambda api_key, http: fake
+    server.print = lambda *args, **kwargs: None  # Keep the per-call log line out of the report
+    queries = query_mix(calls)
+    rows = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, cache in [
+            ('no cache (ttl=0)', server.SearchCache(ttl=0)),
+            ('memory', server.SearchCache(ttl=300)),
+            ('memory + sqlite', server.SearchCache(ttl=300, db_path=os.path.join(tmp, 'search.sqlite3'))),
+        ]:
+            server.search_cache = cache
+            fake.searches = 0
+            samples = await replay(server.web_search, queries, concurrency)
+            stats = cache.stats()
+            rows.append({'cache': name, 'calls': len(samples), 'upstream': fake.searches,
+                         'hit %': 100 * stats['hits'] / max(stats['hits'] + stats['misses'], 1),
+                         'coalesced': stats['coalesced'], **percentiles(samples)})
+
+        # Restart: a fresh in-memory cache over the same SQLite file
+        server.search_cache = cache = server.SearchCache(ttl=300, db_path=os.path.join(tmp, 'search.sqlite3'))
+        fake.searches = 0
+        samples = await replay(server.web_search, queries, concurrency)
+        rows.append({'cache': 'sqlite after restart', 'calls': len(samples), 'upstream': fake.searches,
+                     'hit %': 100 * cache.stats()['hits'] / len(samples), 'coalesced': cache.stats()['coalesced'],
+                     **percentiles(samples)})
+
+    server.search_cache = cache = server.SearchCache(ttl=300)
+    fake.searches = 0
+    samples = await replay(server.web_search, ['latest bitcoin etf news'] * burst, burst)
+    rows.append({'cache': f'burst of {burst} identical', 'calls': len(samples), 'upstream': fake.searches,
+                 'hit %': 0.0, 'coalesced': cache.stats()['coalesced'], **percentiles(samples)})
+
+    print(f'calls={calls} concurrency={concurrency} fake Tavily latency={latency * 1000:.0f}ms (latencies in ms)')
+    print_table(rows, ['cache', 'calls', 'upstream', 'hit %', 'coalesced', 'p50', 'p99', 'max'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--burst', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency, args.latency, args.burst))
@@ -3,40 +3,66 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
-import httpx
-from agentstr import NostrMCPServer
+import asyncio
+from agentstr_demo.cache import TTLCache
+from agentstr_demo.http import HTTPPool
+from agentstr_demo.server import MCPServer
 
 
-BASE_URL = 'https://blockchain.info/q'
+BASE_URL = os.getenv('BLOCKCHAIN_INFO_URL', 'https://blockchain.info/q')
 
+# Field name -> (blockchain.info endpoint, seconds to cache)
+ENDPOINTS = {
+    "24hr_price": ("24hrprice", 30),  # 24 hour weighted price from the largest exchanges
+    "market_cap": ("marketcap", 30),  # USD market cap (based on 24 hour weighted price)
+    "24hr_transaction_count": ("24hrtransactioncount", 300),  # Number of transactions in the last 24 hours
+    "24hr_btc_sent": ("24hrbtcsent", 300),  # Number of BTC sent in the last 24 hours
+    "hashrate": ("hashrate", 300),  # Current hashrate in GH/s
+    "difficulty": ("getdifficulty", 3600),  # Current difficulty
+    "block_count": ("getblockcount", 30),  # Current block count
+}
 
-async def get_24hr_price(client) -> str:
-    """24 hour weighted price from the largest exchanges"""
-    return (await client.get(f'{BASE_URL}/24hrprice')).text
 
-async def get_market_cap(client) -> str:
-    """USD market cap (based on 24 hour weighted price)"""
-    return (await client.get(f'{BASE_URL}/marketcap')).text
-    
-async def get_24hr_transaction_count(client) -> str:
-    """Number of transactions in the last 24 hours"""
-    return (await client.get(f'{BASE_URL}/24hrtransactioncount')).text
-
-async def get_24hr_btc_sent(client) -> str:
-    """Number of BTC sent in the last 24 hours"""
-    return (await client.get(f'{BASE_URL}/24hrbtcsent')).text
-
-async def get_hashrate(client) -> str:
-    """Current hashrate in GH/s"""
-    return (await client.get(f'{BASE_URL}/hashrate')).text
+class BlockchainInfo:
+    """Reads the blockchain.info query API concurrently, caching each value with its own TTL.
 
-async def get_difficulty(client) -> str:
-    """Current difficulty"""
-    return (await client.get(f'{BASE_URL}/getdifficulty')).text
+    Concurrent requests for the same value share a single upstream fetch.
+    """
+    def __init__(self, http: HTTPPool, base_url: str = BASE_URL, endpoints: dict[str, tuple[str, float]] = ENDPOINTS):
+        self.http = http
+        self.base_url = base_url
+        self.endpoints = endpoints
+        self.cache = TTLCache()
+
+    async def _fetch(self, endpoint: str) -> str:
+        response = await self.http.get(f'{self.base_url}/{endpoint}')
+        response.raise_for_status()
+        return response.text
+
+    async def get(self, name: str) -> str:
+        """Get a single value by field name."""
+        endpoint, ttl = self.endpoints[name]
+        return await self.cache.get_or_load(name, lambda: self._fetch(endpoint), ttl=ttl)
+
+    async def get_all(self) -> dict:
+        """Get every value at once.
+
+        Fields that fail to load are left out and listed under `errors` instead, with the
+        reason for each; if none of them load, the first failure is raised.
+        """
+        values = await asyncio.gather(*[self.get(name) for name in self.endpoints], return_exceptions=True)
+        failures = {name: value for name, value in zip(self.endpoints, values) if isinstance(value, Exception)}
+        if len(failures) == len(self.endpoints):
+            raise next(iter(failures.values()))
+        data = {name: value for name, value in zip(self.endpoints, values) if name not in failures}
+        if failures:
+            data["errors"] = {name: str(error) or type(error).__name__ for name, error in failures.items()}
+        return data
+
+
+http_pool = HTTPPool.from_env()
+blockchain_info = BlockchainInfo(http_pool)
 
-async def get_block_count(client) -> str:
-    """Current block count"""
-    return (await client.get(f'{BASE_URL}/getblockcount')).text
 
 async def get_bitcoin_data() -> dict:
     """Get latest Bitcoin blockchain data
@@ -49,27 +75,21 @@ async def get_bitcoin_data() -> dict:
         hashrate: Current hashrate in GH/s
         difficulty: Current difficulty
         block_count: Current block count
+        errors: Fields that could not be loaded, with the reason (only if some failed)
     """
-    async with httpx.AsyncClient() as client:
-        return {
-            "24hr_price": await get_24hr_price(client),
-            "market_cap": await get_market_cap(client),
-            "24hr_transaction_count": await get_24hr_transaction_count(client),
-            "24hr_btc_sent": await get_24hr_btc_sent(client),
-            "hashrate": await get_hashrate(client),
-            "difficulty": await get_difficulty(client),
-            "block_count": await get_block_count(client),
-        }
+    return await blockchain_info.get_all()
 
 
 async def run():
     relays = os.getenv('NOSTR_RELAYS').split(',')
     private_key = os.getenv('MCP_SERVER_PRIVATE_KEY')
 
-    server = NostrMCPServer("Bitcoin Data Tool", 
-                            relays=relays, 
-                            private_key=private_key,
-                            tools=[get_bitcoin_data])
+    server = MCPServer("Bitcoin Data Tool", 
+                       relays=relays, 
+                       private_key=private_key,
+                       tools=[get_bitcoin_data],
+                       http_pool=http_pool,
+                       caches={'blockchain_info': blockchain_info.cache})
 
     await server.start()
 
@@ -79,4 +99,4 @@ if __name__ == "__main__":
     asyncio.run(run())
 
 
-    
\ No newline at end of file
+    
@@ -0,0 +1,120 @@
+import datetime
+
+from agentstr_demo.cache import SQLiteCache, TTLCache
+from agentstr_demo.http import HTTPPool
+
+
+class RateTables:
+    """Cached Frankfurter (ECB) reference rates, stored as one EUR-based table per day.
+
+    Published rates for past dates never change, so they are persisted on disk and never
+    fetched twice. "latest" (and today's date, which may not be published yet) is kept in
+    memory for a short TTL. Any cross rate is derived locally from the EUR table, so
+    converting between N currency pairs costs at most one upstream request.
+    """
+    def __init__(self, http: HTTPPool, base_url: str, db_path: str, latest_ttl: float = 300):
+        """Initialize the tables.
+
+        Args:
+            http: Pool to fetch rates through.
+            base_url: Frankfurter API base URL.
+            db_path: SQLite file for the persistent cache of dated tables.
+            latest_ttl: Seconds to keep "latest" (and today's) rates in memory.
+        """
+        self.http = http
+        self.base_url = base_url
+        self.latest_ttl = latest_ttl
+        self.disk = SQLiteCache(db_path, table='rate_tables')
+        self.memory = TTLCache()
+
+    @staticmethod
+    def _is_settled(date: str) -> bool:
+        """Whether rates for `date` are final (strictly before today, UTC)."""
+        return date != 'latest' and _parse_date(date) < datetime.datetime.now(datetime.timezone.utc).date()
+
+    async def _fetch(self, path: str) -> dict:
+        response = await self.http.get(f'{self.base_url}/{path}', params={'from': 'EUR'})
+        response.raise_for_status()
+        return response.json()
+
+    async def table(self, date: str = 'latest') -> dict:
+        """EUR-based rate table for `date` (YYYY-MM-DD or "latest").
+
+        Returns:
+            {"date": <publication date>, "rates": {currency: units per EUR, including EUR}}
+
+        Raises:
+            ValueError: If `date` is not a YYYY-MM-DD date or "latest".
+        """
+        if date != 'latest':
+            date = _parse_date(date).isoformat()
+        if not self._is_settled(date):
+            return await self.memory.get_or_load(date, lambda: self._load_table(date), ttl=self.latest_ttl)
+        table = self.disk.get(f'table:{date}')
+        if table is None:
+            table = await self.memory.get_or_load(date, lambda: self._load_table(date), ttl=self.latest_ttl)
+            self.disk.set(f'table:{date}', table)
+        return table
+
+    async def _load_table(self, date: str) -> dict:
+        data = await self._fetch(date)
+        return {'date': data['date'], 'rates': {'EUR': 1.0, **data['rates']}}
+
+    async def series(self, start_date: str, end_date: str) -> dict[str, dict]:
+        """EUR-based rate tables for every publication date in [start_date, end_date].
+
+        Returns:
+            {date: {currency: units per EUR}} ordered by date.
+
+        Raises:
+            ValueError: If either date is not a YYYY-MM-DD date, or `start_date` is after `end_date`.
+        """
+        start, end = _parse_date(start_date), _parse_date(end_date)
+        if start > end:
+            raise ValueError(f'Start date {start_date} is after end date {end_date}')
+        start_date, end_date = start.isoformat(), end.isoformat()
+        covered = [tuple(dates) for dates in self.disk.get('covered', [])]  # Stored as JSON lists
+        if any(first <= start_date and end_date <= last for first, last in covered):
+            tables = {}
+            day = start
+            while day <= end:
+                table = self.disk.get(f'table:{day.isoformat()}')
+                if table is not None and table['date'] == day.isoformat():
+                    tables[table['date']] = table['rates']
+                day += datetime.timedelta(days=1)
+            return tables
+
+        data = await self._fetch(f'{start_date}..{end_date}')
+        tables = {date: {'EUR': 1.0, **rates} for date, rates in sorted(data['rates'].items())}
+        settled = {f'table:{date}': {'date': date, 'rates': rates}
+                   for date, rates in tables.items() if self._is_settled(date)}
+        self.disk.set_many(settled)
+        if self._is_settled(end_date):
+            self.disk.set('covered', _merge_ranges(covered + [(start_date, end_date)]))
+        return tables
+
+
+def cross_rate(rates: dict[str, float], currency_from: str, currency_to: str) -> float:
+    """Units of `currency_to` per unit of `currency_from`, from an EUR-based table."""
+    for currency in (currency_from, currency_to):
+        if currency not in rates:
+            raise ValueError(f'Unknown currency: {currency}')
+    return rates[currency_to] / rates[currency_from]
+
+
+def _parse_date(date: str) -> datetime.date:
+    try:
+        return datetime.date.fromisoformat(date)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid date {date!r}: use YYYY-MM-DD') from None
+
+
+def _merge_ranges(ranges: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    merged = []
+    for start, end in sorted(ranges):
+        next_day = (datetime.date.fromisoformat(start) - datetime.timedelta(days=1)).isoformat()
+        if merged and next_day <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
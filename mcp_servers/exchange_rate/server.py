@@ -3,14 +3,25 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import json
 import httpx
-from agentstr import NostrMCPServer, tool
+from agentstr import tool
+from agentstr_demo.http import HTTPPool
+from agentstr_demo.server import MCPServer
+from rates import RateTables, cross_rate
 
 # Get the environment variables
 relays = os.getenv('NOSTR_RELAYS').split(',')
 private_key = os.getenv('MCP_SERVER_PRIVATE_KEY')
 nwc_str = os.getenv('MCP_SERVER_NWC_CONN_STR')
 
+FRANKFURTER_URL = os.getenv('FRANKFURTER_URL', 'https://api.frankfurter.app')
+CACHE_PATH = os.getenv('EXCHANGE_RATE_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'rates.sqlite3'))
+LATEST_TTL = float(os.getenv('EXCHANGE_RATE_LATEST_TTL', '300'))
+
+http_pool = HTTPPool.from_env()
+rate_tables = RateTables(http_pool, FRANKFURTER_URL, CACHE_PATH, latest_ttl=LATEST_TTL)
+
 
 @tool(satoshis=5)
 async def get_exchange_rate(
@@ -22,42 +33,94 @@ async def get_exchange_rate(
 
     Args:
         currency_from: The currency to convert from (e.g., "USD").
-        currency_to: The currency to convert to (e.g., "EUR").
+        currency_to: The currency to convert to (e.g., "EUR", or several like "EUR,GBP").
         currency_date: The date for the exchange rate or "latest". Defaults to "latest".
 
     Returns:
         A dictionary containing the exchange rate data, or an error message if the request fails.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f'https://api.frankfurter.app/{currency_date}',
-                params={'from': currency_from, 'to': currency_to},
-            )
-            response.raise_for_status()
-
-            data = response.json()
-
-        if 'rates' not in data:
-            print(f'rates not found in response: {data}')
-            return {'error': 'Invalid API response format.'}
-        print(f'API response: {data}')
-        return data
+        table = await rate_tables.table(currency_date)
+        return {
+            'amount': 1.0,
+            'base': currency_from,
+            'date': table['date'],
+            'rates': {
+                currency: cross_rate(table['rates'], currency_from, currency)
+                for currency in _currencies(currency_to)
+            },
+        }
+    except httpx.HTTPError as e:
+        print(f'API request failed: {e}')
+        return {'error': f'API request failed: {e}'}
+    except json.JSONDecodeError:
+        print('Invalid JSON response from API')
+        return {'error': 'Invalid JSON response from API.'}
+    except KeyError:
+        print('rates not found in API response')
+        return {'error': 'Invalid API response format.'}
+    except ValueError as e:
+        return {'error': str(e)}
+
+
+@tool(satoshis=10)
+async def get_exchange_rate_series(
+        pairs: list[str],
+        start_date: str = 'latest',
+        end_date: str | None = None,
+):
+    """Use this to get exchange rates for many currency pairs and/or a range of dates in one call.
+
+    Args:
+        pairs: Currency pairs as "FROM/TO" (e.g., ["USD/EUR", "GBP/JPY"]).
+        start_date: First date of the series (YYYY-MM-DD) or "latest". Defaults to "latest".
+        end_date: Last date of the series (YYYY-MM-DD). Defaults to `start_date`.
+
+    Returns:
+        A dictionary mapping each date with published rates to the rate of every pair, or an error message.
+    """
+    try:
+        pairs = [tuple(_currencies(pair.replace('/', ','))) for pair in pairs]
+        if any(len(pair) != 2 for pair in pairs):
+            return {'error': 'Pairs must look like "USD/EUR".'}
+        if start_date == 'latest' or end_date in (None, start_date):
+            table = await rate_tables.table(start_date)
+            tables = {table['date']: table['rates']}
+        else:
+            tables = await rate_tables.series(start_date, end_date)
+        return {
+            'pairs': [f'{a}/{b}' for a, b in pairs],
+            'rates': {
+                date: {f'{a}/{b}': cross_rate(rates, a, b) for a, b in pairs}
+                for date, rates in tables.items()
+            },
+        }
     except httpx.HTTPError as e:
         print(f'API request failed: {e}')
         return {'error': f'API request failed: {e}'}
-    except ValueError:
+    except json.JSONDecodeError:
         print('Invalid JSON response from API')
         return {'error': 'Invalid JSON response from API.'}
+    except KeyError:
+        print('rates not found in API response')
+        return {'error': 'Invalid API response format.'}
+    except ValueError as e:
+        return {'error': str(e)}
+
+
+def _currencies(value: str) -> list[str]:
+    return [currency.strip().upper() for currency in value.split(',') if currency.strip()]
 
 
 async def run():
     # Create an instance of NostrClient
-    server = NostrMCPServer("Exchange Rate Tool", 
+    server = MCPServer("Exchange Rate Tool", 
         relays=relays, 
         private_key=private_key, 
         nwc_str=nwc_str,
-        tools=[get_exchange_rate]
+        tools=[get_exchange_rate, get_exchange_rate_series],
+        http_pool=http_pool,
+        caches={'latest_rates': rate_tables.memory},
     )
     
     await server.start()
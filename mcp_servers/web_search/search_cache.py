@@ -0,0 +1,54 @@
+from collections.abc import Awaitable, Callable
+
+from agentstr_demo.cache import SQLiteCache, TTLCache
+
+
+class SearchCache:
+    """Cache of formatted search results keyed by normalized query and number of results.
+
+    Results live in a TTL + LRU in-memory cache, optionally backed by a SQLite file so they
+    survive restarts. Identical queries that miss at the same time share one upstream search.
+    """
+    def __init__(self, ttl: float = 300, max_size: int = 1000, db_path: str | None = None):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds to keep a search result.
+            max_size: Maximum number of results kept in memory (least recently used are evicted).
+            db_path: SQLite file to back the in-memory cache with (memory only if None).
+        """
+        self.ttl = ttl
+        self.memory = TTLCache(max_size=max_size)
+        self.disk = SQLiteCache(db_path, table='web_search') if db_path else None
+        self.upstream_calls = 0
+
+    @staticmethod
+    def key(query: str, num_results: int) -> str:
+        """Normalize a query so trivially different spellings share a cache entry."""
+        return f"{' '.join(query.lower().split())}|{num_results}"
+
+    async def get_or_search(self, query: str, num_results: int, search: Callable[[], Awaitable[dict]]) -> dict:
+        """Return the cached result for the query, calling `search` only on a miss."""
+        key = self.key(query, num_results)
+        return await self.memory.get_or_load(key, lambda: self._load(key, search), ttl=self.ttl)
+
+    async def _load(self, key: str, search: Callable[[], Awaitable[dict]]) -> dict:
+        if self.disk is not None:
+            result = self.disk.get(key)
+            if result is not None:
+                return result
+        self.upstream_calls += 1
+        result = await search()
+        if self.disk is not None:
+            self.disk.set(key, result, ttl=self.ttl)
+        return result
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters."""
+        return {
+            "hits": self.memory.hits,
+            "misses": self.memory.misses,
+            "coalesced": self.memory.coalesced,
+            "disk_hits": self.disk.hits if self.disk is not None else 0,
+            "upstream_calls": self.upstream_calls,
+        }
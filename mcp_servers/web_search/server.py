@@ -2,9 +2,44 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import logging
 import os
-from agentstr import NostrMCPServer, tool
-from tavily import AsyncTavilyClient
+from agentstr import tool
+from agentstr_demo.http import HTTPPool
+from agentstr_demo.server import MCPServer
+from search_cache import SearchCache
+
+logger = logging.getLogger(__name__)
+
+TAVILY_URL = os.getenv('TAVILY_BASE_URL', 'https://api.tavily.com')
+
+http_pool = HTTPPool.from_env()
+search_cache = SearchCache(
+    ttl=float(os.getenv('WEB_SEARCH_CACHE_TTL', '300')),
+    max_size=int(os.getenv('WEB_SEARCH_CACHE_SIZE', '1000')),
+    db_path=os.getenv('WEB_SEARCH_CACHE_DB'),
+)
+
+
+class TavilyClient:
+    """Minimal Tavily Search API client that sends requests through the server's HTTP pool.
+
+    `tavily.AsyncTavilyClient` opens a new connection for every search; this keeps the
+    same `search` interface but reuses pooled connections.
+    """
+    def __init__(self, api_key: str, http: HTTPPool, base_url: str = TAVILY_URL):
+        self.api_key = api_key
+        self.http = http
+        self.base_url = base_url
+
+    async def search(self, query: str, max_results: int = 5, topic: str = "general", **kwargs) -> dict:
+        response = await self.http.post(
+            f'{self.base_url}/search',
+            json={"query": query, "max_results": max_results, "topic": topic, **kwargs},
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        )
+        response.raise_for_status()
+        return response.json()
 
 
 @tool(satoshis=10)
@@ -19,21 +54,20 @@ async def web_search(query: str, num_results: int = 10) -> dict:
     Returns:
         A dictionary containing search results
     """
-    print(f"Received query: {query}")
     # Get the Tavily API key from environment variables
     tavily_api_key = os.getenv('TAVILY_API_KEY')
     if not tavily_api_key:
         raise ValueError("TAVILY_API_KEY environment variable not set")
 
-    try:
+    async def search() -> dict:
         # Initialize Tavily client
-        tavily_client = AsyncTavilyClient(api_key=tavily_api_key)
-        
+        tavily_client = TavilyClient(api_key=tavily_api_key, http=http_pool)
+
         # Perform the search
         results = (await tavily_client.search(query, max_results=num_results, topic="news")).get('results', [])
-        
+
         # Format results for MCP
-        formatted_results = {
+        return {
             "query": query,
             "num_results": num_results,
             "results": [
@@ -48,12 +82,14 @@ async def web_search(query: str, num_results: int = 10) -> dict:
                 for result in results
             ]
         }
-        
-        print(f"Search results: {formatted_results}")
+
+    try:
+        formatted_results = await search_cache.get_or_search(query, num_results, search)
+        logger.debug(f"Search for {query!r}: {len(formatted_results['results'])} results")
         return formatted_results
     
     except Exception as e:
-        print(f"Search failed: {str(e)}")
+        logger.warning(f"Search for {query!r} failed: {e}")
         return {
             "error": f"Search failed: {str(e)}"
         }
@@ -67,12 +103,14 @@ nwc_str = os.getenv('MCP_SERVER_NWC_CONN_STR')
 
 async def run():
         # Create the MCP server
-    server = NostrMCPServer(
+    server = MCPServer(
         "Web Search Tool",
         relays=relays,
         private_key=private_key,
         nwc_str=nwc_str,
-        tools=[web_search]
+        tools=[web_search],
+        http_pool=http_pool,
+        caches={'search': search_cache.memory},
     )
 
     # Start the server
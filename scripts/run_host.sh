@@ -0,0 +1,3 @@
+#!/bin/bash
+
+uv run python -m agentstr_demo.host host.example.toml
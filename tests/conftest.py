@@ -0,0 +1,19 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_script(path: str):
+    """Import a service script (e.g. `mcp_servers/bitcoin/server.py`) by its path in the repo.
+
+    The script's directory goes on `sys.path` so it can import its sibling modules, and the
+    module is named after its directory so scripts that share a file name don't clash.
+    """
+    path = ROOT / path
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(path.parent.name + '_' + path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
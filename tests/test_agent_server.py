@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from agentstr import AgentCard, NostrClient, Skill
+from pynostr.key import PrivateKey
+
+from agentstr_demo.server import AgentServer
+
+
+def card(*skills: str) -> AgentCard:
+    return AgentCard(name='Test Agent', description='Answers tests.', satoshis=0, nostr_pubkey='npub1test',
+                     skills=[Skill(name=name, description=f'{name} skill', satoshis=0) for name in skills])
+
+
+def server_publishing_to(published: list) -> AgentServer:
+    """An AgentServer whose client records the cards it publishes instead of talking to relays."""
+    client = NostrClient(['ws://127.0.0.1:9'], PrivateKey().bech32())
+
+    async def update_metadata(**metadata):
+        published.append([skill['name'] for skill in json.loads(metadata['about'])['skills']])
+
+    async def listen(*args, **kwargs):
+        await asyncio.Event().wait()
+
+    client.update_metadata = update_metadata
+    client.direct_message_listener = listen
+
+    async def agent_callable(input):
+        return 'ok'
+
+    return AgentServer(client, agent_info=card('old_tool'), agent_callable=agent_callable)
+
+
+def test_update_agent_info_publishes_the_new_card():
+    published = []
+
+    async def run():
+        server = server_publishing_to(published)
+        await server.update_agent_info(card('renamed_tool'))  # Not started yet: start() publishes it
+        assert published == []
+        task = asyncio.create_task(server.start())
+        await asyncio.sleep(0.05)
+        await server.update_agent_info(card('renamed_tool', 'new_tool'))
+        task.cancel()
+
+    asyncio.run(run())
+    assert published == [['renamed_tool'], ['renamed_tool', 'new_tool']]
@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import load_script
+
+suite = load_script('benchmarks/suite.py')
+from fake_llm import FakeLLM, schema_instance  # noqa: E402 (sibling modules suite imported)
+from wallet import StubWallet  # noqa: E402 (sibling modules suite imported)
+
+
+def test_selected_components_bring_their_mcp_server():
+    assert suite.selected('agents/bitcoin,agents/medical') == ['mcp_servers/bitcoin', 'agents/bitcoin', 'agents/medical']
+    assert suite.selected(None) == list(suite.COMPONENTS)
+    with pytest.raises(SystemExit):
+        suite.selected('agents/unknown')
+
+
+def test_compare_flags_metrics_that_got_worse_than_the_tolerance():
+    def report(**metrics):
+        return {'components': {'agents/bitcoin': {'status': 'ok', **metrics}}}
+
+    rows = suite.compare(report(ok_per_s=80.0, latency_p50_ms=105.0, error_rate=0.0),
+                         report(ok_per_s=100.0, latency_p50_ms=100.0, error_rate=0.0), tolerance=0.1)
+    assert {row['metric']: (row['change'], row['regressed']) for row in rows} == {
+        'ok_per_s': ('-20%', 'REGRESSED'), 'latency_p50_ms': ('+5%', ''), 'error_rate': ('+0%', '')}
+
+
+def test_fake_llm_calls_the_tool_the_question_is_about():
+    tools = [{'type': 'function', 'function': {'name': 'get_exchange_rate', 'description': 'Exchange rate between currencies',
+                                               'parameters': {'type': 'object', 'required': ['currency_from'],
+                                                              'properties': {'currency_from': {'type': 'string', 'enum': ['USD']}}}}},
+             {'type': 'function', 'function': {'name': 'web_search', 'description': 'Search the web',
+                                               'parameters': {'type': 'object', 'properties': {}}}}]
+    question = {'role': 'user', 'content': 'What is the exchange rate of USD?'}
+    text, calls = FakeLLM().answer({'messages': [question], 'tools': tools})
+    assert text is None
+    assert [(call['function']['name'], json.loads(call['function']['arguments'])) for call in calls] == \
+        [('get_exchange_rate', {'currency_from': 'USD'})]
+
+    # Once the tool answered, it writes text
+    answered = [question, {'role': 'assistant', 'tool_calls': calls}, {'role': 'tool', 'content': '0.92'}]
+    text, calls = FakeLLM(tokens=3).answer({'messages': answered, 'tools': tools})
+    assert (text, calls) == ("About 'What is the exchange rate of USD?': the network processed.", [])
+
+
+def test_schema_instance_fits_the_schema():
+    schema = {'type': 'object', 'required': ['flight', 'seats', 'note'],
+              'properties': {'flight': {'$ref': '#/$defs/Flight'}, 'seats': {'type': 'integer', 'minimum': 1},
+                             'note': {'anyOf': [{'type': 'null'}, {'type': 'string'}]}},
+              '$defs': {'Flight': {'type': 'object', 'required': ['number', 'cabin'],
+                                   'properties': {'number': {'type': 'string'},
+                                                  'cabin': {'enum': ['economy', 'business']}}}}}
+    assert schema_instance(schema, 'SFO') == {'flight': {'number': 'SFO', 'cabin': 'economy'}, 'seats': 1, 'note': 'SFO'}
+
+
+def test_wallet_invoices_are_settled_once():
+    relay = SimpleNamespace(url='ws://127.0.0.1:9', add_event=lambda event: True)
+    wallet = StubWallet(relay)
+    invoice = wallet._handle('make_invoice', {'amount': 21_000, 'description': 'get_rate'})
+    assert invoice['invoice'].startswith('lnbc') and 'preimage' not in invoice
+    assert wallet._handle('pay_invoice', {'invoice': invoice['invoice']})['preimage']
+    assert wallet._handle('pay_invoice', {'invoice': invoice['invoice']})  # Paying again doesn't count twice
+    looked_up = wallet._handle('lookup_invoice', {'payment_hash': invoice['payment_hash']})
+    assert 'settled_at' in looked_up
+    assert (wallet.invoiced_sats, wallet.paid_sats) == (21, 21)
+    with pytest.raises(KeyError):
+        wallet._handle('pay_invoice', {'invoice': 'lnbc1unknown'})
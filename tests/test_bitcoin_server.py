@@ -0,0 +1,41 @@
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import load_script
+
+server = load_script('mcp_servers/bitcoin/server.py')
+
+
+class StubHTTP:
+    """Answers blockchain.info queries from `values`; endpoints listed in `failing` fail."""
+    def __init__(self, values: dict[str, str], failing: set[str] = frozenset()):
+        self.values = values
+        self.failing = failing
+
+    async def get(self, url: str) -> httpx.Response:
+        endpoint = url.rsplit('/', 1)[1]
+        if endpoint in self.failing:
+            raise httpx.ConnectError(f'{endpoint} unreachable')
+        return httpx.Response(200, text=self.values[endpoint], request=httpx.Request('GET', url))
+
+
+VALUES = {endpoint: str(i) for i, (endpoint, _) in enumerate(server.ENDPOINTS.values())}
+
+
+def test_all_fields_loaded():
+    data = asyncio.run(server.BlockchainInfo(StubHTTP(VALUES)).get_all())
+    assert data == {name: VALUES[endpoint] for name, (endpoint, _) in server.ENDPOINTS.items()}
+
+
+def test_failed_fields_are_reported_apart_from_the_data():
+    data = asyncio.run(server.BlockchainInfo(StubHTTP(VALUES, failing={'hashrate', 'getdifficulty'})).get_all())
+    assert data['errors'] == {'hashrate': 'hashrate unreachable', 'difficulty': 'getdifficulty unreachable'}
+    assert 'hashrate' not in data and 'difficulty' not in data
+    assert data['block_count'] == VALUES['getblockcount']
+
+
+def test_raises_when_every_field_fails():
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(server.BlockchainInfo(StubHTTP(VALUES, failing=set(VALUES))).get_all())
@@ -0,0 +1,63 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from conftest import load_script
+
+booking_store = load_script('agents/travel/booking_store.py')
+from models import Date, Flight  # noqa: E402 (the sibling module booking_store imported)
+
+
+def flight(flight_id: str = 'DA123') -> Flight:
+    return Flight(flight_id=flight_id, date_time=Date(year=2025, month=9, day=1, hour=8),
+                  origin='SFO', destination='JFK', duration=5.5, price=300)
+
+
+def test_threads_never_overbook(tmp_path):
+    store = booking_store.BookingStore(str(tmp_path / 'bookings.sqlite3'), default_capacity=5)
+
+    async def book(user: int):
+        try:
+            return await asyncio.to_thread(store.book, f'user{user}', flight())
+        except ValueError:
+            return None
+
+    async def run():
+        return await asyncio.gather(*(book(user) for user in range(20)))
+
+    booked = [itinerary for itinerary in asyncio.run(run()) if itinerary is not None]
+    assert len(booked) == 5
+    assert store.seats_left('DA123') == 0
+    assert len({itinerary.confirmation_number for itinerary in booked}) == 5
+
+
+def test_cancel_releases_the_seat(tmp_path):
+    store = booking_store.BookingStore(str(tmp_path / 'bookings.sqlite3'), default_capacity=1)
+    itinerary = store.book('alice', flight())
+    with pytest.raises(ValueError):
+        store.cancel('bob', itinerary.confirmation_number)
+    store.cancel('alice', itinerary.confirmation_number)
+    assert store.itinerary('alice') == []
+    assert store.book('bob', flight()).flight.flight_id == 'DA123'
+
+
+def test_booking_waits_for_a_locked_database_off_the_event_loop(tmp_path):
+    path = str(tmp_path / 'bookings.sqlite3')
+    store = booking_store.BookingStore(path, busy_timeout=5)
+    other = sqlite3.connect(path, isolation_level=None)
+
+    async def run():
+        other.execute('BEGIN IMMEDIATE')  # Another process holds the write lock
+        booking = asyncio.create_task(asyncio.to_thread(store.book, 'alice', flight()))
+        ticks = 0
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not booking.done()
+        other.execute('COMMIT')
+        return ticks, await booking
+
+    ticks, itinerary = asyncio.run(run())
+    assert ticks == 10
+    assert store.itinerary('alice') == [itinerary]
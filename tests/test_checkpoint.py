@@ -0,0 +1,66 @@
+import operator
+from typing import Annotated, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+from agentstr_demo.checkpoint import SQLiteCheckpointer
+
+
+class State(TypedDict):
+    items: list[int]
+    results: Annotated[list[int], operator.add]
+
+
+def fan_out(state: State) -> list[Send]:
+    return [Send('work', {'items': [item], 'results': []}) for item in state['items']]
+
+
+def build(checkpointer: SQLiteCheckpointer):
+    graph = StateGraph(State)
+    graph.add_node('plan', lambda state: {})
+    graph.add_node('work', lambda state: {'results': [state['items'][0] * 10]})
+    graph.add_edge(START, 'plan')
+    graph.add_conditional_edges('plan', fan_out, ['work'])
+    graph.add_edge('work', END)
+    return graph.compile(checkpointer=checkpointer, interrupt_before=['work'])
+
+
+def test_resume_send_after_compaction(tmp_path):
+    path = str(tmp_path / 'checkpoints.sqlite3')
+    config = {'configurable': {'thread_id': 'thread-1'}}
+    checkpointer = SQLiteCheckpointer(path, keep=1)
+    graph = build(checkpointer)
+    graph.invoke({'items': [1, 2, 3], 'results': []}, config)
+    assert graph.get_state(config).next == ('work', 'work', 'work')
+    assert len(list(checkpointer.list(config))) == 1
+    checkpointer.close()
+
+    # Resume from the compacted thread in a new process
+    checkpointer = SQLiteCheckpointer(path, keep=1)
+    state = build(checkpointer).invoke(None, config)
+    assert sorted(state['results']) == [10, 20, 30]
+
+
+def test_compaction_keeps_the_parents_writes(tmp_path):
+    checkpointer = SQLiteCheckpointer(str(tmp_path / 'checkpoints.sqlite3'), keep=1)
+    config = {'configurable': {'thread_id': 'thread-1'}}
+    build(checkpointer).invoke({'items': [1, 2], 'results': []}, config)
+    latest = checkpointer.get_tuple(config)
+    with checkpointer.cursor(transaction=False) as cur:
+        kept = {row[0] for row in cur.execute('SELECT DISTINCT checkpoint_id FROM writes')}
+    assert kept <= {latest.config['configurable']['checkpoint_id'], latest.parent_config['configurable']['checkpoint_id']}
+    assert latest.parent_config['configurable']['checkpoint_id'] in kept
+
+
+def test_idle_threads_are_pruned(tmp_path):
+    now = [1000.0]
+    checkpointer = SQLiteCheckpointer(str(tmp_path / 'checkpoints.sqlite3'), ttl=60, clock=lambda: now[0])
+    graph = build(checkpointer)
+    for thread in ('a', 'b'):
+        graph.invoke({'items': [1], 'results': []}, {'configurable': {'thread_id': thread}})
+        now[0] += 50
+    assert checkpointer.thread_count() == 2
+    assert checkpointer.prune() == 1
+    assert checkpointer.get_tuple({'configurable': {'thread_id': 'a'}}) is None
+    assert checkpointer.get_tuple({'configurable': {'thread_id': 'b'}}) is not None
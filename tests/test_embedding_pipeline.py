@@ -0,0 +1,73 @@
+import asyncio
+import logging
+
+from pynostr.event import Event
+from pynostr.key import PrivateKey
+
+from agentstr_demo.embeddings import hashing_embedder
+from conftest import load_script
+
+embedding_pipeline = load_script('agents/nostr_rag/embedding_pipeline.py')
+
+
+def note(content: str) -> Event:
+    event = Event(content=content, kind=1)
+    event.sign(PrivateKey().hex())
+    return event
+
+
+class FlakyEmbedder:
+    """The hashing embedder, failing the first `failures` calls."""
+    def __init__(self, failures: int = 0):
+        self.embed = hashing_embedder(64)
+        self.failures = failures
+
+    def __call__(self, texts: list[str]):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('embedding model unavailable')
+        return self.embed(texts)
+
+
+def pipeline(tmp_path, embed: FlakyEmbedder):
+    store = embedding_pipeline.NoteStore(str(tmp_path / 'notes.sqlite3'), dim=64)
+    return embedding_pipeline.IngestionPipeline(store, embed, batch_size=8), store
+
+
+def test_duplicates_are_stored_once(tmp_path):
+    ingestion, store = pipeline(tmp_path, FlakyEmbedder())
+    event = note('bitcoin fees are low today')
+    assert asyncio.run(ingestion.ingest([event, event])) == 1
+    assert asyncio.run(ingestion.ingest([event])) == 0
+    assert len(store) == 1
+    assert ingestion.stats['duplicates'] == 2
+
+
+def test_failed_batch_is_retried_when_the_note_arrives_again(tmp_path):
+    ingestion, store = pipeline(tmp_path, FlakyEmbedder(failures=1))
+    event = note('lightning channels opened this week')
+    try:
+        asyncio.run(ingestion.ingest([event]))
+    except RuntimeError:
+        pass
+    assert event.id not in store
+    assert asyncio.run(ingestion.ingest([event])) == 1
+    assert event.id in store
+
+
+def test_worker_logs_failures_and_keeps_going(tmp_path, caplog):
+    ingestion, store = pipeline(tmp_path, FlakyEmbedder(failures=1))
+    first, second = note('first note'), note('second note')
+
+    async def run():
+        await ingestion.put(first)
+        await ingestion.join()
+        await ingestion.put(second)
+        await ingestion.put(first)
+        await ingestion.join()
+        ingestion.stop()
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(run())
+    assert [record.exc_info[0] for record in caplog.records] == [RuntimeError]
+    assert first.id in store and second.id in store
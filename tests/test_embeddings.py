@@ -0,0 +1,25 @@
+import sys
+
+import numpy as np
+
+from agentstr_demo.embeddings import DEFAULT_MODEL, hashing_embedder, load_embedder
+
+
+def test_hashing_embedder_is_normalized_and_deterministic():
+    embed = hashing_embedder(64)
+    vectors = embed(['bitcoin price today', 'bitcoin price today', ''])
+    assert vectors.shape == (3, 64) and vectors.dtype == np.float32
+    assert np.allclose(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any()
+
+
+def test_load_embedder_falls_back_to_hashing(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'fastembed', None)  # As if fastembed weren't installed
+    assert load_embedder(None, dim=32).dim == 32
+    assert load_embedder(DEFAULT_MODEL, dim=32).dim == 32
+
+
+def test_load_embedder_without_fallback(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'fastembed', None)
+    assert load_embedder(DEFAULT_MODEL, fallback=False) is None
@@ -0,0 +1,87 @@
+import asyncio
+import datetime
+
+import httpx
+import pytest
+
+from conftest import load_script
+
+rates = load_script('mcp_servers/exchange_rate/rates.py')
+
+
+class StubFrankfurter:
+    """Answers Frankfurter requests with fixed EUR rates and records the paths asked for."""
+    def __init__(self):
+        self.paths = []
+
+    async def get(self, url: str, params: dict | None = None) -> httpx.Response:
+        path = url.rsplit('/', 1)[1]
+        self.paths.append(path)
+        if '..' in path:
+            start, end = path.split('..')
+            body = {'rates': {start: {'USD': 1.1}, end: {'USD': 1.2}}}
+        else:
+            body = {'date': '2024-01-02' if path == 'latest' else path, 'rates': {'USD': 1.1, 'VND': 27000.0}}
+        return httpx.Response(200, json=body, request=httpx.Request('GET', url))
+
+
+def test_cross_rate_keeps_small_rates():
+    table = {'EUR': 1.0, 'VND': 27000.0, 'BTC': 0.000016}
+    assert rates.cross_rate(table, 'VND', 'EUR') == pytest.approx(1 / 27000, rel=1e-12)
+    assert rates.cross_rate(table, 'VND', 'BTC') == pytest.approx(0.000016 / 27000, rel=1e-12)
+    assert rates.cross_rate(table, 'VND', 'BTC') > 0
+
+
+def test_cross_rate_rejects_unknown_currency():
+    with pytest.raises(ValueError, match='XYZ'):
+        rates.cross_rate({'EUR': 1.0}, 'EUR', 'XYZ')
+
+
+def test_is_settled_compares_dates():
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    assert rates.RateTables._is_settled((today - datetime.timedelta(days=1)).isoformat())
+    assert not rates.RateTables._is_settled(today.isoformat())
+    assert not rates.RateTables._is_settled('latest')
+
+
+@pytest.mark.parametrize('date', ['2024-13-01', 'yesterday', '2024-1-1', '', '9999'])
+def test_is_settled_rejects_bad_dates(date):
+    with pytest.raises(ValueError, match='Invalid date'):
+        rates.RateTables._is_settled(date)
+
+
+def test_table_rejects_bad_date_without_fetching(tmp_path):
+    http = StubFrankfurter()
+    tables = rates.RateTables(http, 'https://frankfurter.test', str(tmp_path / 'rates.sqlite3'))
+    with pytest.raises(ValueError):
+        asyncio.run(tables.table('not-a-date'))
+    assert http.paths == []
+
+
+def test_settled_table_is_fetched_once(tmp_path):
+    http = StubFrankfurter()
+    db_path = str(tmp_path / 'rates.sqlite3')
+    asyncio.run(rates.RateTables(http, 'https://frankfurter.test', db_path).table('2024-01-02'))
+    table = asyncio.run(rates.RateTables(http, 'https://frankfurter.test', db_path).table('2024-01-02'))
+    assert table == {'date': '2024-01-02', 'rates': {'EUR': 1.0, 'USD': 1.1, 'VND': 27000.0}}
+    assert http.paths == ['2024-01-02']
+
+
+def test_series_rejects_reversed_range(tmp_path):
+    tables = rates.RateTables(StubFrankfurter(), 'https://frankfurter.test', str(tmp_path / 'rates.sqlite3'))
+    with pytest.raises(ValueError, match='after'):
+        asyncio.run(tables.series('2024-01-05', '2024-01-01'))
+
+
+def test_series_fetches_only_ranges_not_covered(tmp_path):
+    http = StubFrankfurter()
+    db_path = str(tmp_path / 'rates.sqlite3')
+    tables = rates.RateTables(http, 'https://frankfurter.test', db_path)
+    asyncio.run(tables.series('2024-01-01', '2024-01-05'))
+    asyncio.run(tables.series('2024-02-01', '2024-02-05'))
+    # Inside the first range, from a new process: served from disk
+    series = asyncio.run(rates.RateTables(http, 'https://frankfurter.test', db_path).series('2024-01-02', '2024-01-05'))
+    asyncio.run(tables.series('2024-01-04', '2024-02-02'))  # Overlaps both, covers the gap between them
+    asyncio.run(tables.series('2024-01-03', '2024-02-04'))
+    assert series == {'2024-01-05': {'EUR': 1.0, 'USD': 1.2}}
+    assert http.paths == ['2024-01-01..2024-01-05', '2024-02-01..2024-02-05', '2024-01-04..2024-02-02']
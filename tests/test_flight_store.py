@@ -0,0 +1,65 @@
+from conftest import load_script
+
+flight_store = load_script('agents/travel/flight_store.py')
+from models import Date, Flight  # noqa: E402 (the sibling module flight_store imported)
+
+
+def flight(flight_id: str, origin: str = 'SFO', destination: str = 'JFK', day: int = 1, duration: float = 5.0,
+           price: float = 300) -> Flight:
+    return Flight(flight_id=flight_id, date_time=Date(year=2025, month=9, day=day, hour=8),
+                  origin=origin, destination=destination, duration=duration, price=price)
+
+
+FLIGHTS = [
+    flight('A', duration=6.0, price=200),
+    flight('B', duration=5.0, price=350),
+    flight('C', duration=5.0, price=250),
+    flight('D', duration=4.5, price=500),
+    flight('E', day=2, duration=3.0, price=100),
+    flight('F', origin='LAX', duration=5.5, price=150),
+]
+
+
+def ids(flights: list[Flight]) -> list[str]:
+    return [f.flight_id for f in flights]
+
+
+def test_search_returns_the_best_matching_flights_in_order():
+    store = flight_store.FlightStore(FLIGHTS)
+    sep_1 = Date(year=2025, month=9, day=1)
+    assert ids(store.search('SFO', 'JFK', sep_1, 'shortest', limit=3)) == ['D', 'C', 'B']
+    assert ids(store.search('sfo', 'jfk', sep_1, 'cheapest', limit=3)) == ['A', 'C', 'B']
+    assert ids(store.search('SFO', 'JFK', sep_1, 'cheapest', max_duration=5.0, limit=5)) == ['C', 'B', 'D']
+    assert ids(store.search('SFO', 'JFK', sep_1, 'shortest', max_price=300, limit=5)) == ['C', 'A']
+    assert ids(store.search(destination='JFK', criteria='cheapest', limit=2)) == ['E', 'F']
+    assert ids(store.search(criteria='shortest', limit=10)) == ['E', 'D', 'C', 'B', 'F', 'A']
+
+
+def test_search_with_no_room_for_results_returns_nothing():
+    store = flight_store.FlightStore(FLIGHTS)
+    assert store.search(limit=0) == []
+    assert store.search('SFO', 'JFK', '2025-09-01', limit=-1) == []
+
+
+def test_add_and_remove_keep_the_indexes_sorted():
+    store = flight_store.FlightStore(FLIGHTS)
+    store.add(flight('G', duration=2.0, price=900))
+    store.add(flight('A', duration=6.0, price=50))  # Replaces A
+    assert len(store) == 7
+    assert ids(store.search('SFO', 'JFK', '2025-09-01', 'cheapest', limit=2)) == ['A', 'C']
+    assert ids(store.search('SFO', 'JFK', '2025-09-01', 'shortest', limit=2)) == ['G', 'D']
+    store.remove('G')
+    assert 'G' not in store and store.get('G') is None
+    assert ids(store.search('SFO', 'JFK', '2025-09-01', 'shortest', limit=2)) == ['D', 'C']
+
+
+def test_from_file_loads_a_csv(tmp_path):
+    path = tmp_path / 'flights.csv'
+    path.write_text('flight_id,origin,destination,departure,duration,price\n'
+                    'X1,sfo,jfk,2025-09-01T06:00,5.5,320\n'
+                    'X2,SFO,JFK,2025-09-01T09:00,5.0,410\n')
+    store = flight_store.FlightStore.from_file(str(path))
+    assert len(store) == 2
+    assert store.get('X1') == flight('X1', duration=5.5, price=320).model_copy(
+        update={'date_time': Date(year=2025, month=9, day=1, hour=6)})
+    assert ids(store.search('SFO', 'JFK', '2025-09-01', 'shortest', limit=5)) == ['X2', 'X1']
@@ -0,0 +1,101 @@
+import asyncio
+
+from conftest import load_script
+
+history_store = load_script('agents/travel/history_store.py')
+
+
+def turn(i: int) -> dict:
+    return {'user_request': f'request {i}', 'process_result': f'answer {i}'}
+
+
+def test_old_turns_are_folded_into_the_summary():
+    async def summarize(previous, retired):
+        return ' '.join(filter(None, [previous, *(t['process_result'] for t in retired)]))
+
+    async def run():
+        store = history_store.HistoryStore(max_turns=2, summarize=summarize)
+        for i in range(4):
+            await store.append('thread', turn(i))
+        return store.messages('thread')
+
+    messages, saved = asyncio.run(run())
+    assert [m['process_result'] for m in messages] == ['answer 0 answer 1', 'answer 2', 'answer 3']
+    assert saved > 0
+
+
+def test_summary_survives_a_spill_during_summarize(tmp_path):
+    released = asyncio.Event()
+
+    async def summarize(previous, retired):
+        await released.wait()
+        return 'summary of ' + ', '.join(t['user_request'] for t in retired)
+
+    async def run():
+        store = history_store.HistoryStore(max_turns=1, max_threads=1, db_path=str(tmp_path / 'history.sqlite3'),
+                                           summarize=summarize)
+        await store.append('a', turn(0))
+        appending = asyncio.create_task(store.append('a', turn(1)))
+        await asyncio.sleep(0)
+        store.messages('b')  # Spills thread a while its summary is being written
+        released.set()
+        await appending
+        store.messages('b')  # Spills thread a again, now with its summary
+        return store.messages('a')[0]
+
+    messages = asyncio.run(run())
+    assert [m['process_result'] for m in messages] == ['summary of request 0', 'answer 1']
+
+
+def test_appends_to_one_thread_are_serialized():
+    calls = []
+
+    async def summarize(previous, retired):
+        calls.append(previous)
+        await asyncio.sleep(0.01)
+        return (previous or '') + retired[0]['process_result'][-1]
+
+    async def run():
+        store = history_store.HistoryStore(max_turns=1, summarize=summarize)
+        await asyncio.gather(*(store.append('thread', turn(i)) for i in range(4)))
+        return store.messages('thread')[0]
+
+    messages = asyncio.run(run())
+    assert calls == [None, '0', '01']
+    assert messages[0]['process_result'] == '012'
+
+
+def words(text: str) -> int:
+    return len(text.split())  # A turn from turn() is 6 words
+
+
+def test_history_fits_the_budget_after_a_longer_summary():
+    summaries = []
+
+    async def summarize(previous, retired):
+        summaries.append([t['user_request'] for t in retired])
+        return 'a summary seven words long right here'
+
+    async def run():
+        store = history_store.HistoryStore(max_tokens=14, summarize=summarize, count_tokens=words)
+        for i in range(3):
+            await store.append('thread', turn(i))
+        return store.messages('thread')[0], store._thread('thread')
+
+    messages, history = asyncio.run(run())
+    assert summaries == [['request 0'], ['request 1']]  # The first summary left it over budget
+    assert [m['process_result'] for m in messages] == ['a summary seven words long right here', 'answer 2']
+    assert sum(history.turn_tokens) + history.summary_tokens <= 14
+
+
+def test_summary_too_long_for_the_budget_is_dropped():
+    async def summarize(previous, retired):
+        return 'word ' * 20
+
+    async def run():
+        store = history_store.HistoryStore(max_tokens=14, summarize=summarize, count_tokens=words)
+        for i in range(3):
+            await store.append('thread', turn(i))
+        return store.messages('thread')[0]
+
+    assert [m['process_result'] for m in asyncio.run(run())] == ['answer 2']
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from agentstr_demo import host
+
+
+@pytest.fixture
+def scoped_environ(monkeypatch):
+    monkeypatch.setenv('HOST_TEST_VALUE', 'host')
+    monkeypatch.setattr(os, 'environ', host._ScopedEnviron(os.environ))
+
+
+def test_service_sees_its_own_environment_in_python(scoped_environ):
+    async def service():
+        host._service_env.set({**os.environ.copy(), 'HOST_TEST_VALUE': 'service'})
+        in_thread = await asyncio.to_thread(os.getenv, 'HOST_TEST_VALUE')
+        return os.getenv('HOST_TEST_VALUE'), os.environ['HOST_TEST_VALUE'], in_thread
+
+    assert asyncio.run(service()) == ('service', 'service', 'service')
+    assert os.getenv('HOST_TEST_VALUE') == 'host'
+
+
+def test_threads_and_subprocesses_see_the_host_environment(scoped_environ):
+    async def service():
+        host._service_env.set({**os.environ.copy(), 'HOST_TEST_VALUE': 'service'})
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(os.getenv('HOST_TEST_VALUE')))
+        thread.start()
+        thread.join()
+        child = subprocess.run([sys.executable, '-c', 'import os; print(os.environ["HOST_TEST_VALUE"])'],
+                               capture_output=True, text=True, check=True)
+        return seen[0], child.stdout.strip()
+
+    assert asyncio.run(service()) == ('host', 'host')
+
+
+SERVICE_SCRIPT = '''
+import asyncio
+import json
+import os
+
+import openai
+from agentstr import NostrClient
+
+
+async def main():
+    client = NostrClient([os.environ['NOSTR_RELAYS']])
+    llm = openai.AsyncOpenAI(api_key='test', base_url='http://127.0.0.1:9/v1')
+    await asyncio.sleep(0.05)  # Keeps both services' clients alive at once, so their ids can't be reused
+    with open(os.environ['RESULT_PATH'], 'w') as f:
+        json.dump({'service': os.environ['SERVICE'], 'only_one': os.getenv('ONLY_ONE'),
+                   'relay': id(client.relay_manager.relays[0].connection), 'llm': id(llm._client)}, f)
+
+
+asyncio.run(main())
+'''
+
+
+@pytest.fixture
+def hosted(tmp_path, monkeypatch):
+    """Runs a host of two copies of SERVICE_SCRIPT; returns what each of them recorded."""
+    pytest.importorskip('openai')
+    import openai
+    from agentstr import nwc_relay, relay_manager
+
+    # The host patches these process-wide while it runs; put them back afterwards
+    monkeypatch.setattr(relay_manager, 'EventRelay', relay_manager.EventRelay)
+    monkeypatch.setattr(nwc_relay, 'EventRelay', nwc_relay.EventRelay)
+    monkeypatch.setattr(openai.AsyncOpenAI, '__init__', openai.AsyncOpenAI.__init__)
+    monkeypatch.setenv('NOSTR_RELAYS', 'ws://127.0.0.1:9')
+    monkeypatch.setenv('SERVICE', 'host')
+    monkeypatch.delenv('ONLY_ONE', raising=False)
+    services = []
+    for name in ('one', 'two'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'service.py').write_text(SERVICE_SCRIPT)
+        env = {'SERVICE': name, 'RESULT_PATH': str(tmp_path / f'{name}.json')}
+        services.append(host.ServiceConfig(str(tmp_path / name / 'service.py'), name,
+                                           env | ({'ONLY_ONE': 'set'} if name == 'one' else {})))
+    runner = host.Host(services)
+    asyncio.run(runner.run())
+    assert runner.failed == {}
+    return [json.loads((tmp_path / f'{name}.json').read_text()) for name in ('one', 'two')]
+
+
+def test_hosted_services_see_only_their_own_environment(hosted):
+    assert [(result['service'], result['only_one']) for result in hosted] == [('one', 'set'), ('two', None)]
+    assert os.environ['SERVICE'] == 'host' and not isinstance(os.environ, host._ScopedEnviron)
+
+
+def test_hosted_services_share_relay_connections_and_the_llm_client(hosted):
+    one, two = hosted
+    assert one['relay'] == two['relay']
+    assert one['llm'] == two['llm']
@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import pytest
+
+from agentstr_demo.http import HTTPPool
+
+
+class SlowUpstream:
+    """A mock transport that counts how many requests are in flight at once, per host."""
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.in_flight: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.in_flight[host] = self.in_flight.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.in_flight[host])
+        await asyncio.sleep(self.latency)
+        self.in_flight[host] -= 1
+        return httpx.Response(200, json={'host': host})
+
+
+def test_per_host_limit_caps_requests_in_flight():
+    upstream = SlowUpstream()
+
+    async def run():
+        async with HTTPPool(per_host_limit=2, transport=httpx.MockTransport(upstream)) as pool:
+            responses = await asyncio.gather(*[pool.get(f'https://{host}.example.com/') for host in ['a'] * 6 + ['b'] * 3])
+        return [response.json()['host'] for response in responses]
+
+    assert asyncio.run(run()) == ['a.example.com'] * 6 + ['b.example.com'] * 3
+    assert upstream.peak == {'a.example.com': 2, 'b.example.com': 2}
+
+
+def test_no_per_host_limit():
+    upstream = SlowUpstream()
+
+    async def run():
+        async with HTTPPool(per_host_limit=None, transport=httpx.MockTransport(upstream)) as pool:
+            await asyncio.gather(*[pool.get('https://a.example.com/') for _ in range(5)])
+
+    asyncio.run(run())
+    assert upstream.peak == {'a.example.com': 5}
+
+
+def test_pool_closes_when_the_last_user_releases_it():
+    async def run():
+        pool = HTTPPool(transport=httpx.MockTransport(lambda request: httpx.Response(204)))
+        await pool.start()
+        client = pool.client
+        async with pool:  # A second user, e.g. another server in the same process
+            assert pool.client is client
+        assert not client.is_closed
+        assert (await pool.get('https://a.example.com/')).status_code == 204
+        await pool.aclose()
+        assert client.is_closed
+        with pytest.raises(RuntimeError):
+            pool.client
+        await pool.aclose()  # Releasing a closed pool again is harmless
+        async with pool:
+            assert pool.client is not client
+
+    asyncio.run(run())
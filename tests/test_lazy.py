@@ -0,0 +1,77 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from agentstr_demo.lazy import Lazy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter, so nothing else has imported agentstr or LangChain yet
+DEFERRED_IMPORT = '''
+import sys
+from agentstr_demo.lazy import defer_agentstr_langchain
+defer_agentstr_langchain()
+import agentstr
+langchain = ('langchain_community', 'langchain_core', 'langchain_openai')
+print(sorted({name.partition('.')[0] for name in sys.modules} & set(langchain)))
+rag = agentstr.NostrRAG(relays=['ws://127.0.0.1:9'], llm=object())
+print(type(rag.vector_store).__name__, sorted({name.partition('.')[0] for name in sys.modules} & set(langchain)))
+'''
+
+
+def run_deferred_import(mode: str) -> list[str]:
+    result = subprocess.run([sys.executable, '-c', DEFERRED_IMPORT], cwd=ROOT, capture_output=True, text=True,
+                            env={**os.environ, 'AGENT_STARTUP': mode, 'PYTHONPATH': ROOT}, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.splitlines()
+
+
+def test_agentstr_imports_langchain_only_when_a_nostr_rag_is_created():
+    pytest.importorskip('langchain_core')
+    before, after = run_deferred_import('lazy')
+    assert before == '[]'
+    assert after == "InMemoryVectorStore ['langchain_community', 'langchain_core', 'langchain_openai']"
+
+
+def test_eager_startup_imports_agentstr_as_is():
+    pytest.importorskip('langchain_core')
+    before, _ = run_deferred_import('eager')
+    assert before == "['langchain_community', 'langchain_core', 'langchain_openai']"
+
+
+def test_lazy_value_is_built_once_for_concurrent_uses():
+    builds = []
+
+    async def build():
+        builds.append(1)
+        await asyncio.sleep(0.01)
+        return 'agent'
+
+    async def run():
+        value = Lazy(build)
+        return await asyncio.gather(value.get(), value.get()), value.built
+
+    assert asyncio.run(run()) == (['agent', 'agent'], True)
+    assert builds == [1]
+
+
+def test_failed_build_is_tried_again():
+    attempts = []
+
+    def build():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError('framework not ready')
+        return 'agent'
+
+    async def run():
+        value = Lazy(build)
+        with pytest.raises(RuntimeError):
+            await value.get()
+        return await value.get()
+
+    assert asyncio.run(run()) == 'agent'
+    assert len(attempts) == 2
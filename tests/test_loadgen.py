@@ -0,0 +1,45 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from conftest import load_script
+
+loadgen = load_script('benchmarks/loadgen.py')
+
+
+def test_replies_are_classified_by_outcome():
+    assert [loadgen.classify_agent_reply(text) for text in [
+        'The hashrate is 700 EH/s.', "I'm handling too many requests right now.", 'Sorry, your request took too long.',
+        'Error in direct message callback: boom', 'lnbc10n1p...']] == ['ok', 'busy', 'turn_timeout', 'error', 'invoice']
+    assert [loadgen.classify_mcp_reply(text) for text in [
+        json.dumps({'content': []}), json.dumps({'isError': True}), json.dumps({'error': 'unknown tool'}),
+        'not json', 'lnbc10n1p...']] == ['ok', 'error', 'error', 'error', 'invoice']
+
+
+def test_summary_counts_outcomes_and_buckets_ok_latencies():
+    results = [loadgen.TurnResult(0, 0, 'ok', latency=0.02, first=0.01, pieces=2),
+               loadgen.TurnResult(0, 1, 'ok', latency=0.3, first=0.1, pieces=1),
+               loadgen.TurnResult(1, 0, 'busy', latency=0.001),
+               loadgen.TurnResult(2, 0, 'no_reply')]
+    summary = loadgen.summarize(results, elapsed=2.0)
+    assert (summary['requests'], summary['ok'], summary['error_rate'], summary['ok_per_s']) == (4, 2, 0.5, 1.0)
+    assert summary['outcomes'] == {'ok': 2, 'busy': 1, 'no_reply': 1}
+    assert summary['pieces_per_reply'] == 1.5
+    assert {bucket['le_ms']: bucket['count'] for bucket in summary['histogram'] if bucket['count']} == {25: 1, 500: 1}
+    json.dumps(summary)  # Written with --json
+
+
+def test_conversations_against_a_local_agent():
+    args = SimpleNamespace(llm_latency=0.005, relay_latency=0, stream=True)
+
+    async def run():
+        async with loadgen.local_target('agent', args) as (url, pubkey):
+            generator = loadgen.LoadGenerator([url], pubkey, lambda c, t: f'conversation {c} turn {t}',
+                                              conversations=3, turns=2, timeout=10)
+            return await generator.run()
+
+    results = asyncio.run(run())
+    assert sorted((r.conversation, r.turn, r.outcome) for r in results) == \
+        [(c, t, 'ok') for c in range(3) for t in range(2)]
+    assert all(r.pieces > 1 and r.first <= r.latency for r in results)  # Streamed
+    assert {r.reply_chars for r in results} == {len('You said: conversation 0 turn 0 ')}
@@ -0,0 +1,113 @@
+import asyncio
+
+from agentstr_demo.mcp_cache import CachedMCPClient, ToolPolicy
+
+
+class StubMCPClient:
+    """Answers tool calls with a counter and lists `tools`, after `latency` seconds."""
+    def __init__(self, pubkey: str, tools: list[dict] | None = None, latency: float = 0):
+        self.mcp_pubkey = pubkey
+        self.tools = tools or [{'name': 'get_rate', 'satoshis': 3}]
+        self.latency = latency
+        self.tool_to_sats_map = {}
+        self.calls = 0
+        self.listed = 0
+
+    async def list_tools(self):
+        self.listed += 1
+        await asyncio.sleep(self.latency)
+        return {'tools': self.tools}
+
+    async def call_tool(self, name, arguments, timeout=60):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if arguments.get('fail'):
+            return {'isError': True}
+        return {'content': [{'type': 'text', 'text': f'{name} #{self.calls}'}]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def text(result: dict) -> str:
+    return result['content'][0]['text']
+
+
+def test_results_are_reused_until_their_ttl_runs_out():
+    server, clock = StubMCPClient('ttl-server'), Clock()
+    client = CachedMCPClient(server, {'get_rate': ToolPolicy(ttl=60, key=lambda args: args['pair'].upper()),
+                                      'convert': ToolPolicy(deterministic=True)}, clock=clock)
+
+    async def run():
+        calls = [text(await client.call_tool('get_rate', {'pair': 'usd/eur'})),
+                 text(await client.call_tool('get_rate', {'pair': 'USD/EUR'}))]  # Same key
+        clock.now = 61
+        calls.append(text(await client.call_tool('get_rate', {'pair': 'USD/EUR'})))
+        calls.append(text(await client.call_tool('convert', {'amount': 1})))
+        clock.now = 10 ** 6
+        calls.append(text(await client.call_tool('convert', {'amount': 1})))  # Never expires
+        return calls
+
+    assert asyncio.run(run()) == ['get_rate #1', 'get_rate #1', 'get_rate #2', 'convert #3', 'convert #3']
+    assert client.metrics()['get_rate']['hits'] == 1
+
+
+def test_uncached_tools_and_errors_always_reach_the_server():
+    server = StubMCPClient('uncached-server')
+    client = CachedMCPClient(server, {'get_rate': ToolPolicy(ttl=60)})
+
+    async def run():
+        for _ in range(2):
+            await client.call_tool('book_flight', {})
+            await client.call_tool('get_rate', {'fail': True})
+
+    asyncio.run(run())
+    assert server.calls == 4
+
+
+def test_identical_calls_in_flight_share_one_request():
+    server = StubMCPClient('coalescing-server', latency=0.02)
+    server.tool_to_sats_map['get_rate'] = 3
+    client = CachedMCPClient(server, {'get_rate': ToolPolicy(ttl=60)})
+
+    async def run():
+        return await asyncio.gather(*(client.call_tool('get_rate', {'pair': 'USD/EUR'}) for _ in range(3)))
+
+    assert [text(result) for result in asyncio.run(run())] == ['get_rate #1'] * 3
+    stats = client.metrics()['get_rate']
+    assert (stats['remote_calls'], stats['coalesced'], stats['sats_saved']) == (1, 2, 6)
+
+
+def test_saved_schemas_are_served_then_revalidated(tmp_path):
+    schema_cache = str(tmp_path / 'schemas.sqlite3')
+
+    async def first_run():
+        server = StubMCPClient('schema-server')
+        return await CachedMCPClient(server, schema_cache=schema_cache).list_tools()
+
+    assert asyncio.run(first_run()) == {'tools': [{'name': 'get_rate', 'satoshis': 3}]}
+
+    async def restart(tools: list[dict]):
+        server, changes = StubMCPClient('schema-server', tools, latency=0.01), []
+
+        async def on_schema_change():
+            changes.append(await client.list_tools())
+
+        client = CachedMCPClient(server, schema_cache=schema_cache, on_schema_change=on_schema_change)
+        served = await client.list_tools()
+        assert server.tool_to_sats_map == {'get_rate': 3}  # Known before the server answers
+        await client._revalidation
+        return served, changes, client.schema_changes
+
+    served, changes, count = asyncio.run(restart([{'name': 'get_rate', 'satoshis': 3}]))
+    assert (served['tools'][0]['name'], changes, count) == ('get_rate', [], 0)
+
+    changed = [{'name': 'get_rate', 'satoshis': 5}]
+    served, changes, count = asyncio.run(restart(changed))
+    assert served == {'tools': [{'name': 'get_rate', 'satoshis': 3}]}
+    assert (changes, count) == ([{'tools': changed}], 1)
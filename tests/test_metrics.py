@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from agentstr_demo import metrics
+from agentstr_demo.metrics import Counter, Gauge, Histogram, MetricsServer, Registry
+
+
+def test_counters_and_gauges_are_rendered_with_their_labels():
+    registry = Registry()
+    turns = Counter('turns_total', 'Turns by outcome.', ['service', 'outcome'], registry=registry)
+    turns.labels('Travel "Agent"\n', 'ok').inc(2)
+    turns.labels('Travel "Agent"\n', 'ok').inc()
+    queue = []
+    depth = Gauge('queue_depth', 'Turns waiting.', registry=registry)
+    depth.labels().set_function(lambda: len(queue))
+    queue.extend('ab')
+    ratio = Gauge('hit_ratio', 'Hit ratio.', registry=registry)
+    ratio.set(0.25)
+
+    assert registry.expose() == (
+        '# HELP turns_total Turns by outcome.\n'
+        '# TYPE turns_total counter\n'
+        'turns_total{service="Travel \\"Agent\\"\\n",outcome="ok"} 3\n'
+        '# HELP queue_depth Turns waiting.\n'
+        '# TYPE queue_depth gauge\n'
+        'queue_depth 2\n'
+        '# HELP hit_ratio Hit ratio.\n'
+        '# TYPE hit_ratio gauge\n'
+        'hit_ratio 0.25\n')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    seconds = Histogram('call_seconds', 'Calls.', ['tool'], buckets=[0.1, 1], registry=registry)
+    for value in (0.05, 0.1, 0.5, 3):
+        seconds.labels('search').observe(value)
+    assert registry.expose().splitlines()[2:] == [
+        'call_seconds_bucket{tool="search",le="0.1"} 2',
+        'call_seconds_bucket{tool="search",le="1"} 3',
+        'call_seconds_bucket{tool="search",le="+Inf"} 4',
+        'call_seconds_sum{tool="search"} 3.65',
+        'call_seconds_count{tool="search"} 4']
+
+
+def test_a_failing_function_leaves_out_only_its_series():
+    registry = Registry()
+    gauge = Gauge('entries', 'Entries.', ['cache'], registry=registry)
+    gauge.labels('broken').set_function(lambda: 1 / 0)
+    gauge.labels('rates').set(7)
+    assert registry.expose().splitlines()[2:] == ['entries{cache="rates"} 7']
+
+
+def test_names_and_labels_are_checked():
+    registry = Registry()
+    counter = Counter('calls_total', 'Calls.', ['tool'], registry=registry)
+    with pytest.raises(ValueError):
+        Counter('calls_total', 'Calls again.', registry=registry)
+    with pytest.raises(ValueError):
+        counter.labels('search', 'extra')
+
+
+def test_server_answers_scrapes():
+    registry = Registry()
+    Counter('requests_total', 'Requests.', registry=registry).inc()
+
+    async def run():
+        async with MetricsServer(0, registry=registry) as server:
+            async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{server.port}') as client:
+                return await client.get('/metrics'), await client.get('/other')
+
+    scraped, missing = asyncio.run(run())
+    assert (scraped.status_code, scraped.text) == (200, registry.expose())
+    assert missing.status_code == 404
+
+
+def test_paid_invoices_are_credited_to_the_service_that_made_them(monkeypatch):
+    monkeypatch.setattr(metrics, '_payment_services', {})
+    monkeypatch.setattr(metrics, '_unpaid', {})
+
+    class NWCRelay:
+        def __init__(self, app_privkey: str):
+            self.nwc_info = {'app_privkey': app_privkey}
+
+        async def make_invoice(self, amount: int, description: str = ''):
+            return f'lnbc{amount}{self.nwc_info["app_privkey"]}'
+
+        async def did_payment_succeed(self, invoice: str):
+            return True
+
+    metrics.count_payments(SimpleNamespace(nwc_relay=NWCRelay('app-1')), 'Paid Service')
+
+    async def run():
+        relay = NWCRelay('app-1')  # nwc_relay makes a new one each time
+        invoice = await relay.make_invoice(21)
+        await relay.did_payment_succeed(invoice)
+        await relay.did_payment_succeed(invoice)  # Checked again: counted once
+        await NWCRelay('someone-else').make_invoice(5)
+
+    earned = metrics.SATS_EARNED.labels('Paid Service').get()
+    invoiced = metrics.SATS_INVOICED.labels('Paid Service').get()
+    asyncio.run(run())
+    assert metrics.SATS_INVOICED.labels('Paid Service').get() - invoiced == 21
+    assert metrics.SATS_EARNED.labels('Paid Service').get() - earned == 21
@@ -0,0 +1,107 @@
+import asyncio
+
+from agentstr.nostr_rag import Author
+from pynostr.event import Event
+from pynostr.key import PrivateKey
+
+from agentstr_demo.embeddings import hashing_embedder
+from conftest import load_script
+
+rag_service = load_script('agents/nostr_rag/rag_service.py')
+
+
+def note(key: PrivateKey, content: str, created_at: int, tags: list[list[str]] | None = None) -> Event:
+    event = Event(content=content, kind=1, created_at=created_at, tags=tags or [])
+    event.sign(key.hex())
+    return event
+
+
+class StubRelays:
+    """Answers note requests from `events`, honouring authors, hashtags and `since`."""
+    def __init__(self, events: list[Event]):
+        self.events = events
+        self.requests = []
+
+    async def get_events(self, filters, limit, timeout):
+        self.requests.append(filters)
+        tags = set((filters.tags or {}).get('#t', []))
+        return [event for event in self.events
+                if (filters.authors is None or event.pubkey in filters.authors)
+                and (not tags or tags & {tag[1] for tag in event.tags if tag[0] == 't'})
+                and event.created_at >= (filters.since or 0)][:limit]
+
+
+def service(tmp_path, relays: StubRelays, authors: list[Author], hashtags: list[str] | None = None,
+            **kwargs):
+    store = rag_service.NoteStore(str(tmp_path / 'notes.sqlite3'), dim=64)
+    client = type('Client', (), {'relay_manager': relays})()
+    return rag_service.NostrRAGService(client, llm=None, known_authors=authors, store=store,
+                                       embed=hashing_embedder(64), known_hashtags=hashtags, **kwargs)
+
+
+def test_sync_fetches_only_notes_newer_than_the_stored_ones(tmp_path):
+    lyn = PrivateKey()
+    relays = StubRelays([note(lyn, f'note {i}', 100 + i) for i in range(3)])
+    rag = service(tmp_path, relays, [Author(pubkey=lyn.public_key.bech32(), name='Lyn Alden')])
+    assert asyncio.run(rag.sync_author(lyn.public_key.hex())) == 3
+    relays.events.append(note(lyn, 'note 3', 200))
+    assert asyncio.run(rag.sync_author(lyn.public_key.hex())) == 1
+    assert relays.requests[-1].since == 103
+    rag.store.close()
+
+    # A restart keeps the index, so only what is new gets fetched and embedded
+    restarted = service(tmp_path, relays, [Author(pubkey=lyn.public_key.bech32(), name='Lyn Alden')])
+    assert len(restarted.store) == 4
+    assert asyncio.run(restarted.sync_author(lyn.public_key.hex())) == 0
+    assert relays.requests[-1].since == 201
+
+
+def test_question_naming_an_author_is_answered_from_their_notes(tmp_path):
+    lyn, other = PrivateKey(), PrivateKey()
+    relays = StubRelays([note(lyn, 'Energy prices drive inflation', 100), note(lyn, 'I had pasta for lunch', 101),
+                         note(other, 'Energy prices drive inflation too', 102)])
+    rag = service(tmp_path, relays, [Author(pubkey=lyn.public_key.bech32(), name='Lyn Alden'),
+                                     Author(pubkey=other.public_key.bech32(), name='Someone Else')])
+
+    async def run():
+        await asyncio.gather(*(rag.sync_author(pubkey) for pubkey in rag._authors))
+        return await rag.retrieve('What does Lyn Alden say about energy and inflation?', limit=1)
+
+    notes = asyncio.run(run())
+    assert [n.content for n in notes] == ['Posted by Lyn Alden:\n\nEnergy prices drive inflation']
+
+
+def test_notes_by_tag_pages_through_every_tagged_note_once(tmp_path):
+    key = PrivateKey()
+    events = [note(key, f'note {i}', 100 + i // 2, [['t', 'bitcoin' if i % 3 else 'nostr']]) for i in range(10)]
+    events.append(note(key, 'tagged twice', 50, [['t', 'bitcoin'], ['t', '#nostr']]))
+    rag = service(tmp_path, StubRelays(events), [], hashtags=['bitcoin', 'nostr'], max_page=4)
+    assert asyncio.run(rag.sync_tag('bitcoin')) + asyncio.run(rag.sync_tag('nostr')) == 11
+
+    pages, cursor = [], None
+    while True:
+        page, cursor = rag.notes_by_tag(['bitcoin', 'nostr'], limit=100, before=cursor)  # Capped at max_page
+        pages.append(page)
+        if cursor is None:
+            break
+    assert [len(page) for page in pages] == [4, 4, 3]
+    seen = [item for page in pages for item in page]
+    assert seen == sorted(seen, reverse=True)
+    assert {note_id for _, note_id in seen} == {event.id for event in events}
+
+    first, cursor = rag.notes_by_tag(['nostr'], limit=4)
+    last, end = rag.notes_by_tag(['nostr'], limit=4, before=cursor)
+    assert (len(first), len(last), end) == (4, 1, None)
+    assert last[0][1] == events[-1].id  # '#nostr' is indexed as 'nostr'
+
+
+def test_hashtag_question_is_answered_from_the_tag_index(tmp_path):
+    key = PrivateKey()
+    relays = StubRelays([note(key, 'Fees spiked after the halving', 100, [['t', 'bitcoin']]),
+                         note(key, 'Fees on zaps are tiny', 101, [['t', 'zaps']])])
+    rag = service(tmp_path, relays, [], hashtags=['bitcoin'])
+    asyncio.run(rag.sync_tag('bitcoin'))
+
+    notes = asyncio.run(rag.retrieve('What happened to fees in #bitcoin?', query_type='auto'))
+    assert [n.content for n in notes] == ['Posted with #bitcoin:\n\nFees spiked after the halving']
+    assert len(relays.requests) == 1  # Only the sync asked the relays
@@ -0,0 +1,72 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from agentstr import AgentCard
+from pynostr.event import Event, EventKind
+from pynostr.key import PrivateKey
+
+from conftest import load_script
+
+registry = load_script('agents/discovery/registry.py')
+
+
+def metadata(key: PrivateKey, name: str, created_at: int) -> Event:
+    card = AgentCard(name=name, description=f'{name} agent.', satoshis=0, skills=[],
+                     nostr_pubkey=key.public_key.bech32())
+    return Event(content=json.dumps({'name': name, 'about': card.model_dump_json()}), pubkey=key.public_key.hex(),
+                 created_at=created_at, kind=EventKind.SET_METADATA)
+
+
+class StubRelays:
+    """Answers metadata requests with the newest of `events` for each requested author."""
+    def __init__(self, events: list[Event]):
+        self.events = events
+        self.requests: list[list[str]] = []
+
+    async def get_events(self, filters, limit, timeout):
+        self.requests.append(list(filters.authors))
+        return [event for event in self.events if event.pubkey in filters.authors]
+
+
+def test_refresh_fetches_cards_in_batches_and_keeps_the_newest(tmp_path):
+    keys = [PrivateKey() for _ in range(3)]
+    relays = StubRelays([metadata(key, f'Agent {i}', 100) for i, key in enumerate(keys)])
+    changes = []
+    agents = registry.AgentRegistry(SimpleNamespace(relay_manager=relays), [k.public_key.bech32() for k in keys],
+                                    cache_path=str(tmp_path / 'cards.json'), batch_size=2,
+                                    on_change=lambda r: changes.append(len(r)))
+
+    assert asyncio.run(agents.refresh()) == 3
+    assert sorted(len(batch) for batch in relays.requests) == [1, 2]
+    assert changes == [3]
+
+    # An older event does not replace a card, a newer one does
+    relays.events = [metadata(keys[0], 'Stale', 50), metadata(keys[1], 'Renamed', 200)]
+    assert asyncio.run(agents.refresh()) == 1
+    assert sorted(card.name for card in agents.cards.values()) == ['Agent 0', 'Agent 2', 'Renamed']
+    assert changes == [3, 3]
+
+
+def test_cached_cards_are_served_after_a_restart(tmp_path):
+    key, stranger = PrivateKey(), PrivateKey()
+    relays = StubRelays([metadata(key, 'Travel', 100), metadata(stranger, 'Stranger', 100)])
+    cache_path = str(tmp_path / 'cards.json')
+    first = registry.AgentRegistry(SimpleNamespace(relay_manager=relays), [key.public_key.hex()], cache_path=cache_path)
+    asyncio.run(first.refresh())
+    asyncio.run(first._on_event(relays.events[1]))  # Not tracked, and the registry is closed
+
+    restarted = registry.AgentRegistry(SimpleNamespace(relay_manager=StubRelays([])), [key.public_key.bech32()],
+                                       cache_path=cache_path)
+    assert restarted.load_cache() == 1
+    assert {npub: card.name for npub, card in restarted.cards.items()} == {key.public_key.bech32(): 'Travel'}
+
+
+def test_open_registry_admits_any_author_with_an_agent_card():
+    key = PrivateKey()
+    agents = registry.AgentRegistry(SimpleNamespace(relay_manager=StubRelays([])), [], open_registry=True)
+    not_an_agent = Event(content=json.dumps({'name': 'Someone'}), pubkey=PrivateKey().public_key.hex(),
+                         created_at=100, kind=EventKind.SET_METADATA)
+    asyncio.run(agents._on_event(not_an_agent))
+    asyncio.run(agents._on_event(metadata(key, 'Newcomer', 100)))
+    assert list(agents.cards) == [key.public_key.bech32()]
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from agentstr_demo.scheduler import SchedulerFull, TurnScheduler
+
+
+def recorder(log: list, name: str, delay: float = 0):
+    async def turn():
+        log.append(f'start {name}')
+        await asyncio.sleep(delay)
+        log.append(f'end {name}')
+        return name
+    return turn
+
+
+def blocked(gate: asyncio.Event):
+    async def turn():
+        await gate.wait()
+    return turn
+
+
+def test_turns_of_a_thread_run_in_order_one_at_a_time():
+    async def run():
+        scheduler, log = TurnScheduler(max_concurrency=4), []
+        futures = [await scheduler.submit('thread', recorder(log, str(i), delay=0.01 * (3 - i))) for i in range(3)]
+        assert await asyncio.gather(*futures) == ['0', '1', '2']
+        return log
+
+    assert asyncio.run(run()) == ['start 0', 'end 0', 'start 1', 'end 1', 'start 2', 'end 2']
+
+
+def test_threads_run_concurrently():
+    async def run():
+        scheduler, log = TurnScheduler(max_concurrency=2), []
+        futures = [await scheduler.submit(thread, recorder(log, thread, delay=0.01)) for thread in ('a', 'b')]
+        await asyncio.gather(*futures)
+        return log
+
+    assert asyncio.run(run())[:2] == ['start a', 'start b']
+
+
+def test_senders_take_turns_round_robin():
+    async def run():
+        scheduler, log, gate = TurnScheduler(max_concurrency=1), [], asyncio.Event()
+        first = await scheduler.submit('busy', blocked(gate))
+        futures = [await scheduler.submit(thread, recorder(log, thread), sender='heavy') for thread in ('h1', 'h2', 'h3')]
+        futures.append(await scheduler.submit('l1', recorder(log, 'l1'), sender='light'))
+        gate.set()
+        await asyncio.gather(first, *futures)
+        return [entry.removeprefix('start ') for entry in log if entry.startswith('start')]
+
+    assert asyncio.run(run()) == ['h1', 'l1', 'h2', 'h3']
+
+
+def test_per_sender_limit_rejects_right_away():
+    async def run():
+        scheduler, gate = TurnScheduler(max_concurrency=1, max_queue_per_sender=2), asyncio.Event()
+        running = await scheduler.submit('busy', blocked(gate))
+        waiting = [await scheduler.submit(f't{i}', blocked(gate), sender='spammer') for i in range(2)]
+        with pytest.raises(SchedulerFull):
+            await scheduler.submit('t2', blocked(gate), sender='spammer')
+        other = await scheduler.submit('o', blocked(gate), sender='someone else')  # Others still get in
+        gate.set()
+        await asyncio.gather(running, *waiting, other)
+        return scheduler.stats
+
+    stats = asyncio.run(run())
+    assert (stats['rejected'], stats['completed']) == (1, 4)
+
+
+def test_full_queue_waits_for_room_then_rejects():
+    async def run():
+        scheduler = TurnScheduler(max_concurrency=1, max_queue=1, max_queue_per_sender=None, admission_timeout=0.05)
+        gate = asyncio.Event()
+        running = await scheduler.submit('a', blocked(gate))
+        waiting = await scheduler.submit('b', blocked(gate))
+        with pytest.raises(SchedulerFull):
+            await scheduler.submit('c', blocked(gate))
+
+        # Room frees up while a submit waits: it gets in
+        admitted = asyncio.create_task(scheduler.submit('c', blocked(gate)))
+        await asyncio.sleep(0.01)
+        assert not admitted.done()
+        gate.set()
+        await asyncio.gather(running, waiting, await admitted)
+        return scheduler.stats
+
+    stats = asyncio.run(run())
+    assert (stats['rejected'], stats['completed']) == (1, 3)
+
+
+def test_turn_that_runs_too_long_times_out_and_frees_its_thread():
+    async def run():
+        scheduler, log = TurnScheduler(timeout=0.02), []
+        slow = await scheduler.submit('thread', recorder(log, 'slow', delay=1))
+        fast = await scheduler.submit('thread', recorder(log, 'fast'))
+        with pytest.raises(TimeoutError):
+            await slow
+        assert await fast == 'fast'
+        return scheduler.stats
+
+    stats = asyncio.run(run())
+    assert (stats['timed_out'], stats['completed']) == (1, 1)
+
+
+def test_nested_run_for_the_same_thread_runs_inline():
+    async def run():
+        scheduler = TurnScheduler(max_concurrency=1)
+
+        async def outer():
+            return await scheduler.run('thread', lambda: asyncio.sleep(0, 'inner'))
+        return await asyncio.wait_for(scheduler.run('thread', outer), 1)
+
+    assert asyncio.run(run()) == 'inner'
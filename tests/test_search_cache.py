@@ -0,0 +1,118 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'mcp_servers' / 'web_search'))
+
+from search_cache import SearchCache
+
+
+class StubTavilyClient:
+    """Answers searches after `latency` seconds and counts them."""
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.searches = 0
+
+    async def search(self, query: str, max_results: int = 5) -> dict:
+        self.searches += 1
+        await asyncio.sleep(self.latency)
+        return {"query": query, "results": [{"title": f"{query} #{i}"} for i in range(max_results)]}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def search(cache: SearchCache, client: StubTavilyClient, query: str, num_results: int = 3) -> dict:
+    return cache.get_or_search(query, num_results, lambda: client.search(query, max_results=num_results))
+
+
+def test_miss_then_hit():
+    cache, client = SearchCache(ttl=60), StubTavilyClient()
+
+    async def run():
+        first = await search(cache, client, 'bitcoin price')
+        second = await search(cache, client, 'bitcoin price')
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert client.searches == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "coalesced": 0, "disk_hits": 0, "upstream_calls": 1}
+
+
+def test_normalized_queries_share_an_entry():
+    cache, client = SearchCache(ttl=60), StubTavilyClient()
+
+    async def run():
+        await search(cache, client, 'Bitcoin  Price')
+        await search(cache, client, '  bitcoin price ')
+        await search(cache, client, 'bitcoin price', num_results=5)
+
+    asyncio.run(run())
+    assert client.searches == 2  # Different result counts are different searches
+    assert cache.memory.hits == 1
+
+
+def test_entry_expires_after_ttl():
+    cache, client, clock = SearchCache(ttl=60), StubTavilyClient(), FakeClock()
+    cache.memory.clock = clock
+
+    async def run():
+        await search(cache, client, 'bitcoin price')
+        clock.now += 59
+        await search(cache, client, 'bitcoin price')
+        assert client.searches == 1
+        clock.now += 1
+        await search(cache, client, 'bitcoin price')
+
+    asyncio.run(run())
+    assert client.searches == 2
+    assert cache.memory.misses == 2
+
+
+def test_concurrent_misses_are_coalesced():
+    cache, client = SearchCache(ttl=60), StubTavilyClient(latency=0.05)
+
+    async def run():
+        return await asyncio.gather(*(search(cache, client, 'bitcoin price') for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert client.searches == 1
+    assert all(result == results[0] for result in results)
+    assert cache.memory.misses == 20
+    assert cache.memory.coalesced == 19
+
+
+def test_failed_search_is_not_cached():
+    cache, client = SearchCache(ttl=60), StubTavilyClient()
+
+    async def fail():
+        raise RuntimeError('upstream down')
+
+    async def run():
+        try:
+            await cache.get_or_search('bitcoin price', 3, fail)
+        except RuntimeError:
+            pass
+        return await search(cache, client, 'bitcoin price')
+
+    assert asyncio.run(run())['results']
+    assert client.searches == 1
+
+
+def test_disk_cache_survives_restart(tmp_path):
+    db_path = str(tmp_path / 'search.sqlite3')
+    client = StubTavilyClient()
+    asyncio.run(search(SearchCache(ttl=60, db_path=db_path), client, 'bitcoin price'))
+
+    cache = SearchCache(ttl=60, db_path=db_path)
+    result = asyncio.run(search(cache, client, 'bitcoin price'))
+    assert result['query'] == 'bitcoin price'
+    assert client.searches == 1
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.upstream_calls == 0
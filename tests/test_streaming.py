@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from agentstr import AgentCard, NostrClient
+from pynostr.key import PrivateKey
+
+from agentstr_demo import streaming
+from agentstr_demo.server import AgentServer
+from agentstr_demo.streaming import StreamAssembler, chunk_message, parse_chunk
+
+
+def chunk(seq: int, text: str, done: bool = False, stream: str = 's1') -> dict:
+    return parse_chunk(chunk_message(stream, seq, text, done))
+
+
+def test_parse_chunk_leaves_ordinary_replies_alone():
+    assert parse_chunk(chunk_message('s1', 0, 'Hi', True)) == {'stream': 's1', 'seq': 0, 'text': 'Hi', 'done': True}
+    assert parse_chunk('Hello there') is None
+    assert parse_chunk('{"stream": "s1"') is None  # Truncated JSON
+    assert parse_chunk('{"stream": "s1", "seq": 0}') is None  # Not an envelope
+
+
+def test_assembler_orders_pieces_and_ignores_duplicates():
+    assembler = StreamAssembler()
+    assert assembler.add(chunk(1, 'world')) == ''  # Waits for piece 0
+    assert assembler.add(chunk(2, '!', done=True)) == ''
+    assert not assembler.complete
+    assert assembler.add(chunk(0, 'Hello ')) == 'Hello world!'
+    assert assembler.add(chunk(1, 'world')) == ''
+    assert assembler.complete
+    assert assembler.text == 'Hello world!'
+
+
+def test_assembler_follows_the_first_stream_only():
+    assembler = StreamAssembler()
+    assembler.add(chunk(0, 'mine ', stream='s1'))
+    assert assembler.add(chunk(0, 'theirs', done=True, stream='s2')) == ''
+    assert not assembler.complete
+    assembler.add(chunk(1, 'too', done=True, stream='s1'))
+    assert (assembler.complete, assembler.text) == (True, 'mine too')
+
+
+def client_receiving(monkeypatch, replies: list[str]) -> SimpleNamespace:
+    """A client whose sent message is answered with `replies`, in that order."""
+    async def send_message(message, recipient):
+        return SimpleNamespace(created_at=0)
+
+    async def direct_messages(client, author, since):
+        for reply in replies:
+            yield reply
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(streaming, '_direct_messages', direct_messages)
+    return SimpleNamespace(relay_manager=SimpleNamespace(send_message=send_message))
+
+
+def test_send_and_receive_stream_reassembles_pieces(monkeypatch):
+    client = client_receiving(monkeypatch, [chunk_message('s1', 1, 'b', False), chunk_message('s1', 0, 'a', False),
+                                            chunk_message('s1', 1, 'b', False), chunk_message('s1', 2, 'c', True)])
+    seen = []
+    reply = asyncio.run(streaming.send_and_receive_stream(client, PrivateKey().public_key.hex(), 'hi', timeout=1,
+                                                          on_text=seen.append))
+    assert (reply, seen) == ('abc', ['ab', 'c'])
+
+
+def test_send_and_receive_stream_returns_a_plain_reply(monkeypatch):
+    client = client_receiving(monkeypatch, ['Just an answer'])
+    assert asyncio.run(streaming.send_and_receive_stream(client, PrivateKey().public_key.hex(), 'hi', timeout=1)) == \
+        'Just an answer'
+
+
+def test_send_and_receive_stream_returns_what_arrived_on_timeout(monkeypatch):
+    client = client_receiving(monkeypatch, [chunk_message('s1', 0, 'partial', False)])
+    assert asyncio.run(streaming.send_and_receive_stream(client, PrivateKey().public_key.hex(), 'hi', timeout=0.05)) == \
+        'partial'
+
+
+def test_direct_messages_raises_when_no_relay_can_be_reached():
+    key = PrivateKey()
+    client = SimpleNamespace(public_key=key.public_key, private_key=key,
+                             relay_manager=SimpleNamespace(relays=[SimpleNamespace(relay='ws://127.0.0.1:9')]))
+
+    async def run():
+        replies = streaming._direct_messages(client, PrivateKey().public_key.hex(), 0)
+        try:
+            await asyncio.wait_for(anext(replies), 5)
+        finally:
+            await replies.aclose()
+
+    with pytest.raises(ConnectionRefusedError):  # Rather than waiting out the timeout
+        asyncio.run(run())
+
+
+def test_stream_reply_sends_pieces_that_reassemble_to_the_reply():
+    key = PrivateKey()
+    client = NostrClient(['ws://127.0.0.1:9'], key.bech32())
+    sent = []
+
+    async def send_direct_message(recipient, message):
+        sent.append(message)
+
+    client.send_direct_message = send_direct_message
+
+    async def agent_callable(input):
+        return ''
+
+    info = AgentCard(name='Test Agent', description='Streams.', satoshis=0, skills=[], nostr_pubkey=key.public_key.bech32())
+    server = AgentServer(client, agent_info=info, agent_callable=agent_callable, stream_chunk_chars=5, stream_interval=60)
+
+    async def pieces():
+        for word in ['Streamed ', 'replies ', 'arrive ', 'in ', 'pieces.']:
+            yield word
+
+    last = asyncio.run(server._stream_reply('recipient', pieces()))
+    envelopes = [parse_chunk(message) for message in sent + [last]]
+    assert [envelope['seq'] for envelope in envelopes] == list(range(len(envelopes)))
+    assert [envelope['done'] for envelope in envelopes] == [False] * (len(envelopes) - 1) + [True]
+    assert len({envelope['stream'] for envelope in envelopes}) == 1
+    assembler = StreamAssembler()
+    for envelope in reversed(envelopes):
+        assembler.add(envelope)
+    assert (assembler.complete, assembler.text) == (True, 'Streamed replies arrive in pieces.')
@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import httpx
+
+from agentstr_demo import tracing
+from agentstr_demo.http import HTTPPool
+
+
+def ok(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={'path': request.url.path})
+
+
+class Chunks(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        yield b'data: {}\n\n'
+        yield b'data: [DONE]\n\n'
+
+
+def streamed(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, stream=Chunks())
+
+
+def traced_spans(tmp_path, requests) -> list[dict]:
+    """The spans recorded while `requests()` runs with tracing on."""
+    path = tmp_path / 'traces.jsonl'
+    tracing.configure(tracing.Tracer(str(path)))
+    try:
+        asyncio.run(requests())
+    finally:
+        tracing.configure(None)
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+def test_pool_requests_are_recorded_once(tmp_path):
+    async def requests():
+        async with HTTPPool(transport=httpx.MockTransport(ok)) as pool:
+            await pool.get('https://api.example.com/rates')
+
+    spans = traced_spans(tmp_path, requests)
+    assert [(s['name'], s['attributes']['status']) for s in spans] == [('http.request', 200)]
+
+
+def test_event_hooks_record_llm_requests(tmp_path):
+    async def requests():
+        transport = httpx.MockTransport(streamed)
+        async with httpx.AsyncClient(transport=transport, event_hooks=tracing.event_hooks()) as client:
+            await client.post('https://llm.example.com/v1/chat/completions', json={})
+            async with client.stream('GET', 'https://llm.example.com/v1/models') as response:
+                await response.aread()
+
+    spans = traced_spans(tmp_path, requests)
+    assert [(s['name'], s['attributes']['path'], s['attributes']['status']) for s in spans] == [
+        ('llm.request', '/v1/chat/completions', 200), ('http.request', '/v1/models', 200)]
+
+
+def test_event_hooks_are_empty_when_tracing_is_off():
+    assert tracing.event_hooks() == {}
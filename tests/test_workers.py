@@ -0,0 +1,52 @@
+import asyncio
+from types import SimpleNamespace
+
+from agentstr_demo import workers
+from agentstr_demo.workers import HashRing, WorkerLauncher
+
+KEYS = [f'pubkey-{i}' for i in range(5000)]
+
+
+def test_adding_a_worker_only_moves_keys_to_it():
+    before, after = HashRing(4), HashRing(5)
+    moved = [key for key in KEYS if before.node(key) != after.node(key)]
+    assert {after.node(key) for key in moved} == {4}
+    assert 0.1 < len(moved) / len(KEYS) < 0.3  # About 1/5
+
+
+def test_removing_a_worker_only_moves_its_keys():
+    before, after = HashRing(5), HashRing(4)
+    assert all(before.node(key) == after.node(key) for key in KEYS if before.node(key) != 4)
+
+
+def test_keys_are_spread_over_every_worker():
+    ring = HashRing(4)
+    counts = [0] * 4
+    for key in KEYS:
+        counts[ring.node(key)] += 1
+    assert min(counts) > len(KEYS) / 4 * 0.7
+
+
+def test_route_sends_a_thread_to_the_same_worker():
+    launcher = WorkerLauncher('agent.py', workers=3, relays=[], private_key='')
+
+    def event(pubkey: str, content: str):
+        return SimpleNamespace(pubkey=pubkey, to_dict=lambda: {'pubkey': pubkey, 'content': content})
+
+    async def run():
+        for i in range(3):
+            for pubkey in ('alice', 'bob'):
+                await launcher.route(event(pubkey, f'{pubkey} {i}'))
+
+    asyncio.run(run())
+    alice = launcher.ring.node('alice')
+    inbox = launcher._inboxes[alice]
+    received = [inbox.get(timeout=1)['content'] for _ in range(launcher.routed[alice])]
+    assert [content for content in received if content.startswith('alice')] == ['alice 0', 'alice 1', 'alice 2']
+    assert sum(launcher.routed) == 6
+
+
+def test_worker_path_is_unique_per_worker(monkeypatch):
+    assert (workers.worker_path('data/notes.sqlite3'), workers.worker_index()) == ('data/notes.sqlite3', None)
+    monkeypatch.setattr(workers, '_worker', SimpleNamespace(index=1))
+    assert (workers.worker_path('data/notes.sqlite3'), workers.worker_index()) == ('data/notes.w1.sqlite3', 1)